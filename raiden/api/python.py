@@ -1,15 +1,19 @@
 # -*- coding: utf-8 -*-
-import gevent
+from collections import namedtuple
 from contextlib import ExitStack
+
+import gevent
+from gevent.event import AsyncResult
 import structlog
 
 from raiden import waiting
-from raiden.blockchain.events import (
-    ALL_EVENTS,
-    get_all_registry_events,
-    get_all_netting_channel_events,
-    get_all_channel_manager_events
+from raiden.blockchain.abi import (
+    CONTRACT_MANAGER,
+    CONTRACT_CHANNEL_MANAGER,
+    CONTRACT_NETTING_CHANNEL,
+    CONTRACT_REGISTRY,
 )
+from raiden.blockchain.events import contract_event_type
 from raiden.transfer import views
 from raiden.transfer.events import (
     EventTransferSentSuccess,
@@ -21,6 +25,7 @@ from raiden.exceptions import (
     AlreadyRegisteredTokenAddress,
     ChannelBusyError,
     ChannelNotFound,
+    DuplicatedPaymentIdentifier,
     EthNodeCommunicationError,
     InsufficientFunds,
     InvalidAddress,
@@ -28,9 +33,7 @@ from raiden.exceptions import (
     InvalidSettleTimeout,
     UnknownTokenAddress,
 )
-from raiden.settings import (
-    DEFAULT_POLL_TIMEOUT,
-)
+from raiden.settings import DEFAULT_POLL_TIMEOUT
 from raiden.utils import (
     isaddress,
     pex,
@@ -45,6 +48,77 @@ EVENTS_EXTERNALLY_VISIBLE = (
     EventTransferReceivedSuccess,
 )
 
+# Position of an event in a events query, `position` is the 1-based index of
+# the event among the events of `block_number`
+EventsCursor = namedtuple('EventsCursor', ('block_number', 'position'))
+
+
+def encode_events_cursor(cursor: EventsCursor) -> str:
+    return '{}-{}'.format(cursor.block_number, cursor.position)
+
+
+def decode_events_cursor(cursor: str) -> EventsCursor:
+    """ Raises ValueError if `cursor` was not produced by `encode_events_cursor`. """
+    block_number, position = cursor.split('-')
+    cursor = EventsCursor(int(block_number), int(position))
+
+    if cursor.block_number < 0 or cursor.position < 0:
+        raise ValueError('Invalid events cursor')
+
+    return cursor
+
+
+def event_fields(event):
+    """ The attributes of an internal event, the event classes are slotted. """
+    fields = dict()
+
+    for klass in reversed(type(event).__mro__):
+        for name in getattr(klass, '__slots__', ()):
+            fields[name] = getattr(event, name, None)
+
+    return fields
+
+
+def iter_events_with_cursor(events, cursor: EventsCursor = None):
+    """ Yields the `(cursor, event)` pairs for the events which come after
+    `cursor`, `events` must be ordered by block number.
+    """
+    last_block = None
+    position = 0
+    for event in events:
+        block_number = event['block_number']
+
+        if block_number == last_block:
+            position += 1
+        else:
+            last_block = block_number
+            position = 1
+
+        if cursor is not None:
+            if block_number < cursor.block_number:
+                continue
+
+            if block_number == cursor.block_number and position <= cursor.position:
+                continue
+
+        yield EventsCursor(block_number, position), event
+
+
+def paginate_events(events, cursor: EventsCursor = None, limit: int = None):
+    """ Returns the first `limit` events after `cursor` and the cursor of
+    the next page, which is None if there are no more events.
+    """
+    page = list()
+    last_cursor = None
+    for event_cursor, event in iter_events_with_cursor(events, cursor):
+        if limit is not None and len(page) == limit:
+            return page, last_cursor
+
+        page.append(event)
+        last_cursor = event_cursor
+
+    return page, None
+
 
 class RaidenAPI:
     # pylint: disable=too-many-public-methods
@@ -196,7 +270,6 @@ class RaidenAPI:
                 registry_address,
                 token_address,
                 partner_address,
-                self.raiden.alarm.wait_time,
             )
 
         return netcontract_address
@@ -295,7 +368,6 @@ class RaidenAPI:
                     partner_address,
                     target_address,
                     target_balance,
-                    self.raiden.alarm.wait_time,
                 )
 
     def channel_close(
@@ -394,7 +466,6 @@ class RaidenAPI:
                     registry_address,
                     token_address,
                     channel_ids,
-                    self.raiden.alarm.wait_time,
                 )
 
     def get_channel_list(self, registry_address, token_address=None, partner_address=None):
@@ -419,40 +490,37 @@ class RaidenAPI:
         if partner_address and not isaddress(partner_address):
             raise InvalidAddress('Expected binary address format for partner in get_channel_list')
 
+        token_network_views = self.get_token_network_views(registry_address, token_address)
+
         result = list()
-        if token_address and partner_address:
-            channel_state = views.get_channelstate_for(
-                views.state_from_raiden(self.raiden),
-                registry_address,
-                token_address,
-                partner_address,
-            )
+        for token_network_view in token_network_views:
+            for channel_state in token_network_view.channel_states:
+                partner_matches = (
+                    partner_address is None or
+                    channel_state.partner_state.address == partner_address
+                )
 
-            if channel_state:
-                result = [channel_state]
-            else:
-                result = []
+                if partner_matches:
+                    result.append(channel_state)
 
-        elif token_address:
-            result = views.list_channelstate_for_tokennetwork(
-                views.state_from_raiden(self.raiden),
-                registry_address,
-                token_address,
-            )
+        return result
 
-        elif partner_address:
-            result = views.list_channelstate_for_tokennetwork(
-                views.state_from_raiden(self.raiden),
-                registry_address,
-                partner_address,
-            )
+    def get_token_network_views(self, registry_address, token_address=None):
+        """ Returns the materialised TokenNetworkViews of the registry, or
+        only the view of `token_address` if given.
+        """
+        if token_address is None:
+            return self.raiden.channel_views.get_views(registry_address)
 
-        else:
-            result = views.list_all_channelstate(
-                views.state_from_raiden(self.raiden),
-            )
+        token_network_view = self.raiden.channel_views.get_view_by_token_address(
+            registry_address,
+            token_address,
+        )
 
-        return result
+        if token_network_view is None:
+            return []
+
+        return [token_network_view]
 
     def get_node_network_state(self, node_address):
         """ Returns the currently network status of `node_address`. """
@@ -501,24 +569,8 @@ class RaidenAPI:
             target,
             identifier=None):
 
-        if not isinstance(amount, int):
-            raise InvalidAmount('Amount not a number')
-
-        if amount <= 0:
-            raise InvalidAmount('Amount negative')
-
-        if not isaddress(token_address):
-            raise InvalidAddress('token address is not valid.')
-
-        if not isaddress(target):
-            raise InvalidAddress('target address is not valid.')
-
-        valid_tokens = views.get_token_network_addresses_for(
-            views.state_from_raiden(self.raiden),
-            registry_address,
-        )
-        if token_address not in valid_tokens:
-            raise UnknownTokenAddress('Token address is not known.')
+        self._check_token_address(registry_address, token_address)
+        self._check_payment(amount, target, identifier)
 
         log.debug(
             'initiating transfer',
@@ -543,45 +595,229 @@ class RaidenAPI:
         )
         return async_result
 
-    def get_network_events(self, registry_address, from_block, to_block):
-        return get_all_registry_events(
-            self.raiden.chain,
-            registry_address,
-            events=ALL_EVENTS,
-            from_block=from_block,
-            to_block=to_block,
+    def transfer_batch_async(self, registry_address, token_address, payments):
+        """ Start a mediated transfer for each (target, amount, identifier)
+        in `payments`.
+
+        The routes are computed once per target and the transfers are written
+        to the WAL with a single commit, which is much faster than calling
+        `transfer_async` for each payment.
+
+        Returns:
+            An AsyncResult for each payment, in order. The result of an
+            invalid payment is set to the exception, the others are set like
+            the result of `transfer_async`.
+        """
+        self._check_token_address(registry_address, token_address)
+
+        payment_network_identifier = self.raiden.default_registry.address
+        token_network_identifier = views.get_token_network_identifier_by_token_address(
+            views.state_from_raiden(self.raiden),
+            payment_network_identifier,
+            token_address,
         )
 
-    def get_channel_events(self, channel_address, from_block, to_block='latest'):
-        if not isaddress(channel_address):
-            raise InvalidAddress(
-                'Expected binary address format for channel in get_channel_events'
+        results = list()
+        valid_payments = list()
+        valid_positions = list()
+        batch_identifiers = set()
+        for target, amount, identifier in payments:
+            async_result = AsyncResult()
+            try:
+                self._check_payment(amount, target, identifier)
+
+                if identifier in batch_identifiers:
+                    raise DuplicatedPaymentIdentifier(
+                        'The identifier {} is repeated in the batch.'.format(identifier),
+                    )
+            except (InvalidAmount, InvalidAddress, DuplicatedPaymentIdentifier) as e:
+                async_result.set_exception(e)
+            else:
+                if identifier is not None:
+                    batch_identifiers.add(identifier)
+                valid_payments.append((target, amount, identifier))
+                valid_positions.append(len(results))
+
+            results.append(async_result)
+
+        log.debug(
+            'initiating transfer batch',
+            initiator=pex(self.raiden.address),
+            token=pex(token_address),
+            number_of_transfers=len(valid_payments),
+        )
+
+        if valid_payments:
+            transfers_results = self.raiden.start_mediated_transfers_batch(
+                token_network_identifier,
+                valid_payments,
             )
-        returned_events = get_all_netting_channel_events(
-            self.raiden.chain,
-            channel_address,
-            events=ALL_EVENTS,
-            from_block=from_block,
-            to_block=to_block,
+
+            for position, transfer_result in zip(valid_positions, transfers_results):
+                results[position] = transfer_result
+
+        return results
+
+    def _check_token_address(self, registry_address, token_address):
+        if not isaddress(token_address):
+            raise InvalidAddress('token address is not valid.')
+
+        valid_tokens = views.get_token_network_addresses_for(
+            views.state_from_raiden(self.raiden),
+            registry_address,
         )
-        raiden_events = self.raiden.wal.storage.get_events_by_block(
+        if token_address not in valid_tokens:
+            raise UnknownTokenAddress('Token address is not known.')
+
+    def _check_payment(self, amount, target, identifier):
+        if not isinstance(amount, int):
+            raise InvalidAmount('Amount not a number')
+
+        if amount <= 0:
+            raise InvalidAmount('Amount negative')
+
+        if not isaddress(target):
+            raise InvalidAddress('target address is not valid.')
+
+        if identifier is not None and identifier in self.raiden.identifier_to_results:
+            raise DuplicatedPaymentIdentifier(
+                'A payment with the identifier {} is in progress.'.format(identifier),
+            )
+
+    def get_payment_status(self, identifier):
+        """ Returns the PaymentStatus of a payment started by this node, or
+        None if the identifier is unknown or the result was forgotten.
+        """
+        return self.raiden.payments.get(identifier)
+
+    def wait_for_payment_results(self, sequence, timeout=None):
+        """ Returns the payments that finished after `sequence`, blocking up
+        to `timeout` seconds until there is at least one.
+        """
+        return self.raiden.payments.wait_for_results(sequence, timeout)
+
+    def _iter_raiden_events(self, from_block, to_block):
+        """ The internal events that are exposed to the end user. """
+        raiden_events = self.raiden.wal.storage.iter_events_by_block(
             from_block=from_block,
             to_block=to_block,
         )
-        # Here choose which raiden internal events we want to expose to the end user
+
         for block_number, event in raiden_events:
             if isinstance(event, EVENTS_EXTERNALLY_VISIBLE):
                 new_event = {
                     'block_number': block_number,
                     'event': type(event).__name__,
                 }
-                new_event.update(event.__dict__)
-                returned_events.append(new_event)
+                new_event.update(event_fields(event))
+                yield new_event
+
+    def _iter_events(
+            self,
+            get_chain_events,
+            from_block,
+            to_block,
+            event_types,
+            chunk_size=None,
+            include_raiden_events=True,
+    ):
+        """ Yields the blockchain events returned by `get_chain_events`,
+        merged with the internal events if `include_raiden_events` is set,
+        ordered by block number.
+
+        With a `chunk_size` the block range is read in chunks of that many
+        blocks, so a consumer that stops early doesn't pay for the whole
+        range. Otherwise the range is read with a single query.
+        """
+        if from_block is None:
+            from_block = 0
+
+        if to_block is None or to_block == 'latest':
+            to_block = self.raiden.chain.block_number()
+
+        if event_types is not None:
+            event_types = set(event_types)
+
+        if chunk_size is None:
+            chunk_size = max(to_block - from_block + 1, 1)
+
+        for chunk_start in range(from_block, to_block + 1, chunk_size):
+            chunk_end = min(chunk_start + chunk_size - 1, to_block)
+
+            chunk_events = get_chain_events(chunk_start, chunk_end)
+            for event in chunk_events:
+                event.setdefault('block_number', chunk_start)
+
+            if include_raiden_events:
+                chunk_events.extend(self._iter_raiden_events(chunk_start, chunk_end))
 
-        return returned_events
+            # The sort is stable, within a block the blockchain events come
+            # first, so the order of the events doesn't depend on the chunking
+            chunk_events.sort(key=lambda event: event['block_number'])
 
-    def get_token_network_events(self, token_address, from_block, to_block='latest'):
+            for event in chunk_events:
+                if event_types is None or contract_event_type(event) in event_types:
+                    yield event
 
+    def iter_network_events(
+            self,
+            registry_address,
+            from_block,
+            to_block,
+            event_types=None,
+            chunk_size=None,
+    ):
+        def get_chain_events(chunk_start, chunk_end):
+            return self.raiden.contract_events.get_events(
+                CONTRACT_MANAGER.get_contract_abi(CONTRACT_REGISTRY),
+                registry_address,
+                chunk_start,
+                chunk_end,
+                event_types,
+            )
+
+        # The internal events are not about the registry
+        return self._iter_events(
+            get_chain_events,
+            from_block,
+            to_block,
+            event_types,
+            chunk_size,
+            include_raiden_events=False,
+        )
+
+    def iter_channel_events(
+            self,
+            channel_address,
+            from_block,
+            to_block='latest',
+            event_types=None,
+            chunk_size=None,
+    ):
+        if not isaddress(channel_address):
+            raise InvalidAddress(
+                'Expected binary address format for channel in get_channel_events'
+            )
+
+        def get_chain_events(chunk_start, chunk_end):
+            return self.raiden.contract_events.get_events(
+                CONTRACT_MANAGER.get_contract_abi(CONTRACT_NETTING_CHANNEL),
+                channel_address,
+                chunk_start,
+                chunk_end,
+                event_types,
+            )
+
+        return self._iter_events(get_chain_events, from_block, to_block, event_types, chunk_size)
+
+    def iter_token_network_events(
+            self,
+            token_address,
+            from_block,
+            to_block='latest',
+            event_types=None,
+            chunk_size=None,
+    ):
         if not isaddress(token_address):
             raise InvalidAddress(
                 'Expected binary address format for token in get_token_network_events'
@@ -589,29 +825,46 @@ class RaidenAPI:
         channel_manager_address = self.raiden.default_registry.manager_address_by_token(
             token_address
         )
-        returned_events = get_all_channel_manager_events(
-            self.raiden.chain,
-            channel_manager_address,
-            events=ALL_EVENTS,
-            from_block=from_block,
-            to_block=to_block,
-        )
 
-        raiden_events = self.raiden.wal.storage.get_events_by_block(
-            from_block=from_block,
-            to_block=to_block,
-        )
+        def get_chain_events(chunk_start, chunk_end):
+            return self.raiden.contract_events.get_events(
+                CONTRACT_MANAGER.get_contract_abi(CONTRACT_CHANNEL_MANAGER),
+                channel_manager_address,
+                chunk_start,
+                chunk_end,
+                event_types,
+            )
 
-        # Here choose which raiden internal events we want to expose to the end user
-        for block_number, event in raiden_events:
-            if isinstance(event, EVENTS_EXTERNALLY_VISIBLE):
-                new_event = {
-                    'block_number': block_number,
-                    'event': type(event).__name__,
-                }
-                new_event.update(event.__dict__)
-                returned_events.append(new_event)
+        return self._iter_events(get_chain_events, from_block, to_block, event_types, chunk_size)
+
+    def get_network_events(self, registry_address, from_block, to_block, event_types=None):
+        return list(self.iter_network_events(
+            registry_address,
+            from_block,
+            to_block,
+            event_types,
+        ))
+
+    def get_channel_events(self, channel_address, from_block, to_block='latest', event_types=None):
+        return list(self.iter_channel_events(
+            channel_address,
+            from_block,
+            to_block,
+            event_types,
+        ))
 
-        return returned_events
+    def get_token_network_events(
+            self,
+            token_address,
+            from_block,
+            to_block='latest',
+            event_types=None,
+    ):
+        return list(self.iter_token_network_events(
+            token_address,
+            from_block,
+            to_block,
+            event_types,
+        ))
 
     transfer = transfer_and_wait
@@ -1,18 +1,22 @@
 # -*- coding: utf-8 -*-
 
 from http import HTTPStatus
+import hashlib
 import json
 import sys
 import logging
+from itertools import islice
 
-from flask import Flask, make_response, url_for, send_from_directory, request
+from flask import Flask, Response, make_response, url_for, send_from_directory, request
 from flask.json import jsonify
 from flask_restful import Api, abort
 from flask_cors import CORS
 from webargs.flaskparser import parser
 from werkzeug.exceptions import NotFound
+from werkzeug.urls import url_encode
 from gevent.pywsgi import WSGIServer
 
+from cachetools import LRUCache
 import structlog
 
 from raiden.exceptions import (
@@ -21,6 +25,7 @@ from raiden.exceptions import (
     ChannelBusyError,
     ChannelNotFound,
     DuplicatedChannelError,
+    DuplicatedPaymentIdentifier,
     EthNodeCommunicationError,
     InsufficientFunds,
     InvalidAddress,
@@ -37,11 +42,15 @@ from raiden.api.v1.encoding import (
     AddressListSchema,
     PartnersPerTokenListSchema,
     HexAddressConverter,
+    PaymentSchema,
     TransferSchema,
 )
 from raiden.api.v1.resources import (
     create_blueprint,
     AddressResource,
+    MetricsResource,
+    ProfileResource,
+    HubBlocksResource,
     ChannelsResource,
     ChannelsResourceByChannelAddress,
     TokensResource,
@@ -51,8 +60,21 @@ from raiden.api.v1.resources import (
     TokenEventsResource,
     ChannelEventsResource,
     TransferToTargetResource,
+    PaymentToTargetResource,
+    PaymentBatchResource,
+    PaymentResource,
+    PaymentEventsResource,
+    PaymentStreamResource,
     ConnectionsResource,
 )
+from raiden.blockchain.events import contract_event_type
+from raiden.api.python import (
+    decode_events_cursor,
+    encode_events_cursor,
+    iter_events_with_cursor,
+    paginate_events,
+)
+from raiden.payments import PAYMENT_STATUS_SUCCESS
 from raiden.transfer import channel, views
 from raiden.transfer.state import (
     CHANNEL_STATE_OPENED,
@@ -61,8 +83,11 @@ from raiden.transfer.state import (
 from raiden.raiden_service import (
     create_default_identifier,
 )
+from raiden.settings import EVENTS_BLOCK_CHUNK_SIZE
 from raiden.api.objects import ChannelList, PartnersPerTokenList, AddressList
 from raiden.utils import address_encoder, channelstate_to_api_dict, split_endpoint, is_frozen
+from raiden.utils.hub_monitor import HUB_MONITOR
+from raiden.utils.metrics import REGISTRY
 
 log = structlog.get_logger(__name__)
 
@@ -76,6 +101,9 @@ ERROR_STATUS_CODES = [
 
 URLS_V1 = [
     ('/address', AddressResource),
+    ('/metrics', MetricsResource),
+    ('/debug/profile', ProfileResource),
+    ('/debug/blocks', HubBlocksResource),
     ('/channels', ChannelsResource),
     ('/channels/<hexaddress:channel_address>', ChannelsResourceByChannelAddress),
     ('/tokens', TokensResource),
@@ -88,9 +116,25 @@ URLS_V1 = [
         '/transfers/<hexaddress:token_address>/<hexaddress:target_address>',
         TransferToTargetResource,
     ),
+    (
+        '/payments/<hexaddress:token_address>/<hexaddress:target_address>',
+        PaymentToTargetResource,
+    ),
+    ('/payments/<hexaddress:token_address>', PaymentBatchResource),
+    ('/payments/<int:identifier>', PaymentResource),
+    ('/payments/events', PaymentEventsResource),
+    ('/payments/stream', PaymentStreamResource),
     ('/connections/<hexaddress:token_address>', ConnectionsResource),
 ]
 
+# Number of serialized responses cached for the channel endpoints, one per
+# combination of filters.
+RESPONSE_CACHE_SIZE = 256
+
+# Seconds between the comments sent on an idle payment stream, these keep the
+# connection open through proxies and detect disconnected clients.
+PAYMENT_STREAM_KEEPALIVE = 15
+
 
 def api_response(result, status_code=HTTPStatus.OK):
     if status_code == HTTPStatus.NO_CONTENT:
@@ -128,21 +172,22 @@ def endpoint_not_found(e):
     return api_error('invalid endpoint', HTTPStatus.NOT_FOUND)
 
 
-def normalize_events_list(old_list):
+def normalize_event(event):
     """Internally the `event_type` key is prefixed with underscore but the API
     returns an object without that prefix"""
-    new_list = []
-    for _event in old_list:
-        new_event = dict(_event)
-        new_event['event'] = new_event.pop('event').decode()
-        # Some of the raiden events contain accounts and as such need to
-        # be exported in hex to the outside world
-        if new_event['event'] == 'EventTransferReceivedSuccess':
-            new_event['initiator'] = address_encoder(new_event['initiator'])[2:]
-        if new_event['event'] == 'EventTransferSentSuccess':
-            new_event['target'] = address_encoder(new_event['target'])[2:]
-        new_list.append(new_event)
-    return new_list
+    new_event = dict(event)
+    new_event['event'] = contract_event_type(new_event)
+    # Some of the raiden events contain accounts and as such need to
+    # be exported in hex to the outside world
+    if new_event['event'] == 'EventTransferReceivedSuccess':
+        new_event['initiator'] = address_encoder(new_event['initiator'])[2:]
+    if new_event['event'] == 'EventTransferSentSuccess':
+        new_event['target'] = address_encoder(new_event['target'])[2:]
+    return new_event
+
+
+def normalize_events_list(old_list):
+    return [normalize_event(event) for event in old_list]
 
 
 def restapi_setup_urls(flask_api_context, rest_api, urls):
@@ -284,10 +329,88 @@ class RestAPI:
         self.address_list_schema = AddressListSchema()
         self.partner_per_token_list_schema = PartnersPerTokenListSchema()
         self.transfer_schema = TransferSchema()
+        self.payment_schema = PaymentSchema()
+        self.response_cache = LRUCache(maxsize=RESPONSE_CACHE_SIZE)
+
+    def _cached_response(self, key, token_network_views, build_result):
+        """ Returns the serialized result of `build_result`, which must only
+        depend on the `token_network_views`.
+
+        The result is serialized again only if one of the views changed, and
+        the body is not sent if it matches the ETag the client already has.
+        """
+        versions = tuple(
+            (view.token_network_identifier, view.version)
+            for view in token_network_views
+        )
+
+        cached = self.response_cache.get(key)
+        if cached is None or cached[0] != versions:
+            data = json.dumps(build_result())
+            etag = hashlib.sha1(data.encode()).hexdigest()
+            cached = (versions, etag, data)
+            self.response_cache[key] = cached
+
+        _, etag, data = cached
+
+        if request.if_none_match.contains(etag):
+            response = make_response(('', HTTPStatus.NOT_MODIFIED))
+        else:
+            response = make_response((
+                data,
+                HTTPStatus.OK,
+                {'mimetype': 'application/json', 'Content-Type': 'application/json'},
+            ))
+
+        response.set_etag(etag)
+        return response
 
     def get_our_address(self):
         return api_response(result=dict(our_address=address_encoder(self.raiden_api.address)))
 
+    def get_metrics(self):  # pylint: disable=no-self-use
+        return Response(
+            REGISTRY.render(),
+            mimetype='text/plain; version=0.0.4',
+        )
+
+    def get_profile(self, profile_format, limit):
+        profiler = self.raiden_api.raiden.sampling_profiler
+        if profiler is None or not profiler.running:
+            return api_error(
+                errors='The sampling profiler is not running, start raiden with '
+                '--sampling-profiler-rate',
+                status_code=HTTPStatus.CONFLICT,
+            )
+
+        if profile_format == 'collapsed':
+            return Response(profiler.collapsed(), mimetype='text/plain')
+
+        result = [
+            dict(function=function, self_samples=self_samples, total_samples=total_samples)
+            for function, self_samples, total_samples in profiler.top(limit)
+        ]
+        return api_response(result=dict(
+            samples=profiler.number_of_samples,
+            functions=result,
+        ))
+
+    def get_hub_blocks(self):  # pylint: disable=no-self-use
+        if not HUB_MONITOR.running:
+            return api_error(
+                errors='The hub monitor is not running, start raiden with a non-zero '
+                '--hub-block-threshold',
+                status_code=HTTPStatus.CONFLICT,
+            )
+
+        return api_response(result=dict(
+            threshold=HUB_MONITOR.threshold,
+            incidents=[
+                incident.to_dict()
+                for incident in HUB_MONITOR.recent_incidents()
+            ],
+        ))
+
     def register_token(self, registry_address, token_address):
         try:
             manager_address = self.raiden_api.token_network_register(
@@ -453,16 +576,22 @@ class RestAPI:
         return api_response(result=result.data)
 
     def get_channel_list(self, registry_address, token_address=None, partner_address=None):
-        raiden_service_result = self.raiden_api.get_channel_list(
-            registry_address,
-            token_address,
-            partner_address,
-        )
-        assert isinstance(raiden_service_result, list)
+        def build_result():
+            raiden_service_result = self.raiden_api.get_channel_list(
+                registry_address,
+                token_address,
+                partner_address,
+            )
+            assert isinstance(raiden_service_result, list)
 
-        channel_list = ChannelList(raiden_service_result)
-        result = self.channel_list_schema.dump(channel_list)
-        return api_response(result=result.data)
+            channel_list = ChannelList(raiden_service_result)
+            return self.channel_list_schema.dump(channel_list).data
+
+        return self._cached_response(
+            ('channels', registry_address, token_address, partner_address),
+            self.raiden_api.get_token_network_views(registry_address, token_address),
+            build_result,
+        )
 
     def get_tokens_list(self, registry_address):
         raiden_service_result = self.raiden_api.get_tokens_list(registry_address)
@@ -471,30 +600,121 @@ class RestAPI:
         result = self.address_list_schema.dump(tokens_list)
         return api_response(result=result.data)
 
-    def get_network_events(self, registry_address, from_block, to_block):
-        raiden_service_result = self.raiden_api.get_network_events(
+    def _events_response(self, iter_events, from_block, cursor, limit, stream):
+        """ Returns a page of the events from `iter_events(from_block, chunk_size)`.
+
+        The cursor of the next page is sent in the `Link` header, if there is
+        one. With `stream` the events after the cursor are sent as they are
+        read, one JSON document per line, each with the cursor to resume from.
+        The blocks are read in chunks only for a page or a stream, which may
+        stop before the end of the range.
+        """
+        if cursor is not None:
+            try:
+                cursor = decode_events_cursor(cursor)
+            except ValueError:
+                return api_error(
+                    errors='Invalid cursor {}'.format(cursor),
+                    status_code=HTTPStatus.BAD_REQUEST,
+                )
+
+            # There are no events of interest before the cursor's block
+            from_block = max(from_block or 0, cursor.block_number)
+
+        chunk_size = None
+        if stream or limit is not None:
+            chunk_size = EVENTS_BLOCK_CHUNK_SIZE
+
+        events = iter_events(from_block, chunk_size)
+
+        if stream:
+            def generate():
+                events_after_cursor = iter_events_with_cursor(events, cursor)
+                for event_cursor, event in islice(events_after_cursor, limit):
+                    event = normalize_event(event)
+                    event['cursor'] = encode_events_cursor(event_cursor)
+                    yield json.dumps(event) + '\n'
+
+            return Response(generate(), mimetype='application/x-ndjson')
+
+        page, next_cursor = paginate_events(events, cursor, limit)
+        response = api_response(result=normalize_events_list(page))
+
+        if next_cursor is not None:
+            args = request.args.copy()
+            args['cursor'] = encode_events_cursor(next_cursor)
+            response.headers['Link'] = '<{}?{}>; rel="next"'.format(
+                request.base_url,
+                url_encode(args),
+            )
+
+        return response
+
+    def get_network_events(
+            self,
             registry_address,
             from_block,
             to_block,
-        )
-        return api_response(result=normalize_events_list(raiden_service_result))
+            event_type=None,
+            cursor=None,
+            limit=None,
+            stream=False,
+    ):
+        def iter_events(from_block, chunk_size):
+            return self.raiden_api.iter_network_events(
+                registry_address,
+                from_block,
+                to_block,
+                event_type,
+                chunk_size,
+            )
 
-    def get_token_network_events(self, token_address, from_block, to_block):
-        try:
-            raiden_service_result = self.raiden_api.get_token_network_events(
+        return self._events_response(iter_events, from_block, cursor, limit, stream)
+
+    def get_token_network_events(
+            self,
+            token_address,
+            from_block,
+            to_block,
+            event_type=None,
+            cursor=None,
+            limit=None,
+            stream=False,
+    ):
+        def iter_events(from_block, chunk_size):
+            return self.raiden_api.iter_token_network_events(
                 token_address,
                 from_block,
                 to_block,
+                event_type,
+                chunk_size,
             )
-            return api_response(result=normalize_events_list(raiden_service_result))
+
+        try:
+            return self._events_response(iter_events, from_block, cursor, limit, stream)
         except UnknownTokenAddress as e:
             return api_error(str(e), status_code=HTTPStatus.NOT_FOUND)
 
-    def get_channel_events(self, channel_address, from_block, to_block):
-        raiden_service_result = self.raiden_api.get_channel_events(
-            channel_address, from_block, to_block
-        )
-        return api_response(result=normalize_events_list(raiden_service_result))
+    def get_channel_events(
+            self,
+            channel_address,
+            from_block,
+            to_block,
+            event_type=None,
+            cursor=None,
+            limit=None,
+            stream=False,
+    ):
+        def iter_events(from_block, chunk_size):
+            return self.raiden_api.iter_channel_events(
+                channel_address,
+                from_block,
+                to_block,
+                event_type,
+                chunk_size,
+            )
+
+        return self._events_response(iter_events, from_block, cursor, limit, stream)
 
     def get_channel(self, registry_address, channel_address):
         channel_state = self.raiden_api.get_channel(registry_address, channel_address)
@@ -502,24 +722,30 @@ class RestAPI:
         return api_response(result=result.data)
 
     def get_partners_by_token(self, registry_address, token_address):
-        return_list = []
-        raiden_service_result = self.raiden_api.get_channel_list(
-            registry_address,
-            token_address,
+        def build_result():
+            return_list = []
+            raiden_service_result = self.raiden_api.get_channel_list(
+                registry_address,
+                token_address,
+            )
+            for result in raiden_service_result:
+                return_list.append({
+                    'partner_address': result.partner_state.address,
+                    'channel': url_for(
+                        # TODO: Somehow nicely parameterize this for future versions
+                        'v1_resources.channelsresourcebychanneladdress',
+                        channel_address=result.identifier,
+                    ),
+                })
+
+            schema_list = PartnersPerTokenList(return_list)
+            return self.partner_per_token_list_schema.dump(schema_list).data
+
+        return self._cached_response(
+            ('partners', registry_address, token_address),
+            self.raiden_api.get_token_network_views(registry_address, token_address),
+            build_result,
         )
-        for result in raiden_service_result:
-            return_list.append({
-                'partner_address': result.partner_state.address,
-                'channel': url_for(
-                    # TODO: Somehow nicely parameterize this for future versions
-                    'v1_resources.channelsresourcebychanneladdress',
-                    channel_address=result.identifier,
-                ),
-            })
-
-        schema_list = PartnersPerTokenList(return_list)
-        result = self.partner_per_token_list_schema.dump(schema_list)
-        return api_response(result=result.data)
 
     def initiate_transfer(
             self,
@@ -570,6 +796,166 @@ class RestAPI:
         result = self.transfer_schema.dump(transfer)
         return api_response(result=result.data)
 
+    def _payment_to_api_dict(self, payment):
+        token_network = views.get_token_network_by_identifier(
+            views.state_from_raiden(self.raiden_api.raiden),
+            payment.token_network_identifier,
+        )
+        token_address = token_network.token_address if token_network else None
+
+        payment_dict = {
+            'identifier': payment.identifier,
+            'token_address': token_address,
+            'target_address': payment.target,
+            'amount': payment.amount,
+            'status': payment.status,
+            'reason': payment.reason,
+            'sequence': payment.sequence,
+        }
+        return self.payment_schema.dump(payment_dict).data
+
+    def initiate_payment(
+            self,
+            registry_address,
+            token_address,
+            target_address,
+            amount,
+            identifier,
+    ):
+        """ Start the payment and return its identifier without waiting for
+        the result, the status can be queried or streamed later.
+        """
+
+        if identifier is None:
+            identifier = create_default_identifier()
+
+        try:
+            self.raiden_api.transfer_async(
+                registry_address=registry_address,
+                token_address=token_address,
+                target=target_address,
+                amount=amount,
+                identifier=identifier,
+            )
+        except (InvalidAmount, InvalidAddress, DuplicatedPaymentIdentifier) as e:
+            return api_error(
+                errors=str(e),
+                status_code=HTTPStatus.CONFLICT,
+            )
+        except UnknownTokenAddress as e:
+            return api_error(
+                errors=str(e),
+                status_code=HTTPStatus.NOT_FOUND,
+            )
+        except InsufficientFunds as e:
+            return api_error(
+                errors=str(e),
+                status_code=HTTPStatus.PAYMENT_REQUIRED,
+            )
+
+        # The payment may have failed already, e.g. if there is no route
+        payment = self.raiden_api.get_payment_status(identifier)
+        return api_response(
+            result=self._payment_to_api_dict(payment),
+            status_code=HTTPStatus.ACCEPTED,
+        )
+
+    def initiate_payment_batch(self, registry_address, token_address, payments):
+        """ Start all the `payments` at once, the result of each payment is
+        either its status or the errors that prevented it from starting.
+        """
+        batch = list()
+        for payment in payments:
+            identifier = payment['identifier']
+
+            if identifier is None:
+                identifier = create_default_identifier()
+
+            batch.append((payment['target_address'], payment['amount'], identifier))
+
+        try:
+            async_results = self.raiden_api.transfer_batch_async(
+                registry_address,
+                token_address,
+                batch,
+            )
+        except InvalidAddress as e:
+            return api_error(
+                errors=str(e),
+                status_code=HTTPStatus.CONFLICT,
+            )
+        except UnknownTokenAddress as e:
+            return api_error(
+                errors=str(e),
+                status_code=HTTPStatus.NOT_FOUND,
+            )
+
+        result = list()
+        for (_, _, identifier), async_result in zip(batch, async_results):
+            if async_result.ready() and not async_result.successful():
+                result.append({
+                    'identifier': identifier,
+                    'errors': str(async_result.exception),
+                })
+            else:
+                payment = self.raiden_api.get_payment_status(identifier)
+                result.append(self._payment_to_api_dict(payment))
+
+        return api_response(result=result, status_code=HTTPStatus.ACCEPTED)
+
+    def get_payment(self, identifier):
+        payment = self.raiden_api.get_payment_status(identifier)
+
+        if payment is None:
+            return api_error(
+                errors='Payment {} not found'.format(identifier),
+                status_code=HTTPStatus.NOT_FOUND,
+            )
+
+        return api_response(result=self._payment_to_api_dict(payment))
+
+    def get_payment_events(self, since, timeout):
+        results = self.raiden_api.wait_for_payment_results(since, timeout)
+        return api_response(
+            result=[self._payment_to_api_dict(payment) for payment in results],
+        )
+
+    def stream_payment_events(self, since):
+        # Reconnecting EventSource clients resume after the last event seen
+        last_event_id = request.headers.get('Last-Event-ID', '')
+        if last_event_id.isdigit():
+            since = int(last_event_id)
+
+        def generate(sequence):
+            while True:
+                results = self.raiden_api.wait_for_payment_results(
+                    sequence,
+                    PAYMENT_STREAM_KEEPALIVE,
+                )
+
+                if not results:
+                    yield ': keepalive\n\n'
+
+                for payment in results:
+                    sequence = payment.sequence
+
+                    if payment.status == PAYMENT_STATUS_SUCCESS:
+                        event_name = 'EventTransferSentSuccess'
+                    else:
+                        event_name = 'EventTransferSentFailed'
+
+                    yield 'id: {}\nevent: {}\ndata: {}\n\n'.format(
+                        sequence,
+                        event_name,
+                        json.dumps(self._payment_to_api_dict(payment)),
+                    )
+
+        return Response(
+            generate(since),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache'},
+        )
+
     def _deposit(self, registry_address, channel_state, balance):
         if channel.get_status(channel_state) != CHANNEL_STATE_OPENED:
             return api_error(
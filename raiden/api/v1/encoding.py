@@ -29,6 +29,9 @@ from raiden.settings import (
     DEFAULT_REVEAL_TIMEOUT,
     DEFAULT_JOINABLE_FUNDS_TARGET,
     DEFAULT_INITIAL_CHANNEL_TARGET,
+    MAX_EVENTS_PAGE_SIZE,
+    MAX_PAYMENT_BATCH_SIZE,
+    MAX_PAYMENT_EVENTS_TIMEOUT,
 )
 from raiden.transfer import channel
 from raiden.transfer.state import (
@@ -140,6 +143,13 @@ class BaseListSchema(Schema):
 class EventRequestSchema(BaseSchema):
     from_block = fields.Integer(missing=None)
     to_block = fields.Integer(missing=None)
+    event_type = fields.List(fields.String(), missing=None)
+    cursor = fields.String(missing=None)
+    limit = fields.Integer(
+        missing=None,
+        validate=validate.Range(min=1, max=MAX_EVENTS_PAGE_SIZE),
+    )
+    stream = fields.Boolean(missing=False)
 
     class Meta:
         strict = True
@@ -267,6 +277,58 @@ class TransferSchema(BaseSchema):
         decoding_class = dict
 
 
+class PaymentSchema(BaseSchema):
+    identifier = fields.Integer(missing=None)
+    token_address = AddressField(missing=None)
+    target_address = AddressField(missing=None)
+    amount = fields.Integer(required=True)
+    status = fields.String(missing=None)
+    reason = fields.String(missing=None)
+    sequence = fields.Integer(missing=None)
+
+    class Meta:
+        strict = True
+        decoding_class = dict
+
+
+class PaymentBatchSchema(BaseSchema):
+    payments = fields.Nested(
+        PaymentSchema,
+        only=('target_address', 'amount', 'identifier'),
+        many=True,
+        required=True,
+        validate=validate.Length(min=1, max=MAX_PAYMENT_BATCH_SIZE),
+    )
+
+    class Meta:
+        strict = True
+        decoding_class = dict
+
+
+class PaymentEventsRequestSchema(BaseSchema):
+    since = fields.Integer(missing=0, validate=validate.Range(min=0))
+    timeout = fields.Float(
+        missing=0,
+        validate=validate.Range(min=0, max=MAX_PAYMENT_EVENTS_TIMEOUT),
+    )
+
+    class Meta:
+        strict = True
+        decoding_class = dict
+
+
+class ProfileRequestSchema(BaseSchema):
+    format = fields.String(
+        missing='collapsed',
+        validate=validate.OneOf(('collapsed', 'top')),
+    )
+    limit = fields.Integer(missing=20, validate=validate.Range(min=1))
+
+    class Meta:
+        strict = True
+        decoding_class = dict
+
+
 class ConnectionsConnectSchema(BaseSchema):
     funds = fields.Integer(required=True)
     initial_channel_target = fields.Integer(
@@ -6,6 +6,10 @@ from flask import Blueprint
 from raiden.api.v1.encoding import (
     ChannelRequestSchema,
     EventRequestSchema,
+    PaymentBatchSchema,
+    PaymentEventsRequestSchema,
+    PaymentSchema,
+    ProfileRequestSchema,
     TransferSchema,
     ConnectionsConnectSchema,
     ConnectionsLeaveSchema,
@@ -35,6 +39,33 @@ class AddressResource(BaseResource):
         return self.rest_api.get_our_address()
 
 
+class MetricsResource(BaseResource):
+
+    def get(self):
+        return self.rest_api.get_metrics()
+
+
+class ProfileResource(BaseResource):
+
+    get_schema = ProfileRequestSchema()
+
+    @use_kwargs(get_schema, locations=('query',))
+    def get(self, format, limit):  # pylint: disable=redefined-builtin
+        """
+        samples of the sampling profiler, as collapsed stacks or hottest functions
+        """
+        return self.rest_api.get_profile(format, limit)
+
+
+class HubBlocksResource(BaseResource):
+
+    def get(self):
+        """
+        recent blocks of the gevent hub, the most recent first
+        """
+        return self.rest_api.get_hub_blocks()
+
+
 class ChannelsResource(BaseResource):
 
     put_schema = ChannelRequestSchema(
@@ -102,11 +133,10 @@ class NetworkEventsResource(BaseResource):
     get_schema = EventRequestSchema()
 
     @use_kwargs(get_schema, locations=('query',))
-    def get(self, from_block, to_block):
+    def get(self, **kwargs):
         return self.rest_api.get_network_events(
             registry_address=self.rest_api.raiden_api.raiden.default_registry.address,
-            from_block=from_block,
-            to_block=to_block,
+            **kwargs,
         )
 
 
@@ -115,11 +145,10 @@ class TokenEventsResource(BaseResource):
     get_schema = EventRequestSchema()
 
     @use_kwargs(get_schema, locations=('query',))
-    def get(self, token_address, from_block, to_block):
+    def get(self, token_address, **kwargs):
         return self.rest_api.get_token_network_events(
             token_address=token_address,
-            from_block=from_block,
-            to_block=to_block,
+            **kwargs,
         )
 
 
@@ -128,11 +157,10 @@ class ChannelEventsResource(BaseResource):
     get_schema = EventRequestSchema()
 
     @use_kwargs(get_schema, locations=('query',))
-    def get(self, channel_address, from_block, to_block):
+    def get(self, channel_address, **kwargs):
         return self.rest_api.get_channel_events(
             channel_address=channel_address,
-            from_block=from_block,
-            to_block=to_block,
+            **kwargs,
         )
 
 
@@ -162,6 +190,68 @@ class TransferToTargetResource(BaseResource):
         )
 
 
+class PaymentToTargetResource(BaseResource):
+
+    post_schema = PaymentSchema(
+        only=('amount', 'identifier'),
+    )
+
+    @use_kwargs(post_schema, locations=('json',))
+    def post(self, token_address, target_address, amount, identifier):
+        return self.rest_api.initiate_payment(
+            registry_address=self.rest_api.raiden_api.raiden.default_registry.address,
+            token_address=token_address,
+            target_address=target_address,
+            amount=amount,
+            identifier=identifier,
+        )
+
+
+class PaymentBatchResource(BaseResource):
+
+    post_schema = PaymentBatchSchema()
+
+    @use_kwargs(post_schema, locations=('json',))
+    def post(self, token_address, payments):
+        return self.rest_api.initiate_payment_batch(
+            registry_address=self.rest_api.raiden_api.raiden.default_registry.address,
+            token_address=token_address,
+            payments=payments,
+        )
+
+
+class PaymentResource(BaseResource):
+
+    def get(self, identifier):
+        return self.rest_api.get_payment(identifier)
+
+
+class PaymentEventsResource(BaseResource):
+
+    get_schema = PaymentEventsRequestSchema()
+
+    @use_kwargs(get_schema, locations=('query',))
+    def get(self, since, timeout):
+        """
+        long-poll for the payments which finished after `since`
+        """
+        return self.rest_api.get_payment_events(since, timeout)
+
+
+class PaymentStreamResource(BaseResource):
+
+    get_schema = PaymentEventsRequestSchema(
+        only=('since',),
+    )
+
+    @use_kwargs(get_schema, locations=('query',))
+    def get(self, since):
+        """
+        server-sent events for the payments which finished after `since`
+        """
+        return self.rest_api.stream_payment_events(since)
+
+
 class ConnectionsResource(BaseResource):
 
     put_schema = ConnectionsConnectSchema()
@@ -13,6 +13,12 @@ from raiden.settings import (
     DEFAULT_NAT_INVITATION_TIMEOUT,
     DEFAULT_NAT_KEEPALIVE_RETRIES,
     DEFAULT_NAT_KEEPALIVE_TIMEOUT,
+    DEFAULT_PROTOCOL_BATCH_DELIVERED,
+    DEFAULT_PROTOCOL_COALESCING_DELAY,
+    DEFAULT_PROTOCOL_DELIVERED_BATCH_DELAY,
+    DEFAULT_PROTOCOL_PACKET_COALESCING,
+    DEFAULT_PROTOCOL_PEER_THROTTLE_CAPACITY,
+    DEFAULT_PROTOCOL_PEER_THROTTLE_FILL_RATE,
     DEFAULT_PROTOCOL_RETRIES_BEFORE_BACKOFF,
     DEFAULT_PROTOCOL_THROTTLE_CAPACITY,
     DEFAULT_PROTOCOL_THROTTLE_FILL_RATE,
@@ -20,6 +26,7 @@ from raiden.settings import (
     DEFAULT_REVEAL_TIMEOUT,
     DEFAULT_SETTLE_TIMEOUT,
     DEFAULT_SHUTDOWN_TIMEOUT,
+    DEFAULT_HUB_BLOCK_THRESHOLD,
     INITIAL_PORT,
 )
 from raiden.utils import (
@@ -64,10 +71,20 @@ class App:  # pylint: disable=too-few-public-methods
             'retries_before_backoff': DEFAULT_PROTOCOL_RETRIES_BEFORE_BACKOFF,
             'throttle_capacity': DEFAULT_PROTOCOL_THROTTLE_CAPACITY,
             'throttle_fill_rate': DEFAULT_PROTOCOL_THROTTLE_FILL_RATE,
+            'peer_throttle_capacity': DEFAULT_PROTOCOL_PEER_THROTTLE_CAPACITY,
+            'peer_throttle_fill_rate': DEFAULT_PROTOCOL_PEER_THROTTLE_FILL_RATE,
             'nat_invitation_timeout': DEFAULT_NAT_INVITATION_TIMEOUT,
             'nat_keepalive_retries': DEFAULT_NAT_KEEPALIVE_RETRIES,
             'nat_keepalive_timeout': DEFAULT_NAT_KEEPALIVE_TIMEOUT,
+            'packet_coalescing': DEFAULT_PROTOCOL_PACKET_COALESCING,
+            'coalescing_delay': DEFAULT_PROTOCOL_COALESCING_DELAY,
+            'batch_delivered': DEFAULT_PROTOCOL_BATCH_DELIVERED,
+            'delivered_batch_delay': DEFAULT_PROTOCOL_DELIVERED_BATCH_DELAY,
         },
+        'eth_ipc_path': None,
+        'partitioned_state': False,
+        'sampling_profiler_rate': 0,
+        'hub_block_threshold': DEFAULT_HUB_BLOCK_THRESHOLD,
         'rpc': True,
         'console': False,
         'shutdown_timeout': DEFAULT_SHUTDOWN_TIMEOUT,
@@ -190,6 +190,7 @@ class ContractManagerWrap(ContractManager):
             EVENT_CHANNEL_SECRET_REVEALED: CONTRACT_NETTING_CHANNEL,
             EVENT_CHANNEL_SETTLED: CONTRACT_NETTING_CHANNEL,
             EVENT_TOKEN_ADDED: CONTRACT_REGISTRY,
+            EVENT_ADDRESS_REGISTERED: CONTRACT_ENDPOINT_REGISTRY,
         }
         self.contract_to_version = dict()
         self.init_contract_versions()
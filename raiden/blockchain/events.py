@@ -2,11 +2,13 @@
 import itertools
 from collections import namedtuple, defaultdict
 
+import gevent.lock
 import structlog
 
 from raiden.blockchain.abi import (
     CONTRACT_MANAGER,
     CONTRACT_CHANNEL_MANAGER,
+    CONTRACT_ENDPOINT_REGISTRY,
     CONTRACT_NETTING_CHANNEL,
     CONTRACT_REGISTRY,
     EVENT_TOKEN_ADDED,
@@ -21,12 +23,14 @@ from raiden.blockchain.abi import (
     EVENT_CHANNEL_CLOSED,
     EVENT_CHANNEL_SETTLED,
     EVENT_CHANNEL_SECRET_REVEALED,
+    EVENT_ADDRESS_REGISTERED,
 )
 from raiden.exceptions import (
     AddressWithoutCode,
     EthNodeCommunicationError,
 )
 from raiden.network.rpc.filters import get_filter_events
+from raiden.settings import DEFAULT_NUMBER_OF_CONFIRMATIONS_BLOCK
 from raiden.utils import address_decoder, pex
 from raiden.network.rpc.smartcontract_proxy import decode_event
 
@@ -104,6 +108,128 @@ def get_contract_events(
 # These helpers have a better descriptive name and provide the translator for
 # the caller.
 
+def contract_event_type(event) -> str:
+    event_type = event['event']
+
+    # The blockchain events are decoded with a binary name
+    if isinstance(event_type, bytes):
+        event_type = event_type.decode()
+
+    return event_type
+
+
+class ContractEventsCache:
+    """ The decoded events of the smart contracts, persisted in the node's
+    database.
+
+    Only the events of blocks with `confirmations` confirmations are stored,
+    the younger ones can still be removed by a reorg. A query for an old range
+    is answered from the database and only the unconfirmed tail is fetched
+    from the blockchain. For every contract a single range of blocks is
+    stored, it's extended as the queries ask for blocks outside of it.
+    """
+
+    def __init__(self, chain, storage, confirmations=DEFAULT_NUMBER_OF_CONFIRMATIONS_BLOCK):
+        self.chain = chain
+        self.storage = storage
+        self.confirmations = confirmations
+
+        # Serializes the synchronization, concurrent queries would otherwise
+        # store the same events twice
+        self.sync_lock = gevent.lock.Semaphore()
+
+    def get_events(self, abi, contract_address, from_block, to_block, event_types=None):
+        """ Returns the events of the contract at `contract_address` in the
+        inclusive range `[from_block, to_block]`, optionally only the ones
+        with a name in `event_types`.
+        """
+        latest_block = self.chain.block_number()
+
+        if from_block is None:
+            from_block = 0
+
+        if to_block is None or to_block == 'latest':
+            to_block = latest_block
+
+        result = list()
+
+        confirmed_block = min(to_block, latest_block - self.confirmations)
+        if from_block <= confirmed_block:
+            with self.sync_lock:
+                self._sync(abi, contract_address, from_block, confirmed_block)
+
+            result = self.storage.get_contract_events(
+                contract_address,
+                from_block,
+                confirmed_block,
+                event_types,
+            )
+            from_block = confirmed_block + 1
+
+        if from_block <= to_block:
+            unconfirmed_events = get_contract_events(
+                self.chain,
+                abi,
+                contract_address,
+                ALL_EVENTS,
+                from_block,
+                to_block,
+            )
+            result.extend(
+                event
+                for event in unconfirmed_events
+                if event_types is None or contract_event_type(event) in event_types
+            )
+
+        return result
+
+    def _sync(self, abi, contract_address, from_block, to_block):
+        synced = self.storage.get_contract_events_range(contract_address)
+
+        if synced is None:
+            self._fetch(abi, contract_address, from_block, to_block, from_block, to_block)
+            return
+
+        # The stored range must stay contiguous, so a gap between it and the
+        # queried range is fetched as well
+        synced_from, synced_to = synced
+
+        if from_block < synced_from:
+            self._fetch(abi, contract_address, from_block, synced_from - 1, from_block, synced_to)
+            synced_from = from_block
+
+        if to_block > synced_to:
+            self._fetch(abi, contract_address, synced_to + 1, to_block, synced_from, to_block)
+
+    def _fetch(self, abi, contract_address, fetch_from, fetch_to, synced_from, synced_to):
+        events = get_contract_events(
+            self.chain,
+            abi,
+            contract_address,
+            ALL_EVENTS,
+            fetch_from,
+            fetch_to,
+        )
+
+        self.storage.write_contract_events(
+            contract_address,
+            [
+                (event.get('block_number', fetch_from), contract_event_type(event), event)
+                for event in events
+            ],
+            synced_from,
+            synced_to,
+        )
+
+        log.debug(
+            'contract events cached',
+            contract=pex(contract_address),
+            events=len(events),
+            from_block=fetch_from,
+            to_block=fetch_to,
+        )
+
+
 def get_all_channel_manager_events(
         chain,
         channel_manager_address,
@@ -232,6 +358,9 @@ def decode_event_to_internal(event):
     elif data['event'] == EVENT_CHANNEL_SETTLED:
         data['registry_address'] = address_decoder(data['args']['registry_address'])
 
+    elif data['event'] == EVENT_ADDRESS_REGISTERED:
+        data['eth_address'] = address_decoder(data['args']['eth_address'])
+
     return event
 
 
@@ -377,6 +506,17 @@ class BlockchainEvents:
             netting_channel_proxy.all_events_filter,
         )
 
+    def add_discovery_listener(self, discovery_proxy, from_block=None):
+        addressregistered = discovery_proxy.addressregistered_filter(from_block)
+        discovery_address = discovery_proxy.address
+
+        self.add_event_listener(
+            'Discovery {}'.format(pex(discovery_address)),
+            addressregistered,
+            CONTRACT_MANAGER.get_contract_abi(CONTRACT_ENDPOINT_REGISTRY),
+            discovery_proxy.addressregistered_filter,
+        )
+
     def add_proxies_listeners(self, proxies, from_block=None):
         self.add_registry_listener(proxies.registry, from_block)
 
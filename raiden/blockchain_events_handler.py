@@ -34,6 +34,7 @@ from raiden.blockchain.abi import (
     EVENT_CHANNEL_SETTLED,
     EVENT_CHANNEL_SECRET_REVEALED,
     EVENT_CHANNEL_SECRET_REVEALED2,
+    EVENT_ADDRESS_REGISTERED,
 )
 
 log = structlog.get_logger(__name__)  # pylint: disable=invalid-name
@@ -247,6 +248,19 @@ def handle_channel_withdraw(raiden, event):
         raiden.handle_state_change(withdrawn_state_change)
 
 
+def handle_address_registered(raiden, event):
+    data = event.event_data
+
+    # The endpoints are not part of the node state, the registration only
+    # updates the discovery cache.
+    if raiden.discovery is not None:
+        raiden.discovery.endpoint_registered(
+            data['eth_address'],
+            data['args']['socket'],
+            data['block_number'],
+        )
+
+
 def on_blockchain_event(raiden, event):
     log.debug('EVENT', node=pex(raiden.address), chain_event=event)
 
@@ -285,6 +299,9 @@ def on_blockchain_event(raiden, event):
         data['secret'] = data['args']['secret']
         handle_channel_withdraw(raiden, event)
 
+    elif data['event'] == EVENT_ADDRESS_REGISTERED:
+        handle_address_registered(raiden, event)
+
     else:
         log.error('Unknown event type', raiden_event=event)
 
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+from raiden.transfer import channel, views
+from raiden.transfer.state import CHANNEL_STATE_OPENED
+from raiden.transfer.state_change import (
+    ActionChangeNodeNetworkState,
+    Block,
+    ReceiveDelivered,
+    ReceiveDeliveredBatch,
+    ReceiveProcessed,
+)
+from raiden.utils import typing
+
+# State changes which never modify a channel
+CHANNEL_NEUTRAL_STATE_CHANGES = (
+    ActionChangeNodeNetworkState,
+    ReceiveDelivered,
+    ReceiveDeliveredBatch,
+    ReceiveProcessed,
+)
+
+
+class TokenNetworkView:
+    """ A summary of the channels of a token network.
+
+    `version` changes every time the content of the view changes, it can be
+    used to cache anything derived from the view.
+    """
+    __slots__ = (
+        'payment_network_identifier',
+        'token_network_identifier',
+        'token_address',
+        'channel_states',
+        'channel_summaries',
+        'open_partners',
+        'total_deposit',
+        'total_capacity',
+        'version',
+    )
+
+    def __init__(self, payment_network_identifier, token_network_state, version):
+        self.payment_network_identifier = payment_network_identifier
+        self.token_network_identifier = token_network_state.address
+        self.token_address = token_network_state.token_address
+        self.channel_states = list(token_network_state.partneraddresses_to_channels.values())
+        self.channel_summaries = [
+            summarize_channel(channel_state)
+            for channel_state in self.channel_states
+        ]
+
+        self.open_partners = set()
+        self.total_deposit = 0
+        self.total_capacity = 0
+        for channel_state in self.channel_states:
+            if channel.get_status(channel_state) == CHANNEL_STATE_OPENED:
+                self.open_partners.add(channel_state.partner_state.address)
+                self.total_deposit += channel_state.our_state.contract_balance
+                self.total_capacity += channel.get_distributable(
+                    channel_state.our_state,
+                    channel_state.partner_state,
+                )
+
+        self.version = version
+
+
+def summarize_channel(channel_state) -> typing.Tuple:
+    """ Every value of a channel that is exposed through the API. """
+    return (
+        channel_state.identifier,
+        channel_state.partner_state.address,
+        channel_state.settle_timeout,
+        channel_state.reveal_timeout,
+        channel_state.our_state.contract_balance,
+        channel.get_balance(channel_state.our_state, channel_state.partner_state),
+        channel.get_distributable(channel_state.our_state, channel_state.partner_state),
+        channel.get_status(channel_state),
+    )
+
+
+class ChannelViews:
+    """ Materialised views of the channels of every token network.
+
+    The views are marked as stale by the state changes applied to the node
+    and are rebuilt on the next read, so only the token networks that changed
+    since the last read are walked. A `Block` marks as stale only the token
+    networks with a due channel or payment task timer, the other state changes
+    which can't be attributed to a token network mark every view as stale.
+    """
+
+    def __init__(self, raiden: 'RaidenService'):
+        self.raiden = raiden
+        self.token_networks_to_views = dict()
+        self.stale_token_networks = set()
+        self.all_stale = True
+        self.last_version = 0
+
+    def state_changed(self, state_change, due_token_networks=()):
+        """ Must be called after `state_change` is applied to the node state.
+
+        `due_token_networks` are the token networks a `Block` was dispatched
+        to, the timers are removed by the block so they must be collected
+        before it is applied.
+        """
+        if isinstance(state_change, CHANNEL_NEUTRAL_STATE_CHANGES):
+            return
+
+        if isinstance(state_change, Block):
+            self.stale_token_networks.update(due_token_networks)
+            return
+
+        token_network_identifier = views.token_network_for(state_change)
+
+        if token_network_identifier is None:
+            self.all_stale = True
+        else:
+            self.stale_token_networks.add(token_network_identifier)
+
+    def get_views(
+            self,
+            payment_network_identifier: typing.PaymentNetworkID,
+    ) -> typing.List[TokenNetworkView]:
+        self._refresh()
+
+        return [
+            view
+            for view in self.token_networks_to_views.values()
+            if view.payment_network_identifier == payment_network_identifier
+        ]
+
+    def get_view_by_token_address(
+            self,
+            payment_network_identifier: typing.PaymentNetworkID,
+            token_address: typing.TokenAddress,
+    ) -> typing.Optional[TokenNetworkView]:
+        for view in self.get_views(payment_network_identifier):
+            if view.token_address == token_address:
+                return view
+
+        return None
+
+    def _refresh(self):
+        if not self.all_stale and not self.stale_token_networks:
+            return
+
+        node_state = views.state_from_raiden(self.raiden)
+
+        token_networks_to_views = dict()
+        payment_networks = node_state.identifiers_to_paymentnetworks.items()
+        for payment_network_identifier, payment_network in payment_networks:
+            for token_network_state in payment_network.tokenidentifiers_to_tokennetworks.values():
+                token_network_identifier = token_network_state.address
+                view = self.token_networks_to_views.get(token_network_identifier)
+
+                is_stale = (
+                    view is None or
+                    self.all_stale or
+                    token_network_identifier in self.stale_token_networks
+                )
+
+                if is_stale:
+                    view = self._rebuild(payment_network_identifier, token_network_state, view)
+
+                token_networks_to_views[token_network_identifier] = view
+
+        self.token_networks_to_views = token_networks_to_views
+        self.stale_token_networks.clear()
+        self.all_stale = False
+
+    def _rebuild(self, payment_network_identifier, token_network_state, old_view):
+        self.last_version += 1
+        view = TokenNetworkView(
+            payment_network_identifier,
+            token_network_state,
+            self.last_version,
+        )
+
+        # Keep the version if nothing changed, so that the caches derived from
+        # the view stay valid
+        if old_view is not None and old_view.channel_summaries == view.channel_summaries:
+            view.version = old_view.version
+
+        return view
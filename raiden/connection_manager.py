@@ -178,7 +178,6 @@ class ConnectionManager:
                 registry_address,
                 self.token_address,
                 channel_ids,
-                self.raiden.alarm.wait_time,
             )
 
         return channels_to_close
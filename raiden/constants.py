@@ -25,6 +25,11 @@ NETTINGCHANNEL_SETTLE_TIMEOUT_MAX = 2700000
 # TODO: add this as an attribute of the transport class
 UDP_MAX_MESSAGE_SIZE = 1200
 
+# Bitmask of the optional UDP transport features, advertised in Ping and Pong
+# messages
+UDP_CAPABILITY_ENVELOPE = 1
+UDP_CAPABILITY_DELIVERED_BATCH = 2
+
 MAINNET = 'mainnet'
 ROPSTEN = 'ropsten'
 RINKEBY = 'rinkeby'
@@ -35,6 +35,11 @@ LOCKEDTRANSFER = 7
 REFUNDTRANSFER = 8
 REVEALSECRET = 11
 DELIVERED = 12
+# Not a message on its own, it frames multiple encoded messages in a single
+# UDP datagram, see raiden.network.transport.udp.envelope
+ENVELOPE = 13
+# Variable length, the encoding is implemented by raiden.messages.DeliveredBatch
+DELIVEREDBATCH = 14
 
 
 # pylint: disable=invalid-name
@@ -72,6 +77,10 @@ optional_secret = make_field('secret', 32, '32s', optional_bytes())
 
 signature = make_field('signature', 65, '65s')
 
+# Uses the first byte of the padding, nodes that don't know about this field
+# will ignore it
+capabilities = make_field('capabilities', 1, 'B', integer(0, 255))
+
 Processed = namedbuffer(
     'processed',
     [
@@ -97,7 +106,8 @@ Ping = namedbuffer(
     'ping',
     [
         cmdid(PING),
-        pad(3),
+        capabilities,
+        pad(2),
         nonce,
         signature,
     ]
@@ -107,7 +117,8 @@ Pong = namedbuffer(
     'pong',
     [
         cmdid(PONG),
-        pad(3),
+        capabilities,
+        pad(2),
         nonce,
         signature,
     ]
@@ -113,6 +113,10 @@ class DuplicatedChannelError(RaidenError):
     """Raised if someone tries to create a channel that already exists."""
 
 
+class DuplicatedPaymentIdentifier(RaidenError):
+    """Raised if a payment is started with the identifier of a pending payment."""
+
+
 class ChannelBusyError(RaidenError):
     """Raised if someone tries to perform an operation on a channel that
     conflicts with an ongoing operation."""
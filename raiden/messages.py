@@ -34,6 +34,7 @@ from raiden.transfer.mediated_transfer.events import (
 
 __all__ = (
     'Delivered',
+    'DeliveredBatch',
     'DirectTransfer',
     'Lock',
     'LockedTransfer',
@@ -423,41 +424,153 @@ class Delivered(SignedMessage):
         return delivered
 
 
+class DeliveredBatch(SignedMessage):
+    """ Acknowledges multiple messages at once, it has the same semantics as
+    sending a `Delivered` for each of the `delivered_message_identifiers`.
+
+    The number of identifiers is variable, so this message does not have a
+    fixed size buffer, the layout is the cmdid and padding, followed by the
+    identifiers (8 bytes each) and the signature.
+    """
+    cmdid = messages.DELIVEREDBATCH
+
+    HEADER_SIZE = 4
+    IDENTIFIER_SIZE = 8
+    SIGNATURE_SIZE = 65
+
+    def __init__(self, delivered_message_identifiers):
+        super().__init__()
+        self.delivered_message_identifiers = list(delivered_message_identifiers)
+
+    @classmethod
+    def max_identifiers(cls, max_size):
+        """ Number of identifiers that fit in a message of `max_size` bytes. """
+        return (max_size - cls.HEADER_SIZE - cls.SIGNATURE_SIZE) // cls.IDENTIFIER_SIZE
+
+    @property
+    def hash(self):
+        return sha3(self.encode())
+
+    def _data_to_sign(self):
+        data = bytearray(self.HEADER_SIZE)
+        data[0] = self.cmdid
+
+        for identifier in self.delivered_message_identifiers:
+            if not 0 <= identifier <= UINT64_MAX:
+                raise ValueError('message identifier is outside the valid range')
+            data += identifier.to_bytes(self.IDENTIFIER_SIZE, byteorder='big')
+
+        return bytes(data)
+
+    def sign(self, private_key, node_address):
+        """ Sign message using `private_key`. """
+        self.signature = signing.sign(self._data_to_sign(), private_key)
+        self.sender = node_address
+
+    def encode(self):
+        return self._data_to_sign() + self.signature
+
+    @classmethod
+    def decode(cls, data):
+        identifiers_size = len(data) - cls.HEADER_SIZE - cls.SIGNATURE_SIZE
+        if identifiers_size <= 0 or identifiers_size % cls.IDENTIFIER_SIZE:
+            log.error('trying to decode invalid message')
+            return None
+
+        data_that_was_signed = data[:-cls.SIGNATURE_SIZE]
+        message_signature = data[-cls.SIGNATURE_SIZE:]
+
+        address = signing.recover_address(data_that_was_signed, message_signature)
+
+        if address is None:
+            return None
+
+        identifiers = [
+            int.from_bytes(data[start:start + cls.IDENTIFIER_SIZE], byteorder='big')
+            for start in range(cls.HEADER_SIZE, len(data_that_was_signed), cls.IDENTIFIER_SIZE)
+        ]
+
+        delivered_batch = cls(identifiers)
+        delivered_batch.signature = bytes(message_signature)
+        delivered_batch.sender = address
+        return delivered_batch
+
+    def __repr__(self):
+        return '<{} [delivered_msgids:{}]>'.format(
+            self.__class__.__name__,
+            self.delivered_message_identifiers,
+        )
+
+    def to_dict(self):
+        return {
+            'type': self.__class__.__name__,
+            'delivered_message_identifiers': self.delivered_message_identifiers,
+            'signature': data_encoder(self.signature)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        assert data['type'] == cls.__name__
+        delivered_batch = cls(
+            delivered_message_identifiers=data['delivered_message_identifiers'],
+        )
+        delivered_batch.signature = data_decoder(data['signature'])
+        return delivered_batch
+
+
 class Pong(SignedMessage):
-    """ Response to a Ping message. """
+    """ Response to a Ping message.
+
+    `capabilities` is a bitmask of the optional transport features supported
+    by the sender, older nodes leave it as zero.
+    """
     cmdid = messages.PONG
 
-    def __init__(self, nonce):
+    def __init__(self, nonce, capabilities=0):
         super().__init__()
         self.nonce = nonce
+        self.capabilities = capabilities
 
     @staticmethod
     def unpack(packed):
-        pong = Pong(nonce=packed.nonce)
+        pong = Pong(
+            nonce=packed.nonce,
+            capabilities=packed.capabilities,
+        )
         pong.signature = packed.signature
         return pong
 
     def pack(self, packed):
         packed.nonce = self.nonce
+        packed.capabilities = self.capabilities
         packed.signature = self.signature
 
 
 class Ping(SignedMessage):
-    """ Healthcheck message. """
+    """ Healthcheck message.
+
+    `capabilities` is a bitmask of the optional transport features supported
+    by the sender, older nodes leave it as zero.
+    """
     cmdid = messages.PING
 
-    def __init__(self, nonce):
+    def __init__(self, nonce, capabilities=0):
         super().__init__()
         self.nonce = nonce
+        self.capabilities = capabilities
 
     @classmethod
     def unpack(cls, packed):
-        ping = cls(nonce=packed.nonce)
+        ping = cls(
+            nonce=packed.nonce,
+            capabilities=packed.capabilities,
+        )
         ping.signature = packed.signature
         return ping
 
     def pack(self, packed):
         packed.nonce = self.nonce
+        packed.capabilities = self.capabilities
         packed.signature = self.signature
 
 
@@ -1427,6 +1540,7 @@ class RefundTransfer(LockedTransfer):
 
 CMDID_TO_CLASS = {
     messages.DELIVERED: Delivered,
+    messages.DELIVEREDBATCH: DeliveredBatch,
     messages.DIRECTTRANSFER: DirectTransfer,
     messages.LOCKEDTRANSFER: LockedTransfer,
     messages.PING: Ping,
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 import socket
-from typing import Tuple
+from typing import Callable, List, Tuple
 
 import structlog
 
@@ -22,6 +22,29 @@ class Discovery:
 
     def __init__(self):
         self.nodeid_to_hostport = dict()
+        self.listeners = list()
+
+    def add_listener(self, callback: Callable[[bytes, Tuple[str, int]], None]):
+        """ `callback(node_address, host_port)` is called every time an
+        endpoint is added or changed.
+        """
+        self.listeners.append(callback)
+
+    def update_endpoint(self, node_address: bytes, host_port: Tuple[str, int]) -> bool:
+        """ Update the endpoint of `node_address` and notify the listeners.
+
+        Returns:
+            True if the endpoint changed.
+        """
+        if self.nodeid_to_hostport.get(node_address) == host_port:
+            return False
+
+        self.nodeid_to_hostport[node_address] = host_port
+
+        for callback in self.listeners:
+            callback(node_address, host_port)
+
+        return True
 
     def register(self, node_address: bytes, host: str, port: int):
         if not isaddress(node_address):
@@ -35,7 +58,7 @@ class Discovery:
         if not isinstance(port, int):
             raise ValueError('port must be a valid number')
 
-        self.nodeid_to_hostport[node_address] = (host, port)
+        self.update_endpoint(node_address, (host, port))
 
     def get(self, node_address: bytes):
         try:
@@ -54,6 +77,12 @@ class ContractDiscovery(Discovery):
     """ Raiden node discovery.
 
     Allows registering and looking up by endpoint (host, port) for node_address.
+
+    Until `preload` is called the lookups are done with calls to the endpoint
+    registry. Once the endpoints are preloaded all the lookups are served from
+    memory, the cache is kept up-to-date with the `AddressRegistered` events
+    polled by the node, and it is persisted to the node's database so that a
+    restart only has to fetch the registrations done while it was offline.
     """
 
     def __init__(
@@ -65,6 +94,91 @@ class ContractDiscovery(Discovery):
 
         self.node_address = node_address
         self.discovery_proxy = discovery_proxy
+        self.storage = None
+        self.synced_block_number = None
+
+    def preload(self, storage, block_number: int):
+        """ Load all the endpoints registered up to `block_number`.
+
+        The endpoints persisted in `storage` are loaded first, and only the
+        registrations done after the last synced block are fetched from the
+        blockchain.
+        """
+        registry_address = self.discovery_proxy.address
+        synced_block_number, endpoints = storage.get_endpoints(registry_address)
+
+        for node_address, host, port in endpoints:
+            self.nodeid_to_hostport[node_address] = (host, port)
+
+        if synced_block_number is None:
+            from_block = 0
+        else:
+            from_block = synced_block_number + 1
+
+        registered = list()
+        if from_block <= block_number:
+            registered = self.discovery_proxy.registered_endpoints(from_block, block_number)
+
+        changed = self._apply_registrations(registered)
+        storage.write_endpoints(
+            registry_address,
+            [
+                (node_address, host, port)
+                for node_address, (host, port) in changed.items()
+            ],
+            block_number,
+        )
+
+        self.storage = storage
+        self.synced_block_number = block_number
+
+        log.debug(
+            'discovery preloaded',
+            node=pex(self.node_address),
+            endpoints=len(self.nodeid_to_hostport),
+            fetched=len(registered),
+            from_block=from_block,
+            to_block=block_number,
+        )
+
+    def endpoint_registered(self, node_address: bytes, endpoint: str, block_number: int):
+        """ Handles an `AddressRegistered` event polled from the blockchain. """
+        changed = self._apply_registrations([(node_address, endpoint, block_number)])
+
+        if self.storage is not None and block_number is not None:
+            # The events of `block_number` may not have been all processed,
+            # only the previous block is known to be fully synced.
+            synced_block_number = max(self.synced_block_number, block_number - 1)
+            self.storage.write_endpoints(
+                self.discovery_proxy.address,
+                [
+                    (address, host, port)
+                    for address, (host, port) in changed.items()
+                ],
+                synced_block_number,
+            )
+            self.synced_block_number = synced_block_number
+
+    def _apply_registrations(self, registered: List[Tuple[bytes, str, int]]):
+        changed = dict()
+
+        for node_address, endpoint, _ in registered:
+            try:
+                if isinstance(endpoint, bytes):
+                    endpoint = endpoint.decode()
+                host_port = split_endpoint(endpoint)
+            except ValueError:
+                log.warning(
+                    'invalid endpoint registered',
+                    node_address=pex(node_address),
+                    endpoint=endpoint,
+                )
+                continue
+
+            if self.update_endpoint(node_address, host_port):
+                changed[node_address] = host_port
+
+        return changed
 
     def register(self, node_address: bytes, host: str, port: int):
         if node_address != self.node_address:
@@ -96,6 +210,10 @@ class ContractDiscovery(Discovery):
         else:
             endpoint = host_port_to_endpoint(host, port)
             self.discovery_proxy.register_endpoint(node_address, endpoint)
+
+            if self.synced_block_number is not None:
+                self.update_endpoint(node_address, (host, port))
+
             log.info(
                 'registered endpoint in discovery',
                 node_address=pex(node_address),
@@ -104,11 +222,20 @@ class ContractDiscovery(Discovery):
             )
 
     def get(self, node_address: bytes):
+        if self.synced_block_number is not None:
+            try:
+                return self.nodeid_to_hostport[node_address]
+            except KeyError:
+                raise UnknownAddress('Unknown address {}'.format(pex(node_address)))
+
         endpoint = self.discovery_proxy.endpoint_by_address(node_address)
         host_port = split_endpoint(endpoint.decode())
         return host_port
 
     def nodeid_by_host_port(self, host_port: Tuple[str, int]):
+        if self.synced_block_number is not None:
+            return super().nodeid_by_host_port(host_port)
+
         host, port = host_port
         endpoint = host_port_to_endpoint(host, port)
         return self.discovery_proxy.address_by_endpoint(endpoint)
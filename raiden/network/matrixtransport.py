@@ -1,16 +1,21 @@
 # -*- coding: utf-8 -*-
+import base64
 import binascii
 import json
 import re
+import struct
+import zlib
 from enum import Enum
 from operator import itemgetter
 from random import Random
+from time import time
 from typing import Dict, Set, Tuple, List
 from urllib.parse import urlparse
 
 import gevent
 import structlog
-from gevent.event import AsyncResult
+from gevent.event import AsyncResult, Event as GEvent
+from gevent.pool import Pool
 from matrix_client.errors import MatrixRequestError
 from matrix_client.user import User
 
@@ -19,6 +24,7 @@ from raiden.constants import ID_TO_NETWORKNAME
 from raiden.encoding import signing
 from raiden.exceptions import (
     InvalidAddress,
+    InvalidProtocolMessage,
     UnknownAddress,
     UnknownTokenAddress,
 )
@@ -62,6 +68,222 @@ class UserPresence(Enum):
     OFFLINE = 'offline'
 
 
+# Homeservers reject events larger than 65536 bytes, the limit leaves room for
+# the event envelope
+MAX_BATCH_SIZE = 60000
+
+# Every node understands a body with the hex encoding of a single message, the
+# nodes which predate the batches parse the whole body as one message. The
+# list of encodings is sent with every event under ENCODINGS_KEY, the nodes
+# which advertise it also split the body in lines, so only they are sent
+# batches, compressed if they advertised the compressed encoding.
+ENCODING_COMPRESSED = 'zlib'
+SUPPORTED_ENCODINGS = [ENCODING_COMPRESSED]
+ENCODINGS_KEY = 'raiden_encodings'
+COMPRESSED_PREFIX = 'z:'
+LENGTH_PREFIX = struct.Struct('>H')
+
+# Number of concurrent room resolutions, each one is a sequence of directory
+# searches, joins and invites
+ROOM_RESOLUTION_POOL_SIZE = 10
+
+
+def pack_compressed(messages_data: List[bytes]) -> str:
+    """ Encodes the binary messages into a compressed event body. """
+    framed = b''.join(
+        LENGTH_PREFIX.pack(len(data)) + data
+        for data in messages_data
+    )
+    compressed = zlib.compress(framed)
+    return COMPRESSED_PREFIX + base64.b64encode(compressed).decode()
+
+
+def unpack_compressed(body: str) -> List[bytes]:
+    """ Decodes a compressed event body into the binary messages.
+
+    Raises:
+        ValueError: If the body is malformed.
+    """
+    if not body.startswith(COMPRESSED_PREFIX):
+        raise ValueError('body is not compressed')
+
+    try:
+        compressed = base64.b64decode(body[len(COMPRESSED_PREFIX):], validate=True)
+        decompressor = zlib.decompressobj()
+        # A batch is never larger than the hex encoded body, this protects
+        # against decompression bombs
+        framed = decompressor.decompress(compressed, MAX_BATCH_SIZE)
+    except (binascii.Error, zlib.error) as e:
+        raise ValueError(str(e))
+
+    if decompressor.unconsumed_tail:
+        raise ValueError('compressed body is too large')
+
+    messages_data = list()
+    start = 0
+    while start < len(framed):
+        if start + LENGTH_PREFIX.size > len(framed):
+            raise ValueError('truncated length prefix')
+
+        (length,) = LENGTH_PREFIX.unpack_from(framed, start)
+        start += LENGTH_PREFIX.size
+
+        if length == 0 or start + length > len(framed):
+            raise ValueError('invalid message length {}'.format(length))
+
+        messages_data.append(framed[start:start + length])
+        start += length
+
+    return messages_data
+
+
+class _QueuedMessage:
+    __slots__ = ('data', 'async_result', 'timeout_generator', 'next_send')
+
+    def __init__(self, data: bytes, async_result: AsyncResult, timeout_generator):
+        self.data = data
+        self.async_result = async_result
+        self.timeout_generator = timeout_generator
+        self.next_send = 0
+
+
+class _RetryQueue:
+    """ Outbound messages to a single peer.
+
+    All the messages which are due are sent together in a single Matrix event,
+    one message per line, so a burst of messages to the same peer is a single
+    request to the homeserver. Older nodes parse the whole body as a single
+    message, so the messages are batched only if the peer advertised its
+    encodings, otherwise they are sent one per event. A message is retried
+    with an exponential backoff until its async result is set, i.e. until its
+    Delivered is received or the transport is stopped. Messages without an
+    async result, e.g. Delivered, are sent only once.
+    """
+
+    def __init__(
+        self,
+        transport: 'MatrixTransport',
+        receiver_address: typing.Address,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_batch_messages: int = None,
+    ):
+        self.transport = transport
+        self.receiver_address = receiver_address
+        self.max_batch_size = max_batch_size
+        self.max_batch_messages = max_batch_messages
+
+        self.queue: List[_QueuedMessage] = list()
+        self.event_new_data = GEvent()
+        self.greenlet = None
+
+    def enqueue(self, data: bytes, async_result: AsyncResult = None):
+        timeout_generator = None
+        if async_result is not None:
+            timeout_generator = self.transport._retry_timeouts()
+
+        self.queue.append(_QueuedMessage(data, async_result, timeout_generator))
+        self.event_new_data.set()
+
+    def start(self, event_stop: GEvent) -> gevent.Greenlet:
+        self.greenlet = gevent.spawn(self._run, event_stop)
+        return self.greenlet
+
+    def _next_batch(self, now: float) -> Tuple[List[_QueuedMessage], float]:
+        """ Returns the messages to send now and the time of the next send. """
+        # Stop retrying the messages that were delivered
+        self.queue = [
+            item
+            for item in self.queue
+            if item.async_result is None or not item.async_result.ready()
+        ]
+
+        max_batch_messages = self.max_batch_messages
+        if not self.transport._supports_batches(self.receiver_address):
+            max_batch_messages = 1
+
+        batch = list()
+        batch_size = 0
+        next_send = None
+
+        for item in self.queue:
+            if item.next_send > now:
+                if next_send is None or item.next_send < next_send:
+                    next_send = item.next_send
+                continue
+
+            # Size of the hex encoded line, the compressed encoding is smaller
+            item_size = len(item.data) * 2 + 3
+
+            batch_full = (
+                (batch and batch_size + item_size > self.max_batch_size) or
+                (max_batch_messages and len(batch) >= max_batch_messages)
+            )
+            if batch_full:
+                next_send = now
+                break
+
+            batch.append(item)
+            batch_size += item_size
+
+        return batch, next_send
+
+    def _run(self, event_stop: GEvent):
+        while not event_stop.is_set():
+            # Cleared before looking at the queue, so that a notification
+            # received while sending is not lost
+            self.event_new_data.clear()
+
+            timeout = self._send_due(time())
+            if timeout != 0:
+                self.event_new_data.wait(timeout)
+
+    def _send_due(self, now: float) -> typing.Optional[float]:
+        """ Sends a batch of the messages which are due.
+
+        Returns:
+            The time to wait for the next batch, zero if it can be sent right
+            away and None if the queue is empty.
+        """
+        batch, next_send = self._next_batch(now)
+
+        if batch and self._send(batch):
+            for item in batch:
+                if item.timeout_generator is None:
+                    self.queue.remove(item)
+                else:
+                    item.next_send = now + next(item.timeout_generator)
+            return 0
+
+        if batch:
+            # The room is being resolved, the queue is notified once it is
+            # known, the timeout retries a failed resolution.
+            return self.transport._room_retry_timeout()
+
+        if next_send is not None:
+            return max(next_send - now, 0)
+
+        return None
+
+    def _send(self, batch: List[_QueuedMessage]) -> bool:
+        """ Returns False if the messages could not be sent because the room
+        of the peer is not known yet.
+        """
+        messages_data = [item.data for item in batch]
+
+        try:
+            return self.transport._send_immediate(self.receiver_address, messages_data)
+        except MatrixRequestError:
+            # The messages are retried with the next batch, the once-only
+            # messages are retransmitted by the peer.
+            log.warning(
+                'Sending messages failed',
+                receiver=pex(self.receiver_address),
+                messages=len(batch),
+                exc_info=True,
+            )
+            return True
+
+
 class MatrixTransport:
     _room_prefix = 'raiden'
     _room_sep = '_'
@@ -84,6 +306,12 @@ class MatrixTransport:
         self._address_to_presence: Dict[typing.Address, UserPresence] = dict()
         self._userids_to_address: Dict[str, typing.Address] = dict()
         self._address_to_roomid: Dict[typing.Address, str] = dict()
+        self._address_to_retrier: Dict[typing.Address, _RetryQueue] = dict()
+        self._address_to_room_resolution: Dict[typing.Address, gevent.Greenlet] = dict()
+        self._address_to_encodings: Dict[typing.Address, Set[str]] = dict()
+        self._room_pool = Pool(ROOM_RESOLUTION_POOL_SIZE)
+        self._max_batch_messages = config.get('max_batch_messages')
+        self._stop_event = GEvent()
 
         self._discovery_room_alias = None
         self._discovery_room_alias_full = None
@@ -108,6 +336,7 @@ class MatrixTransport:
         )
 
         self._login_or_register()
+        self._load_peers()
         self._inventory_rooms()
 
         self._client.add_invite_listener(self._handle_invite)
@@ -128,6 +357,13 @@ class MatrixTransport:
         log.info('TRANSPORT STARTED')
 
     def start_health_check(self, node_address):
+        """ Start monitoring the presence of `node_address` and resolve its
+        room in the background, so that the first message does not wait for
+        the directory lookups.
+        """
+        self._room_pool.spawn(self._start_health_check, node_address)
+
+    def _start_health_check(self, node_address):
         log.debug('HEALTHCHECK', peer_address=pex(node_address))
         node_address_hex = address_encoder(node_address)
         users = [
@@ -142,10 +378,14 @@ class MatrixTransport:
         if user_ids:
             log.debug('Add to presence list', added_users=user_ids)
             self._client.modify_presence_list(add_user_ids=list(user_ids))
-        self._address_to_userids.setdefault(node_address, set()).update(user_ids_to_add)
+        known_user_ids = self._address_to_userids.setdefault(node_address, set())
+        if not user_ids_to_add <= known_user_ids:
+            known_user_ids.update(user_ids_to_add)
+            self._persist_peer(node_address)
+
         # Ensure there is a room for the peer node
         # We use spawn_later to avoid races if the peer is already expecting us and sent an invite
-        gevent.spawn_later(1, self._get_room_for_address, node_address, allow_missing_peers=True)
+        gevent.spawn_later(1, self._resolve_room, node_address, allow_missing_peers=True)
 
     def send_async(
         self,
@@ -170,11 +410,16 @@ class MatrixTransport:
         message_id = message.message_identifier
         if message_id not in self._messageids_to_asyncresult:
             async_result = self._messageids_to_asyncresult[message_id] = AsyncResult()
-            self._send_with_retry(receiver_address, async_result, json.dumps(message.to_dict()))
+            self._get_retrier(receiver_address).enqueue(message.encode(), async_result)
 
         return self._messageids_to_asyncresult[message_id]
 
     def stop_and_wait(self):
+        self._stop_event.set()
+        self._room_pool.kill(block=False)
+        for retrier in self._address_to_retrier.values():
+            retrier.event_new_data.set()
+
         self._client.set_presence_state(UserPresence.OFFLINE.value)
         self._client.stop_listener_thread()
         self._client.logout()
@@ -276,7 +521,7 @@ class MatrixTransport:
                         room=room
                     )
                     return
-                self._address_to_roomid[peer_address] = room.room_id
+                self._set_room_for_address(peer_address, room.room_id)
                 room.add_listener(self._handle_message)
             log.debug(
                 'ROOM',
@@ -298,7 +543,7 @@ class MatrixTransport:
                 room=room
             )
             return
-        self._address_to_roomid[peer_address] = room.room_id
+        self._set_room_for_address(peer_address, room.room_id)
         room.add_listener(self._handle_message, 'm.room.message')
         log.debug(
             'Invited to a room',
@@ -342,13 +587,41 @@ class MatrixTransport:
                 return
             self._userids_to_address[sender_id] = peer_address
 
-        data = event['content']['body']
-        if data.startswith('0x'):
-            message = message_from_bytes(data_decoder(data))
-        else:
-            message_dict = json.loads(data)
-            log.debug('MESSAGE_DATA', data=message_dict)
-            message = message_from_dict(message_dict)
+        encodings = event['content'].get(ENCODINGS_KEY)
+        if isinstance(encodings, list):
+            self._address_to_encodings[peer_address] = set(encodings)
+
+        body = event['content']['body']
+        if body.startswith(COMPRESSED_PREFIX):
+            try:
+                messages_data = unpack_compressed(body)
+            except ValueError:
+                log.warning('INVALID MESSAGE', peer_address=pex(peer_address), message=body)
+                return
+
+            for data in messages_data:
+                self._handle_message_data(data, peer_address)
+            return
+
+        # The body may carry a batch of messages, one per line, hex encoded or
+        # as JSON for the nodes which predate the binary encoding
+        for line in body.splitlines():
+            if line:
+                self._handle_message_data(line, peer_address)
+
+    def _handle_message_data(self, data: typing.Union[bytes, str], peer_address: typing.Address):
+        try:
+            if isinstance(data, bytes):
+                message = message_from_bytes(data)
+            elif data.startswith('0x'):
+                message = message_from_bytes(data_decoder(data))
+            else:
+                message_dict = json.loads(data)
+                log.debug('MESSAGE_DATA', data=message_dict)
+                message = message_from_dict(message_dict)
+        except (InvalidProtocolMessage, ValueError, KeyError, TypeError, IndexError):
+            log.warning('INVALID MESSAGE', peer_address=pex(peer_address), message=data)
+            return
 
         if isinstance(message, SignedMessage) and not message.sender:
             # FIXME: This can't be right
@@ -413,7 +686,7 @@ class MatrixTransport:
                 #       See: https://matrix.org/docs/spec/client_server/r0.3.0.html#id57
                 delivered_message = Delivered(message.message_identifier)
                 self._raiden_service.sign(delivered_message)
-                self._send_immediate(message.sender, json.dumps(delivered_message.to_dict()))
+                self._get_retrier(message.sender).enqueue(delivered_message.encode())
 
         except (InvalidAddress, UnknownAddress, UnknownTokenAddress):
             log.warn('Exception while processing message', exc_info=True)
@@ -438,43 +711,137 @@ class MatrixTransport:
             # TODO: Check if we need to separate this by queue_name
             gevent.spawn(send_queue, address, events)
 
-    def _send_with_retry(
-        self,
-        receiver_address: typing.Address,
-        async_result: AsyncResult,
-        data: str
-    ):
-        def retry():
-            timeout_generator = udp_utils.timeout_exponential_backoff(
-                self._raiden_service.config['protocol']['retries_before_backoff'],
-                self._raiden_service.config['protocol']['retry_interval'],
-                self._raiden_service.config['protocol']['retry_interval'] * 10
+    def _get_retrier(self, receiver_address: typing.Address) -> _RetryQueue:
+        retrier = self._address_to_retrier.get(receiver_address)
+
+        if retrier is None:
+            retrier = _RetryQueue(
+                self,
+                receiver_address,
+                max_batch_messages=self._max_batch_messages,
             )
-            while async_result.value is None:
-                self._send_immediate(receiver_address, data)
-                gevent.sleep(next(timeout_generator))
+            self._address_to_retrier[receiver_address] = retrier
+            self.greenlets.append(retrier.start(self._stop_event))
 
-        self.greenlets.append(gevent.spawn(retry))
+        return retrier
 
-    def _send_immediate(self, receiver_address, data):
+    def _supports_batches(self, receiver_address: typing.Address) -> bool:
+        """ The nodes which advertise their encodings split the body in lines. """
+        return receiver_address in self._address_to_encodings
+
+    def _retry_timeouts(self):
+        protocol_config = self._raiden_service.config['protocol']
+        return udp_utils.timeout_exponential_backoff(
+            protocol_config['retries_before_backoff'],
+            protocol_config['retry_interval'],
+            protocol_config['retry_interval'] * 10,
+        )
+
+    def _send_immediate(self, receiver_address, messages_data: List[bytes]) -> bool:
+        """ Send the encoded messages in a single event to the room of
+        `receiver_address`.
+
+        This never blocks on the room directory, if the room is not known
+        its resolution is started in the background and False is returned.
+        """
         # FIXME: Send message to all matching rooms
-        room = self._get_room_for_address(receiver_address)
-        log.debug('SEND: %r => %r', room, data)
-        room.send_text(data)
+        room = self._get_cached_room(receiver_address)
+        if room is None:
+            self._resolve_room(receiver_address)
+            return False
+
+        peer_encodings = self._address_to_encodings.get(receiver_address, set())
+        if ENCODING_COMPRESSED in peer_encodings:
+            body = pack_compressed(messages_data)
+        else:
+            body = '\n'.join(data_encoder(data) for data in messages_data)
 
-    def _get_room_for_address(
-        self,
-        receiver_address: typing.Address,
-        allow_missing_peers=False
-    ) -> Room:
+        content = {
+            'msgtype': 'm.text',
+            'body': body,
+            ENCODINGS_KEY: SUPPORTED_ENCODINGS,
+        }
+
+        log.debug('SEND: %r => %r', room, body)
+        self._client.api.send_message_event(room.room_id, 'm.room.message', content)
+        return True
+
+    def _get_cached_room(self, receiver_address: typing.Address) -> Room:
         room_id = self._address_to_roomid.get(receiver_address)
         if room_id:
             room = self._client.rooms.get(room_id)
             if room:
                 return room
-            else:
-                # Room is gone - remove from cache
-                self._address_to_roomid.pop(receiver_address)
+
+            # Room is gone - remove from cache
+            self._address_to_roomid.pop(receiver_address)
+
+        return None
+
+    def _resolve_room(self, receiver_address: typing.Address, allow_missing_peers=False):
+        """ Resolve the room of `receiver_address` in the room pool, at most one
+        resolution per address runs at a time.
+        """
+        resolution = self._address_to_room_resolution.get(receiver_address)
+        if resolution is not None and not resolution.ready():
+            return resolution
+
+        resolution = self._room_pool.spawn(
+            self._resolve_room_worker,
+            receiver_address,
+            allow_missing_peers,
+        )
+        self._address_to_room_resolution[receiver_address] = resolution
+        return resolution
+
+    def _resolve_room_worker(self, receiver_address: typing.Address, allow_missing_peers: bool):
+        try:
+            self._get_room_for_address(receiver_address, allow_missing_peers)
+        except (MatrixRequestError, ValueError):
+            log.warning(
+                'Could not resolve the room',
+                peer_address=pex(receiver_address),
+                exc_info=True,
+            )
+            return
+
+        retrier = self._address_to_retrier.get(receiver_address)
+        if retrier is not None:
+            retrier.event_new_data.set()
+
+    def _room_retry_timeout(self):
+        return self._raiden_service.config['protocol']['retry_interval']
+
+    def _set_room_for_address(self, address: typing.Address, room_id: str):
+        if self._address_to_roomid.get(address) != room_id:
+            self._address_to_roomid[address] = room_id
+            self._persist_peer(address)
+
+    def _persist_peer(self, address: typing.Address):
+        self._raiden_service.wal.storage.write_matrix_peer(
+            address,
+            self._address_to_roomid.get(address),
+            self._address_to_userids.get(address, set()),
+        )
+
+    def _load_peers(self):
+        """ Restore the rooms and user ids of the peers from the database, the
+        rooms which were left while the node was offline are discarded.
+        """
+        for address, room_id, user_ids in self._raiden_service.wal.storage.get_matrix_peers():
+            if room_id is not None and room_id in self._client.rooms:
+                self._address_to_roomid[address] = room_id
+
+            self._address_to_userids.setdefault(address, set()).update(user_ids)
+
+    def _get_room_for_address(
+        self,
+        receiver_address: typing.Address,
+        allow_missing_peers=False
+    ) -> Room:
+        room = self._get_cached_room(receiver_address)
+        if room is not None:
+            return room
 
         # The addresses are being sorted to ensure the same channel is used for both directions
         # of communication.
@@ -522,7 +889,7 @@ class MatrixTransport:
 
         room.add_listener(self._handle_message, 'm.room.message')
         log.info('CHANNEL ROOM', peer_address=address_encoder(receiver_address), room=room)
-        self._address_to_roomid[receiver_address] = room.room_id
+        self._set_room_for_address(receiver_address, room.room_id)
         return room
 
     def _make_room_alias(self, *parts):
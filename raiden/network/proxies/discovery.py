@@ -6,16 +6,24 @@ from eth_utils import to_canonical_address, to_checksum_address
 from raiden.blockchain.abi import (
     CONTRACT_MANAGER,
     CONTRACT_ENDPOINT_REGISTRY,
+    EVENT_ADDRESS_REGISTERED,
 )
 from raiden.exceptions import (
     TransactionThrew,
     UnknownAddress,
 )
 from raiden.network.rpc.client import check_address_has_code
+from raiden.network.rpc.filters import (
+    Filter,
+    get_filter_events,
+    new_filter,
+)
+from raiden.network.rpc.smartcontract_proxy import decode_event
 from raiden.network.rpc.transactions import check_transaction_threw
 from raiden.settings import DEFAULT_POLL_TIMEOUT
 from raiden.constants import NULL_ADDRESS
 from raiden.utils import (
+    address_decoder,
     address_encoder,
     isaddress,
     pex,
@@ -91,3 +99,48 @@ class Discovery:
 
     def version(self):
         return self.proxy.call('contract_version')
+
+    def registered_endpoints(self, from_block=0, to_block='latest'):
+        """ Returns the list of `(node_address, endpoint, block_number)` of all
+        the registrations in the block range, in the order they happened.
+
+        Later registrations of the same address override the earlier ones.
+        """
+        topics = [CONTRACT_MANAGER.get_event_id(EVENT_ADDRESS_REGISTERED)]
+        abi = CONTRACT_MANAGER.get_contract_abi(CONTRACT_ENDPOINT_REGISTRY)
+
+        events = get_filter_events(
+            self.client,
+            self.address,
+            topics=topics,
+            from_block=from_block,
+            to_block=to_block,
+        )
+
+        result = list()
+        for event in events:
+            decoded_event = decode_event(abi, event['event_data'])
+            args = decoded_event['args']
+            result.append((
+                address_decoder(args['eth_address']),
+                args['socket'],
+                event['block_number'],
+            ))
+
+        return result
+
+    def addressregistered_filter(self, from_block=None, to_block=None):
+        topics = [CONTRACT_MANAGER.get_event_id(EVENT_ADDRESS_REGISTERED)]
+
+        filter_id_raw = new_filter(
+            self.client,
+            self.address,
+            topics,
+            from_block=from_block,
+            to_block=to_block,
+        )
+
+        return Filter(
+            self.client,
+            filter_id_raw,
+        )
@@ -36,6 +36,7 @@ from raiden.utils.solc import (
     solidity_resolve_symbols
 )
 from raiden.constants import NULL_ADDRESS
+from raiden.utils.metrics import RPC_REQUEST_SECONDS
 
 log = structlog.get_logger(__name__)  # pylint: disable=invalid-name
 
@@ -51,7 +52,8 @@ def make_connection_test_middleware(client):
 
             try:
                 if web3.isConnected():
-                    return make_request(method, params)
+                    with RPC_REQUEST_SECONDS.time((method, )):
+                        return make_request(method, params)
                 else:
                     raise EthNodeCommunicationError('Web3 provider not connected')
 
@@ -1,41 +1,233 @@
 # -*- coding: utf-8 -*-
+import codecs
+from collections import defaultdict
 from typing import Callable, Optional, Dict, List
 
 from eth_utils import (
     to_canonical_address,
     decode_hex,
+    encode_hex,
     to_checksum_address,
-    event_abi_to_log_topic
+    event_abi_to_log_topic,
+    function_abi_to_4byte_selector,
 )
-from eth_abi import decode_abi, encode_abi
-from web3.utils.contracts import encode_transaction_data, find_matching_fn_abi
-from web3.utils.abi import get_abi_input_types, get_abi_output_types, filter_by_type
-from web3.utils.events import get_event_data
+from eth_abi import decode_abi, decode_single, encode_abi
+from eth_abi.exceptions import EncodingError
+from web3.utils.contracts import find_matching_fn_abi
+from web3.utils.abi import (
+    filter_by_type,
+    get_abi_input_names,
+    get_abi_input_types,
+    get_abi_output_types,
+    is_array_type,
+    normalize_event_input_types,
+)
+from web3.utils.datastructures import AttributeDict
+from web3.utils.encoding import hexstr_if_str, to_bytes
+from web3.utils.events import get_event_abi_types_for_decoding, get_event_data
 
 from raiden.exceptions import InvalidFunctionName
 from raiden.utils.typing import Address
 
 
+class FunctionCodec:
+    """ The selector and the argument types of a contract function. """
+    __slots__ = (
+        'abi',
+        'selector',
+        'input_types',
+        'output_types',
+    )
+
+    def __init__(self, fn_abi: Dict):
+        self.abi = fn_abi
+        self.selector = function_abi_to_4byte_selector(fn_abi)
+        self.input_types = get_abi_input_types(fn_abi)
+        self.output_types = get_abi_output_types(fn_abi)
+
+    def encode_call(self, args: List) -> bytes:
+        try:
+            arguments = encode_abi(self.input_types, sanitize_args(self.input_types, args))
+        except EncodingError as e:
+            raise TypeError(
+                'One or more arguments could not be encoded to the necessary '
+                'ABI type: {}'.format(e),
+            )
+
+        return self.selector + arguments
+
+    def decode_result(self, data: bytes):
+        result = decode_abi(self.output_types, data)
+
+        if len(result) == 1:
+            result = result[0]
+
+        return result
+
+
+def normalize_return_value(abi_type: str, value):
+    """ Same as the `BASE_RETURN_NORMALIZERS` of web3. """
+    if abi_type == 'address':
+        return to_checksum_address(value)
+
+    if abi_type == 'string' and isinstance(value, bytes):
+        return codecs.decode(value, 'utf8', 'backslashreplace')
+
+    return value
+
+
+class EventCodec:
+    """ The argument names and types of a contract event, the decoded events
+    are the same as the ones from web3's `get_event_data`.
+    """
+    __slots__ = (
+        'abi',
+        'topic_names',
+        'topic_types',
+        'data_names',
+        'data_types',
+        'has_arrays',
+    )
+
+    def __init__(self, event_abi: Dict):
+        topics_abi = [arg for arg in event_abi['inputs'] if arg['indexed']]
+        data_abi = [arg for arg in event_abi['inputs'] if not arg['indexed']]
+
+        self.abi = event_abi
+        self.topic_names = get_abi_input_names({'inputs': topics_abi})
+        self.topic_types = get_event_abi_types_for_decoding(
+            normalize_event_input_types(topics_abi),
+        )
+        self.data_names = get_abi_input_names({'inputs': data_abi})
+        self.data_types = get_event_abi_types_for_decoding(
+            normalize_event_input_types(data_abi),
+        )
+
+        # The normalization of arrays is left to web3
+        self.has_arrays = any(
+            is_array_type(abi_type)
+            for abi_type in self.topic_types + self.data_types
+        )
+
+    def decode(self, log: Dict):
+        if self.has_arrays:
+            return get_event_data(self.abi, log)
+
+        if self.abi['anonymous']:
+            topics = log['topics']
+        else:
+            topics = log['topics'][1:]
+
+        if len(topics) != len(self.topic_types):
+            raise ValueError('Expected {} log topics.  Got {}'.format(
+                len(self.topic_types),
+                len(topics),
+            ))
+
+        args = dict()
+        for name, abi_type, topic in zip(self.topic_names, self.topic_types, topics):
+            args[name] = normalize_return_value(abi_type, decode_single(abi_type, topic))
+
+        data = decode_abi(self.data_types, hexstr_if_str(to_bytes, log['data']))
+        for name, abi_type, value in zip(self.data_names, self.data_types, data):
+            args[name] = normalize_return_value(abi_type, value)
+
+        return AttributeDict.recursive({
+            'args': args,
+            'event': self.abi['name'],
+            'logIndex': log['logIndex'],
+            'transactionIndex': log['transactionIndex'],
+            'transactionHash': log['transactionHash'],
+            'address': log['address'],
+            'blockHash': log['blockHash'],
+            'blockNumber': log['blockNumber'],
+        })
+
+
+class ContractCodec:
+    """ The encoders and decoders of a contract's ABI.
+
+    Computing the topics of the events and the selectors of the functions
+    requires hashing their signatures, so this is done once per ABI instead
+    of for every log and every call.
+    """
+
+    def __init__(self, abi: List[Dict]):
+        self.abi = abi
+
+        self.topic_to_event = {
+            event_abi_to_log_topic(event_abi): EventCodec(event_abi)
+            for event_abi in filter_by_type('event', abi)
+        }
+
+        self.name_to_functions = defaultdict(list)
+        for fn_abi in filter_by_type('function', abi):
+            self.name_to_functions[fn_abi['name']].append(FunctionCodec(fn_abi))
+
+    def function(self, function_name: str, args: List) -> FunctionCodec:
+        functions = self.name_to_functions.get(function_name, [])
+
+        if len(functions) == 1 and len(functions[0].input_types) == len(args):
+            return functions[0]
+
+        # Overloaded function or wrong number of arguments, let web3 resolve it
+        # or raise the appropriate error
+        fn_abi = find_matching_fn_abi(self.abi, function_name, args)
+        for function in functions:
+            if function.abi is fn_abi:
+                return function
+
+        return FunctionCodec(fn_abi)
+
+    def decode_event(self, log: Dict):
+        if isinstance(log['topics'][0], str):
+            log['topics'][0] = decode_hex(log['topics'][0])
+        elif isinstance(log['topics'][0], int):
+            log['topics'][0] = decode_hex(hex(log['topics'][0]))
+        event_id = log['topics'][0]
+        return self.topic_to_event[event_id].decode(log)
+
+
+# The ABIs are long lived objects owned by the CONTRACT_MANAGER, the codecs
+# are cached by identity. The codec keeps a reference to its ABI, so the id
+# of a cached ABI can not be reused.
+_abi_codecs = dict()
+
+
+def get_codec(abi: List[Dict]) -> ContractCodec:
+    codec = _abi_codecs.get(id(abi))
+
+    if codec is None or codec.abi is not abi:
+        codec = ContractCodec(abi)
+        _abi_codecs[id(abi)] = codec
+
+    return codec
+
+
+def sanitize_args(input_types: List[str], args: List):
+    """Prepare inputs to match the ABI"""
+    output = []
+    assert len(input_types) == len(args)
+    for input_type, arg in zip(input_types, args):
+        if input_type == 'address':
+            output.append(to_checksum_address(arg))
+        elif input_type == 'bytes' and isinstance(arg, str):
+            output.append(arg.encode())
+        elif input_type == 'string' and isinstance(arg, bytes):
+            output.append(arg.decode())
+        else:
+            output.append(arg)
+    return output
+
+
 def decode_event(abi: Dict, log: Dict):
     """Helper function to unpack event data using a provided ABI"""
-    if isinstance(log['topics'][0], str):
-        log['topics'][0] = decode_hex(log['topics'][0])
-    elif isinstance(log['topics'][0], int):
-        log['topics'][0] = decode_hex(hex(log['topics'][0]))
-    event_id = log['topics'][0]
-    events = filter_by_type('event', abi)
-    topic_to_event_abi = {
-        event_abi_to_log_topic(event_abi): event_abi
-        for event_abi in events
-    }
-    event_abi = topic_to_event_abi[event_id]
-    return get_event_data(event_abi, log)
+    return get_codec(abi).decode_event(log)
 
 
 def encode_function_call(abi: Dict, function: str, args: List=list()):
-    fn_abi = find_matching_fn_abi(abi, function, args)
-    fn_types = get_abi_input_types(fn_abi)
-    return encode_abi(fn_types, args)
+    function_codec = get_codec(abi).function(function, args)
+    return encode_abi(function_codec.input_types, args)
 
 
 class ContractProxy:
@@ -54,6 +246,7 @@ class ContractProxy:
         contract_address = to_canonical_address(contract_address)
 
         self.abi = abi
+        self.codec = get_codec(abi)
         self.call_function = call_function
         self.contract_address = contract_address
         self.estimate_function = estimate_function
@@ -62,8 +255,7 @@ class ContractProxy:
         self.valid_kargs = {'gasprice', 'startgas', 'value'}
 
     def _check_function_name_and_kargs(self, function_name: str, kargs):
-        functions = [x['name'] for x in self.abi if x['type'] == 'function']
-        if function_name not in functions:
+        if function_name not in self.codec.name_to_functions:
             raise InvalidFunctionName('Unknown function {}'.format(function_name))
 
         invalid_args = set(kargs.keys()).difference(self.valid_kargs)
@@ -74,12 +266,12 @@ class ContractProxy:
 
     def transact(self, function_name: str, *args, **kargs):
         self._check_function_name_and_kargs(function_name, kargs)
-        data = self.get_transaction_data(self.abi, function_name, args)
+        data = self.codec.function(function_name, args).encode_call(args)
 
         txhash = self.transaction_function(
             to=self.contract_address,
             value=kargs.pop('value', 0),
-            data=decode_hex(data),
+            data=data,
             **kargs
         )
 
@@ -87,22 +279,18 @@ class ContractProxy:
 
     def call(self, function_name: str, *args, **kargs):
         self._check_function_name_and_kargs(function_name, kargs)
-        data = self.get_transaction_data(self.abi, function_name, args)
+        function_codec = self.codec.function(function_name, args)
 
         res = self.call_function(
             sender=self.sender,
             to=self.contract_address,
             value=kargs.pop('value', 0),
-            data=decode_hex(data),
+            data=function_codec.encode_call(args),
             **kargs
         )
 
         if res:
-            fn_abi = find_matching_fn_abi(self.abi, function_name, args)
-            output_types = get_abi_output_types(fn_abi)
-            res = decode_abi(output_types, res)
-            if len(res) == 1:
-                res = res[0]
+            res = function_codec.decode_result(res)
 
         return res
 
@@ -117,51 +305,26 @@ class ContractProxy:
             raise RuntimeError('estimate_function was not supplied.')
 
         self._check_function_name_and_kargs(function_name, kargs)
-        data = self.get_transaction_data(self.abi, function_name, args)
+        data = self.codec.function(function_name, args).encode_call(args)
 
         res = self.estimate_function(
             sender=self.sender,
             to=self.contract_address,
             value=kargs.pop('value', 0),
-            data=decode_hex(data),
+            data=data,
             **kargs
         )
 
         return res
 
     def decode_event(self, log):
-        return decode_event(self.abi, log)
+        return self.codec.decode_event(log)
 
     def encode_function_call(self, function: str, args: List=list()):
         return self.get_transaction_data(self.abi, function, args)
 
-    @staticmethod
-    def sanitize_args(abi: dict, args: List):
-        """Prepare inputs to match the ABI"""
-        inputs = get_abi_input_types(abi)
-        output = []
-        assert len(inputs) == len(args)
-        for input_type, arg in zip(inputs, args):
-            if input_type == 'address':
-                output.append(to_checksum_address(arg))
-            elif input_type == 'bytes' and isinstance(arg, str):
-                output.append(arg.encode())
-            else:
-                output.append(arg)
-        return output
-
     @staticmethod
     def get_transaction_data(abi: Dict, function_name: str, args: List=list()):
         """Get encoded transaction data"""
-        fn_abi = find_matching_fn_abi(
-            abi,
-            function_name,
-            args
-        )
-        args = ContractProxy.sanitize_args(fn_abi, args)
-        return encode_transaction_data(
-            abi,
-            None,
-            function_name,
-            args
-        )
+        function_codec = get_codec(abi).function(function_name, args)
+        return encode_hex(function_codec.encode_call(args))
@@ -16,6 +16,9 @@ class DummyPolicy:
     def consume(self, tokens):  # pylint: disable=unused-argument,no-self-use
         return 0.
 
+    def wait_time(self, tokens):  # pylint: disable=unused-argument,no-self-use
+        return 0.
+
 
 class TokenBucket:
     """Implementation of the token bucket throttling algorithm.
@@ -44,9 +47,68 @@ class TokenBucket:
             wait_time = -self.tokens / self.fill_rate
         return wait_time
 
+    def wait_time(self, tokens):
+        """Time until `tokens` can be consumed without waiting, does not
+        consume any tokens.
+        Args:
+            tokens (float): number of transport tokens required
+        Returns:
+            wait_time (float): time until the tokens are available
+        """
+        if self.tokens < tokens:
+            self._get_tokens()
+        if self.tokens < tokens:
+            return (tokens - self.tokens) / self.fill_rate
+        return 0.
+
     def _get_tokens(self):
         now = self._time()
         self.tokens += self.fill_rate * (now - self.timestamp)
         if self.tokens > self.capacity:
             self.tokens = self.capacity
         self.timestamp = now
+
+
+class PeerTokenBuckets:
+    """Lazily creates a TokenBucket per peer, so that a single peer cannot
+    consume the budget of the others.
+
+    A bucket which refilled to its capacity behaves exactly like a new one, so
+    the buckets of the idle peers are dropped once the number of buckets
+    doubled since the last eviction.
+    """
+
+    MIN_EVICTION_SIZE = 64
+
+    def __init__(self, capacity=10., fill_rate=10., time_function=None):
+        self.capacity = capacity
+        self.fill_rate = fill_rate
+        self._time = time_function or time
+        self.peers_to_buckets = dict()
+        self.eviction_size = self.MIN_EVICTION_SIZE
+
+    def get(self, peer):
+        bucket = self.peers_to_buckets.get(peer)
+
+        if bucket is None:
+            if len(self.peers_to_buckets) >= self.eviction_size:
+                self.evict_idle()
+
+            bucket = TokenBucket(self.capacity, self.fill_rate, self._time)
+            self.peers_to_buckets[peer] = bucket
+
+        return bucket
+
+    def evict_idle(self):
+        """Drops the buckets which are full."""
+        now = self._time()
+
+        self.peers_to_buckets = {
+            peer: bucket
+            for peer, bucket in self.peers_to_buckets.items()
+            if bucket.tokens + bucket.fill_rate * (now - bucket.timestamp) < bucket.capacity
+        }
+        self.eviction_size = max(self.MIN_EVICTION_SIZE, 2 * len(self.peers_to_buckets))
+
+    def __len__(self):
+        return len(self.peers_to_buckets)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import gevent
+
+from raiden.constants import UDP_MAX_MESSAGE_SIZE
+from raiden.messages import DeliveredBatch
+from raiden.utils import typing
+
+
+class DeliveredAggregator:
+    """ Collects the identifiers of the processed messages per sender, so that
+    they can be acknowledged with a single `DeliveredBatch`.
+
+    The identifiers are added only after the message was processed, i.e. after
+    the state change was written to the WAL, so the durability guarantee of
+    the individual `Delivered` is kept. The batch is sent `flush_delay` seconds
+    after the first identifier was added or as soon as it is full.
+    """
+
+    def __init__(
+            self,
+            send_batch: typing.Callable[[typing.Address, typing.List[int]], None],
+            flush_delay: float,
+            max_size: int = UDP_MAX_MESSAGE_SIZE,
+    ):
+        self.send_batch = send_batch
+        self.flush_delay = flush_delay
+        self.max_identifiers = DeliveredBatch.max_identifiers(max_size)
+
+        self.senders_to_identifiers = dict()
+        self.senders_to_flush = dict()
+
+    def add(self, sender: typing.Address, message_identifier: int):
+        identifiers = self.senders_to_identifiers.setdefault(sender, list())
+
+        # A retransmission may arrive before the batch is sent
+        if message_identifier not in identifiers:
+            identifiers.append(message_identifier)
+
+        if len(identifiers) >= self.max_identifiers:
+            self.flush(sender)
+
+        elif sender not in self.senders_to_flush:
+            self.senders_to_flush[sender] = gevent.spawn_later(
+                self.flush_delay,
+                self.flush,
+                sender,
+            )
+
+    def flush(self, sender: typing.Address):
+        """ Acknowledge the messages received from `sender`. """
+        identifiers = self.senders_to_identifiers.pop(sender, None)
+
+        greenlet = self.senders_to_flush.pop(sender, None)
+        if greenlet is not None and greenlet is not gevent.getcurrent():
+            greenlet.kill(block=False)
+
+        if identifiers:
+            self.send_batch(sender, identifiers)
+
+    def stop(self):
+        """ Drop the pending acknowledgments, the partner will retry the
+        messages and they will be acknowledged after a restart.
+        """
+        for greenlet in self.senders_to_flush.values():
+            greenlet.kill(block=False)
+
+        self.senders_to_flush.clear()
+        self.senders_to_identifiers.clear()
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+import struct
+
+import gevent
+import structlog
+
+from raiden.constants import UDP_MAX_MESSAGE_SIZE
+from raiden.encoding import messages
+from raiden.utils import typing
+
+log = structlog.get_logger(__name__)  # pylint: disable=invalid-name
+
+# The envelope uses the same header layout as the messages, the cmdid followed
+# by three bytes of padding, then each encoded message prefixed by its length.
+ENVELOPE_HEADER = bytes([messages.ENVELOPE, 0, 0, 0])
+LENGTH_PREFIX = struct.Struct('>H')
+
+HostPort_T = typing.Tuple[str, int]
+
+
+def is_envelope(data: bytes) -> bool:
+    return data[:1] == ENVELOPE_HEADER[:1]
+
+
+def envelope_size(messagedata_list: typing.List[bytes]) -> int:
+    """ Returns the size of the envelope packing `messagedata_list`. """
+    return len(ENVELOPE_HEADER) + sum(
+        LENGTH_PREFIX.size + len(messagedata)
+        for messagedata in messagedata_list
+    )
+
+
+def pack_envelope(messagedata_list: typing.List[bytes]) -> bytes:
+    """ Frames the already encoded messages into a single datagram. """
+    if not messagedata_list:
+        raise ValueError('an envelope cannot be empty')
+
+    data = bytearray(ENVELOPE_HEADER)
+    for messagedata in messagedata_list:
+        data += LENGTH_PREFIX.pack(len(messagedata))
+        data += messagedata
+
+    return bytes(data)
+
+
+def unpack_envelope(data: bytes) -> typing.List[bytes]:
+    """ Splits an envelope into the encoded messages it carries.
+
+    Raises:
+        ValueError: If the envelope is malformed or contains another envelope.
+    """
+    if not is_envelope(data):
+        raise ValueError('data is not an envelope')
+
+    messagedata_list = list()
+    start = len(ENVELOPE_HEADER)
+    end = len(data)
+
+    while start < end:
+        if start + LENGTH_PREFIX.size > end:
+            raise ValueError('truncated length prefix')
+
+        (length,) = LENGTH_PREFIX.unpack_from(data, start)
+        start += LENGTH_PREFIX.size
+
+        if length == 0 or start + length > end:
+            raise ValueError('invalid message length {}'.format(length))
+
+        messagedata = data[start:start + length]
+        if is_envelope(messagedata):
+            raise ValueError('nested envelopes are not allowed')
+
+        messagedata_list.append(messagedata)
+        start += length
+
+    if not messagedata_list:
+        raise ValueError('an envelope cannot be empty')
+
+    return messagedata_list
+
+
+class MessageCoalescer:
+    """ Buffers encoded messages per endpoint and sends them together.
+
+    Messages added for the same endpoint are packed into an envelope which is
+    sent after `flush_delay` seconds or as soon as the next message would not
+    fit into a single datagram. With a delay of zero the buffer is flushed on
+    the next iteration of the event loop, so only the messages produced by the
+    work done in the current iteration (e.g. a state change and the Delivered
+    for the message that triggered it) are coalesced.
+    """
+
+    def __init__(
+            self,
+            sendraw: typing.Callable[[HostPort_T, bytes], None],
+            flush_delay: float,
+            max_size: int = UDP_MAX_MESSAGE_SIZE,
+    ):
+        self.sendraw = sendraw
+        self.flush_delay = flush_delay
+        self.max_size = max_size
+
+        self.endpoints_to_pending = dict()
+        self.endpoints_to_size = dict()
+        self.endpoints_to_flush = dict()
+
+    def add(self, host_port: HostPort_T, messagedata: bytes):
+        message_size = LENGTH_PREFIX.size + len(messagedata)
+        pending_size = self.endpoints_to_size.get(host_port, len(ENVELOPE_HEADER))
+
+        if host_port in self.endpoints_to_pending and pending_size + message_size > self.max_size:
+            self.flush(host_port)
+            pending_size = len(ENVELOPE_HEADER)
+
+        pending = self.endpoints_to_pending.setdefault(host_port, list())
+        pending.append(messagedata)
+        self.endpoints_to_size[host_port] = pending_size + message_size
+
+        if host_port not in self.endpoints_to_flush:
+            self.endpoints_to_flush[host_port] = gevent.spawn_later(
+                self.flush_delay,
+                self.flush,
+                host_port,
+            )
+
+    def flush(self, host_port: HostPort_T):
+        """ Send the messages buffered for `host_port`. """
+        pending = self.endpoints_to_pending.pop(host_port, None)
+        self.endpoints_to_size.pop(host_port, None)
+
+        greenlet = self.endpoints_to_flush.pop(host_port, None)
+        if greenlet is not None and greenlet is not gevent.getcurrent():
+            greenlet.kill(block=False)
+
+        if not pending:
+            return
+
+        # A single message is sent as is, there is no reason to pay for the
+        # framing overhead.
+        if len(pending) == 1:
+            datagram = pending[0]
+        else:
+            datagram = pack_envelope(pending)
+
+        log.debug(
+            'sending coalesced messages',
+            host_port=host_port,
+            count=len(pending),
+            size=len(datagram),
+        )
+        self.sendraw(host_port, datagram)
+
+    def stop(self):
+        """ Drop the buffered messages.
+
+        The messages that require acknowledgment are retried by the queues,
+        so dropping the buffer is safe.
+        """
+        for greenlet in self.endpoints_to_flush.values():
+            greenlet.kill(block=False)
+
+        self.endpoints_to_flush.clear()
+        self.endpoints_to_pending.clear()
+        self.endpoints_to_size.clear()
@@ -1,16 +1,18 @@
 # -*- coding: utf-8 -*-
+import heapq
+import random
 from collections import namedtuple
-from itertools import repeat
+from time import time
 
 from gevent.event import Event
 import structlog
 
 from raiden.exceptions import (
+    InvalidAddress,
     UnknownAddress,
     RaidenShuttingDown,
 )
 from raiden.utils import pex, typing
-from raiden.transfer import views
 from raiden.transfer.state import (
     NODE_NETWORK_REACHABLE,
     NODE_NETWORK_UNKNOWN,
@@ -27,149 +29,301 @@ HealthEvents = namedtuple('HealthEvents', (
 ))
 
 
-def healthcheck(
-        protocol: 'UDPTransport',
-        recipient: typing.Address,
-        event_stop: Event,
-        event_healthy: Event,
-        event_unhealthy: Event,
-        nat_keepalive_retries: int,
-        nat_keepalive_timeout: int,
-        nat_invitation_timeout: int,
-        ping_nonce: int,
-):
-
-    """ Sends a periodical Ping to `recipient` to check its health. """
-    # pylint: disable=too-many-branches
-
-    log.debug(
-        'starting healthcheck for',
-        node=pex(protocol.raiden.address),
-        to=pex(recipient),
+class PeerHealth:
+    """ Liveness bookkeeping for a single peer. """
+    __slots__ = (
+        'address',
+        'events',
+        'network_state',
+        'endpoint_known',
+        'endpoint_backoff',
+        'last_seen',
+        'ping_nonce',
+        'first_unanswered_nonce',
+        'unanswered_pings',
+        'next_check',
+        'pong_seen',
     )
 
-    # The state of the node is unknown, the events are set to allow the tasks
-    # to do work.
-    last_state = NODE_NETWORK_UNKNOWN
-    protocol.set_node_network_state(
-        recipient,
-        last_state,
-    )
+    def __init__(self, address: typing.Address, events: HealthEvents):
+        self.address = address
+        self.events = events
+        self.network_state = NODE_NETWORK_UNKNOWN
+        self.endpoint_known = False
+        self.endpoint_backoff = None
+        self.last_seen = None
+        self.ping_nonce = 0
+        self.first_unanswered_nonce = 1
+        self.unanswered_pings = 0
+        self.next_check = None
+        self.pong_seen = False
 
-    # Always call `clear` before `set`, since only `set` does context-switches
-    # it's easier to reason about tasks that are waiting on both events.
-
-    # Wait for the end-point registration or for the node to quit
-    try:
-        protocol.get_host_port(recipient)
-    except UnknownAddress:
-        log.debug(
-            'waiting for endpoint registration',
-            node=pex(protocol.raiden.address),
-            to=pex(recipient),
-        )
-
-        event_healthy.clear()
-        event_unhealthy.set()
-
-        backoff = udp_utils.timeout_exponential_backoff(
-            nat_keepalive_retries,
-            nat_keepalive_timeout,
-            nat_invitation_timeout,
-        )
-        sleep = next(backoff)
-
-        while not event_stop.wait(sleep):
-            try:
-                protocol.get_host_port(recipient)
-            except UnknownAddress:
-                sleep = next(backoff)
-            else:
-                break
-
-    # Don't wait to send the first Ping and to start sending messages if the
-    # endpoint is known
-    sleep = 0
-    event_unhealthy.clear()
-    event_healthy.set()
-
-    while not event_stop.wait(sleep):
-        sleep = nat_keepalive_timeout
-
-        ping_nonce['nonce'] += 1
-        messagedata = protocol.get_ping(ping_nonce['nonce'])
-        message_id = ('ping', ping_nonce['nonce'], recipient)
-
-        # Send Ping a few times before setting the node as unreachable
-        try:
-            acknowledged = udp_utils.retry(
-                protocol,
-                messagedata,
-                message_id,
-                recipient,
-                event_stop,
-                [nat_keepalive_timeout] * nat_keepalive_retries,
-            )
-        except RaidenShuttingDown:  # For a clean shutdown process
-            return
 
-        if event_stop.is_set():
-            return
+class HealthCheckScheduler:
+    """ Tracks the reachability of all the peers with a single task.
 
-        if not acknowledged:
-            log.debug(
-                'node is unresponsive',
-                node=pex(protocol.raiden.address),
-                to=pex(recipient),
-                current_state=last_state,
-                new_state=NODE_NETWORK_UNREACHABLE,
-                retries=nat_keepalive_retries,
-                timeout=nat_keepalive_timeout,
+    Instead of pinging every peer on its own timer, any authenticated message
+    received from a peer is used as a proof of liveness and only the peers
+    which have been idle for `nat_keepalive_timeout` are pinged. A peer is
+    pinged as soon as its endpoint is known, regardless of the traffic, and
+    until it answered with a Pong, since the Ping and Pong carry the
+    capabilities of the nodes. The checks are kept in a heap ordered by time,
+    with some jitter on the keepalives to spread the pings over time. The
+    node network state is only updated on transitions.
+
+    The HealthEvents of a peer are set as follows:
+
+    - Both are cleared while the endpoint is not known.
+    - `event_healthy` is set once the endpoint is known or when the peer shows
+      any sign of life.
+    - `event_unhealthy` is set after `nat_keepalive_retries` unanswered pings.
+    """
+
+    def __init__(
+            self,
+            protocol: 'UDPTransport',
+            nat_keepalive_retries: int,
+            nat_keepalive_timeout: int,
+            nat_invitation_timeout: int,
+            jitter: float = 0.1,
+            time_function=None,
+    ):
+        self.protocol = protocol
+        self.nat_keepalive_retries = nat_keepalive_retries
+        self.nat_keepalive_timeout = nat_keepalive_timeout
+        self.nat_invitation_timeout = nat_invitation_timeout
+        self.jitter = jitter
+        self._time = time_function or time
+
+        self.addresses_to_peers = dict()
+        self.checks = list()
+        self.event_wakeup = Event()
+        self.event_stop = None
+
+    def add(self, address: typing.Address) -> HealthEvents:
+        """ Start monitoring `address`, the first check is done right away. """
+        peer = self.addresses_to_peers.get(address)
+
+        if peer is None:
+            events = HealthEvents(
+                event_healthy=Event(),
+                event_unhealthy=Event(),
             )
+            peer = PeerHealth(address, events)
+            self.addresses_to_peers[address] = peer
 
-            # The node is not healthy, clear the event to stop all queue
-            # tasks
-            last_state = NODE_NETWORK_UNREACHABLE
-            protocol.set_node_network_state(
-                recipient,
-                last_state,
+            log.debug(
+                'starting healthcheck for',
+                node=pex(self.protocol.raiden.address),
+                to=pex(address),
             )
-            event_healthy.clear()
-            event_unhealthy.set()
-
-            # Retry until recovery, used for:
-            # - Checking node status.
-            # - Nat punching.
-            try:
-                acknowledged = udp_utils.retry(
-                    protocol,
-                    messagedata,
-                    message_id,
-                    recipient,
-                    event_stop,
-                    repeat(nat_invitation_timeout),
-                )
-            except RaidenShuttingDown:  # For a clean shutdown process
-                return
+            self._schedule(peer, self._time())
+
+        return peer.events
+
+    def peer_seen(self, address: typing.Address):
+        """ Must be called for every authenticated message from `address`. """
+        peer = self.addresses_to_peers.get(address)
 
-        if acknowledged:
-            current_state = views.get_node_network_status(
-                views.state_from_raiden(protocol.raiden),
-                recipient,
+        if peer is not None:
+            peer.last_seen = self._time()
+            peer.unanswered_pings = 0
+            peer.first_unanswered_nonce = peer.ping_nonce + 1
+
+            if peer.endpoint_known:
+                self._set_state(peer, NODE_NETWORK_REACHABLE)
+
+    def endpoint_changed(self, address: typing.Address, host_port: typing.Tuple[str, int]):
+        """ Must be called when the endpoint of `address` is registered or
+        changed, the peer is checked right away instead of waiting for the
+        backoff or the next keepalive.
+        """
+        peer = self.addresses_to_peers.get(address)
+
+        if peer is not None:
+            log.debug(
+                'endpoint changed',
+                node=pex(self.protocol.raiden.address),
+                to=pex(address),
+                host_port=host_port,
             )
+
+            # The new endpoint must be confirmed with a ping, the node may
+            # have been restarted with other capabilities
+            peer.last_seen = None
+            peer.pong_seen = False
+            peer.next_check = None
+            self._schedule(peer, self._time())
+
+    def pong_received(self, address: typing.Address, nonce: int) -> bool:
+        """ Handles the Pong for one of the outstanding pings.
+
+        Returns:
+            False if the nonce is not of an unanswered ping.
+        """
+        peer = self.addresses_to_peers.get(address)
+
+        if peer is None or not peer.first_unanswered_nonce <= nonce <= peer.ping_nonce:
+            return False
+
+        peer.pong_seen = True
+        self.peer_seen(address)
+        return True
+
+    def run(self, event_stop: Event):
+        self.event_stop = event_stop
+
+        while not event_stop.is_set():
+            now = self._time()
+
+            while self.checks and self.checks[0][0] <= now:
+                check_time, _, address = heapq.heappop(self.checks)
+                peer = self.addresses_to_peers[address]
+
+                # A peer has a single pending check, older entries are stale
+                if peer.next_check != check_time:
+                    continue
+
+                peer.next_check = None
+                try:
+                    self._check(peer, now)
+                except RaidenShuttingDown:  # For a clean shutdown process
+                    return
+                except Exception as e:  # pylint: disable=broad-except
+                    # A single greenlet checks every peer, an error must only
+                    # delay the checks of its peer
+                    log.error(
+                        'healthcheck failed',
+                        node=pex(self.protocol.raiden.address),
+                        to=pex(peer.address),
+                        error=str(e),
+                    )
+                    self._schedule(peer, now + self._with_jitter(self.nat_keepalive_timeout))
+
+                if event_stop.is_set():
+                    return
+
+            timeout = None
+            if self.checks:
+                timeout = max(self.checks[0][0] - self._time(), 0)
+
+            self.event_wakeup.clear()
+            self.event_wakeup.wait(timeout)
+
+    def stop(self):
+        self.event_wakeup.set()
+
+    def _schedule(self, peer: PeerHealth, check_time: float):
+        if peer.next_check is not None and peer.next_check <= check_time:
+            return
+
+        peer.next_check = check_time
+        heapq.heappush(self.checks, (check_time, id(peer), peer.address))
+
+        if self.checks[0][0] == check_time:
+            self.event_wakeup.set()
+
+    def _with_jitter(self, timeout: float) -> float:
+        return timeout * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _set_state(self, peer: PeerHealth, network_state: str):
+        # Always call `clear` before `set`, since only `set` does
+        # context-switches it's easier to reason about tasks that are waiting
+        # on both events.
+        if network_state == NODE_NETWORK_UNREACHABLE:
+            peer.events.event_healthy.clear()
+            peer.events.event_unhealthy.set()
+        else:
+            peer.events.event_unhealthy.clear()
+            peer.events.event_healthy.set()
+
+        if peer.network_state != network_state:
             log.debug(
-                'node answered',
-                node=pex(protocol.raiden.address),
-                to=pex(recipient),
-                current_state=current_state,
-                new_state=NODE_NETWORK_REACHABLE,
+                'node network state changed',
+                node=pex(self.protocol.raiden.address),
+                to=pex(peer.address),
+                current_state=peer.network_state,
+                new_state=network_state,
             )
+            peer.network_state = network_state
+            self.protocol.set_node_network_state(peer.address, network_state)
+
+    def _check(self, peer: PeerHealth, now: float):
+        if not peer.endpoint_known:
+            self._check_endpoint(peer, now)
+            return
+
+        idle_time = now - peer.last_seen if peer.last_seen is not None else None
+        recent_traffic = idle_time is not None and idle_time < self.nat_keepalive_timeout
+        if recent_traffic and peer.pong_seen:
+            # There was traffic recently, there is no need to ping
+            next_check = peer.last_seen + self._with_jitter(self.nat_keepalive_timeout)
+            self._schedule(peer, max(next_check, now))
+            return
+
+        if peer.ping_nonce >= peer.first_unanswered_nonce:
+            peer.unanswered_pings += 1
 
-            if last_state != NODE_NETWORK_REACHABLE:
-                last_state = NODE_NETWORK_REACHABLE
-                protocol.set_node_network_state(
-                    recipient,
-                    last_state,
+        if peer.unanswered_pings >= self.nat_keepalive_retries:
+            if peer.network_state != NODE_NETWORK_UNREACHABLE:
+                log.debug(
+                    'node is unresponsive',
+                    node=pex(self.protocol.raiden.address),
+                    to=pex(peer.address),
+                    retries=self.nat_keepalive_retries,
+                    timeout=self.nat_keepalive_timeout,
                 )
-                event_unhealthy.clear()
-                event_healthy.set()
+
+            # The node is not healthy, the queue tasks will wait for it to
+            # recover. Keep pinging for NAT punching.
+            self._set_state(peer, NODE_NETWORK_UNREACHABLE)
+            timeout = self.nat_invitation_timeout
+        else:
+            timeout = self.nat_keepalive_timeout
+
+        self._send_ping(peer)
+        self._schedule(peer, now + self._with_jitter(timeout))
+
+    def _check_endpoint(self, peer: PeerHealth, now: float):
+        try:
+            self.protocol.get_host_port(peer.address)
+        except (InvalidAddress, UnknownAddress):
+            if peer.endpoint_backoff is None:
+                log.debug(
+                    'waiting for endpoint registration',
+                    node=pex(self.protocol.raiden.address),
+                    to=pex(peer.address),
+                )
+
+                peer.endpoint_backoff = udp_utils.timeout_exponential_backoff(
+                    self.nat_keepalive_retries,
+                    self.nat_keepalive_timeout,
+                    self.nat_invitation_timeout,
+                )
+                peer.events.event_healthy.clear()
+                peer.events.event_unhealthy.set()
+
+            self._schedule(peer, now + next(peer.endpoint_backoff))
+            return
+
+        peer.endpoint_known = True
+        peer.endpoint_backoff = None
+
+        # Don't wait for the first Ping to start sending messages, the
+        # endpoint is known. The Ping is sent right away, the peer is not
+        # routed through before it is reachable and the Pong negotiates the
+        # capabilities.
+        peer.events.event_unhealthy.clear()
+        peer.events.event_healthy.set()
+
+        self._check(peer, now)
+
+    def _send_ping(self, peer: PeerHealth):
+        peer.ping_nonce += 1
+        messagedata = self.protocol.get_ping(peer.ping_nonce)
+
+        try:
+            host_port = self.protocol.get_host_port(peer.address)
+            self.protocol.maybe_sendraw_to(peer.address, host_port, messagedata)
+        except (InvalidAddress, UnknownAddress) as e:
+            log.debug("Couldn't send the `Ping` message", e=e)
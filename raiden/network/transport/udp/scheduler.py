@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict, deque
+from time import time
+
+import gevent
+from gevent.event import Event
+import structlog
+
+from raiden.encoding import messages
+from raiden.network.throttle import PeerTokenBuckets
+from raiden.network.transport.udp import envelope
+from raiden.utils import typing
+
+log = structlog.get_logger(__name__)  # pylint: disable=invalid-name
+
+# Priority classes, lower values are sent first. Acknowledgments unblock the
+# partner's queues and secrets are time sensitive because of the lock
+# expirations, both must not wait behind health checks and retransmissions.
+PRIORITY_ACK = 0
+PRIORITY_SECRET = 1
+PRIORITY_PROTOCOL = 2
+PRIORITY_RETRY = 3
+PRIORITY_PING = 4
+
+PRIORITY_NAMES = {
+    PRIORITY_ACK: 'ack',
+    PRIORITY_SECRET: 'secret',
+    PRIORITY_PROTOCOL: 'protocol',
+    PRIORITY_RETRY: 'retry',
+    PRIORITY_PING: 'ping',
+}
+
+CMDID_TO_PRIORITY = {
+    messages.DELIVERED: PRIORITY_ACK,
+    messages.DELIVEREDBATCH: PRIORITY_ACK,
+    messages.PONG: PRIORITY_ACK,
+    messages.PROCESSED: PRIORITY_ACK,
+    messages.SECRET: PRIORITY_SECRET,
+    messages.SECRETREQUEST: PRIORITY_SECRET,
+    messages.REVEALSECRET: PRIORITY_SECRET,
+    messages.PING: PRIORITY_PING,
+}
+
+HostPort_T = typing.Tuple[str, int]
+
+
+def priority_for(messagedata: bytes, is_retry: bool = False) -> int:
+    """ Returns the priority class of the encoded message.
+
+    Envelopes are sent with the priority of the most urgent message they
+    carry.
+    """
+    if envelope.is_envelope(messagedata):
+        try:
+            inner = envelope.unpack_envelope(messagedata)
+        except ValueError:
+            return PRIORITY_PROTOCOL
+
+        return min(priority_for(data, is_retry) for data in inner)
+
+    priority = CMDID_TO_PRIORITY.get(messagedata[0], PRIORITY_PROTOCOL)
+
+    if is_retry and priority > PRIORITY_ACK:
+        priority = max(priority, PRIORITY_RETRY)
+
+    return priority
+
+
+class ThrottleStatistics:
+    """ Accumulated throttling delay of a priority class. """
+    __slots__ = ('sent', 'delayed', 'total_delay', 'max_delay')
+
+    def __init__(self):
+        self.sent = 0
+        self.delayed = 0
+        self.total_delay = 0.
+        self.max_delay = 0.
+
+    def add(self, delay: float):
+        self.sent += 1
+
+        if delay > 0:
+            self.delayed += 1
+            self.total_delay += delay
+            self.max_delay = max(self.max_delay, delay)
+
+    def to_dict(self):
+        return {
+            'sent': self.sent,
+            'delayed': self.delayed,
+            'total_delay': self.total_delay,
+            'max_delay': self.max_delay,
+        }
+
+
+class SendScheduler:
+    """ Sends the datagrams respecting a global and a per peer token bucket.
+
+    Datagrams are never delayed by sleeping on the caller's greenlet. If the
+    datagram can be sent right away it is, otherwise it's queued by priority
+    class and peer, and a single greenlet sends the queued datagrams as soon
+    as the buckets allow it. Within a class the peers are served in a round
+    robin, so a peer that exhausted its bucket does not block the others.
+    """
+
+    def __init__(
+            self,
+            sendto: typing.Callable[[HostPort_T, bytes], None],
+            global_bucket,
+            peer_buckets: PeerTokenBuckets,
+            time_function=None,
+    ):
+        self.sendto = sendto
+        self.global_bucket = global_bucket
+        self.peer_buckets = peer_buckets
+        self._time = time_function or time
+
+        self.priorities_to_peers = {
+            priority: OrderedDict()
+            for priority in PRIORITY_NAMES
+        }
+        self.statistics = {
+            priority: ThrottleStatistics()
+            for priority in PRIORITY_NAMES
+        }
+        self.queued = 0
+
+        self.event_new_data = Event()
+        self.event_stop = None
+        self.greenlet = None
+
+    def start(self, event_stop: Event) -> gevent.Greenlet:
+        self.event_stop = event_stop
+        self.greenlet = gevent.spawn(self._run)
+        return self.greenlet
+
+    def stop(self):
+        for peers in self.priorities_to_peers.values():
+            peers.clear()
+
+        self.queued = 0
+        self.event_new_data.set()
+
+    def send(self, host_port: HostPort_T, messagedata: bytes, priority: int):
+        peer_bucket = self.peer_buckets.get(host_port)
+
+        can_send_now = (
+            not self.queued and
+            self.global_bucket.wait_time(1) == 0 and
+            peer_bucket.wait_time(1) == 0
+        )
+
+        if can_send_now:
+            self._consume_and_send(host_port, messagedata, priority, self._time())
+        else:
+            queue = self.priorities_to_peers[priority].setdefault(host_port, deque())
+            queue.append((self._time(), messagedata))
+            self.queued += 1
+            self.event_new_data.set()
+
+    def statistics_by_class(self):
+        return {
+            PRIORITY_NAMES[priority]: statistics.to_dict()
+            for priority, statistics in self.statistics.items()
+        }
+
+    def _consume_and_send(self, host_port, messagedata, priority, queued_at):
+        self.global_bucket.consume(1)
+        self.peer_buckets.get(host_port).consume(1)
+
+        self.statistics[priority].add(self._time() - queued_at)
+        self.sendto(host_port, messagedata)
+
+    def _send_next(self) -> typing.Optional[float]:
+        """ Sends the next datagram allowed by the buckets.
+
+        Returns:
+            None if a datagram was sent, otherwise the time until the next
+            datagram can be sent.
+        """
+        global_wait = self.global_bucket.wait_time(1)
+        if global_wait > 0:
+            return global_wait
+
+        min_wait = None
+        for priority in sorted(self.priorities_to_peers):
+            peers = self.priorities_to_peers[priority]
+
+            for host_port, queue in peers.items():
+                peer_wait = self.peer_buckets.get(host_port).wait_time(1)
+
+                if peer_wait == 0:
+                    queued_at, messagedata = queue.popleft()
+                    self.queued -= 1
+
+                    # Round robin, the peer goes to the end of the line
+                    del peers[host_port]
+                    if queue:
+                        peers[host_port] = queue
+
+                    self._consume_and_send(host_port, messagedata, priority, queued_at)
+                    return None
+
+                if min_wait is None or peer_wait < min_wait:
+                    min_wait = peer_wait
+
+        return min_wait
+
+    def _run(self):
+        while not self.event_stop.is_set():
+            if not self.queued:
+                self.event_new_data.clear()
+                self.event_new_data.wait()
+                continue
+
+            try:
+                wait = self._send_next()
+            except OSError as e:
+                # The datagram is dropped like a lost packet, the retries of
+                # the protocol recover from it. The other queued datagrams
+                # must still be sent.
+                log.error('sending a queued datagram failed', error=str(e))
+                continue
+
+            if wait is not None:
+                self.event_new_data.clear()
+                self.event_new_data.wait(wait)
+            else:
+                # Yield to the other greenlets, the queued datagrams are sent
+                # in a busy loop otherwise.
+                gevent.idle()
@@ -2,7 +2,6 @@
 import socket
 from binascii import hexlify
 
-import cachetools
 import gevent
 from gevent.event import (
     AsyncResult,
@@ -17,22 +16,39 @@ from raiden.exceptions import (
     UnknownAddress,
     RaidenShuttingDown,
 )
-from raiden.constants import UDP_MAX_MESSAGE_SIZE
+from raiden.constants import (
+    UDP_CAPABILITY_DELIVERED_BATCH,
+    UDP_CAPABILITY_ENVELOPE,
+    UDP_MAX_MESSAGE_SIZE,
+)
 from raiden.messages import (
     message_from_sendevent,
     decode,
     Delivered,
+    DeliveredBatch,
     Message,
     Ping,
     Pong,
 )
-from raiden.settings import CACHE_TTL
-from raiden.utils import isaddress, pex, typing
+from raiden.settings import (
+    DEFAULT_PROTOCOL_BATCH_DELIVERED,
+    DEFAULT_PROTOCOL_COALESCING_DELAY,
+    DEFAULT_PROTOCOL_DELIVERED_BATCH_DELAY,
+    DEFAULT_PROTOCOL_PACKET_COALESCING,
+    DEFAULT_PROTOCOL_PEER_THROTTLE_CAPACITY,
+    DEFAULT_PROTOCOL_PEER_THROTTLE_FILL_RATE,
+)
+from raiden.utils import address_encoder, isaddress, pex, typing
+from raiden.utils.hub_monitor import HUB_MONITOR
+from raiden.utils.metrics import TRANSPORT_QUEUED_MESSAGES
 from raiden.utils.notifying_queue import NotifyingQueue
 from raiden.udp_message_handler import on_udp_message
-from raiden.transfer.state_change import ReceiveDelivered
+from raiden.transfer.state_change import ReceiveDelivered, ReceiveDeliveredBatch
 from raiden.transfer.state_change import ActionChangeNodeNetworkState
-from raiden.network.transport.udp import healthcheck
+from raiden.network.transport.udp import envelope, healthcheck
+from raiden.network.throttle import PeerTokenBuckets
+from raiden.network.transport.udp.delivered import DeliveredAggregator
+from raiden.network.transport.udp.scheduler import SendScheduler, priority_for
 from raiden.network.transport.udp.udp_utils import (
     event_first_of,
     timeout_exponential_backoff,
@@ -164,18 +180,52 @@ class UDPTransport:
 
         self.messageids_to_asyncresults = dict()
 
-        # Maps the addresses to a dict with the latest nonce (using a dict
-        # because python integers are immutable)
-        self.nodeaddresses_to_nonces = dict()
-
-        cache = cachetools.TTLCache(
-            maxsize=50,
-            ttl=CACHE_TTL,
+        # A single task checks the health of all the peers
+        self.healthcheck = healthcheck.HealthCheckScheduler(
+            self,
+            self.nat_keepalive_retries,
+            self.nat_keepalive_timeout,
+            self.nat_invitation_timeout,
         )
-        cache_wrapper = cachetools.cached(cache=cache)
-        self.get_host_port = cache_wrapper(discovery.get)
 
+        # The discovery serves the endpoints from memory, there are no
+        # blocking calls on the send path. Registrations wake up the health
+        # checks of the peers waiting for an endpoint.
+        self.get_host_port = discovery.get
+        discovery.add_listener(self.healthcheck.endpoint_changed)
+
+        # Maps the addresses to the capabilities advertised in their last
+        # Ping or Pong
+        self.nodeaddresses_to_capabilities = dict()
+
+        self.capabilities = 0
+        self.coalescer = None
+        if config.get('packet_coalescing', DEFAULT_PROTOCOL_PACKET_COALESCING):
+            self.capabilities |= UDP_CAPABILITY_ENVELOPE
+            self.coalescer = envelope.MessageCoalescer(
+                self.maybe_sendraw,
+                config.get('coalescing_delay', DEFAULT_PROTOCOL_COALESCING_DELAY),
+            )
+
+        self.delivered_aggregator = None
+        if config.get('batch_delivered', DEFAULT_PROTOCOL_BATCH_DELIVERED):
+            self.capabilities |= UDP_CAPABILITY_DELIVERED_BATCH
+            self.delivered_aggregator = DeliveredAggregator(
+                self.send_delivered_batch,
+                config.get('delivered_batch_delay', DEFAULT_PROTOCOL_DELIVERED_BATCH_DELAY),
+            )
+
+        # The throttle policy is shared by all peers, additionally every peer
+        # has its own bucket.
         self.throttle_policy = throttle_policy
+        self.scheduler = SendScheduler(
+            self._sendto,
+            throttle_policy,
+            PeerTokenBuckets(
+                config.get('peer_throttle_capacity', DEFAULT_PROTOCOL_PEER_THROTTLE_CAPACITY),
+                config.get('peer_throttle_fill_rate', DEFAULT_PROTOCOL_PEER_THROTTLE_FILL_RATE),
+            ),
+        )
         self.server = DatagramServer(udpsocket, handle=self._receive)
 
     def start(
@@ -202,6 +252,10 @@ class UDPTransport:
 
             self.init_queue_for(recipient, queue_name, encoded_queue)
 
+        TRANSPORT_QUEUED_MESSAGES.set_function(self.queue_depths, key=self)
+
+        self.greenlets.append(self.scheduler.start(self.event_stop))
+        self.greenlets.append(gevent.spawn(self.healthcheck.run, self.event_stop))
         self.server.start()
 
     def stop_and_wait(self):
@@ -211,8 +265,16 @@ class UDPTransport:
 
         # Stop processing the outgoing queues
         self.event_stop.set()
+        self.scheduler.stop()
+        self.healthcheck.stop()
         gevent.wait(self.greenlets)
 
+        if self.delivered_aggregator is not None:
+            self.delivered_aggregator.stop()
+
+        if self.coalescer is not None:
+            self.coalescer.stop()
+
         # All outgoing tasks are stopped. Now it's safe to close the socket. At
         # this point there might be some incoming message being processed,
         # keeping the socket open is not useful for these.
@@ -231,9 +293,11 @@ class UDPTransport:
         for async_result in self.messageids_to_asyncresults.values():
             async_result.set(False)
 
+        TRANSPORT_QUEUED_MESSAGES.remove_function(key=self)
+
     def get_health_events(self, recipient):
-        """ Starts a healthcheck task for `recipient` and returns a
-        HealthEvents with locks to react on its current state.
+        """ Starts healthchecking `recipient` and returns a HealthEvents with
+        locks to react on its current state.
         """
         if recipient not in self.addresses_events:
             self.start_health_check(recipient)
@@ -241,34 +305,25 @@ class UDPTransport:
         return self.addresses_events[recipient]
 
     def start_health_check(self, recipient):
-        """ Starts a task for healthchecking `recipient` if there is not
-        one yet.
-        """
+        """ Adds `recipient` to the healthcheck if it's not there yet. """
         if recipient not in self.addresses_events:
-            ping_nonce = self.nodeaddresses_to_nonces.setdefault(
-                recipient,
-                {'nonce': 0},  # HACK: Allows the task to mutate the object
-            )
+            self.addresses_events[recipient] = self.healthcheck.add(recipient)
 
-            events = healthcheck.HealthEvents(
-                event_healthy=Event(),
-                event_unhealthy=Event(),
-            )
+    def queue_depths(self):
+        """ The number of messages of each queue, by `(node, recipient, queue)`
+        labels.
+        """
+        node = address_encoder(self.raiden.address)
+        labels_to_depths = dict()
+        for (recipient, queue_name), queue in self.queueids_to_queues.items():
+            try:
+                queue_label = queue_name.decode('ascii')
+            except UnicodeDecodeError:
+                queue_label = pex(queue_name)
 
-            self.addresses_events[recipient] = events
+            labels_to_depths[(node, address_encoder(recipient), queue_label)] = len(queue)
 
-            self.greenlets.append(gevent.spawn(
-                healthcheck.healthcheck,
-                self,
-                recipient,
-                self.event_stop,
-                events.event_healthy,
-                events.event_unhealthy,
-                self.nat_keepalive_retries,
-                self.nat_keepalive_timeout,
-                self.nat_invitation_timeout,
-                ping_nonce,
-            ))
+        return labels_to_depths
 
     def init_queue_for(
             self,
@@ -343,7 +398,7 @@ class UDPTransport:
             raise ValueError('Invalid address {}'.format(pex(recipient)))
 
         # These are not protocol messages, but transport specific messages
-        if isinstance(message, (Delivered, Ping, Pong)):
+        if isinstance(message, (Delivered, DeliveredBatch, Ping, Pong)):
             raise ValueError('Do not use send for {} messages'.format(message.__class__.__name__))
 
         messagedata = message.encode()
@@ -379,13 +434,14 @@ class UDPTransport:
         messagedata = message.encode()
         host_port = self.get_host_port(recipient)
 
-        self.maybe_sendraw(host_port, messagedata)
+        self.maybe_sendraw_to(recipient, host_port, messagedata)
 
     def maybe_sendraw_with_result(
             self,
             recipient: typing.Address,
             messagedata: bytes,
             message_id: int,
+            is_retry: bool = False,
     ) -> AsyncResult:
         """ Send message to recipient if the transport is running.
 
@@ -400,19 +456,46 @@ class UDPTransport:
             self.messageids_to_asyncresults[message_id] = async_result
 
         host_port = self.get_host_port(recipient)
-        self.maybe_sendraw(host_port, messagedata)
+        self.maybe_sendraw_to(recipient, host_port, messagedata, is_retry)
 
         return async_result
 
-    def maybe_sendraw(self, host_port: typing.Tuple[int, int], messagedata: bytes):
-        """ Send message to recipient if the transport is running. """
+    def maybe_sendraw_to(
+            self,
+            recipient: typing.Address,
+            host_port: typing.Tuple[int, int],
+            messagedata: bytes,
+            is_retry: bool = False,
+    ):
+        """ Send message to recipient if the transport is running, coalescing
+        it with other messages to the same recipient if both nodes support it.
+        """
+        if self.coalescer is not None and self.supports(recipient, UDP_CAPABILITY_ENVELOPE):
+            self.coalescer.add(host_port, messagedata)
+        else:
+            self.maybe_sendraw(host_port, messagedata, is_retry)
+
+    def supports(self, recipient: typing.Address, capability: int) -> bool:
+        """ True if `recipient` advertised `capability` in its last Ping or Pong. """
+        capabilities = self.nodeaddresses_to_capabilities.get(recipient, 0)
+        return bool(capabilities & capability)
+
+    def maybe_sendraw(
+            self,
+            host_port: typing.Tuple[int, int],
+            messagedata: bytes,
+            is_retry: bool = False,
+    ):
+        """ Send message to recipient if the transport is running.
 
-        # Don't sleep if timeout is zero, otherwise a context-switch is done
-        # and the message is delayed, increasing it's latency
-        sleep_timeout = self.throttle_policy.consume(1)
-        if sleep_timeout:
-            gevent.sleep(sleep_timeout)
+        The message is sent right away if the throttling allows it, otherwise
+        it is scheduled by its priority class and this call returns without
+        doing a context-switch.
+        """
+        priority = priority_for(messagedata, is_retry)
+        self.scheduler.send(host_port, messagedata, priority)
 
+    def _sendto(self, host_port: typing.Tuple[int, int], messagedata: bytes):
         # Check the udp socket is still available before trying to send the
         # message. There must be *no context-switches after this test*.
         if hasattr(self.server, 'socket'):
@@ -421,6 +504,12 @@ class UDPTransport:
                 host_port,
             )
 
+    def throttle_statistics(self) -> typing.Dict[str, typing.Dict]:
+        """ Number of sent and delayed packets and the throttling delay, by
+        priority class.
+        """
+        return self.scheduler.statistics_by_class()
+
     def _receive(self, data, host_port):  # pylint: disable=unused-argument
         try:
             self.receive(data)
@@ -440,7 +529,17 @@ class UDPTransport:
             )
             return
 
-        message = decode(messagedata)
+        if envelope.is_envelope(messagedata):
+            self.receive_envelope(messagedata)
+            return
+
+        with HUB_MONITOR.processing('UDPTransport.receive'):
+            message = decode(messagedata)
+
+        # Any authenticated message is a proof of liveness, the Pong is only
+        # accepted for an outstanding Ping
+        if message is not None and type(message) != Pong:
+            self.healthcheck.peer_seen(message.sender)
 
         if type(message) == Pong:
             self.receive_pong(message)
@@ -448,6 +547,8 @@ class UDPTransport:
             self.receive_ping(message)
         elif type(message) == Delivered:
             self.receive_delivered(message)
+        elif type(message) == DeliveredBatch:
+            self.receive_delivered_batch(message)
         elif message is not None:
             self.receive_message(message)
         else:
@@ -457,6 +558,26 @@ class UDPTransport:
                 message=hexlify(messagedata),
             )
 
+    def receive_envelope(self, messagedata: bytes):
+        """ Handle an UDP packet carrying multiple messages.
+
+        The envelope itself is not signed, every message in it is handled as if
+        it was received in its own packet.
+        """
+        try:
+            messagedata_list = envelope.unpack_envelope(messagedata)
+        except ValueError as e:
+            log.error(
+                'INVALID MESSAGE: Malformed envelope',
+                node=pex(self.raiden.address),
+                message=hexlify(messagedata),
+                error=str(e),
+            )
+            return
+
+        for inner_messagedata in messagedata_list:
+            self.receive(inner_messagedata)
+
     def receive_message(self, message: Message):
         """ Handle a Raiden protocol message.
 
@@ -480,13 +601,41 @@ class UDPTransport:
             #   state change
             # - Decode it, save to the WAL, and process it (the current
             #   implementation)
-            delivered_message = Delivered(message.message_identifier)
-            self.raiden.sign(delivered_message)
-
-            self.maybe_send(
-                message.sender,
-                delivered_message,
+            #
+            # When both nodes support it the acknowledgments are sent in
+            # batches, this only delays the Delivered, the message is already
+            # processed.
+            batch_delivered = (
+                self.delivered_aggregator is not None and
+                self.supports(message.sender, UDP_CAPABILITY_DELIVERED_BATCH)
             )
+            if batch_delivered:
+                self.delivered_aggregator.add(
+                    message.sender,
+                    message.message_identifier,
+                )
+            else:
+                delivered_message = Delivered(message.message_identifier)
+                self.raiden.sign(delivered_message)
+
+                self.maybe_send(
+                    message.sender,
+                    delivered_message,
+                )
+
+    def send_delivered_batch(
+            self,
+            recipient: typing.Address,
+            message_identifiers: typing.List[int],
+    ):
+        """ Acknowledge all the `message_identifiers` with a single message. """
+        delivered_batch = DeliveredBatch(message_identifiers)
+        self.raiden.sign(delivered_batch)
+
+        try:
+            self.maybe_send(recipient, delivered_batch)
+        except (InvalidAddress, UnknownAddress) as e:
+            log.debug("Couldn't send the `DeliveredBatch` message", e=e)
 
     def receive_delivered(self, delivered: Delivered):
         """ Handle a Delivered message.
@@ -507,6 +656,21 @@ class UDPTransport:
             del self.messageids_to_asyncresults[message_id]
             async_result.set()
 
+    def receive_delivered_batch(self, delivered_batch: DeliveredBatch):
+        """ Handle a DeliveredBatch message.
+
+        All the acknowledgments are applied with a single state change.
+        """
+        message_identifiers = delivered_batch.delivered_message_identifiers
+        processed = ReceiveDeliveredBatch(message_identifiers)
+        self.raiden.handle_state_change(processed)
+
+        for message_id in message_identifiers:
+            async_result = self.messageids_to_asyncresults.pop(message_id, None)
+
+            if async_result is not None:
+                async_result.set()
+
     # Pings and Pongs are used to check the health status of another node. They
     # are /not/ part of the raiden protocol, only part of the UDP transport,
     # therefore these messages are not forwarded to the message handler.
@@ -521,7 +685,9 @@ class UDPTransport:
             sender=pex(ping.sender),
         )
 
-        pong = Pong(ping.nonce)
+        self.nodeaddresses_to_capabilities[ping.sender] = ping.capabilities
+
+        pong = Pong(ping.nonce, self.capabilities)
         self.raiden.sign(pong)
 
         try:
@@ -532,25 +698,22 @@ class UDPTransport:
     def receive_pong(self, pong: Pong):
         """ Handles a Pong message. """
 
-        message_id = ('ping', pong.nonce, pong.sender)
-        async_result = self.messageids_to_asyncresults.get(message_id)
+        if self.healthcheck.pong_received(pong.sender, pong.nonce):
+            self.nodeaddresses_to_capabilities[pong.sender] = pong.capabilities
 
-        if async_result is not None:
             log.debug(
                 'PONG RECEIVED',
                 node=pex(self.raiden.address),
                 message_id=pong.nonce,
             )
 
-            async_result.set(True)
-
     def get_ping(self, nonce: int) -> Ping:
         """ Returns a signed Ping message.
 
         Note: Ping messages don't have an enforced ordering, so a Ping message
         with a higher nonce may be acknowledged first.
         """
-        message = Ping(nonce)
+        message = Ping(nonce, self.capabilities)
         self.raiden.sign(message)
         message_data = message.encode()
 
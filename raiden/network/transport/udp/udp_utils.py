@@ -9,6 +9,7 @@ from gevent.event import (
 )
 
 from raiden.utils import typing
+from raiden.utils.metrics import TRANSPORT_RETRIES
 
 
 def event_first_of(*events: _AbstractLinkable) -> Event:
@@ -105,10 +106,12 @@ def retry(
         if event_quit.wait(timeout=timeout) is True:
             break
 
+        TRANSPORT_RETRIES.inc()
         protocol.maybe_sendraw_with_result(
             recipient,
             messagedata,
             message_id,
+            is_retry=True,
         )
 
     return async_result.ready()
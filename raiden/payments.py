@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict, deque
+
+from gevent.event import Event
+
+from raiden.settings import DEFAULT_PAYMENT_HISTORY_SIZE
+from raiden.utils import typing
+
+PAYMENT_STATUS_PENDING = 'pending'
+PAYMENT_STATUS_SUCCESS = 'success'
+PAYMENT_STATUS_FAILED = 'failed'
+
+
+class PaymentStatus:
+    """ The outcome of a payment started by this node. """
+    __slots__ = (
+        'identifier',
+        'token_network_identifier',
+        'target',
+        'amount',
+        'status',
+        'reason',
+        'sequence',
+    )
+
+    def __init__(
+            self,
+            identifier: typing.PaymentID,
+            token_network_identifier: typing.Address,
+            target: typing.Address,
+            amount: typing.TokenAmount,
+    ):
+        self.identifier = identifier
+        self.token_network_identifier = token_network_identifier
+        self.target = target
+        self.amount = amount
+        self.status = PAYMENT_STATUS_PENDING
+        self.reason = None
+        self.sequence = None
+
+    def __repr__(self):
+        return '<PaymentStatus id:{} status:{}>'.format(self.identifier, self.status)
+
+
+class PaymentTracker:
+    """ Keeps the status of the payments started by this node, so that they
+    can be queried after the result was delivered to the `AsyncResult`s in
+    `RaidenService.identifier_to_results`.
+
+    Every finished payment is given an increasing sequence number, a client
+    that remembers the last sequence it saw can wait for the results that
+    came after it. Only the last `history_size` finished payments are kept.
+    """
+
+    def __init__(self, history_size: int = DEFAULT_PAYMENT_HISTORY_SIZE):
+        self.history_size = history_size
+
+        self.identifiers_to_pending = dict()
+        self.identifiers_to_finished = OrderedDict()
+        self.results = deque(maxlen=history_size)
+        self.last_sequence = 0
+        self.event_new_result = Event()
+
+    def is_pending(self, identifier: typing.PaymentID) -> bool:
+        return identifier in self.identifiers_to_pending
+
+    def get(self, identifier: typing.PaymentID) -> typing.Optional[PaymentStatus]:
+        payment = self.identifiers_to_pending.get(identifier)
+
+        if payment is None:
+            payment = self.identifiers_to_finished.get(identifier)
+
+        return payment
+
+    def payment_started(
+            self,
+            identifier: typing.PaymentID,
+            token_network_identifier: typing.Address,
+            target: typing.Address,
+            amount: typing.TokenAmount,
+    ) -> PaymentStatus:
+        payment = PaymentStatus(identifier, token_network_identifier, target, amount)
+        self.identifiers_to_pending[identifier] = payment
+
+        # The identifier is reused, the old result is not valid anymore
+        self.identifiers_to_finished.pop(identifier, None)
+
+        return payment
+
+    def payment_finished(
+            self,
+            identifier: typing.PaymentID,
+            success: bool,
+            reason: str = None,
+    ) -> typing.Optional[PaymentStatus]:
+        payment = self.identifiers_to_pending.pop(identifier, None)
+
+        if payment is None:
+            return None
+
+        self.last_sequence += 1
+        payment.sequence = self.last_sequence
+        payment.reason = reason
+        payment.status = PAYMENT_STATUS_SUCCESS if success else PAYMENT_STATUS_FAILED
+
+        self.identifiers_to_finished[identifier] = payment
+        while len(self.identifiers_to_finished) > self.history_size:
+            self.identifiers_to_finished.popitem(last=False)
+
+        self.results.append(payment)
+
+        # Wake up the current waiters, new waiters use a fresh event
+        event, self.event_new_result = self.event_new_result, Event()
+        event.set()
+
+        return payment
+
+    def results_after(self, sequence: int) -> typing.List[PaymentStatus]:
+        """ Returns the payments that finished after `sequence`, older results
+        may have been dropped from the history.
+        """
+        if sequence >= self.last_sequence:
+            return []
+
+        first_kept = self.last_sequence - len(self.results) + 1
+        start = max(sequence + 1 - first_kept, 0)
+        return [self.results[position] for position in range(start, len(self.results))]
+
+    def wait_for_results(
+            self,
+            sequence: int,
+            timeout: typing.Optional[float] = None,
+    ) -> typing.List[PaymentStatus]:
+        """ Blocks until a payment finishes after `sequence` or `timeout`
+        expires, in which case the returned list is empty.
+        """
+        event = self.event_new_result
+        results = self.results_after(sequence)
+
+        if not results:
+            event.wait(timeout)
+            results = self.results_after(sequence)
+
+        return results
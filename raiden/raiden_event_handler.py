@@ -137,6 +137,7 @@ def handle_transfersentsuccess(
         result.set(True)
 
     del raiden.identifier_to_results[transfer_sent_success_event.identifier]
+    raiden.payments.payment_finished(transfer_sent_success_event.identifier, True)
 
 
 def handle_transfersentfailed(
@@ -146,6 +147,11 @@ def handle_transfersentfailed(
     for result in raiden.identifier_to_results[transfer_sent_failed_event.identifier]:
         result.set(False)
     del raiden.identifier_to_results[transfer_sent_failed_event.identifier]
+    raiden.payments.payment_finished(
+        transfer_sent_failed_event.identifier,
+        False,
+        transfer_sent_failed_event.reason,
+    )
 
 
 def handle_unlockfailed(
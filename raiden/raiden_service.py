@@ -13,6 +13,7 @@ import structlog
 
 from raiden import routing, waiting
 from raiden.blockchain_events_handler import on_blockchain_event
+from raiden.channel_views import ChannelViews
 from raiden.constants import (
     UINT64_MAX,
     NETTINGCHANNEL_SETTLE_TIMEOUT_MIN,
@@ -22,10 +23,15 @@ from raiden.blockchain.state import get_token_network_state_from_proxies
 from raiden.blockchain.events import (
     get_relevant_proxies,
     BlockchainEvents,
+    ContractEventsCache,
 )
+from raiden.network.discovery import ContractDiscovery
+from raiden.payments import PaymentTracker
 from raiden.raiden_event_handler import on_raiden_event
 from raiden.tasks import AlarmTask
 from raiden.transfer import views, node
+from raiden.transfer.architecture import copy_state
+from raiden.transfer.partition import copy_partitions, get_due_channels, get_partitions
 from raiden.transfer.state import (
     RouteState,
     PaymentNetworkState,
@@ -51,11 +57,15 @@ from raiden.exceptions import InvalidAddress, RaidenShuttingDown
 from raiden.messages import (LockedTransfer, SignedMessage)
 from raiden.connection_manager import ConnectionManager
 from raiden.utils import (
+    address_encoder,
     isaddress,
     pex,
     privatekey_to_address,
     random_secret,
 )
+from raiden.utils.hub_monitor import HUB_MONITOR
+from raiden.utils.metrics import EVENT_POLL_DURATION_SECONDS, EVENT_POLL_LAG_BLOCKS
+from raiden.utils.profiling.stacksampler import StackSampler
 from raiden.storage import wal, serialize, sqlite
 
 log = structlog.get_logger(__name__)  # pylint: disable=invalid-name
@@ -176,6 +186,7 @@ class RaidenService:
 
         self.tokens_to_connectionmanagers = dict()
         self.identifier_to_results = defaultdict(list)
+        self.payments = PaymentTracker()
 
         # This is a map from a secrethash to a list of channels, the same
         # secrethash can be used in more than one token (for tokenswaps), a
@@ -185,6 +196,7 @@ class RaidenService:
 
         self.chain = chain
         self.default_registry = default_registry
+        self.discovery = discovery
         self.config = config
         self.privkey = private_key_bin
         self.address = privatekey_to_address(private_key_bin)
@@ -203,7 +215,9 @@ class RaidenService:
         self.protocol = transport
 
         self.blockchain_events = BlockchainEvents()
-        self.alarm = AlarmTask(chain)
+        self.state_observers = waiting.StateObservers()
+        self.channel_views = ChannelViews(self)
+        self.alarm = AlarmTask(chain, config['eth_ipc_path'])
         self.shutdown_timeout = config['shutdown_timeout']
         self._block_number = None
         self.stop_event = Event()
@@ -211,6 +225,7 @@ class RaidenService:
         self.chain.client.inject_stop_event(self.stop_event)
 
         self.wal = None
+        self.sampling_profiler = None
 
         self.database_path = config['database_path']
         if self.database_path != ':memory:':
@@ -248,12 +263,27 @@ class RaidenService:
             self.db_lock.acquire(timeout=0)
             assert self.db_lock.is_locked
 
+        if self.config['hub_block_threshold']:
+            HUB_MONITOR.start(self.config['hub_block_threshold'])
+
+        if self.config['sampling_profiler_rate']:
+            if self.sampling_profiler is None:
+                self.sampling_profiler = StackSampler(self.config['sampling_profiler_rate'])
+            self.sampling_profiler.start()
+
         # The database may be :memory:
         storage = sqlite.SQLiteStorage(self.database_path, serialize.PickleSerializer())
+
+        state_copy = copy_state
+        if self.config['partitioned_state']:
+            state_copy = copy_partitions
+
         self.wal, unapplied_events = wal.restore_from_latest_snapshot(
             node.state_transition,
             storage,
+            state_copy,
         )
+        self.contract_events = ContractEventsCache(self.chain, storage)
 
         last_log_block_number = None
         # First run, initialize the basic state
@@ -276,6 +306,9 @@ class RaidenService:
         self.alarm.register_callback(self.set_block_number)
         self._block_number = self.chain.block_number()
 
+        if isinstance(self.discovery, ContractDiscovery):
+            self.preload_discovery(self._block_number)
+
         # Registry registration must start *after* the alarm task. This
         # avoids corner cases where the registry is queried in block A, a new
         # block B is mined, and the alarm starts polling at block C.
@@ -300,6 +333,21 @@ class RaidenService:
 
         self.start_event.set()
 
+    def preload_discovery(self, block_number):
+        """ Load the endpoint registry into memory, so that the transport
+        never has to query the blockchain to send a message.
+        """
+        # Install the filter first to avoid missing registrations, as a
+        # consequence some registrations might be applied twice. The lock
+        # prevents the alarm task from applying new registrations before the
+        # older ones are loaded.
+        with self.event_poll_lock:
+            self.blockchain_events.add_discovery_listener(
+                self.discovery.discovery_proxy,
+                block_number,
+            )
+            self.discovery.preload(self.wal.storage, block_number)
+
     def start_neighbours_healthcheck(self):
         for neighbour in views.all_neighbour_nodes(self.wal.state_manager.current_state):
             if neighbour != ConnectionManager.BOOTSTRAP_ADDR:
@@ -331,6 +379,12 @@ class RaidenService:
         except (gevent.timeout.Timeout, RaidenShuttingDown):
             pass
 
+        if self.sampling_profiler is not None:
+            self.sampling_profiler.stop()
+
+        if self.config['hub_block_threshold']:
+            HUB_MONITOR.stop()
+
         if self.db_lock is not None:
             self.db_lock.release()
 
@@ -351,18 +405,90 @@ class RaidenService:
         if block_number is None:
             block_number = self.get_block_number()
 
-        event_list = self.wal.log_and_dispatch(state_change, block_number)
+        due_channels = self.get_due_channels(state_change)
+        due_token_networks = self.get_due_token_networks(state_change)
+
+        with HUB_MONITOR.processing(state_change):
+            event_list = self.wal.log_and_dispatch(state_change, block_number)
+            self.channel_views.state_changed(state_change, due_token_networks)
+            self.state_observers.notify(state_change, due_channels)
 
         for event in event_list:
             log.debug('EVENT', node=pex(self.address), chain_event=event)
 
-            on_raiden_event(self, event)
+            with HUB_MONITOR.processing(event):
+                on_raiden_event(self, event)
 
         return event_list
 
+    def handle_state_changes(self, state_changes, block_number=None):
+        """ Apply the `state_changes` with a single group commit to the WAL.
+
+        Returns:
+            The list of events of each state change, in order.
+        """
+        if block_number is None:
+            block_number = self.get_block_number()
+
+        # Computed before the whole batch is applied, a `Block` may miss the
+        # timers scheduled by the earlier state changes of the same batch
+        due_channels_list = [
+            self.get_due_channels(state_change)
+            for state_change in state_changes
+        ]
+        due_token_networks_list = [
+            self.get_due_token_networks(state_change)
+            for state_change in state_changes
+        ]
+
+        with HUB_MONITOR.processing('state change batch'):
+            events_lists = self.wal.log_and_dispatch_batch(state_changes, block_number)
+
+        batch = zip(state_changes, due_channels_list, due_token_networks_list, events_lists)
+        for state_change, due_channels, due_token_networks, event_list in batch:
+            log.debug('STATE CHANGE', node=pex(self.address), state_change=state_change)
+            self.channel_views.state_changed(state_change, due_token_networks)
+            self.state_observers.notify(state_change, due_channels)
+
+            for event in event_list:
+                log.debug('EVENT', node=pex(self.address), chain_event=event)
+
+                with HUB_MONITOR.processing(event):
+                    on_raiden_event(self, event)
+
+        return events_lists
+
+    def get_due_channels(self, state_change):
+        """ The channels `state_change` is dispatched to if it is a `Block`,
+        must be called before it is applied.
+        """
+        if not isinstance(state_change, Block):
+            return ()
+
+        return get_due_channels(
+            views.state_from_raiden(self),
+            state_change.block_number,
+        )
+
+    def get_due_token_networks(self, state_change):
+        """ The token networks with a channel or a payment task that
+        `state_change` is dispatched to if it is a `Block`, must be called
+        before it is applied.
+        """
+        if not isinstance(state_change, Block):
+            return ()
+
+        token_network_identifiers, _ = get_partitions(
+            views.state_from_raiden(self),
+            state_change,
+        )
+        return token_network_identifiers
+
     def set_node_network_state(self, node_address, network_state):
         state_change = ActionChangeNodeNetworkState(node_address, network_state)
-        self.wal.log_and_dispatch(state_change, self.get_block_number())
+        with HUB_MONITOR.processing(state_change):
+            self.wal.log_and_dispatch(state_change, self.get_block_number())
+        self.state_observers.notify(state_change)
 
     def start_health_check_for(self, node_address):
         self.protocol.start_health_check(node_address)
@@ -370,10 +496,18 @@ class RaidenService:
     def get_block_number(self):
         return views.block_number(self.wal.state_manager.current_state)
 
-    def poll_blockchain_events(self, current_block=None):  # pylint: disable=unused-argument
-        with self.event_poll_lock:
+    def poll_blockchain_events(self, current_block=None):
+        with self.event_poll_lock, EVENT_POLL_DURATION_SECONDS.time():
             for event in self.blockchain_events.poll_blockchain_events():
-                on_blockchain_event(self, event)
+                with HUB_MONITOR.processing(event):
+                    on_blockchain_event(self, event)
+
+        # The alarm task keeps detecting blocks while the events are applied
+        if current_block is not None:
+            EVENT_POLL_LAG_BLOCKS.set(
+                self.alarm.last_block_number - current_block,
+                (address_encoder(self.address), ),
+            )
 
     def sign(self, message):
         """ Sign message inplace. """
@@ -431,6 +565,7 @@ class RaidenService:
     def leave_all_token_networks(self):
         state_change = ActionLeaveAllNetworks()
         self.wal.log_and_dispatch(state_change, self.get_block_number())
+        self.channel_views.state_changed(state_change)
 
     def close_and_settle(self):
         log.info('raiden will close and settle all channels now')
@@ -443,10 +578,7 @@ class RaidenService:
         ]
 
         if connection_managers:
-            waiting.wait_for_settle_all_channels(
-                self,
-                self.alarm.wait_time,
-            )
+            waiting.wait_for_settle_all_channels(self)
 
     def mediated_transfer_async(
             self,
@@ -528,6 +660,7 @@ class RaidenService:
 
         async_result = AsyncResult()
         self.identifier_to_results[identifier].append(async_result)
+        self.payments.payment_started(identifier, token_network_identifier, target, amount)
 
         secret = random_secret()
         init_initiator_statechange = initiator_init(
@@ -548,6 +681,72 @@ class RaidenService:
 
         return async_result
 
+    def start_mediated_transfers_batch(self, token_network_identifier, payments):
+        """ Start many mediated transfers at once.
+
+        The routes are computed once per target and all the transfers are
+        dispatched with a single group commit to the WAL.
+
+        Args:
+            payments: A list of (target, amount, identifier) tuples, the
+                identifiers must be unique and not in use, or None for a
+                random identifier.
+
+        Returns:
+            The AsyncResult of each transfer, in order.
+        """
+        node_state = views.state_from_raiden(self)
+
+        targets_to_amount = dict()
+        for target, amount, _ in payments:
+            targets_to_amount[target] = min(amount, targets_to_amount.get(target, amount))
+
+        # The routes are filtered by capacity, use the smallest amount so that
+        # every transfer can use them. The initiator validates the capacity of
+        # the channel before each transfer.
+        targets_to_routes = dict()
+        for target, amount in targets_to_amount.items():
+            self.protocol.start_health_check(target)
+
+            targets_to_routes[target] = routing.get_best_routes(
+                node_state,
+                token_network_identifier,
+                self.address,
+                target,
+                amount,
+                None,
+            )
+
+        async_results = list()
+        state_changes = list()
+        for target, amount, identifier in payments:
+            if identifier is None:
+                identifier = create_default_identifier()
+
+            assert identifier not in self.identifier_to_results
+
+            async_result = AsyncResult()
+            self.identifier_to_results[identifier].append(async_result)
+            self.payments.payment_started(identifier, token_network_identifier, target, amount)
+            async_results.append(async_result)
+
+            transfer_state = TransferDescriptionWithSecretState(
+                identifier,
+                amount,
+                token_network_identifier,
+                self.address,
+                target,
+                random_secret(),
+            )
+            state_changes.append(ActionInitInitiator(
+                transfer_state,
+                list(targets_to_routes[target]),
+            ))
+
+        self.handle_state_changes(state_changes)
+
+        return async_results
+
     def mediate_mediated_transfer(self, transfer: LockedTransfer):
         init_mediator_statechange = mediator_init(self, transfer)
         self.handle_state_change(init_mediator_statechange)
@@ -14,7 +14,13 @@ GAS_PRICE = denoms.shannon * 20
 DEFAULT_PROTOCOL_RETRIES_BEFORE_BACKOFF = 5
 DEFAULT_PROTOCOL_THROTTLE_CAPACITY = 10.
 DEFAULT_PROTOCOL_THROTTLE_FILL_RATE = 10.
+DEFAULT_PROTOCOL_PEER_THROTTLE_CAPACITY = DEFAULT_PROTOCOL_THROTTLE_CAPACITY
+DEFAULT_PROTOCOL_PEER_THROTTLE_FILL_RATE = DEFAULT_PROTOCOL_THROTTLE_FILL_RATE
 DEFAULT_PROTOCOL_RETRY_INTERVAL = 1.
+DEFAULT_PROTOCOL_PACKET_COALESCING = False
+DEFAULT_PROTOCOL_COALESCING_DELAY = 0.
+DEFAULT_PROTOCOL_BATCH_DELIVERED = False
+DEFAULT_PROTOCOL_DELIVERED_BATCH_DELAY = 0.05
 
 DEFAULT_REVEAL_TIMEOUT = 10
 DEFAULT_SETTLE_TIMEOUT = DEFAULT_REVEAL_TIMEOUT * 9
@@ -31,5 +37,28 @@ DEFAULT_NAT_INVITATION_TIMEOUT = 15
 
 DEFAULT_SHUTDOWN_TIMEOUT = 2
 
+# A greenlet which runs longer than this many seconds without switching is
+# reported as blocking the hub. The monitor traces every greenlet switch, so
+# it is disabled unless a threshold is given, e.g. 0.1
+DEFAULT_HUB_BLOCK_THRESHOLD = 0
+
+# The alarm polls the block number this many times per block time, the
+# interval is bounded since the block time estimate can be off on young or
+# irregular chains
+DEFAULT_ALARM_WAIT_TIME = 0.5
+ALARM_POLLS_PER_BLOCK = 10
+ALARM_MIN_WAIT_TIME = 0.05
+ALARM_MAX_WAIT_TIME = 1.0
+ALARM_BLOCKTIME_ESTIMATE_INTERVAL = 100
+
+DEFAULT_PAYMENT_HISTORY_SIZE = 10000
+MAX_PAYMENT_EVENTS_TIMEOUT = 60
+MAX_PAYMENT_BATCH_SIZE = 10000
+
+# Number of blocks queried at once when reading the blockchain and local
+# events, bounds the memory used by a single events query
+EVENTS_BLOCK_CHUNK_SIZE = 10000
+MAX_EVENTS_PAGE_SIZE = 1000
+
 ORACLE_BLOCKNUMBER_DRIFT_TOLERANCE = 3
 ETHERSCAN_API = 'https://{network}.etherscan.io/api?module=proxy&action={action}'
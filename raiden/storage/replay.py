@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Offline replay of a node database.
+
+The state changes recorded in the write-ahead-log are dispatched through the
+node state machine from an empty state, without network or blockchain. The
+state machine is deterministic, so the replayed state must be equal to the
+stored snapshot at the state change it was taken, this verifies a change of
+the state machine against a recorded trace and measures its performance.
+"""
+import time
+from collections import defaultdict
+
+from raiden.transfer import node
+from raiden.transfer.architecture import StateManager, copy_state
+from raiden.transfer.state import NodeState
+from raiden.utils import typing
+
+# The compared attributes of the node state
+NODE_STATE_ATTRIBUTES = (
+    'pseudo_random_generator',
+    'block_number',
+    'queueids_to_queues',
+    'identifiers_to_paymentnetworks',
+    'nodeaddresses_to_networkstates',
+    'payment_mapping',
+)
+
+
+class ReplayReport:
+    """ The measurements of a replay. """
+
+    def __init__(self):
+        self.number_of_state_changes = 0
+        self.number_of_events = 0
+        self.last_identifier = None
+
+        # Seconds spent by each dispatch, by state change type
+        self.typenames_to_latencies = defaultdict(list)
+
+        # None if there is no snapshot, otherwise the differing attributes
+        self.snapshot_identifier = None
+        self.snapshot_differences = None
+
+    @property
+    def duration(self) -> float:
+        return sum(
+            sum(latencies)
+            for latencies in self.typenames_to_latencies.values()
+        )
+
+    @property
+    def throughput(self) -> float:
+        duration = self.duration
+        if duration == 0:
+            return 0.0
+        return self.number_of_state_changes / duration
+
+
+def state_differences(state, other) -> typing.List[str]:
+    """ The names of the attributes of the node state that differ. """
+    if not isinstance(state, NodeState) or not isinstance(other, NodeState):
+        return [] if state == other else ['node_state']
+
+    differences = list()
+    for name in NODE_STATE_ATTRIBUTES:
+        value = getattr(state, name)
+        other_value = getattr(other, name)
+
+        if name == 'pseudo_random_generator':
+            value = value.getstate()
+            other_value = other_value.getstate()
+
+        if value != other_value:
+            differences.append(name)
+
+    return differences
+
+
+def percentile(sorted_values: typing.List[float], fraction: float) -> float:
+    """ The nearest-rank percentile of `sorted_values`. """
+    position = max(int(round(fraction * len(sorted_values))) - 1, 0)
+    return sorted_values[position]
+
+
+def latency_histogram(latencies: typing.List[float]) -> typing.List[typing.Tuple[int, int]]:
+    """ The `(upper_bound, count)` pairs of a histogram of `latencies`, with
+    power of two buckets in microseconds.
+    """
+    buckets = defaultdict(int)
+    for latency in latencies:
+        upper_bound = 1
+        while upper_bound < latency * 1e6:
+            upper_bound *= 2
+        buckets[upper_bound] += 1
+
+    return sorted(buckets.items())
+
+
+def replay(
+        storage,
+        transition_function=node.state_transition,
+        state_copy=copy_state,
+        to_identifier: int = None,
+):
+    """ Dispatches the state changes of `storage` up to `to_identifier`, or
+    all of them, through `transition_function` starting from an empty state.
+
+    Returns:
+        The replayed state and the `ReplayReport`.
+    """
+    report = ReplayReport()
+
+    snapshot = storage.get_state_snapshot()
+    snapshot_state = None
+    if snapshot:
+        report.snapshot_identifier, snapshot_state = snapshot
+
+    state_manager = StateManager(transition_function, None, state_copy)
+    typenames_to_latencies = report.typenames_to_latencies
+
+    for identifier, state_change in storage.iter_state_changes():
+        if to_identifier is not None and identifier > to_identifier:
+            break
+
+        start = time.perf_counter()
+        events = state_manager.dispatch(state_change)
+        latency = time.perf_counter() - start
+
+        typenames_to_latencies[type(state_change).__name__].append(latency)
+        report.number_of_state_changes += 1
+        report.number_of_events += len(events)
+        report.last_identifier = identifier
+
+        if identifier == report.snapshot_identifier:
+            report.snapshot_differences = state_differences(
+                state_manager.current_state,
+                snapshot_state,
+            )
+
+    return state_manager.current_state, report
@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
+import json
 import sqlite3
 import threading
 from typing import (
     Any,
+    List,
     Optional,
     Tuple,
 )
@@ -39,6 +41,56 @@ class SQLiteStorage:
                 '    FOREIGN KEY(source_statechange_id) REFERENCES state_changes(identifier)'
                 ')'
             )
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS state_events_block_number '
+                'ON state_events(block_number, identifier)'
+            )
+            cursor.execute(
+                'CREATE TABLE IF NOT EXISTS endpoints ('
+                '    registry_address BINARY NOT NULL, '
+                '    node_address BINARY NOT NULL, '
+                '    host TEXT NOT NULL, '
+                '    port INTEGER NOT NULL, '
+                '    PRIMARY KEY(registry_address, node_address)'
+                ')'
+            )
+            cursor.execute(
+                'CREATE TABLE IF NOT EXISTS matrix_peers ('
+                '    node_address BINARY PRIMARY KEY, '
+                '    room_id TEXT, '
+                '    user_ids TEXT NOT NULL'
+                ')'
+            )
+            cursor.execute(
+                'CREATE TABLE IF NOT EXISTS endpoints_sync ('
+                '    registry_address BINARY PRIMARY KEY, '
+                '    block_number INTEGER NOT NULL'
+                ')'
+            )
+            cursor.execute(
+                'CREATE TABLE IF NOT EXISTS contract_events ('
+                '    identifier INTEGER PRIMARY KEY, '
+                '    contract_address BINARY NOT NULL, '
+                '    block_number INTEGER NOT NULL, '
+                '    event_type TEXT NOT NULL, '
+                '    data BINARY'
+                ')'
+            )
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS contract_events_block_number '
+                'ON contract_events(contract_address, block_number)'
+            )
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS contract_events_event_type '
+                'ON contract_events(contract_address, event_type, block_number)'
+            )
+            cursor.execute(
+                'CREATE TABLE IF NOT EXISTS contract_events_sync ('
+                '    contract_address BINARY PRIMARY KEY, '
+                '    from_block INTEGER NOT NULL, '
+                '    to_block INTEGER NOT NULL'
+                ')'
+            )
 
         # When writting to a table where the primary key is the identifier and we want
         # to return said identifier we use cursor.lastrowid, which uses sqlite's last_insert_rowid
@@ -68,6 +120,28 @@ class SQLiteStorage:
 
         return last_id
 
+    def write_state_changes(self, state_changes):
+        """ Save the `state_changes` in a single transaction.
+
+        Returns:
+            The identifiers of the state changes, in order.
+        """
+        serialized_data = [
+            self.serializer.serialize(state_change)
+            for state_change in state_changes
+        ]
+
+        ids = list()
+        with self.write_lock, self.conn:
+            for data in serialized_data:
+                cursor = self.conn.execute(
+                    'INSERT INTO state_changes(identifier, data) VALUES(null, ?)',
+                    (data,)
+                )
+                ids.append(cursor.lastrowid)
+
+        return ids
+
     def write_state_snapshot(self, statechange_id, snapshot):
         # TODO: Snapshotting is not yet implemented. This is just skeleton code
         # (Issue #682)
@@ -100,6 +174,25 @@ class SQLiteStorage:
             for event in events
         ]
 
+        self._insert_events(events_data)
+
+    def write_events_batch(self, state_change_ids, block_number, events_lists):
+        """ Save the events of many state changes in a single transaction.
+
+        Args:
+            state_change_ids: Ids of the state changes that generated the events.
+            block_number: Block number at which the state changes were applied.
+            events_lists: The list of events of each state change.
+        """
+        events_data = [
+            (None, state_change_id, block_number, self.serializer.serialize(event))
+            for state_change_id, events in zip(state_change_ids, events_lists)
+            for event in events
+        ]
+
+        self._insert_events(events_data)
+
+    def _insert_events(self, events_data):
         with self.write_lock, self.conn:
             self.conn.executemany(
                 'INSERT INTO state_events('
@@ -108,6 +201,137 @@ class SQLiteStorage:
                 events_data,
             )
 
+    def write_endpoints(self, registry_address, endpoints, block_number):
+        """ Save the endpoints known from the registry.
+
+        Args:
+            registry_address: Address of the endpoint registry.
+            endpoints: List of (node_address, host, port) tuples.
+            block_number: All the registrations up to this block are included.
+        """
+        endpoints_data = [
+            (registry_address, node_address, host, port)
+            for node_address, host, port in endpoints
+        ]
+
+        with self.write_lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO endpoints('
+                '    registry_address, node_address, host, port'
+                ') VALUES(?, ?, ?, ?)',
+                endpoints_data,
+            )
+            self.conn.execute(
+                'INSERT OR REPLACE INTO endpoints_sync('
+                '    registry_address, block_number'
+                ') VALUES(?, ?)',
+                (registry_address, block_number),
+            )
+
+    def get_endpoints(
+            self,
+            registry_address,
+    ) -> Tuple[Optional[int], List[Tuple[bytes, str, int]]]:
+        """ Return the tuple of (synced_block_number, endpoints), the block
+        number is None if the registry was never synced.
+        """
+        cursor = self.conn.execute(
+            'SELECT block_number FROM endpoints_sync WHERE registry_address = ?',
+            (registry_address,),
+        )
+        synced = cursor.fetchone()
+
+        if synced is None:
+            return None, list()
+
+        cursor = self.conn.execute(
+            'SELECT node_address, host, port FROM endpoints WHERE registry_address = ?',
+            (registry_address,),
+        )
+        endpoints = [
+            (bytes(node_address), host, port)
+            for node_address, host, port in cursor.fetchall()
+        ]
+
+        return synced[0], endpoints
+
+    def write_contract_events(self, contract_address, events, from_block, to_block):
+        """ Save the decoded events of a contract.
+
+        Args:
+            contract_address: Address of the contract which emitted the events.
+            events: List of (block_number, event_type, decoded_event) tuples,
+                in the order they were emitted.
+            from_block: First block of the range synced for the contract.
+            to_block: All the events of the contract in the range
+                `[from_block, to_block]` are stored.
+        """
+        events_data = [
+            (contract_address, block_number, event_type, self.serializer.serialize(event))
+            for block_number, event_type, event in events
+        ]
+
+        with self.write_lock, self.conn:
+            self.conn.executemany(
+                'INSERT INTO contract_events('
+                '    contract_address, block_number, event_type, data'
+                ') VALUES(?, ?, ?, ?)',
+                events_data,
+            )
+            self.conn.execute(
+                'INSERT OR REPLACE INTO contract_events_sync('
+                '    contract_address, from_block, to_block'
+                ') VALUES(?, ?, ?)',
+                (contract_address, from_block, to_block),
+            )
+
+    def get_contract_events_range(self, contract_address) -> Optional[Tuple[int, int]]:
+        """ Return the `(from_block, to_block)` range for which all the events
+        of the contract are stored, or None if the contract was never synced.
+        """
+        cursor = self.conn.execute(
+            'SELECT from_block, to_block FROM contract_events_sync WHERE contract_address = ?',
+            (contract_address,),
+        )
+        return cursor.fetchone()
+
+    def get_contract_events(self, contract_address, from_block, to_block, event_types=None):
+        """ Return the stored events of a contract in the inclusive range
+        `[from_block, to_block]`, in the order they were emitted.
+        """
+        query = (
+            'SELECT data FROM contract_events WHERE contract_address = ? '
+            'AND block_number BETWEEN ? AND ?'
+        )
+        arguments = [contract_address, from_block, to_block]
+
+        if event_types is not None:
+            event_types = list(event_types)
+            query += ' AND event_type IN ({})'.format(','.join('?' * len(event_types)))
+            arguments.extend(event_types)
+
+        cursor = self.conn.execute(query + ' ORDER BY block_number, identifier', arguments)
+        return [self.serializer.deserialize(data) for data, in cursor.fetchall()]
+
+    def write_matrix_peer(self, node_address, room_id, user_ids):
+        """ Save the room and the user ids used to talk to `node_address`. """
+        with self.write_lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO matrix_peers('
+                '    node_address, room_id, user_ids'
+                ') VALUES(?, ?, ?)',
+                (node_address, room_id, json.dumps(sorted(user_ids))),
+            )
+
+    def get_matrix_peers(self) -> List[Tuple[bytes, Optional[str], List[str]]]:
+        """ Return the list of (node_address, room_id, user_ids). """
+        cursor = self.conn.execute('SELECT node_address, room_id, user_ids FROM matrix_peers')
+
+        return [
+            (bytes(node_address), room_id, json.loads(user_ids))
+            for node_address, room_id, user_ids in cursor.fetchall()
+        ]
+
     def get_state_snapshot(self) -> Optional[Tuple[int, Any]]:
         """ Return the tuple of (last_applied_state_change_id, snapshot) or None"""
         cursor = self.conn.execute('SELECT statechange_id, data from state_snapshot')
@@ -156,6 +380,32 @@ class SQLiteStorage:
         ]
         return result
 
+    def iter_state_changes(self, from_identifier=0, batch_size=1000):
+        """ Yields the `(identifier, state_change)` pairs for the state changes
+        with an identifier larger than `from_identifier`, in the order they
+        were written.
+
+        The state changes are read `batch_size` rows at a time, so that a
+        large log is never fully loaded in memory.
+        """
+        if not isinstance(from_identifier, int):
+            raise ValueError('from_identifier must be an integer')
+
+        last_identifier = from_identifier
+        while True:
+            cursor = self.conn.execute(
+                'SELECT identifier, data FROM state_changes WHERE identifier > ? '
+                'ORDER BY identifier LIMIT ?',
+                (last_identifier, batch_size),
+            )
+            rows = cursor.fetchall()
+
+            for last_identifier, data in rows:
+                yield last_identifier, self.serializer.deserialize(data)
+
+            if len(rows) < batch_size:
+                return
+
     def get_events_by_identifier(self, from_identifier, to_identifier):
         if not (from_identifier == 'latest' or isinstance(from_identifier, int)):
             raise ValueError("from_identifier must be an integer or 'latest'")
@@ -227,5 +477,34 @@ class SQLiteStorage:
         ]
         return result
 
+    def iter_events_by_block(self, from_block, to_block, batch_size=1000):
+        """ Yields the `(block_number, event)` pairs for the events in the
+        inclusive range `[from_block, to_block]`, ordered by block.
+
+        The events are read `batch_size` rows at a time, so that a large range
+        is never fully loaded in memory and no statement is kept open while
+        the consumer runs.
+        """
+        if not isinstance(from_block, int) or not isinstance(to_block, int):
+            raise ValueError('from_block and to_block must be integers')
+
+        last_block = from_block
+        last_identifier = -1
+        while True:
+            cursor = self.conn.execute(
+                'SELECT identifier, block_number, data FROM state_events '
+                'WHERE (block_number > ? OR (block_number = ? AND identifier > ?)) '
+                'AND block_number <= ? '
+                'ORDER BY block_number, identifier LIMIT ?',
+                (last_block, last_block, last_identifier, to_block, batch_size),
+            )
+            rows = cursor.fetchall()
+
+            for last_identifier, last_block, data in rows:
+                yield last_block, self.serializer.deserialize(data)
+
+            if len(rows) < batch_size:
+                return
+
     def __del__(self):
         self.conn.close()
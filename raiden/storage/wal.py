@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
+import time
 from collections import namedtuple
 
-from raiden.transfer.architecture import StateManager
+from raiden.transfer.architecture import StateManager, copy_state
+from raiden.utils.metrics import STATE_CHANGE_DISPATCH_SECONDS, WAL_WRITE_SECONDS
 
 InternalEvent = namedtuple(
     'InternalEvent',
@@ -9,7 +11,7 @@ InternalEvent = namedtuple(
 )
 
 
-def restore_from_latest_snapshot(transition_function, storage):
+def restore_from_latest_snapshot(transition_function, storage, state_copy=copy_state):
     events = list()
     snapshot = storage.get_state_snapshot()
 
@@ -23,7 +25,7 @@ def restore_from_latest_snapshot(transition_function, storage):
         state = None
         unapplied_state_changes = list()
 
-    state_manager = StateManager(transition_function, state)
+    state_manager = StateManager(transition_function, state, state_copy)
     wal = WriteAheadLog(state_manager, storage)
 
     for state_change in unapplied_state_changes:
@@ -47,15 +49,61 @@ class WriteAheadLog:
 
         Events produced by applying state change are also saved.
         """
+        start = time.perf_counter()
         state_change_id = self.storage.write_state_change(state_change)
+        written = time.perf_counter()
 
         events = self.state_manager.dispatch(state_change)
+        dispatched = time.perf_counter()
 
         self.state_change_id = state_change_id
         self.storage.write_events(state_change_id, block_number, events)
 
+        WAL_WRITE_SECONDS.observe(written - start, ('state_change', ))
+        STATE_CHANGE_DISPATCH_SECONDS.observe(
+            dispatched - written,
+            (type(state_change).__name__, ),
+        )
+        WAL_WRITE_SECONDS.observe(time.perf_counter() - dispatched, ('events', ))
+
         return events
 
+    def log_and_dispatch_batch(self, state_changes, block_number):
+        """ Log and apply many state changes with a group commit.
+
+        All the state changes are written to the write-ahead-log in a single
+        transaction before any is applied, and the events of all of them are
+        saved in a second transaction. This has the same recovery guarantees
+        as calling `log_and_dispatch` for each state change, with two commits
+        instead of two per state change.
+
+        Returns:
+            The list of events of each state change, in order.
+        """
+        if not state_changes:
+            return []
+
+        start = time.perf_counter()
+        state_change_ids = self.storage.write_state_changes(state_changes)
+        WAL_WRITE_SECONDS.observe(time.perf_counter() - start, ('state_change_batch', ))
+
+        events_lists = list()
+        for state_change in state_changes:
+            start = time.perf_counter()
+            events_lists.append(self.state_manager.dispatch(state_change))
+            STATE_CHANGE_DISPATCH_SECONDS.observe(
+                time.perf_counter() - start,
+                (type(state_change).__name__, ),
+            )
+
+        self.state_change_id = state_change_ids[-1]
+
+        start = time.perf_counter()
+        self.storage.write_events_batch(state_change_ids, block_number, events_lists)
+        WAL_WRITE_SECONDS.observe(time.perf_counter() - start, ('events_batch', ))
+
+        return events_lists
+
     def snapshot(self):
         """ Snapshot the application state.
 
@@ -1,41 +1,225 @@
 # -*- coding: utf-8 -*-
+import json
+import socket
 import time
 import structlog
 
 import gevent
-from gevent.event import AsyncResult
+import gevent.socket
+from gevent.event import AsyncResult, Event
 from gevent.queue import (
     Queue,
 )
-from raiden.exceptions import RaidenShuttingDown
+from raiden.exceptions import EthNodeCommunicationError, RaidenShuttingDown
+from raiden.settings import (
+    ALARM_BLOCKTIME_ESTIMATE_INTERVAL,
+    ALARM_MAX_WAIT_TIME,
+    ALARM_MIN_WAIT_TIME,
+    ALARM_POLLS_PER_BLOCK,
+    DEFAULT_ALARM_WAIT_TIME,
+)
+from raiden.utils.metrics import ALARM_CALLBACKS_SECONDS, ALARM_SKIPPED_BLOCKS
 
 REMOVE_CALLBACK = object()
 log = structlog.get_logger(__name__)  # pylint: disable=invalid-name
 
 
-class AlarmTask(gevent.Greenlet):
-    """ Task to notify when a block is mined. """
+def wait_time_for(block_time: float) -> float:
+    """ The interval between polls for a chain which mines a block every
+    `block_time` seconds.
+    """
+    wait_time = block_time / ALARM_POLLS_PER_BLOCK
+    return min(max(wait_time, ALARM_MIN_WAIT_TIME), ALARM_MAX_WAIT_TIME)
+
+
+class PollingBlockSource:
+    """ Detects new blocks by polling the block number of the ethereum node.
+
+    The poll interval is a fraction of the block time, which is estimated
+    from the timestamps of the latest blocks and refreshed every
+    `ALARM_BLOCKTIME_ESTIMATE_INTERVAL` blocks.
+    """
 
     def __init__(self, chain):
+        self.chain = chain
+        self.block_time = None
+        self.wait_time = DEFAULT_ALARM_WAIT_TIME
+        self.estimated_block_number = None
+
+    def update_wait_time(self, block_number):
+        is_outdated = (
+            self.estimated_block_number is None or
+            block_number - self.estimated_block_number >= ALARM_BLOCKTIME_ESTIMATE_INTERVAL
+        )
+
+        if is_outdated:
+            # The estimate is only an optimization, a node which can't provide
+            # the block timestamps is polled at the default rate
+            try:
+                self.block_time = self.chain.estimate_blocktime()
+            except Exception as e:  # pylint: disable=broad-except
+                log.warning('block time estimate failed', error=str(e))
+                self.block_time = None
+                self.wait_time = DEFAULT_ALARM_WAIT_TIME
+            else:
+                self.wait_time = wait_time_for(self.block_time)
+
+            self.estimated_block_number = block_number
+
+    def wait_for_block(self, last_block_number, stop_event):
+        """ Returns the first block number which differs from
+        `last_block_number`, or None if `stop_event` was set.
+        """
+        while stop_event.wait(self.wait_time) is not True:
+            block_number = self.chain.block_number()
+
+            if block_number != last_block_number:
+                self.update_wait_time(block_number)
+                return block_number
+
+        return None
+
+    def stop(self):
+        pass
+
+
+class IpcBlockSource:
+    """ Receives the new blocks from a `newHeads` subscription on the IPC
+    socket of a local ethereum node, a new block is known as soon as the node
+    imports it.
+    """
+
+    def __init__(self, ipc_path):
+        self.ipc_path = ipc_path
+        self.socket = None
+        self.reader = None
+        self.latest_block_number = None
+        self.error = None
+        self.new_head = Event()
+
+    def subscribe(self):
+        self.socket = gevent.socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(self.ipc_path)
+
+        request = {
+            'jsonrpc': '2.0',
+            'id': 1,
+            'method': 'eth_subscribe',
+            'params': ['newHeads'],
+        }
+        self.socket.sendall(json.dumps(request).encode())
+
+        messages = self._read_messages()
+        response = next(messages)
+        if 'result' not in response:
+            raise EthNodeCommunicationError(
+                'newHeads subscription failed: {}'.format(response.get('error')),
+            )
+
+        self.reader = gevent.spawn(self._read_heads, messages)
+
+    def _read_messages(self):
+        """ Yields the JSON messages sent by the node, the IPC socket is a
+        stream of JSON documents without framing.
+        """
+        decoder = json.JSONDecoder()
+        buffer = ''
+
+        while True:
+            data = self.socket.recv(4096)
+            if not data:
+                raise EthNodeCommunicationError('IPC connection closed')
+
+            buffer += data.decode()
+            while True:
+                buffer = buffer.lstrip()
+
+                try:
+                    message, end = decoder.raw_decode(buffer)
+                except ValueError:
+                    # The message is incomplete
+                    break
+
+                buffer = buffer[end:]
+                yield message
+
+    def _read_heads(self, messages):
+        try:
+            for message in messages:
+                if message.get('method') == 'eth_subscription':
+                    head = message['params']['result']
+                    self.latest_block_number = int(head['number'], 16)
+                    self.new_head.set()
+        except (EthNodeCommunicationError, OSError, ValueError) as e:
+            self.error = e
+            self.new_head.set()
+
+    def wait_for_block(self, last_block_number, stop_event):
+        """ Returns the first block number which differs from
+        `last_block_number`, or None if `stop_event` was set.
+
+        Raises:
+            EthNodeCommunicationError: If the subscription was lost.
+        """
+        while not stop_event.ready():
+            self.new_head.clear()
+
+            if self.error is not None:
+                raise EthNodeCommunicationError(
+                    'newHeads subscription lost: {}'.format(self.error),
+                )
+
+            block_number = self.latest_block_number
+            if block_number is not None and block_number != last_block_number:
+                return block_number
+
+            gevent.wait([stop_event, self.new_head], count=1)
+
+        return None
+
+    def stop(self):
+        if self.reader is not None:
+            self.reader.kill()
+
+        if self.socket is not None:
+            self.socket.close()
+
+
+class AlarmTask(gevent.Greenlet):
+    """ Task to notify when a block is mined.
+
+    New blocks are received from a `newHeads` subscription if `ipc_path` is
+    given and the subscription can be made, otherwise the block number is
+    polled. The callbacks are executed by a separate greenlet, so slow
+    callbacks don't delay the detection of new blocks, if the callbacks lag
+    behind they are only called for the latest block.
+    """
+
+    def __init__(self, chain, ipc_path=None):
         super().__init__()
         self.callbacks = list()
         self.stop_event = AsyncResult()
         self.chain = chain
+        self.ipc_path = ipc_path
         self.last_block_number = None
-        self.response_queue = Queue()
+        self.new_blocks = Queue()
+        self.polling = PollingBlockSource(chain)
 
-        # TODO: Start with a larger wait_time and decrease it as the
-        # probability of a new block increases.
-        self.wait_time = 0.5
+        # Time spent executing the callbacks for the last block
+        self.work_time = 0
         self.last_loop = time.time()
 
+    @property
+    def wait_time(self):
+        return self.polling.wait_time
+
     def register_callback(self, callback):
         """ Register a new callback.
 
         Note:
             The callback will be executed in the AlarmTask context and for
-            this reason it should not block, otherwise we can miss block
-            changes.
+            this reason it should not block, otherwise the other callbacks
+            are delayed and blocks are skipped.
         """
         if not callable(callback):
             raise ValueError('callback is not a callable')
@@ -50,61 +234,133 @@ class AlarmTask(gevent.Greenlet):
     def _run(self):  # pylint: disable=method-hidden
         log.debug('starting block number', block_number=self.last_block_number)
 
-        sleep_time = 0
-        while self.stop_event.wait(sleep_time) is not True:
+        callbacks_task = gevent.spawn(self._run_callbacks)
+        callbacks_task.link_exception(lambda task: self.kill(task.exception, block=False))
+
+        block_source = self._start_block_source()
+        try:
+            while True:
+                try:
+                    block_number = block_source.wait_for_block(
+                        self.last_block_number,
+                        self.stop_event,
+                    )
+                except RaidenShuttingDown:
+                    break
+                except EthNodeCommunicationError as e:
+                    if block_source is self.polling:
+                        raise
+
+                    log.warning('newHeads subscription lost, polling for blocks', error=str(e))
+                    block_source.stop()
+                    block_source = self.polling
+                    continue
+
+                if block_number is None:
+                    break
+
+                self._new_block(block_number)
+                self.new_blocks.put(block_number)
+        finally:
+            block_source.stop()
+
+            # Let the callbacks of the current block finish
+            self.new_blocks.put(None)
+            callbacks_task.join()
+
+        # stopping
+        self.callbacks = list()
+
+    def _start_block_source(self):
+        if self.ipc_path is not None:
+            block_source = IpcBlockSource(self.ipc_path)
+
             try:
-                self.poll_for_new_block()
+                block_source.subscribe()
+            except (EthNodeCommunicationError, OSError) as e:
+                log.warning(
+                    'newHeads subscription failed, polling for blocks',
+                    ipc_path=self.ipc_path,
+                    error=str(e),
+                )
+                block_source.stop()
+            else:
+                return block_source
+
+        return self.polling
+
+    def _run_callbacks(self):
+        while True:
+            block_number = self.new_blocks.get()
+
+            # Only the latest block matters if the callbacks are lagging behind
+            while block_number is not None and not self.new_blocks.empty():
+                block_number = self.new_blocks.get()
+                ALARM_SKIPPED_BLOCKS.inc()
+
+            if block_number is None:
+                break
+
+            loop_start = time.time()
+            try:
+                self.run_callbacks(block_number)
             except RaidenShuttingDown:
+                self.stop_event.set(True)
                 break
 
-            # we want this task to iterate in the tick of `wait_time`, so take
-            # into account how long we spent executing one tick.
             self.last_loop = time.time()
-            work_time = self.last_loop - self.last_loop
-            if work_time > self.wait_time:
+            self.work_time = self.last_loop - loop_start
+            ALARM_CALLBACKS_SECONDS.observe(self.work_time)
+
+            block_time = self.polling.block_time
+            if block_time is not None and self.work_time > block_time:
                 log.warning(
-                    'alarm loop is taking longer than the wait time',
-                    work_time=work_time,
-                    wait_time=self.wait_time,
+                    'alarm callbacks are taking longer than the block time',
+                    work_time=self.work_time,
+                    block_time=block_time,
                 )
-                sleep_time = 0.001
-            else:
-                sleep_time = self.wait_time - work_time
-
-        # stopping
-        self.callbacks = list()
-
-    def poll_for_new_block(self):
-        current_block = self.chain.block_number()
 
+    def _new_block(self, current_block):
         if current_block > self.last_block_number + 1:
             difference = current_block - self.last_block_number - 1
             log.error('alarm missed %s blocks' % (difference))
 
+        log.debug(
+            'new block',
+            number=current_block,
+            timestamp=time.time(),
+        )
+
+        self.last_block_number = current_block
+
+    def poll_for_new_block(self):
+        """ Checks for a new block and executes the callbacks in the caller's
+        context.
+        """
+        current_block = self.chain.block_number()
+
         if current_block != self.last_block_number:
-            log.debug(
-                'new block',
-                number=current_block,
-                timestamp=self.last_loop,
-            )
+            self._new_block(current_block)
+            self.run_callbacks(current_block)
 
-            self.last_block_number = current_block
-            remove = list()
-            for callback in self.callbacks:
-                result = callback(current_block)
-                if result is REMOVE_CALLBACK:
-                    remove.append(callback)
+    def run_callbacks(self, current_block):
+        remove = list()
+        for callback in self.callbacks:
+            result = callback(current_block)
+            if result is REMOVE_CALLBACK:
+                remove.append(callback)
 
-            for callback in remove:
-                self.callbacks.remove(callback)
+        for callback in remove:
+            self.callbacks.remove(callback)
 
     def start(self):
         self.last_block_number = self.chain.block_number()
+        self.polling.update_wait_time(self.last_block_number)
         super().start()
 
     def stop_and_wait(self):
         self.stop_event.set(True)
-        gevent.wait(self)
+        gevent.wait([self])
 
     def stop_async(self):
         self.stop_event.set(True)
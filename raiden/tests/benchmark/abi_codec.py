@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Measures how many logs per second are decoded and how many function calls per
+second are encoded with the ABI codecs of `smartcontract_proxy`, compared to
+resolving the ABI entries on every operation as it was done before.
+
+The logs are generated for every event of the contract's ABI with random
+arguments, in the format returned by `eth_getLogs`.
+"""
+import argparse
+import os
+import random
+import time
+
+from eth_abi import encode_abi, encode_single
+from eth_utils import encode_hex, event_abi_to_log_topic, to_checksum_address
+from hexbytes import HexBytes
+from web3.utils.abi import filter_by_type, get_abi_input_types
+from web3.utils.contracts import find_matching_fn_abi
+from web3.utils.events import get_event_data
+
+from raiden.blockchain.abi import (
+    CONTRACT_MANAGER,
+    CONTRACT_CHANNEL_MANAGER,
+    CONTRACT_ENDPOINT_REGISTRY,
+    CONTRACT_NETTING_CHANNEL,
+    CONTRACT_REGISTRY,
+)
+from raiden.network.rpc.smartcontract_proxy import get_codec, sanitize_args
+
+CONTRACTS = (
+    CONTRACT_CHANNEL_MANAGER,
+    CONTRACT_ENDPOINT_REGISTRY,
+    CONTRACT_NETTING_CHANNEL,
+    CONTRACT_REGISTRY,
+)
+
+
+def random_value(abi_type):
+    if abi_type.endswith('[]'):
+        return [random_value(abi_type[:-2]) for _ in range(random.randint(0, 3))]
+    if abi_type == 'address':
+        return to_checksum_address(os.urandom(20))
+    if abi_type == 'bool':
+        return random.choice((True, False))
+    if abi_type.startswith('uint'):
+        bits = min(int(abi_type[len('uint'):] or 256), 64)
+        return random.randint(0, 2 ** bits - 1)
+    if abi_type.startswith('int'):
+        bits = min(int(abi_type[len('int'):] or 256), 64)
+        return random.randint(-2 ** (bits - 1), 2 ** (bits - 1) - 1)
+    if abi_type == 'string':
+        return 'raiden'
+    if abi_type == 'bytes':
+        return os.urandom(random.randint(0, 100))
+    if abi_type.startswith('bytes'):
+        return os.urandom(int(abi_type[len('bytes'):]))
+
+    raise ValueError('Unsupported type {}'.format(abi_type))
+
+
+def make_logs(abi, number_of_logs):
+    events = filter_by_type('event', abi)
+
+    logs = list()
+    for block_number in range(number_of_logs):
+        event_abi = random.choice(events)
+        indexed = [arg['type'] for arg in event_abi['inputs'] if arg['indexed']]
+        not_indexed = [arg['type'] for arg in event_abi['inputs'] if not arg['indexed']]
+
+        topics = [HexBytes(event_abi_to_log_topic(event_abi))]
+        topics.extend(
+            HexBytes(encode_single(abi_type, random_value(abi_type)))
+            for abi_type in indexed
+        )
+        data = encode_abi(not_indexed, [random_value(abi_type) for abi_type in not_indexed])
+
+        logs.append({
+            'address': to_checksum_address(os.urandom(20)),
+            'topics': topics,
+            'data': encode_hex(data),
+            'blockNumber': block_number,
+            'blockHash': HexBytes(os.urandom(32)),
+            'transactionHash': HexBytes(os.urandom(32)),
+            'transactionIndex': 0,
+            'logIndex': 0,
+        })
+
+    return logs
+
+
+def make_calls(abi, number_of_calls):
+    functions = filter_by_type('function', abi)
+
+    calls = list()
+    for _ in range(number_of_calls):
+        fn_abi = random.choice(functions)
+        args = [random_value(abi_type) for abi_type in get_abi_input_types(fn_abi)]
+        calls.append((fn_abi['name'], args))
+
+    return calls
+
+
+def decode_uncached(abi, log):
+    topic_to_event_abi = {
+        event_abi_to_log_topic(event_abi): event_abi
+        for event_abi in filter_by_type('event', abi)
+    }
+    return get_event_data(topic_to_event_abi[log['topics'][0]], log)
+
+
+def decode_with_codec(abi, log):
+    return get_codec(abi).decode_event(log)
+
+
+def encode_uncached(abi, function_name, args):
+    fn_abi = find_matching_fn_abi(abi, function_name, args)
+    input_types = get_abi_input_types(fn_abi)
+    return encode_abi(input_types, sanitize_args(input_types, args))
+
+
+def encode_with_codec(abi, function_name, args):
+    return get_codec(abi).function(function_name, args).encode_call(args)
+
+
+def measure(function, abi, items):
+    start = time.time()
+    for item in items:
+        function(abi, *item)
+    return len(items) / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--contract', choices=CONTRACTS, default=CONTRACT_NETTING_CHANNEL)
+    parser.add_argument('--logs', type=int, default=10000)
+    parser.add_argument('--calls', type=int, default=10000)
+    args = parser.parse_args()
+
+    abi = CONTRACT_MANAGER.get_contract_abi(args.contract)
+    logs = [(log,) for log in make_logs(abi, args.logs)]
+    calls = make_calls(abi, args.calls)
+
+    print('operation   uncached/s   codec/s')
+    print('{:<11} {:<12.1f} {:.1f}'.format(
+        'decode',
+        measure(decode_uncached, abi, logs),
+        measure(decode_with_codec, abi, logs),
+    ))
+    print('{:<11} {:<12.1f} {:.1f}'.format(
+        'encode',
+        measure(encode_uncached, abi, calls),
+        measure(encode_with_codec, abi, calls),
+    ))
+
+
+if __name__ == '__main__':
+    main()
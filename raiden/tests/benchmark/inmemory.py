@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+An in-memory blockchain and transport to run many `RaidenService` instances
+in a single process, without an ethereum node or sockets.
+
+The blockchain only holds what the nodes read on start, i.e. the registry,
+the channel managers and the netting channels with their deposits. It has no
+contract events, so the channels must be created before the nodes start. The
+transport delivers every message exactly once and in order, it has no
+retries and every partner is reachable.
+"""
+from collections import defaultdict
+
+import gevent
+from gevent.queue import Queue
+
+from raiden import messages
+from raiden.messages import Delivered
+from raiden.transfer.state import NODE_NETWORK_REACHABLE
+from raiden.transfer.state_change import ReceiveDelivered
+from raiden.udp_message_handler import on_udp_message
+from raiden.utils import sha3
+
+
+class InMemoryFilter:
+    """ A filter for a contract without events. """
+
+    def changes(self):  # pylint: disable=no-self-use
+        return list()
+
+    def uninstall(self):
+        pass
+
+
+class InMemoryBlockchain:
+    """ The contracts shared by all the nodes. """
+
+    def __init__(self, settle_timeout, block_number=1):
+        self.settle_timeout = settle_timeout
+        self.block_number = block_number
+        self.registry_address = sha3(b'registry')[:20]
+        self.tokens_to_managers = dict()
+        self.managers_to_channels = defaultdict(list)
+        self.channels = dict()
+
+    def new_channel_manager(self, token_address):
+        manager_address = sha3(b'manager' + token_address)[:20]
+        self.tokens_to_managers[token_address] = manager_address
+        return manager_address
+
+    def new_channel(self, manager_address, participant1, deposit1, participant2, deposit2):
+        channel_address = sha3(
+            b'channel' + manager_address + participant1 + participant2,
+        )[:20]
+
+        self.channels[channel_address] = (participant1, deposit1, participant2, deposit2)
+        self.managers_to_channels[manager_address].append(channel_address)
+
+        return channel_address
+
+
+class InMemoryChain:
+    """ The view of the blockchain of a single node, implements the part of the
+    `BlockChainService` interface used by `RaidenService`.
+    """
+
+    def __init__(self, blockchain, node_address):
+        self.blockchain = blockchain
+        self.node_address = node_address
+        self.client = self
+        self.network_id = 0
+
+    def inject_stop_event(self, event):
+        pass
+
+    def block_number(self):
+        return self.blockchain.block_number
+
+    def estimate_blocktime(self):  # pylint: disable=no-self-use
+        return 15
+
+    def registry(self, registry_address):
+        assert registry_address == self.blockchain.registry_address
+        return InMemoryRegistry(self, registry_address)
+
+    def manager(self, manager_address):
+        return InMemoryChannelManager(self, manager_address)
+
+    def netting_channel(self, channel_address):
+        return InMemoryNettingChannel(self, channel_address)
+
+
+class InMemoryRegistry:
+    def __init__(self, chain, address):
+        self.chain = chain
+        self.address = address
+
+    def manager_addresses(self):
+        return list(self.chain.blockchain.tokens_to_managers.values())
+
+    def manager(self, manager_address):
+        return self.chain.manager(manager_address)
+
+    def tokenadded_filter(self, from_block=None):  # pylint: disable=unused-argument,no-self-use
+        return InMemoryFilter()
+
+
+class InMemoryChannelManager:
+    def __init__(self, chain, address):
+        self.chain = chain
+        self.address = address
+
+    def token_address(self):
+        for token_address, manager_address in self.chain.blockchain.tokens_to_managers.items():
+            if manager_address == self.address:
+                return token_address
+
+        raise ValueError('unknown channel manager')
+
+    def channels_addresses(self):
+        blockchain = self.chain.blockchain
+        return [
+            (blockchain.channels[channel_address][0], blockchain.channels[channel_address][2])
+            for channel_address in blockchain.managers_to_channels[self.address]
+        ]
+
+    def channels_by_participant(self, participant_address):
+        blockchain = self.chain.blockchain
+        return [
+            channel_address
+            for channel_address in blockchain.managers_to_channels[self.address]
+            if participant_address in blockchain.channels[channel_address][::2]
+        ]
+
+    def channelnew_filter(self, from_block=None):  # pylint: disable=unused-argument,no-self-use
+        return InMemoryFilter()
+
+
+class InMemoryNettingChannel:
+    def __init__(self, chain, address):
+        self.chain = chain
+        self.address = address
+
+    def detail(self):
+        blockchain = self.chain.blockchain
+        participant1, deposit1, participant2, deposit2 = blockchain.channels[self.address]
+
+        if participant2 == self.chain.node_address:
+            participant1, deposit1, participant2, deposit2 = (
+                participant2,
+                deposit2,
+                participant1,
+                deposit1,
+            )
+
+        return {
+            'our_address': participant1,
+            'our_balance': deposit1,
+            'partner_address': participant2,
+            'partner_balance': deposit2,
+            'settle_timeout': blockchain.settle_timeout,
+        }
+
+    def opened(self):  # pylint: disable=no-self-use
+        return 1
+
+    def closed(self):  # pylint: disable=no-self-use
+        return 0
+
+    def all_events_filter(self, from_block=None):  # pylint: disable=unused-argument,no-self-use
+        return InMemoryFilter()
+
+
+class InMemoryTransport:
+    """ Delivers the messages of the nodes of the same `InMemoryNetwork`.
+
+    Every node has an inbox processed by its own greenlet. A message is
+    acknowledged with a `Delivered` once it's processed, as done by the UDP
+    transport without batching.
+    """
+
+    def __init__(self, network):
+        self.network = network
+        self.raiden = None
+        self.inbox = Queue()
+        self.greenlets = list()
+        self.reachable = set()
+
+    def start(self, raiden, queueids_to_queues):
+        assert not any(queueids_to_queues.values()), 'the transport does not retry'
+
+        self.raiden = raiden
+        self.network[raiden.address] = self
+        self.greenlets.append(gevent.spawn(self._run))
+
+    def stop_and_wait(self):
+        self.inbox.put(None)
+        gevent.wait(self.greenlets)
+
+    def start_health_check(self, node_address):
+        if node_address not in self.reachable:
+            self.reachable.add(node_address)
+            self.raiden.set_node_network_state(node_address, NODE_NETWORK_REACHABLE)
+
+    def send_async(self, recipient, queue_name, message):  # pylint: disable=unused-argument
+        self.network[recipient].inbox.put(message.encode())
+
+    def _run(self):
+        while True:
+            data = self.inbox.get()
+
+            if data is None:
+                return
+
+            self.receive(data)
+
+    def receive(self, data):
+        message = messages.decode(data)
+
+        if isinstance(message, Delivered):
+            delivered = ReceiveDelivered(message.delivered_message_identifier)
+            self.raiden.handle_state_change(delivered)
+
+        elif on_udp_message(self.raiden, message):
+            delivered_message = Delivered(message.message_identifier)
+            self.raiden.sign(delivered_message)
+            self.network[message.sender].inbox.put(delivered_message.encode())
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the encodings of the protocol messages sent through Matrix.
+
+For every message type the size of the event body and the time to encode and
+decode it are reported for the JSON encoding used before (`to_dict` +
+`json.dumps`), the hex encoded binary format, and the compressed batch
+encoding when `--batch` messages of the same type are sent together.
+
+Note that decoding the binary format recovers the sender from the signature,
+which `from_dict` does not do, the difference in the decoding time is mostly
+the cost of the signature recovery.
+"""
+import argparse
+import json
+import time
+
+from raiden.messages import (
+    Delivered,
+    Processed,
+    RevealSecret,
+    Secret,
+    SecretRequest,
+    decode,
+    from_dict,
+)
+from raiden.network.matrixtransport import pack_compressed, unpack_compressed
+from raiden.tests.utils.messages import (
+    ADDRESS,
+    PRIVKEY,
+    VALID_SECRETS,
+    VALID_SECRETHASHES,
+    make_direct_transfer,
+    make_mediated_transfer,
+    make_refund_transfer,
+)
+from raiden.utils import data_decoder, data_encoder
+
+
+def make_secret(message_identifier):
+    return Secret(
+        message_identifier=message_identifier,
+        payment_identifier=1,
+        nonce=2,
+        token_network_address=ADDRESS,
+        channel=ADDRESS,
+        transferred_amount=10,
+        locked_amount=0,
+        locksroot=b'\x00' * 32,
+        secret=VALID_SECRETS[0],
+    )
+
+
+MESSAGE_FACTORIES = [
+    lambda identifier: Processed(ADDRESS, identifier),
+    Delivered,
+    lambda identifier: SecretRequest(identifier, 1, VALID_SECRETHASHES[0], 10),
+    lambda identifier: RevealSecret(identifier, VALID_SECRETS[0]),
+    make_secret,
+    lambda identifier: make_direct_transfer(message_identifier=identifier),
+    lambda identifier: make_mediated_transfer(message_identifier=identifier),
+    lambda identifier: make_refund_transfer(message_identifier=identifier),
+]
+
+
+def make_signed(factory, message_identifier):
+    message = factory(message_identifier)
+    message.sign(PRIVKEY, ADDRESS)
+    return message
+
+
+def timeit(function, rounds):
+    start = time.time()
+    for _ in range(rounds):
+        function()
+    return (time.time() - start) / rounds * 1e6
+
+
+def compare(factory, rounds, batch):
+    # The messages of a batch differ in their identifiers and signatures,
+    # like the messages sent to a partner do
+    messages = [make_signed(factory, identifier) for identifier in range(1, batch + 1)]
+    message = messages[0]
+
+    json_body = json.dumps(message.to_dict())
+    hex_body = data_encoder(message.encode())
+    compressed_body = pack_compressed([batched.encode() for batched in messages])
+
+    return {
+        'name': type(message).__name__,
+        'json_size': len(json_body),
+        'hex_size': len(hex_body),
+        'compressed_size': len(compressed_body) / batch,
+        'json_encode': timeit(lambda: json.dumps(message.to_dict()), rounds),
+        'hex_encode': timeit(lambda: data_encoder(message.encode()), rounds),
+        'json_decode': timeit(lambda: from_dict(json.loads(json_body)), rounds),
+        'hex_decode': timeit(lambda: decode(data_decoder(hex_body)), rounds),
+        'compressed_decode': timeit(
+            lambda: [decode(data) for data in unpack_compressed(compressed_body)],
+            rounds,
+        ) / batch,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=1000)
+    parser.add_argument('--batch', type=int, default=20)
+    args = parser.parse_args()
+
+    print('sizes in bytes per message, times in us per message')
+    print(
+        '{:<16} {:>6} {:>6} {:>6} {:>10} {:>10} {:>10} {:>10} {:>10}'.format(
+            'message', 'json', 'hex', 'zlib',
+            'json-enc', 'hex-enc', 'json-dec', 'hex-dec', 'zlib-dec',
+        )
+    )
+
+    for factory in MESSAGE_FACTORIES:
+        result = compare(factory, args.rounds, args.batch)
+        print(
+            '{:<16} {:>6} {:>6} {:>6.0f} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f}'.format(
+                result['name'],
+                result['json_size'],
+                result['hex_size'],
+                result['compressed_size'],
+                result['json_encode'],
+                result['hex_encode'],
+                result['json_decode'],
+                result['hex_decode'],
+                result['compressed_decode'],
+            )
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the throughput of the MatrixTransport send pipeline against a local
+stand-in for the homeserver.
+
+The stand-in homeserver answers every event after a configurable latency,
+which is the cost of a request to a real homeserver, and acknowledges every
+message it received with a Delivered after another round trip. The
+benchmark sends bursts of messages to a single partner and reports the
+messages per second, the number of requests and the bytes sent, with and
+without batching.
+"""
+import argparse
+import time
+from types import SimpleNamespace
+
+import gevent
+from coincurve import PrivateKey
+
+from raiden.log_config import configure_logging
+from raiden.messages import Processed, decode
+from raiden.network.matrixtransport import (
+    COMPRESSED_PREFIX,
+    ENCODING_COMPRESSED,
+    MatrixTransport,
+    unpack_compressed,
+)
+from raiden.settings import DEFAULT_PROTOCOL_RETRIES_BEFORE_BACKOFF
+from raiden.tests.utils.matrix import MockMatrixClient
+from raiden.utils import data_decoder, privatekey_to_address, sha3
+
+ROOM_ID = '!benchmark:localhost'
+
+
+class StandInRoom:
+    def __init__(self):
+        self.room_id = ROOM_ID
+
+
+class StandInApi:
+    def __init__(self, transport, latency):
+        self.transport = transport
+        self.latency = latency
+        self.requests = 0
+        self.messages = 0
+        self.bytes = 0
+
+    def send_message_event(self, room_id, event_type, content):  # pylint: disable=unused-argument
+        gevent.sleep(self.latency)
+        self.requests += 1
+
+        body = content['body']
+        self.bytes += len(body)
+
+        if body.startswith(COMPRESSED_PREFIX):
+            messages_data = unpack_compressed(body)
+        else:
+            messages_data = [data_decoder(line) for line in body.splitlines()]
+
+        identifiers = [decode(data).message_identifier for data in messages_data]
+        self.messages += len(identifiers)
+        gevent.spawn_later(self.latency, self.deliver, identifiers)
+
+    def deliver(self, identifiers):
+        for message_identifier in identifiers:
+            async_result = self.transport._messageids_to_asyncresult.pop(message_identifier, None)
+            if async_result is not None:
+                async_result.set(True)
+
+
+def run(number_of_messages, burst_size, latency, max_batch_messages, compressed):
+    privkey = sha3(b'matrix-benchmark')
+    address = privatekey_to_address(privkey)
+    partner = privatekey_to_address(sha3(b'matrix-benchmark-partner'))
+
+    transport = MatrixTransport({
+        'server': 'http://localhost',
+        'client_class': MockMatrixClient,
+        'max_batch_messages': max_batch_messages,
+    })
+    transport._raiden_service = SimpleNamespace(
+        address=address,
+        config={
+            'protocol': {
+                'retries_before_backoff': DEFAULT_PROTOCOL_RETRIES_BEFORE_BACKOFF,
+                'retry_interval': latency * 10,
+            },
+        },
+    )
+
+    api = StandInApi(transport, latency)
+    transport._client.api = api
+    transport._client.rooms[ROOM_ID] = StandInRoom()
+    transport._address_to_roomid[partner] = ROOM_ID
+
+    # The messages are batched only for the partners which advertised their
+    # encodings
+    if compressed:
+        transport._address_to_encodings[partner] = {ENCODING_COMPRESSED}
+    else:
+        transport._address_to_encodings[partner] = set()
+
+    private_key = PrivateKey(privkey)
+    results = list()
+
+    start = time.time()
+    for message_identifier in range(number_of_messages):
+        message = Processed(address, message_identifier)
+        message.sign(private_key, address)
+        results.append(transport.send_async('', partner, message))
+
+        if message_identifier % burst_size == burst_size - 1:
+            gevent.idle()
+
+    gevent.wait(results)
+    elapsed = time.time() - start
+
+    transport._stop_event.set()
+    for retrier in transport._address_to_retrier.values():
+        retrier.event_new_data.set()
+    gevent.wait(transport.greenlets)
+
+    return elapsed, api.requests, api.messages, api.bytes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--burst', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.005, help='request latency in s')
+    args = parser.parse_args()
+
+    configure_logging({'': 'WARNING'})
+
+    print('mode         elapsed   msgs/s    requests  sent      bytes')
+    # `per-message` sends one message per request, like the transport did
+    # before batching, except that the requests to a peer are not concurrent
+    modes = (
+        ('per-message', 1, False),
+        ('batched', None, False),
+        ('compressed', None, True),
+    )
+    for name, max_batch_messages, compressed in modes:
+        elapsed, requests, sent, sent_bytes = run(
+            args.messages,
+            args.burst,
+            args.latency,
+            max_batch_messages,
+            compressed,
+        )
+        print('{:<12} {:<9.3f} {:<9.1f} {:<9} {:<9} {}'.format(
+            name,
+            elapsed,
+            args.messages / elapsed,
+            requests,
+            sent,
+            sent_bytes,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Measures how many state changes per second are dispatched by the node state
+machine for an increasing number of token networks, when the whole node state
+is copied for every state change and when only the modified partitions are
+copied, as with `--partitioned-state`.
+
+The state changes are confirmed deposits to a random channel, interleaved
+with a `Block` every `--block-interval` state changes.
+"""
+import argparse
+import random
+import time
+
+import networkx
+
+from raiden.tests.utils import factories
+from raiden.transfer import node
+from raiden.transfer.architecture import StateManager, copy_state
+from raiden.transfer.partition import copy_partitions
+from raiden.transfer.state import (
+    NodeState,
+    TokenNetworkGraphState,
+    TokenNetworkState,
+    TransactionChannelNewBalance,
+)
+from raiden.transfer.state_change import (
+    ActionNewTokenNetwork,
+    Block,
+    ContractReceiveChannelNewBalance,
+)
+
+
+# The deposits are mined at block 1 and are confirmed from this block on
+START_BLOCK_NUMBER = 10
+
+
+def make_node_state(number_of_token_networks, number_of_channels):
+    node_state = NodeState(random.Random(), START_BLOCK_NUMBER)
+    payment_network_identifier = factories.make_address()
+
+    channels = list()
+    for _ in range(number_of_token_networks):
+        token_network_identifier = factories.make_address()
+        token_network_channels = [
+            factories.make_channel(token_network_identifier=token_network_identifier)
+            for _ in range(number_of_channels)
+        ]
+        token_network_state = TokenNetworkState(
+            token_network_identifier,
+            factories.make_address(),
+            TokenNetworkGraphState(networkx.Graph()),
+            token_network_channels,
+        )
+
+        node.state_transition(
+            node_state,
+            ActionNewTokenNetwork(payment_network_identifier, token_network_state),
+        )
+        channels.extend(token_network_channels)
+
+    return node_state, channels
+
+
+def make_state_changes(channels, number_of_state_changes, block_interval):
+    state_changes = list()
+    block_number = START_BLOCK_NUMBER
+
+    for position in range(number_of_state_changes):
+        if position % block_interval == 0:
+            block_number += 1
+            state_changes.append(Block(block_number))
+            continue
+
+        channel_state = random.choice(channels)
+        deposit = TransactionChannelNewBalance(
+            channel_state.our_state.address,
+            position,
+            1,
+        )
+        state_changes.append(ContractReceiveChannelNewBalance(
+            channel_state.token_network_identifier,
+            channel_state.identifier,
+            deposit,
+        ))
+
+    return state_changes
+
+
+def run(node_state, state_changes, state_copy):
+    state_manager = StateManager(node.state_transition, node_state, state_copy)
+
+    start = time.time()
+    for state_change in state_changes:
+        state_manager.dispatch(state_change)
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--token-networks', type=int, action='append')
+    parser.add_argument('--channels', type=int, default=10)
+    parser.add_argument('--state-changes', type=int, default=1000)
+    parser.add_argument('--block-interval', type=int, default=10)
+    args = parser.parse_args()
+
+    print('networks  full copy/s  partitioned/s')
+    for number_of_token_networks in args.token_networks or [1, 10, 50, 100]:
+        node_state, channels = make_node_state(number_of_token_networks, args.channels)
+        state_changes = make_state_changes(
+            channels,
+            args.state_changes,
+            args.block_interval,
+        )
+
+        full_copy = run(node_state, state_changes, copy_state)
+        partitioned = run(node_state, state_changes, copy_partitions)
+
+        print('{:<9} {:<12.1f} {:.1f}'.format(
+            number_of_token_networks,
+            len(state_changes) / full_copy,
+            len(state_changes) / partitioned,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the overhead of the `StackSampler` at increasing sampling rates.
+
+The workload is the dispatch of state changes by the node state machine, as in
+`partitioned_state`, split among `--greenlets` greenlets which yield to the hub
+every `--yield-interval` state changes. The throughput of the best of
+`--repeat` runs is compared with the throughput without the sampler. The
+sampler counts CPU time, so the samples are about `rate` per second of run.
+"""
+import argparse
+import random
+import time
+
+import gevent
+
+from raiden.tests.benchmark.partitioned_state import make_node_state, make_state_changes
+from raiden.transfer import node
+from raiden.transfer.architecture import StateManager, copy_state
+from raiden.utils.profiling.stacksampler import StackSampler
+
+
+def dispatch(node_state, state_changes, yield_interval):
+    state_manager = StateManager(node.state_transition, node_state, copy_state)
+
+    for position, state_change in enumerate(state_changes):
+        state_manager.dispatch(state_change)
+
+        if position % yield_interval == 0:
+            gevent.sleep(0)
+
+
+def run(node_state, state_changes, number_of_greenlets, yield_interval, rate):
+    sampler = None
+    if rate:
+        sampler = StackSampler(rate)
+        sampler.start()
+
+    start = time.perf_counter()
+    gevent.joinall(
+        [
+            gevent.spawn(dispatch, node_state, state_changes, yield_interval)
+            for _ in range(number_of_greenlets)
+        ],
+        raise_error=True,
+    )
+    elapsed = time.perf_counter() - start
+
+    number_of_samples = 0
+    number_of_stacks = 0
+    if sampler is not None:
+        sampler.stop()
+        number_of_samples = sampler.number_of_samples
+        number_of_stacks = len(sampler.stacks_to_counts)
+
+    throughput = number_of_greenlets * len(state_changes) / elapsed
+    return throughput, number_of_samples, number_of_stacks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rate', type=int, action='append')
+    parser.add_argument('--greenlets', type=int, default=5)
+    parser.add_argument('--token-networks', type=int, default=2)
+    parser.add_argument('--channels', type=int, default=10)
+    parser.add_argument('--state-changes', type=int, default=300)
+    parser.add_argument('--yield-interval', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed(0)
+    node_state, channels = make_node_state(args.token_networks, args.channels)
+    state_changes = make_state_changes(channels, args.state_changes, 10)
+
+    # The runs of the rates are interleaved, so a drift of the machine's
+    # performance affects them alike
+    rates = [0] + (args.rate or [10, 100, 1000])
+    rates_to_best = dict()
+    for _ in range(args.repeat):
+        for rate in rates:
+            result = run(node_state, state_changes, args.greenlets, args.yield_interval, rate)
+            rates_to_best[rate] = max(rates_to_best.get(rate, result), result)
+
+    baseline, _, _ = rates_to_best[0]
+
+    print('rate/s   state changes/s   overhead %   samples   stacks')
+    print('{:<8} {:<17.1f} {:<12} {:<9} {}'.format('off', baseline, '-', '-', '-'))
+    for rate in rates[1:]:
+        throughput, number_of_samples, number_of_stacks = rates_to_best[rate]
+
+        print('{:<8} {:<17.1f} {:<12.2f} {:<9} {}'.format(
+            rate,
+            throughput,
+            (baseline - throughput) / baseline * 100,
+            number_of_samples,
+            number_of_stacks,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the memory used by the state changes and events of pending
+transfers, in bytes per pending transfer, i.e. the `ActionInitMediator` of an
+incoming transfer, and per queued message, i.e. a `SendLockedTransfer` in
+`NodeState.queueids_to_queues`. The sizes are measured in memory and pickled,
+as the state changes are written to the WAL and the queues to the snapshots.
+
+The `dict` columns use instances which store their attributes in a `__dict__`
+and decode the messages without interning the identifiers, as it was done
+before the classes were slotted.
+"""
+import argparse
+import pickle
+import random
+import tracemalloc
+
+import raiden.utils
+from raiden import messages
+from raiden.messages import Lock, LockedTransfer
+from raiden.tests.utils import factories
+from raiden.transfer.mediated_transfer.events import SendLockedTransfer
+from raiden.transfer.mediated_transfer.state import (
+    LockedTransferUnsignedState,
+    lockedtransfersigned_from_message,
+)
+from raiden.transfer.mediated_transfer.state_change import ActionInitMediator
+from raiden.transfer.state import BalanceProofUnsignedState, RouteState
+from raiden.utils import intern_identifier, sha3
+
+
+class DictInstance:
+    """ An instance with the attributes of a slotted instance in a __dict__. """
+
+    def __init__(self, instance):
+        for klass in type(instance).__mro__:
+            for name in getattr(klass, '__slots__', ()):
+                setattr(self, name, getattr(instance, name))
+
+
+def make_messages(number_of_messages, number_of_channels):
+    channels = [
+        (factories.make_privkey_address(), factories.make_address())
+        for _ in range(number_of_channels)
+    ]
+    token = factories.make_address()
+    token_network_identifier = factories.make_address()
+
+    encoded_messages = list()
+    for message_identifier in range(number_of_messages):
+        (private_key, sender), channel_identifier = random.choice(channels)
+        lock = Lock(
+            random.randint(1, 100),
+            random.randint(100, 1000),
+            sha3(random.getrandbits(256).to_bytes(32, 'big')),
+        )
+        transfer = LockedTransfer(
+            message_identifier,
+            message_identifier,
+            1,
+            token_network_identifier,
+            token,
+            channel_identifier,
+            0,
+            lock.amount,
+            factories.UNIT_TRANSFER_TARGET,
+            lock.lockhash,
+            lock,
+            factories.UNIT_TRANSFER_TARGET,
+            factories.UNIT_TRANSFER_INITIATOR,
+        )
+        transfer.sign(private_key, sender)
+        encoded_messages.append(transfer.encode())
+
+    return encoded_messages
+
+
+def pending_transfer_from(data):
+    message = messages.decode(data)
+    from_transfer = lockedtransfersigned_from_message(message)
+    from_route = RouteState(
+        from_transfer.balance_proof.sender,
+        from_transfer.balance_proof.channel_address,
+    )
+    return ActionInitMediator([from_route], from_route, from_transfer)
+
+
+def queued_message_from(data):
+    message = messages.decode(data)
+    from_transfer = lockedtransfersigned_from_message(message)
+    balance_proof = from_transfer.balance_proof
+
+    transfer = LockedTransferUnsignedState(
+        from_transfer.payment_identifier,
+        from_transfer.token,
+        BalanceProofUnsignedState(
+            balance_proof.nonce,
+            balance_proof.transferred_amount,
+            balance_proof.locked_amount,
+            balance_proof.locksroot,
+            balance_proof.token_network_identifier,
+            balance_proof.channel_address,
+        ),
+        from_transfer.lock,
+        from_transfer.initiator,
+        from_transfer.target,
+    )
+    return SendLockedTransfer(
+        intern_identifier(message.recipient),
+        b'queue',
+        message.message_identifier,
+        transfer,
+    )
+
+
+def measure(convert, encoded_messages, compact):
+    raiden.utils.INTERNED_IDENTIFIERS.clear()
+    max_interned = raiden.utils.MAX_INTERNED_IDENTIFIERS
+    if not compact:
+        raiden.utils.MAX_INTERNED_IDENTIFIERS = 0
+
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+
+    instances = list()
+    for data in encoded_messages:
+        instance = convert(data)
+        if not compact:
+            instance = DictInstance(instance)
+        instances.append(instance)
+
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    raiden.utils.MAX_INTERNED_IDENTIFIERS = max_interned
+
+    pickled = pickle.dumps(instances)
+    number_of_messages = len(encoded_messages)
+    return (end - start) / number_of_messages, len(pickled) / number_of_messages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--channels', type=int, default=10)
+    args = parser.parse_args()
+
+    encoded_messages = make_messages(args.messages, args.channels)
+
+    print('bytes per         dict    slotted   dict pickled   slotted pickled')
+    for name, convert in (('pending transfer', pending_transfer_from),
+                          ('queued message', queued_message_from)):
+        dict_memory, dict_pickled = measure(convert, encoded_messages, compact=False)
+        memory, pickled = measure(convert, encoded_messages, compact=True)
+
+        print('{:<17} {:<7.0f} {:<9.0f} {:<14.0f} {:.0f}'.format(
+            name,
+            dict_memory,
+            memory,
+            dict_pickled,
+            pickled,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the end-to-end throughput of transfers among `RaidenService`
+instances running in a single process, with the in-memory blockchain and
+transport of `inmemory`, so no ethereum node or socket is needed.
+
+The nodes are connected with the channels of `--topology` and the workload
+is either direct transfers over a random channel or mediated transfers
+between random nodes which don't share a channel. `--concurrency` transfers
+are in flight at any time. A transfer is complete once its target received
+it, i.e. for a mediated transfer once the lock is unlocked.
+
+Besides the throughput and the latency percentiles, the time spent by all the
+nodes in each phase of the transfers is reported:
+
+- routing: the computation of the routes by the initiator and the mediators
+- wal write: the writes of the state changes and the events to the database
+- dispatch: the copy of the node state and the state transition
+- signing: the signatures of the outgoing messages
+- send: the encoding of the outgoing messages
+- receive: the decoding and signature recovery of the incoming messages
+
+The metrics of `raiden.utils.metrics` are recorded unless `--disable-metrics`
+is given, comparing both runs measures the overhead of the instrumentation.
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+from copy import deepcopy
+
+import gevent
+import networkx
+from gevent.event import AsyncResult
+from gevent.pool import Pool
+
+from raiden import messages, raiden_service, routing
+from raiden.app import App
+from raiden.log_config import configure_logging
+from raiden.raiden_service import RaidenService
+from raiden.tests.benchmark.inmemory import (
+    InMemoryBlockchain,
+    InMemoryChain,
+    InMemoryTransport,
+)
+from raiden.transfer.events import EventTransferReceivedSuccess, EventTransferSentFailed
+from raiden.utils import privatekey_to_address, sha3
+from raiden.utils.metrics import REGISTRY
+
+TOPOLOGIES = ('line', 'ring', 'star', 'full')
+WORKLOADS = ('direct', 'mediated')
+PHASES = ('routing', 'wal write', 'dispatch', 'signing', 'send', 'receive')
+
+
+class PhaseTimer:
+    """ Accumulates the time spent in the wrapped functions, by phase. """
+
+    def __init__(self):
+        self.phases_to_seconds = defaultdict(float)
+        self.phases_to_calls = defaultdict(int)
+
+    def wrap(self, phase, function):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.phases_to_seconds[phase] += time.perf_counter() - start
+                self.phases_to_calls[phase] += 1
+
+        return timed
+
+
+class TransferTracker:
+    """ Resolves the transfers once their target received them. """
+
+    def __init__(self):
+        self.identifiers_to_results = dict()
+
+    def start(self, identifier):
+        result = AsyncResult()
+        self.identifiers_to_results[identifier] = result
+        return result
+
+    def on_raiden_event(self, raiden, event):
+        if isinstance(event, EventTransferReceivedSuccess):
+            result = self.identifiers_to_results.pop(event.identifier, None)
+            if result is not None:
+                result.set(True)
+
+        elif isinstance(event, EventTransferSentFailed):
+            result = self.identifiers_to_results.pop(event.identifier, None)
+            if result is not None:
+                result.set(False)
+
+
+def topology_edges(topology, number_of_nodes):
+    if topology == 'line':
+        return [(node, node + 1) for node in range(number_of_nodes - 1)]
+
+    if topology == 'ring':
+        edges = topology_edges('line', number_of_nodes)
+        edges.append((number_of_nodes - 1, 0))
+        return edges
+
+    if topology == 'star':
+        return [(0, node) for node in range(1, number_of_nodes)]
+
+    return [
+        (node, partner)
+        for node in range(number_of_nodes)
+        for partner in range(node + 1, number_of_nodes)
+    ]
+
+
+def make_network(number_of_nodes, topology, deposit, partitioned_state):
+    config = deepcopy(App.DEFAULT_CONFIG)
+    config['database_path'] = ':memory:'
+    config['transport_type'] = 'memory'
+    config['partitioned_state'] = partitioned_state
+
+    blockchain = InMemoryBlockchain(config['settle_timeout'])
+    token_network_identifier = blockchain.new_channel_manager(sha3(b'token')[:20])
+
+    private_keys = [
+        sha3('node:{}'.format(position).encode())
+        for position in range(number_of_nodes)
+    ]
+    addresses = [privatekey_to_address(private_key) for private_key in private_keys]
+
+    edges = topology_edges(topology, number_of_nodes)
+    for node, partner in edges:
+        blockchain.new_channel(
+            token_network_identifier,
+            addresses[node],
+            deposit,
+            addresses[partner],
+            deposit,
+        )
+
+    network = dict()
+    services = list()
+    for private_key, address in zip(private_keys, addresses):
+        chain = InMemoryChain(blockchain, address)
+        services.append(RaidenService(
+            chain,
+            chain.registry(blockchain.registry_address),
+            private_key,
+            InMemoryTransport(network),
+            config,
+        ))
+
+    return services, edges, token_network_identifier
+
+
+def instrument(services, timer):
+    routing.get_best_routes = timer.wrap('routing', routing.get_best_routes)
+    messages.decode = timer.wrap('receive', messages.decode)
+
+    for raiden in services:
+        storage = raiden.wal.storage
+        storage.write_state_change = timer.wrap('wal write', storage.write_state_change)
+        storage.write_events = timer.wrap('wal write', storage.write_events)
+
+        state_manager = raiden.wal.state_manager
+        state_manager.copy_state = timer.wrap('dispatch', state_manager.copy_state)
+        state_manager.state_transition = timer.wrap('dispatch', state_manager.state_transition)
+
+        raiden.sign = timer.wrap('signing', raiden.sign)
+        raiden.protocol.send_async = timer.wrap('send', raiden.protocol.send_async)
+
+
+def make_transfers(workload, services, edges, number_of_transfers):
+    if workload == 'direct':
+        pairs = edges + [(partner, node) for node, partner in edges]
+    else:
+        graph = networkx.Graph(edges)
+        pairs = [
+            (node, target)
+            for node, targets in networkx.all_pairs_shortest_path_length(graph)
+            for target, length in targets.items()
+            if length >= 2
+        ]
+
+    if not pairs:
+        raise ValueError('The topology has no pairs of nodes for {} transfers'.format(workload))
+
+    transfers = list()
+    for identifier in range(1, number_of_transfers + 1):
+        node, target = random.choice(pairs)
+        transfers.append((identifier, services[node], services[target].address))
+
+    return transfers
+
+
+def run(workload, transfers, token_network_identifier, tracker, concurrency, amount):
+    latencies = list()
+    failures = list()
+
+    def transfer(identifier, raiden, target):
+        result = tracker.start(identifier)
+        start = time.perf_counter()
+
+        if workload == 'direct':
+            raiden.direct_transfer_async(token_network_identifier, amount, target, identifier)
+        else:
+            raiden.mediated_transfer_async(token_network_identifier, amount, target, identifier)
+
+        if result.get():
+            latencies.append(time.perf_counter() - start)
+        else:
+            failures.append(identifier)
+
+    pool = Pool(concurrency)
+    start = time.perf_counter()
+    for identifier, raiden, target in transfers:
+        pool.spawn(transfer, identifier, raiden, target)
+    pool.join(raise_error=True)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, sorted(latencies), failures
+
+
+def percentile(sorted_values, fraction):
+    position = max(int(round(fraction * len(sorted_values))) - 1, 0)
+    return sorted_values[position]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', type=int, default=5)
+    parser.add_argument('--topology', choices=TOPOLOGIES, default='line')
+    parser.add_argument('--workload', choices=WORKLOADS, default='mediated')
+    parser.add_argument('--transfers', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--amount', type=int, default=1)
+    parser.add_argument('--partitioned-state', action='store_true')
+    parser.add_argument('--disable-metrics', action='store_true')
+    args = parser.parse_args()
+
+    configure_logging({'': 'ERROR'})
+    REGISTRY.enabled = not args.disable_metrics
+
+    deposit = args.amount * args.transfers
+    services, edges, token_network_identifier = make_network(
+        args.nodes,
+        args.topology,
+        deposit,
+        args.partitioned_state,
+    )
+    transfers = make_transfers(args.workload, services, edges, args.transfers)
+
+    tracker = TransferTracker()
+    on_raiden_event = raiden_service.on_raiden_event
+
+    def tracked_on_raiden_event(raiden, event):
+        on_raiden_event(raiden, event)
+        tracker.on_raiden_event(raiden, event)
+
+    raiden_service.on_raiden_event = tracked_on_raiden_event
+
+    timer = PhaseTimer()
+    instrument(services, timer)
+
+    elapsed, latencies, failures = run(
+        args.workload,
+        transfers,
+        token_network_identifier,
+        tracker,
+        args.concurrency,
+        args.amount,
+    )
+
+    for raiden in services:
+        raiden.stop()
+    gevent.sleep(0)
+
+    print('{} {} transfers, {} nodes in a {}, concurrency {}'.format(
+        len(transfers),
+        args.workload,
+        args.nodes,
+        args.topology,
+        args.concurrency,
+    ))
+    print('completed  failed  elapsed   transfers/s  p50 ms   p99 ms')
+    print('{:<10} {:<7} {:<9.2f} {:<12.1f} {:<8.2f} {:.2f}'.format(
+        len(latencies),
+        len(failures),
+        elapsed,
+        len(latencies) / elapsed,
+        percentile(latencies, 0.5) * 1000 if latencies else 0,
+        percentile(latencies, 0.99) * 1000 if latencies else 0,
+    ))
+    print()
+    print('phase      calls     total s   mean us   % of elapsed')
+    for phase in PHASES:
+        seconds = timer.phases_to_seconds[phase]
+        calls = timer.phases_to_calls[phase]
+        print('{:<10} {:<9} {:<9.2f} {:<9.1f} {:.1f}'.format(
+            phase,
+            calls,
+            seconds,
+            seconds / calls * 1e6 if calls else 0,
+            seconds / elapsed * 100,
+        ))
+
+
+if __name__ == '__main__':
+    main()
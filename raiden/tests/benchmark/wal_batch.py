@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Measures how many payments per second can be written to the write-ahead-log
+when each payment is logged on its own, as `RaidenAPI.transfer_async` does,
+and when the payments are logged with a group commit, as
+`RaidenAPI.transfer_batch_async` does.
+
+The state changes are the `ActionInitInitiator` of the payments and the
+database is a file, so the cost of the commits is included. The state
+transition is a no-op, since it's the same with and without batching.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from raiden.storage.serialize import PickleSerializer
+from raiden.storage.sqlite import SQLiteStorage
+from raiden.storage.wal import WriteAheadLog
+from raiden.tests.utils import factories
+from raiden.transfer.architecture import StateManager, TransitionResult
+from raiden.transfer.mediated_transfer.state import TransferDescriptionWithSecretState
+from raiden.transfer.mediated_transfer.state_change import ActionInitInitiator
+from raiden.transfer.state import RouteState
+from raiden.utils import sha3
+
+
+def state_transition_noop(state, state_change):  # pylint: disable=unused-argument
+    return TransitionResult(state, list())
+
+
+def make_payments(number_of_payments, number_of_routes):
+    routes = [
+        RouteState(factories.make_address(), factories.make_address())
+        for _ in range(number_of_routes)
+    ]
+
+    payments = list()
+    for identifier in range(number_of_payments):
+        transfer = TransferDescriptionWithSecretState(
+            identifier,
+            factories.UNIT_TRANSFER_AMOUNT,
+            factories.UNIT_TOKEN_NETWORK_ADDRESS,
+            factories.UNIT_TRANSFER_INITIATOR,
+            factories.UNIT_TRANSFER_TARGET,
+            sha3(identifier.to_bytes(8, 'big')),
+        )
+        payments.append(ActionInitInitiator(transfer, list(routes)))
+
+    return payments
+
+
+def run(database_path, payments, batch_size):
+    storage = SQLiteStorage(database_path, PickleSerializer)
+    wal = WriteAheadLog(StateManager(state_transition_noop, None), storage)
+
+    start = time.time()
+    if batch_size == 1:
+        for state_change in payments:
+            wal.log_and_dispatch(state_change, 1)
+    else:
+        for position in range(0, len(payments), batch_size):
+            wal.log_and_dispatch_batch(payments[position:position + batch_size], 1)
+    elapsed = time.time() - start
+
+    storage.conn.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--payments', type=int, default=2000)
+    parser.add_argument('--routes', type=int, default=3)
+    parser.add_argument('--batch', type=int, action='append')
+    args = parser.parse_args()
+
+    batch_sizes = args.batch or [1, 10, 100, 1000]
+    payments = make_payments(args.payments, args.routes)
+
+    print('batch     elapsed   payments/s')
+    with tempfile.TemporaryDirectory() as directory:
+        for batch_size in batch_sizes:
+            database_path = os.path.join(directory, 'batch{}.db'.format(batch_size))
+            elapsed = run(database_path, payments, batch_size)
+
+            print('{:<9} {:<9.3f} {:.1f}'.format(
+                batch_size,
+                elapsed,
+                len(payments) / elapsed,
+            ))
+
+
+if __name__ == '__main__':
+    main()
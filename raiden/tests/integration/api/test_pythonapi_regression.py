@@ -37,7 +37,6 @@ def test_close_regression(raiden_network, deposit, token_addresses):
         app0.raiden.default_registry.address,
         token_address,
         [channel12.identifier],
-        app0.raiden.alarm.wait_time,
     )
     node1_expected_balance = node1_balance_before + deposit - amount
     node2_expected_balance = node2_balance_before + deposit + amount
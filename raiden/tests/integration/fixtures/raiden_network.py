@@ -41,7 +41,6 @@ def wait_for_usable_channel(
         token_address,
         our_deposit,
         partner_deposit,
-        events_poll_timeout=0.5,
 ):
     """ Wait until the channel from app0 to app1 is usable.
 
@@ -53,7 +52,6 @@ def wait_for_usable_channel(
         registry_address,
         token_address,
         app1.raiden.address,
-        events_poll_timeout,
     )
 
     waiting.wait_for_participant_newbalance(
@@ -63,7 +61,6 @@ def wait_for_usable_channel(
         app1.raiden.address,
         app0.raiden.address,
         our_deposit,
-        events_poll_timeout,
     )
 
     waiting.wait_for_participant_newbalance(
@@ -73,13 +70,11 @@ def wait_for_usable_channel(
         app1.raiden.address,
         app1.raiden.address,
         partner_deposit,
-        events_poll_timeout,
     )
 
     waiting.wait_for_healthy(
         app0.raiden,
         app1.raiden.address,
-        events_poll_timeout,
     )
 
 
@@ -88,7 +83,6 @@ def wait_for_channels(
         registry_address,
         token_addresses,
         deposit,
-        events_poll_timeout=0.5,
 ):
     """ Wait until all channels are usable from both directions. """
     for app0, app1 in app_channels:
@@ -100,7 +94,6 @@ def wait_for_channels(
                 token_address,
                 deposit,
                 deposit,
-                events_poll_timeout,
             )
             wait_for_usable_channel(
                 app1,
@@ -109,7 +102,6 @@ def wait_for_channels(
                 token_address,
                 deposit,
                 deposit,
-                events_poll_timeout,
             )
 
 
@@ -145,7 +145,6 @@ def test_new_netting_contract(raiden_network, token_amount, settle_timeout):
         registry_address,
         token_address,
         [netting_address_01],
-        app1.raiden.alarm.wait_time,
     )
 
     with pytest.raises(AddressWithoutCode):
@@ -55,7 +55,6 @@ def test_settle_is_automatically_called(raiden_network, token_addresses, deposit
         registry_address,
         token_address,
         [channel_identifier],
-        app0.raiden.alarm.wait_time,
     )
 
     assert_synched_channel_state(
@@ -168,7 +167,6 @@ def test_withdraw(raiden_network, token_addresses, deposit):
         registry_address,
         token_address,
         [alice_bob_channel.identifier],
-        alice_app.raiden.alarm.wait_time,
     )
 
     alice_bob_channel = get_channelstate(alice_app, bob_app, token_network_identifier)
@@ -264,7 +262,6 @@ def test_settled_lock(token_addresses, raiden_network, deposit):
         app1.raiden.default_registry.address,
         token_address,
         [channelstate_0_1.identifier],
-        app1.raiden.alarm.wait_time,
     )
 
     expected_balance0 = initial_balance0 + deposit0 - amount * 2
@@ -314,7 +311,6 @@ def test_close_channel_lack_of_balance_proof(raiden_chain, deposit, token_addres
         app0.raiden.default_registry.address,
         token_address,
         [channel_state.identifier],
-        app0.raiden.alarm.wait_time,
     )
 
     expected_balance0 = initial_balance0 + deposit - amount
@@ -478,7 +474,6 @@ def test_automatic_dispute(raiden_network, deposit, token_addresses):
         registry_address,
         token_address,
         [channel0.identifier],
-        app0.raiden.alarm.wait_time,
     )
 
     # check that the channel is properly settled and that Bob's client
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import os
+
+from eth_abi import encode_abi, encode_single
+from eth_utils import (
+    encode_hex,
+    event_abi_to_log_topic,
+    function_abi_to_4byte_selector,
+    to_checksum_address,
+)
+from hexbytes import HexBytes
+from web3.utils.events import get_event_data
+
+from raiden.network.rpc.smartcontract_proxy import get_codec
+
+TRANSFER_EVENT_ABI = {
+    'type': 'event',
+    'name': 'Transfer',
+    'anonymous': False,
+    'inputs': [
+        {'name': 'from', 'type': 'address', 'indexed': True},
+        {'name': 'to', 'type': 'address', 'indexed': True},
+        {'name': 'value', 'type': 'uint256', 'indexed': False},
+        {'name': 'memo', 'type': 'string', 'indexed': False},
+    ],
+}
+TRANSFER_FUNCTION_ABI = {
+    'type': 'function',
+    'name': 'transfer',
+    'constant': False,
+    'inputs': [
+        {'name': 'to', 'type': 'address'},
+        {'name': 'value', 'type': 'uint256'},
+    ],
+    'outputs': [{'name': '', 'type': 'bool'}],
+}
+ABI = [TRANSFER_EVENT_ABI, TRANSFER_FUNCTION_ABI]
+
+
+def test_codec_is_cached_per_abi():
+    assert get_codec(ABI) is get_codec(ABI)
+    assert get_codec(ABI) is not get_codec(list(ABI))
+
+
+def test_codec_encodes_function_calls():
+    to = os.urandom(20)
+    call_data = get_codec(ABI).function('transfer', [to, 10]).encode_call([to, 10])
+
+    selector = function_abi_to_4byte_selector(TRANSFER_FUNCTION_ABI)
+    assert call_data == selector + encode_abi(['address', 'uint256'], [to, 10])
+
+
+def test_codec_decodes_events_as_web3():
+    sender, receiver = os.urandom(20), os.urandom(20)
+    log = {
+        'address': to_checksum_address(os.urandom(20)),
+        'topics': [
+            HexBytes(event_abi_to_log_topic(TRANSFER_EVENT_ABI)),
+            HexBytes(encode_single('address', sender)),
+            HexBytes(encode_single('address', receiver)),
+        ],
+        'data': encode_hex(encode_abi(['uint256', 'string'], [10, 'raiden'])),
+        'blockNumber': 1,
+        'blockHash': HexBytes(os.urandom(32)),
+        'transactionHash': HexBytes(os.urandom(32)),
+        'transactionIndex': 0,
+        'logIndex': 0,
+    }
+
+    decoded = get_codec(ABI).decode_event(log)
+    assert decoded == get_event_data(TRANSFER_EVENT_ABI, log)
+    assert decoded['args']['from'] == to_checksum_address(sender)
+    assert decoded['args']['value'] == 10
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import socket
+import tempfile
+from types import SimpleNamespace
+
+import gevent
+import gevent.socket
+
+from raiden.network.blockchain_service import BlockChainService
+from raiden.settings import (
+    ALARM_BLOCKTIME_ESTIMATE_INTERVAL,
+    ALARM_MAX_WAIT_TIME,
+    ALARM_MIN_WAIT_TIME,
+    DEFAULT_ALARM_WAIT_TIME,
+)
+from raiden.tasks import AlarmTask, PollingBlockSource, wait_time_for
+from raiden.tests.utils import factories
+
+
+class MockChain:
+    def __init__(self, block_time=0.5):
+        self.current_block = 1
+        self.block_time = block_time
+
+    def block_number(self):
+        return self.current_block
+
+    def estimate_blocktime(self):
+        return self.block_time
+
+
+def test_wait_time_for():
+    assert wait_time_for(0) == ALARM_MIN_WAIT_TIME
+    assert wait_time_for(0.5) == 0.05
+    assert wait_time_for(1000) == ALARM_MAX_WAIT_TIME
+
+
+def test_slow_callbacks_dont_stall_block_detection():
+    chain = MockChain()
+    alarm = AlarmTask(chain)
+
+    called_blocks = list()
+
+    def slow_callback(block_number):
+        called_blocks.append(block_number)
+        gevent.sleep(0.3)
+
+    alarm.register_callback(slow_callback)
+    alarm.start()
+
+    chain.current_block = 2
+    gevent.sleep(0.1)
+    for block_number in range(3, 6):
+        chain.current_block = block_number
+        gevent.sleep(0.06)
+
+    # The blocks were detected while the first callback was running
+    assert alarm.last_block_number == 5
+    assert called_blocks == [2]
+
+    gevent.sleep(0.3)
+    alarm.stop_and_wait()
+
+    # The callbacks are only executed for the latest block
+    assert called_blocks == [2, 5]
+    assert alarm.work_time >= 0.3
+
+
+def test_alarm_receives_new_heads_from_ipc():
+    chain = MockChain(block_time=1000)
+
+    with tempfile.TemporaryDirectory() as directory:
+        ipc_path = os.path.join(directory, 'geth.ipc')
+        server = gevent.socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(ipc_path)
+        server.listen(1)
+
+        alarm = AlarmTask(chain, ipc_path)
+        called_blocks = list()
+        alarm.register_callback(called_blocks.append)
+        alarm.start()
+
+        connection, _ = server.accept()
+        request = json.loads(connection.recv(4096).decode())
+        assert request['method'] == 'eth_subscribe'
+        assert request['params'] == ['newHeads']
+
+        response = {'jsonrpc': '2.0', 'id': request['id'], 'result': '0x1'}
+        connection.sendall(json.dumps(response).encode())
+
+        # A message may be split across reads
+        notification = json.dumps({
+            'jsonrpc': '2.0',
+            'method': 'eth_subscription',
+            'params': {'subscription': '0x1', 'result': {'number': '0x2'}},
+        }).encode()
+        connection.sendall(notification[:10])
+        gevent.sleep(0.01)
+        connection.sendall(notification[10:])
+        gevent.sleep(0.01)
+
+        # The polling interval is too large to have detected the block
+        assert called_blocks == [2]
+
+        # Losing the subscription falls back to polling
+        connection.close()
+        alarm.polling.wait_time = ALARM_MIN_WAIT_TIME
+        chain.current_block = 3
+        gevent.sleep(0.2)
+        assert called_blocks == [2, 3]
+
+        alarm.stop_and_wait()
+        server.close()
+
+
+class MockEth:
+    def __init__(self, blocks_to_timestamp):
+        self.blocks_to_timestamp = blocks_to_timestamp
+
+    def getBlock(self, block_number, full_transactions):  # pylint: disable=invalid-name
+        return {'number': block_number, 'timestamp': self.blocks_to_timestamp[block_number]}
+
+
+def make_blockchain_service(block_number, blocks_to_timestamp):
+    privkey, _ = factories.make_privkey_address()
+    client = SimpleNamespace(
+        block_number=lambda: block_number,
+        web3=SimpleNamespace(eth=MockEth(blocks_to_timestamp)),
+    )
+    return BlockChainService(privkey.secret, client)
+
+
+def test_polling_uses_the_block_time_estimate():
+    chain = make_blockchain_service(300, {44: 1000, 300: 1000 + 256 * 15})
+    assert chain.estimate_blocktime() == 15
+
+    polling = PollingBlockSource(chain)
+    polling.update_wait_time(300)
+    assert polling.block_time == 15
+    assert polling.wait_time == wait_time_for(15)
+
+
+def test_polling_falls_back_if_the_estimate_fails():
+    # The node doesn't have the old block
+    chain = make_blockchain_service(300, {300: 1000})
+
+    polling = PollingBlockSource(chain)
+    polling.update_wait_time(300)
+    assert polling.block_time is None
+    assert polling.wait_time == DEFAULT_ALARM_WAIT_TIME
+
+    # The estimate is retried after the usual interval
+    chain.client.web3.eth.blocks_to_timestamp[44] = 0
+    polling.update_wait_time(301)
+    assert polling.block_time is None
+
+    polling.update_wait_time(300 + ALARM_BLOCKTIME_ESTIMATE_INTERVAL)
+    assert polling.block_time is not None
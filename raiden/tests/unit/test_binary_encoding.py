@@ -5,10 +5,16 @@ import pytest
 
 from raiden.messages import (
     decode,
+    DeliveredBatch,
     Processed,
     Ping,
 )
-from raiden.constants import UINT256_MAX, UINT64_MAX
+from raiden.constants import (
+    UDP_CAPABILITY_ENVELOPE,
+    UDP_MAX_MESSAGE_SIZE,
+    UINT256_MAX,
+    UINT64_MAX,
+)
 from raiden.utils import sha3
 from raiden.tests.utils.messages import (
     make_direct_transfer,
@@ -109,3 +115,34 @@ def test_refund_transfer_min_max(amount, payment_identifier, nonce, transferred_
 
     refund_transfer.sign(PRIVKEY, ADDRESS)
     assert decode(refund_transfer.encode()) == refund_transfer
+
+
+def test_ping_capabilities():
+    ping = Ping(nonce=1, capabilities=UDP_CAPABILITY_ENVELOPE)
+    ping.sign(PRIVKEY, ADDRESS)
+    decoded_ping = decode(ping.encode())
+    assert decoded_ping.capabilities == UDP_CAPABILITY_ENVELOPE
+    assert decoded_ping.sender == ADDRESS
+
+
+@pytest.mark.parametrize('message_identifiers', [[0], [1, 2, 3], [UINT64_MAX] * 141])
+def test_delivered_batch(message_identifiers):
+    delivered_batch = DeliveredBatch(message_identifiers)
+    delivered_batch.sign(PRIVKEY, ADDRESS)
+
+    data = delivered_batch.encode()
+    decoded_batch = decode(data)
+
+    assert isinstance(decoded_batch, DeliveredBatch)
+    assert decoded_batch.sender == ADDRESS
+    assert decoded_batch.delivered_message_identifiers == message_identifiers
+    assert decoded_batch.hash == delivered_batch.hash
+    assert len(data) <= UDP_MAX_MESSAGE_SIZE
+
+
+def test_delivered_batch_invalid_size():
+    delivered_batch = DeliveredBatch([1, 2])
+    delivered_batch.sign(PRIVKEY, ADDRESS)
+
+    assert decode(delivered_batch.encode()[:-1]) is None
+    assert decode(delivered_batch.encode()[:4] + delivered_batch.signature) is None
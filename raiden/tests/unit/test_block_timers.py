@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import random
+
+import networkx
+
+from raiden.settings import DEFAULT_NUMBER_OF_CONFIRMATIONS_BLOCK
+from raiden.tests.utils import factories
+from raiden.transfer import node
+from raiden.transfer.events import ContractSendChannelSettle
+from raiden.transfer.state import (
+    BlockTimersState,
+    NodeState,
+    TokenNetworkGraphState,
+    TokenNetworkState,
+    TransactionChannelNewBalance,
+)
+from raiden.transfer.state_change import (
+    ActionNewTokenNetwork,
+    Block,
+    ContractReceiveChannelClosed,
+    ContractReceiveChannelNewBalance,
+)
+
+
+def test_block_only_visits_due_channels():
+    block_number = 1
+    payment_network_identifier = factories.make_address()
+    token_network_identifier = factories.make_address()
+    token_address = factories.make_address()
+
+    channels = [
+        factories.make_channel(
+            token_address=token_address,
+            token_network_identifier=token_network_identifier,
+        )
+        for _ in range(3)
+    ]
+    closed_channel, deposit_channel, _ = channels
+
+    node_state = NodeState(random.Random(), block_number)
+    token_network_state = TokenNetworkState(
+        token_network_identifier,
+        token_address,
+        TokenNetworkGraphState(networkx.Graph()),
+        channels,
+    )
+    node.state_transition(
+        node_state,
+        ActionNewTokenNetwork(payment_network_identifier, token_network_state),
+    )
+
+    # Open channels without pending deposits have nothing to do on a block
+    assert not node_state.block_timers.keys_to_block
+
+    node.state_transition(node_state, ContractReceiveChannelClosed(
+        token_network_identifier,
+        closed_channel.identifier,
+        closed_channel.partner_state.address,
+        block_number,
+    ))
+    deposit = TransactionChannelNewBalance(
+        deposit_channel.our_state.address,
+        30,
+        block_number,
+    )
+    node.state_transition(node_state, ContractReceiveChannelNewBalance(
+        token_network_identifier,
+        deposit_channel.identifier,
+        deposit,
+    ))
+
+    settle_block = block_number + closed_channel.settle_timeout + 1
+    confirmation_block = block_number + DEFAULT_NUMBER_OF_CONFIRMATIONS_BLOCK + 1
+    assert node_state.block_timers.keys_to_block == {
+        (BlockTimersState.CHANNEL, (token_network_identifier, closed_channel.identifier)):
+            settle_block,
+        (BlockTimersState.CHANNEL, (token_network_identifier, deposit_channel.identifier)):
+            confirmation_block,
+    }
+
+    events = list()
+    for block_number in range(2, settle_block + 1):
+        iteration = node.state_transition(node_state, Block(block_number))
+        events.append((block_number, iteration.events))
+
+        token_network_state = node_state.identifiers_to_paymentnetworks[
+            payment_network_identifier
+        ].tokenidentifiers_to_tokennetworks[token_network_identifier]
+        deposit_channel = token_network_state.channelidentifiers_to_channels[
+            deposit_channel.identifier
+        ]
+        confirmed = deposit_channel.our_state.contract_balance == 30
+        assert confirmed == (block_number >= confirmation_block)
+
+    settle_events = [
+        (block_number, event)
+        for block_number, block_events in events
+        for event in block_events
+        if isinstance(event, ContractSendChannelSettle)
+    ]
+    assert len(settle_events) == 1
+    assert settle_events[0][0] == settle_block
+    assert settle_events[0][1].channel_identifier == closed_channel.identifier
+
+    # Every timer was consumed and the settling channel has nothing left to do
+    assert not node_state.block_timers.keys_to_block
+    assert not node_state.block_timers.queue
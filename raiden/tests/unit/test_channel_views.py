@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+import json
+import random
+from types import SimpleNamespace
+
+import networkx
+
+from raiden.api.python import RaidenAPI
+from raiden.api.rest import APIServer, RestAPI
+from raiden.channel_views import ChannelViews
+from raiden.raiden_service import RaidenService
+from raiden.tests.utils import factories
+from raiden.transfer import node
+from raiden.transfer.state import (
+    BlockTimersState,
+    NodeState,
+    PaymentNetworkState,
+    TokenNetworkGraphState,
+    TokenNetworkState,
+)
+from raiden.transfer.state_change import (
+    Block,
+    ContractReceiveChannelNewBalance,
+    ReceiveProcessed,
+)
+
+
+def make_node_state(payment_network_identifier, channels_per_token_network):
+    token_networks = list()
+    for token_network_identifier, token_address, channels in channels_per_token_network:
+        token_networks.append(TokenNetworkState(
+            token_network_identifier,
+            token_address,
+            TokenNetworkGraphState(networkx.Graph()),
+            channels,
+        ))
+
+    node_state = NodeState(random.Random(), 1)
+    node_state.identifiers_to_paymentnetworks[payment_network_identifier] = PaymentNetworkState(
+        payment_network_identifier,
+        token_networks,
+    )
+    return node_state
+
+
+def test_channel_views_are_rebuilt_only_when_stale():
+    payment_network_identifier = factories.make_address()
+    network1, token1 = factories.make_address(), factories.make_address()
+    network2, token2 = factories.make_address(), factories.make_address()
+
+    channel1 = factories.make_channel(
+        our_balance=10,
+        token_address=token1,
+        token_network_identifier=network1,
+    )
+    channel2 = factories.make_channel(
+        our_balance=20,
+        token_address=token2,
+        token_network_identifier=network2,
+    )
+
+    node_state = make_node_state(
+        payment_network_identifier,
+        [(network1, token1, [channel1]), (network2, token2, [channel2])],
+    )
+    raiden = SimpleNamespace(
+        wal=SimpleNamespace(state_manager=SimpleNamespace(current_state=node_state)),
+    )
+    channel_views = ChannelViews(raiden)
+
+    view1 = channel_views.get_view_by_token_address(payment_network_identifier, token1)
+    view2 = channel_views.get_view_by_token_address(payment_network_identifier, token2)
+    assert view1.channel_states == [channel1]
+    assert view1.open_partners == {channel1.partner_state.address}
+    assert view1.total_deposit == 10
+    assert view1.total_capacity == 10
+    assert view2.total_deposit == 20
+    assert channel_views.get_view_by_token_address(payment_network_identifier, network1) is None
+
+    # State changes that don't modify the channels keep the views
+    channel_views.state_changed(ReceiveProcessed(1))
+    assert channel_views.get_view_by_token_address(payment_network_identifier, token1) is view1
+
+    # Rebuilding a view without changes keeps the version
+    channel_views.state_changed(Block(2), {network1})
+    rebuilt_view1 = channel_views.get_view_by_token_address(payment_network_identifier, token1)
+    assert rebuilt_view1 is not view1
+    assert rebuilt_view1.version == view1.version
+    assert channel_views.get_view_by_token_address(payment_network_identifier, token2) is view2
+
+    # Only the token network of the state change is rebuilt
+    channel1.our_state.contract_balance = 15
+    new_balance = ContractReceiveChannelNewBalance(network1, channel1.identifier, None)
+    channel_views.state_changed(new_balance)
+
+    new_view1 = channel_views.get_view_by_token_address(payment_network_identifier, token1)
+    new_view2 = channel_views.get_view_by_token_address(payment_network_identifier, token2)
+    assert new_view1.version != view1.version
+    assert new_view1.total_deposit == 15
+    assert new_view2.version == view2.version
+
+
+def test_block_marks_only_the_due_token_networks_as_stale():
+    payment_network_identifier = factories.make_address()
+    network1, token1 = factories.make_address(), factories.make_address()
+    network2, token2 = factories.make_address(), factories.make_address()
+    channel1 = factories.make_channel(token_address=token1, token_network_identifier=network1)
+    channel2 = factories.make_channel(token_address=token2, token_network_identifier=network2)
+
+    node_state = make_node_state(
+        payment_network_identifier,
+        [(network1, token1, [channel1]), (network2, token2, [channel2])],
+    )
+    node.schedule_block_timer(
+        node_state,
+        BlockTimersState.CHANNEL,
+        (network1, channel1.identifier),
+        5,
+    )
+    raiden = SimpleNamespace(
+        wal=SimpleNamespace(state_manager=SimpleNamespace(current_state=node_state)),
+    )
+    channel_views = ChannelViews(raiden)
+
+    assert RaidenService.get_due_token_networks(raiden, ReceiveProcessed(1)) == ()
+    assert RaidenService.get_due_token_networks(raiden, Block(4)) == set()
+    assert RaidenService.get_due_token_networks(raiden, Block(5)) == {network1}
+
+    view1 = channel_views.get_view_by_token_address(payment_network_identifier, token1)
+    view2 = channel_views.get_view_by_token_address(payment_network_identifier, token2)
+
+    channel_views.state_changed(Block(4), set())
+    assert channel_views.get_view_by_token_address(payment_network_identifier, token1) is view1
+
+    channel_views.state_changed(Block(5), {network1})
+    assert channel_views.get_view_by_token_address(payment_network_identifier, token1) is not view1
+    assert channel_views.get_view_by_token_address(payment_network_identifier, token2) is view2
+
+
+def test_rest_channels_etag():
+    payment_network_identifier = factories.make_address()
+    network, token = factories.make_address(), factories.make_address()
+    channel_state = factories.make_channel(
+        our_balance=10,
+        token_address=token,
+        token_network_identifier=network,
+    )
+
+    node_state = make_node_state(payment_network_identifier, [(network, token, [channel_state])])
+    raiden = SimpleNamespace(
+        default_registry=SimpleNamespace(address=payment_network_identifier),
+        wal=SimpleNamespace(state_manager=SimpleNamespace(current_state=node_state)),
+    )
+    raiden.channel_views = ChannelViews(raiden)
+    client = APIServer(RestAPI(RaidenAPI(raiden))).flask_app.test_client()
+
+    response = client.get('/api/1/channels')
+    etag = response.headers['ETag']
+    assert response.status_code == 200
+    assert json.loads(response.get_data(as_text=True))[0]['balance'] == 10
+
+    response = client.get('/api/1/channels', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.headers['ETag'] == etag
+
+    channel_state.our_state.contract_balance = 15
+    raiden.channel_views.state_changed(
+        ContractReceiveChannelNewBalance(network, channel_state.identifier, None),
+    )
+    response = client.get('/api/1/channels', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert json.loads(response.get_data(as_text=True))[0]['balance'] == 15
@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+from click.testing import CliRunner
+
 from raiden.utils import (
     is_minified_address,
     is_supported_client,
@@ -78,3 +80,40 @@ def test_minified_address_checker():
     assert not is_minified_address('xxxxxx')
     assert not is_minified_address('123zzz')
     assert not is_minified_address('$@$^$')
+
+
+def help_sections():
+    """ The options of `raiden --help`, by section. """
+    from raiden.ui.cli import run
+
+    result = CliRunner().invoke(run, ['--help'])
+    assert result.exit_code == 0
+
+    sections = dict()
+    options = None
+    for line in result.output.splitlines():
+        if line and not line.startswith(' ') and line.endswith(':'):
+            options = sections.setdefault(line[:-1], list())
+        elif line.startswith('  --') and options is not None:
+            options.append(line.split()[0])
+
+    return sections
+
+
+def test_udp_transport_options_group():
+    udp_options = help_sections()['UDP Transport Options']
+
+    assert '--packet-coalescing' in udp_options
+    assert '--batch-delivered' in udp_options
+    assert '--protocol-peer-throttle-capacity' in udp_options
+    assert '--protocol-peer-throttle-fill-rate' in udp_options
+
+
+def test_hub_monitor_is_disabled_by_default():
+    from raiden.ui.cli import run
+
+    defaults = {
+        param.name: param.default
+        for param in run.params
+    }
+    assert not defaults['hub_block_threshold']
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import subprocess
+import sys
+
+# Imported only by the commands which use them
+HEAVY_MODULES = (
+    'IPython',
+    'flask',
+    'marshmallow',
+    'matrix_client',
+    'networkx',
+    'raiden.api.rest',
+    'raiden.network.matrixtransport',
+    'raiden.network.rpc',
+    'raiden.network.transport',
+    'raiden.raiden_service',
+    'raiden.utils.profiling',
+    'raiden.utils.solc',
+    'requests',
+    'web3',
+    'webargs',
+)
+
+# Generous, the import takes a fraction of it, this only catches regressions
+# which bring back the heavy modules on a slow machine
+IMPORT_BUDGET = 5.0
+
+IMPORT_CLI = '''
+import sys
+import time
+
+start = time.perf_counter()
+import raiden.ui.cli
+print(time.perf_counter() - start)
+print('\\n'.join(sys.modules))
+'''
+
+
+def test_cli_import_is_light():
+    output = subprocess.check_output(
+        [sys.executable, '-c', IMPORT_CLI],
+        universal_newlines=True,
+    )
+    elapsed, *modules = output.splitlines()
+
+    heavy_modules = sorted(
+        module
+        for module in modules
+        if any(module == heavy or module.startswith(heavy + '.') for heavy in HEAVY_MODULES)
+    )
+    assert heavy_modules == []
+    assert float(elapsed) < IMPORT_BUDGET
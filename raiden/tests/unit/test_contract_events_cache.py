@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from types import SimpleNamespace
+
+from raiden.blockchain import events
+from raiden.blockchain.events import ContractEventsCache
+from raiden.storage.serialize import PickleSerializer
+from raiden.storage.sqlite import SQLiteStorage
+from raiden.tests.utils import factories
+
+
+def test_contract_events_cache(monkeypatch):
+    contract_address = factories.make_address()
+    blockchain_events = [
+        {'event': b'ChannelNew', 'block_number': block_number}
+        for block_number in range(0, 100, 10)
+    ]
+    fetched_ranges = list()
+
+    def get_contract_events(chain, abi, address, topics, from_block, to_block):
+        fetched_ranges.append((from_block, to_block))
+        return [
+            dict(event)
+            for event in blockchain_events
+            if from_block <= event['block_number'] <= to_block
+        ]
+
+    monkeypatch.setattr(events, 'get_contract_events', get_contract_events)
+
+    chain = SimpleNamespace(block_number=lambda: 95)
+    storage = SQLiteStorage(':memory:', PickleSerializer)
+    cache = ContractEventsCache(chain, storage, confirmations=10)
+
+    result = cache.get_events(None, contract_address, 20, 'latest')
+    assert [event['block_number'] for event in result] == [20, 30, 40, 50, 60, 70, 80, 90]
+    assert fetched_ranges == [(20, 85), (86, 95)]
+    assert storage.get_contract_events_range(contract_address) == (20, 85)
+
+    # Only the unconfirmed tail is queried again
+    del fetched_ranges[:]
+    result = cache.get_events(None, contract_address, 30, 85, ['ChannelNew'])
+    assert [event['block_number'] for event in result] == [30, 40, 50, 60, 70, 80]
+    assert fetched_ranges == []
+
+    # The stored range is extended to cover the query
+    result = cache.get_events(None, contract_address, 0, 15)
+    assert [event['block_number'] for event in result] == [0, 10]
+    assert fetched_ranges == [(0, 19)]
+    assert storage.get_contract_events_range(contract_address) == (0, 85)
+
+    result = cache.get_events(None, contract_address, 0, 'latest', ['ChannelClosed'])
+    assert result == []
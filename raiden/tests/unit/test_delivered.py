@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import random
+
+import gevent
+
+from raiden.messages import DeliveredBatch
+from raiden.network.transport.udp.delivered import DeliveredAggregator
+from raiden.tests.utils import factories
+from raiden.transfer import node
+from raiden.transfer.events import SendProcessed
+from raiden.transfer.state import NodeState
+from raiden.transfer.state_change import ReceiveDeliveredBatch
+
+# Room for three identifiers
+THREE_IDENTIFIERS_SIZE = (
+    DeliveredBatch.HEADER_SIZE +
+    DeliveredBatch.SIGNATURE_SIZE +
+    3 * DeliveredBatch.IDENTIFIER_SIZE
+)
+
+
+def test_delivered_aggregator_flushes_when_full():
+    sent = list()
+    sender = factories.make_address()
+    aggregator = DeliveredAggregator(
+        lambda recipient, identifiers: sent.append((recipient, identifiers)),
+        flush_delay=60,
+        max_size=THREE_IDENTIFIERS_SIZE,
+    )
+
+    aggregator.add(sender, 1)
+    aggregator.add(sender, 2)
+    aggregator.add(sender, 2)
+    assert sent == []
+
+    aggregator.add(sender, 3)
+    assert sent == [(sender, [1, 2, 3])]
+    assert not aggregator.senders_to_identifiers
+    assert not aggregator.senders_to_flush
+
+    aggregator.add(sender, 4)
+    aggregator.stop()
+    assert sent == [(sender, [1, 2, 3])]
+
+
+def test_delivered_aggregator_flushes_after_delay():
+    sent = list()
+    first = factories.make_address()
+    second = factories.make_address()
+    aggregator = DeliveredAggregator(
+        lambda recipient, identifiers: sent.append((recipient, identifiers)),
+        flush_delay=0.01,
+    )
+
+    aggregator.add(first, 1)
+    aggregator.add(second, 2)
+    aggregator.add(first, 3)
+    assert sent == []
+
+    gevent.sleep(0.05)
+    assert sorted(sent) == sorted([(first, [1, 3]), (second, [2])])
+    assert not aggregator.senders_to_flush
+
+
+def test_delivered_batch_clears_the_queues():
+    node_state = NodeState(random.Random(), 1)
+    partner = factories.make_address()
+    other_partner = factories.make_address()
+    channel_identifier = factories.make_address()
+
+    global_queue = [
+        SendProcessed(partner, 'global', message_identifier)
+        for message_identifier in (1, 2, 3)
+    ]
+    other_global_queue = [SendProcessed(other_partner, 'global', 2)]
+    channel_queue = [SendProcessed(partner, channel_identifier, 1)]
+    node_state.queueids_to_queues[(partner, 'global')] = global_queue
+    node_state.queueids_to_queues[(other_partner, 'global')] = other_global_queue
+    node_state.queueids_to_queues[(partner, channel_identifier)] = channel_queue
+
+    iteration = node.state_transition(node_state, ReceiveDeliveredBatch([1, 2]))
+
+    queues = iteration.new_state.queueids_to_queues
+    assert iteration.events == []
+    assert [message.message_identifier for message in queues[(partner, 'global')]] == [3]
+    assert queues[(other_partner, 'global')] == []
+    assert queues[(partner, channel_identifier)] == channel_queue
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from raiden.api import rest
+from raiden.api.python import (
+    EventsCursor,
+    RaidenAPI,
+    decode_events_cursor,
+    encode_events_cursor,
+    paginate_events,
+)
+from raiden.api.rest import APIServer, RestAPI
+from raiden.tests.utils import factories
+from raiden.transfer.events import EventTransferSentFailed
+from raiden.utils import address_encoder
+
+
+def make_events(*block_numbers):
+    return [
+        {'block_number': block_number, 'event': 'Event{}'.format(position)}
+        for position, block_number in enumerate(block_numbers)
+    ]
+
+
+def test_events_cursor_encoding():
+    cursor = EventsCursor(10, 2)
+    assert decode_events_cursor(encode_events_cursor(cursor)) == cursor
+
+    for invalid in ('', '10', '10-a', '-1-2', '1-2-3'):
+        with pytest.raises(ValueError):
+            decode_events_cursor(invalid)
+
+
+def test_paginate_events():
+    events = make_events(1, 1, 2, 2, 2, 3)
+
+    pages = list()
+    cursor = None
+    while True:
+        page, cursor = paginate_events(events, cursor, limit=2)
+        pages.append(page)
+
+        if cursor is None:
+            break
+
+    assert pages == [events[0:2], events[2:4], events[4:6]]
+
+    page, cursor = paginate_events(events, EventsCursor(2, 1))
+    assert page == events[3:]
+    assert cursor is None
+
+    # A page that ends with the last event doesn't have a next page
+    page, cursor = paginate_events(events, None, limit=len(events))
+    assert page == events
+    assert cursor is None
+
+
+class MockContractEvents:
+    def __init__(self, events):
+        self.events = events
+        self.queries = list()
+
+    def get_events(self, abi, contract_address, from_block, to_block, event_types):
+        self.queries.append((from_block, to_block))
+        return [
+            dict(event)
+            for event in self.events
+            if from_block <= event['block_number'] <= to_block
+        ]
+
+
+def make_raiden(chain_events, raiden_events, block_number):
+    def iter_events_by_block(from_block, to_block):
+        return [
+            (event_block, event)
+            for event_block, event in raiden_events
+            if from_block <= event_block <= to_block
+        ]
+
+    return SimpleNamespace(
+        chain=SimpleNamespace(block_number=lambda: block_number),
+        contract_events=MockContractEvents(chain_events),
+        default_registry=SimpleNamespace(address=factories.make_address()),
+        wal=SimpleNamespace(storage=SimpleNamespace(iter_events_by_block=iter_events_by_block)),
+    )
+
+
+def make_chain_events(*block_numbers):
+    return [
+        {'block_number': block_number, 'event': b'ChannelNewBalance', 'position': position}
+        for position, block_number in enumerate(block_numbers)
+    ]
+
+
+def test_iter_events_chunks_only_when_asked():
+    chain_events = make_chain_events(1, 1, 3, 5, 8)
+    raiden_events = [
+        (3, EventTransferSentFailed(1, 'no route')),
+        (9, EventTransferSentFailed(2, 'no route')),
+    ]
+    raiden = make_raiden(chain_events, raiden_events, block_number=9)
+    api = RaidenAPI(raiden)
+    channel_address = factories.make_address()
+
+    events = list(api.iter_channel_events(channel_address, 0))
+    assert raiden.contract_events.queries == [(0, 9)]
+    assert [event['block_number'] for event in events] == [1, 1, 3, 3, 5, 8, 9]
+    assert events[3]['event'] == 'EventTransferSentFailed'
+
+    raiden.contract_events.queries.clear()
+    chunked_events = list(api.iter_channel_events(channel_address, 0, chunk_size=4))
+    assert raiden.contract_events.queries == [(0, 3), (4, 7), (8, 9)]
+    assert chunked_events == events
+
+    # A consumer that stops early doesn't read the rest of the range
+    raiden.contract_events.queries.clear()
+    next(api.iter_channel_events(channel_address, 0, chunk_size=4))
+    assert raiden.contract_events.queries == [(0, 3)]
+
+    # The internal events are not registry events
+    network_events = list(api.iter_network_events(raiden.default_registry.address, 0, 'latest'))
+    assert network_events == chain_events
+
+
+def get_json_lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_rest_events_pages(monkeypatch):
+    monkeypatch.setattr(rest, 'EVENTS_BLOCK_CHUNK_SIZE', 4)
+    chain_events = make_chain_events(1, 1, 3, 5, 8)
+    raiden_events = [(3, EventTransferSentFailed(1, 'no route'))]
+    raiden = make_raiden(chain_events, raiden_events, block_number=9)
+    client = APIServer(RestAPI(RaidenAPI(raiden))).flask_app.test_client()
+    url = '/api/1/events/channels/{}'.format(address_encoder(factories.make_address()))
+
+    response = client.get(url)
+    all_events = json.loads(response.get_data(as_text=True))
+    assert len(all_events) == 6
+    assert 'Link' not in response.headers
+    assert raiden.contract_events.queries == [(0, 9)]
+
+    pages = list()
+    next_url = url + '?limit=4'
+    while next_url is not None:
+        response = client.get(next_url)
+        assert response.status_code == 200
+        pages.append(json.loads(response.get_data(as_text=True)))
+
+        next_url = None
+        link = response.headers.get('Link')
+        if link is not None:
+            next_url, rel = link.split('; ')
+            assert rel == 'rel="next"'
+            next_url = next_url.strip('<>')
+
+    assert [len(page) for page in pages] == [4, 2]
+    assert pages[0] + pages[1] == all_events
+    assert 'cursor=3-2' in client.get(url + '?limit=4').headers['Link']
+
+    response = client.get(url + '?cursor=3-2')
+    assert json.loads(response.get_data(as_text=True)) == all_events[4:]
+
+    response = client.get(url + '?cursor=invalid')
+    assert response.status_code == 400
+
+
+def test_rest_events_stream(monkeypatch):
+    monkeypatch.setattr(rest, 'EVENTS_BLOCK_CHUNK_SIZE', 4)
+    chain_events = make_chain_events(1, 1, 3, 5, 8)
+    raiden = make_raiden(chain_events, [], block_number=9)
+    client = APIServer(RestAPI(RaidenAPI(raiden))).flask_app.test_client()
+    url = '/api/1/events/channels/{}'.format(address_encoder(factories.make_address()))
+
+    response = client.get(url + '?stream=true')
+    assert response.mimetype == 'application/x-ndjson'
+    events = get_json_lines(response)
+    assert [event['cursor'] for event in events] == ['1-1', '1-2', '3-1', '5-1', '8-1']
+    assert [event['position'] for event in events] == [0, 1, 2, 3, 4]
+    assert raiden.contract_events.queries == [(0, 3), (4, 7), (8, 9)]
+
+    # An interrupted stream is resumed from the cursor of the last event
+    response = client.get(url + '?stream=true&cursor=3-1')
+    assert [event['cursor'] for event in get_json_lines(response)] == ['5-1', '8-1']
+
+    response = client.get(url + '?stream=true&limit=2')
+    assert [event['cursor'] for event in get_json_lines(response)] == ['1-1', '1-2']
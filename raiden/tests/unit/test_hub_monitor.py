@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import time
+
+import gevent
+import greenlet
+
+from raiden.utils.hub_monitor import HubMonitor
+
+
+def blocking(monitor, activity, seconds):
+    with monitor.processing(activity):
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            pass
+
+
+def test_hub_monitor_records_blocks():
+    monitor = HubMonitor(max_incidents=2)
+    monitor.start(0.05)
+
+    try:
+        gevent.joinall([
+            gevent.spawn(blocking, monitor, 'first', 0.3),
+            gevent.spawn(gevent.sleep, 0.01),
+            gevent.spawn(blocking, monitor, 'second', 0.3),
+            gevent.spawn(blocking, monitor, 'third', 0.3),
+        ])
+        gevent.sleep(0)
+    finally:
+        monitor.stop()
+
+    incidents = monitor.recent_incidents()
+    assert [incident.activity for incident in incidents] == ['third', 'second']
+
+    for incident in incidents:
+        assert incident.duration >= 0.3
+        assert any('in blocking' in line for line in incident.stack)
+
+
+def test_hub_monitor_ignores_switching_greenlets():
+    monitor = HubMonitor()
+    monitor.start(0.05)
+
+    def switching():
+        for _ in range(10):
+            gevent.sleep(0.02)
+
+    try:
+        gevent.joinall([gevent.spawn(switching) for _ in range(3)])
+    finally:
+        monitor.stop()
+
+    assert not monitor.recent_incidents()
+
+
+def test_hub_monitor_processing_nests():
+    monitor = HubMonitor()
+    current = greenlet.getcurrent()
+
+    with monitor.processing('state change'):
+        with monitor.processing('event'):
+            assert monitor.greenlets_to_activities[current] == 'event'
+        assert monitor.greenlets_to_activities[current] == 'state change'
+
+    assert current not in monitor.greenlets_to_activities
+
+
+def test_hub_monitor_is_shared():
+    monitor = HubMonitor()
+    previous_trace = greenlet.gettrace()
+
+    monitor.start(0.05)
+    monitor.start(0.05)
+    monitor.stop()
+    assert monitor.running
+    assert greenlet.gettrace() is not previous_trace
+
+    monitor.stop()
+    assert not monitor.running
+    assert greenlet.gettrace() is previous_trace
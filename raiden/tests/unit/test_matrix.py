@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+import base64
+import zlib
+from types import SimpleNamespace
+
+import pytest
+from gevent.event import AsyncResult
+
+from raiden.messages import Processed, decode
+from raiden.network.matrixtransport import (
+    COMPRESSED_PREFIX,
+    ENCODING_COMPRESSED,
+    MatrixTransport,
+    _RetryQueue,
+    pack_compressed,
+    unpack_compressed,
+)
+from raiden.network.transport.udp import udp_utils
+from raiden.storage.serialize import PickleSerializer
+from raiden.storage.sqlite import SQLiteStorage
+from raiden.tests.utils.matrix import MockMatrixClient
+from raiden.tests.utils.messages import ADDRESS, PRIVKEY
+from raiden.utils import data_decoder, data_encoder
+
+
+def test_compressed_body_roundtrip():
+    messages_data = [b'\x01' * 10, b'\x02' * 300, b'\x03']
+
+    body = pack_compressed(messages_data)
+    assert body.startswith(COMPRESSED_PREFIX)
+    assert unpack_compressed(body) == messages_data
+
+
+def test_compressed_body_malformed():
+    with pytest.raises(ValueError):
+        unpack_compressed('0x0102')
+
+    with pytest.raises(ValueError):
+        unpack_compressed(COMPRESSED_PREFIX + 'not base64!')
+
+    truncated = base64.b64encode(zlib.compress(b'\x00\x05ab')).decode()
+    with pytest.raises(ValueError):
+        unpack_compressed(COMPRESSED_PREFIX + truncated)
+
+    bomb = base64.b64encode(zlib.compress(b'\x00' * 10 ** 6)).decode()
+    with pytest.raises(ValueError):
+        unpack_compressed(COMPRESSED_PREFIX + bomb)
+
+
+class MockTransport:
+    def __init__(self, supports_batches=True):
+        self.supports_batches = supports_batches
+        self.room_known = True
+        self.sent = list()
+
+    def _supports_batches(self, receiver_address):  # pylint: disable=unused-argument
+        return self.supports_batches
+
+    def _retry_timeouts(self):  # pylint: disable=no-self-use
+        return udp_utils.timeout_exponential_backoff(2, 1, 10)
+
+    def _room_retry_timeout(self):  # pylint: disable=no-self-use
+        return 5
+
+    def _send_immediate(self, receiver_address, messages_data):  # pylint: disable=unused-argument
+        if not self.room_known:
+            return False
+
+        self.sent.append(list(messages_data))
+        return True
+
+
+def make_retrier(transport, **kwargs):
+    return _RetryQueue(transport, b'\x01' * 20, **kwargs)
+
+
+def test_retry_queue_batches_due_messages():
+    transport = MockTransport()
+    retrier = make_retrier(transport, max_batch_size=12)
+
+    # a line is the hex encoding, the 0x prefix and the newline, i.e. 7
+    # characters for 2 bytes and 5 for 1 byte, the third line doesn't fit
+    retrier.enqueue(b'\x01\x01', AsyncResult())
+    retrier.enqueue(b'\x02')
+    retrier.enqueue(b'\x03')
+
+    # pylint: disable=protected-access
+    assert retrier._send_due(0) == 0
+    assert retrier._send_due(0) == 0
+    assert transport.sent == [[b'\x01\x01', b'\x02'], [b'\x03']]
+
+    # the messages without an async result are sent only once
+    assert [item.data for item in retrier.queue] == [b'\x01\x01']
+    assert retrier._send_due(0) == 1
+
+
+def test_retry_queue_retries_with_backoff():
+    transport = MockTransport()
+    retrier = make_retrier(transport)
+    async_result = AsyncResult()
+    retrier.enqueue(b'\x01', async_result)
+
+    # pylint: disable=protected-access
+    now = 0
+    send_times = list()
+    for _ in range(5):
+        assert retrier._send_due(now) == 0
+        send_times.append(now)
+        now += retrier._send_due(now)
+
+    assert send_times == [0, 1, 2, 4, 8]
+    assert len(transport.sent) == 5
+
+    # delivered, it is not retried anymore
+    async_result.set(True)
+    assert retrier._send_due(now) is None
+    assert not retrier.queue
+    assert len(transport.sent) == 5
+
+
+def test_retry_queue_waits_for_the_room():
+    transport = MockTransport()
+    transport.room_known = False
+    retrier = make_retrier(transport)
+    retrier.enqueue(b'\x01')
+
+    # pylint: disable=protected-access
+    assert retrier._send_due(0) == 5
+    assert not transport.sent
+
+    transport.room_known = True
+    assert retrier._send_due(0) == 0
+    assert transport.sent == [[b'\x01']]
+
+
+def test_retry_queue_batches_only_if_supported():
+    transport = MockTransport(supports_batches=False)
+    retrier = make_retrier(transport)
+    retrier.enqueue(b'\x01')
+    retrier.enqueue(b'\x02')
+
+    # pylint: disable=protected-access
+    assert retrier._send_due(0) == 0
+    assert retrier._send_due(0) == 0
+    assert retrier._send_due(0) is None
+    assert transport.sent == [[b'\x01'], [b'\x02']]
+
+
+class MockRoom:
+    def __init__(self, room_id):
+        self.room_id = room_id
+        self.listeners = list()
+
+    def add_listener(self, callback, event_type=None):
+        self.listeners.append((callback, event_type))
+
+
+class MockApi:
+    def __init__(self):
+        self.events = list()
+
+    def send_message_event(self, room_id, event_type, content):
+        self.events.append((room_id, event_type, content))
+
+
+def make_transport():
+    transport = MatrixTransport({
+        'server': 'http://localhost:8008',
+        'client_class': MockMatrixClient,
+    })
+    transport._client.api = MockApi()  # pylint: disable=protected-access
+    transport._raiden_service = SimpleNamespace(  # pylint: disable=protected-access
+        address=b'\x01' * 20,
+        chain=SimpleNamespace(network_id=1),
+        wal=SimpleNamespace(storage=SQLiteStorage(':memory:', PickleSerializer)),
+    )
+    return transport
+
+
+def test_matrix_bodies_by_peer_encodings():
+    transport = make_transport()
+    client = transport._client  # pylint: disable=protected-access
+
+    older_peer = b'\x01' * 20
+    batching_peer = b'\x02' * 20
+    compressing_peer = b'\x03' * 20
+    for number, address in enumerate((older_peer, batching_peer, compressing_peer)):
+        room_id = '!room{}'.format(number)
+        client.rooms[room_id] = MockRoom(room_id)
+        transport._address_to_roomid[address] = room_id  # pylint: disable=protected-access
+
+    # pylint: disable=protected-access
+    transport._address_to_encodings[batching_peer] = set()
+    transport._address_to_encodings[compressing_peer] = {ENCODING_COMPRESSED}
+
+    assert not transport._supports_batches(older_peer)
+    assert transport._supports_batches(batching_peer)
+    assert transport._supports_batches(compressing_peer)
+
+    messages_data = [b'\x01\x02', b'\x03']
+    transport._send_immediate(older_peer, messages_data[:1])
+    transport._send_immediate(batching_peer, messages_data)
+    transport._send_immediate(compressing_peer, messages_data)
+
+    bodies = [content['body'] for _, _, content in client.api.events]
+    assert bodies[0] == data_encoder(messages_data[0])
+    assert bodies[1].splitlines() == [data_encoder(data) for data in messages_data]
+    assert unpack_compressed(bodies[2]) == messages_data
+
+
+def test_matrix_peers_are_restored():
+    transport = make_transport()
+    client = transport._client  # pylint: disable=protected-access
+    storage = transport._raiden_service.wal.storage  # pylint: disable=protected-access
+
+    joined_peer = b'\x02' * 20
+    left_peer = b'\x03' * 20
+    storage.write_matrix_peer(joined_peer, '!joined', {'@joined:server'})
+    storage.write_matrix_peer(left_peer, '!left', {'@left:server'})
+    client.rooms['!joined'] = MockRoom('!joined')
+
+    # pylint: disable=protected-access
+    transport._load_peers()
+
+    # the room left while the node was offline is resolved again
+    assert transport._address_to_roomid == {joined_peer: '!joined'}
+    assert transport._address_to_userids == {
+        joined_peer: {'@joined:server'},
+        left_peer: {'@left:server'},
+    }
+
+
+def test_matrix_stale_room_is_resolved_in_the_background():
+    transport = make_transport()
+    client = transport._client  # pylint: disable=protected-access
+    storage = transport._raiden_service.wal.storage  # pylint: disable=protected-access
+    peer = b'\x02' * 20
+
+    new_room = MockRoom('!new')
+
+    def search_room_directory(room_alias):  # pylint: disable=unused-argument
+        client.rooms[new_room.room_id] = new_room
+        return [new_room]
+
+    client.search_room_directory = search_room_directory
+
+    # pylint: disable=protected-access
+    transport._address_to_roomid[peer] = '!left'
+    retrier = _RetryQueue(transport, peer)
+    transport._address_to_retrier[peer] = retrier
+
+    # the send doesn't wait for the room, the queue is woken up once it is
+    # known
+    assert not transport._send_immediate(peer, [b'\x01'])
+    assert peer not in transport._address_to_roomid
+
+    transport._address_to_room_resolution[peer].join()
+    assert retrier.event_new_data.is_set()
+    assert transport._address_to_roomid[peer] == '!new'
+    assert storage.get_matrix_peers() == [(peer, '!new', [])]
+
+    assert transport._send_immediate(peer, [b'\x01'])
+    assert client.api.events[-1][0] == '!new'
+
+
+def test_matrix_bodies_for_older_peers():
+    transport = make_transport()
+    client = transport._client  # pylint: disable=protected-access
+    older_peer = b'\x02' * 20
+
+    client.rooms['!older'] = MockRoom('!older')
+    transport._address_to_roomid[older_peer] = '!older'  # pylint: disable=protected-access
+
+    retrier = _RetryQueue(transport, older_peer)
+    for message_identifier in (1, 2):
+        message = Processed(ADDRESS, message_identifier)
+        message.sign(PRIVKEY, ADDRESS)
+        retrier.enqueue(message.encode())
+
+    # pylint: disable=protected-access
+    while retrier._send_due(0) == 0:
+        pass
+
+    # every body is decodable by a node which predates the batches
+    bodies = [content['body'] for _, _, content in client.api.events]
+    assert [decode(data_decoder(body)).message_identifier for body in bodies] == [1, 2]
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+from types import SimpleNamespace
+
+import pytest
+from gevent.lock import Semaphore
+
+from raiden.raiden_service import RaidenService
+from raiden.tests.utils import factories
+from raiden.utils import address_encoder
+from raiden.utils.metrics import EVENT_POLL_LAG_BLOCKS, MetricsRegistry
+
+
+def test_counter_render():
+    registry = MetricsRegistry()
+    counter = registry.counter('retries_total', 'Retries.')
+    labeled = registry.counter('messages_total', 'Messages.', ('kind', ))
+
+    counter.inc()
+    counter.inc(2)
+    labeled.inc(labels=('secret"request', ))
+
+    assert registry.render() == (
+        '# HELP retries_total Retries.\n'
+        '# TYPE retries_total counter\n'
+        'retries_total 3.0\n'
+        '# HELP messages_total Messages.\n'
+        '# TYPE messages_total counter\n'
+        'messages_total{kind="secret\\"request"} 1.0\n'
+    )
+
+
+def test_gauge_function():
+    registry = MetricsRegistry()
+    gauge = registry.gauge('queued', 'Queued.', ('queue', ))
+
+    depths = {('global', ): 2}
+    gauge.set_function(lambda: depths)
+    assert 'queued{queue="global"} 2.0' in registry.render()
+
+    depths[('global', )] = 0
+    assert 'queued{queue="global"} 0.0' in registry.render()
+
+
+def test_gauge_functions_by_key():
+    registry = MetricsRegistry()
+    gauge = registry.gauge('queued', 'Queued.', ('node', ))
+
+    gauge.set_function(lambda: {('node1', ): 1}, key='node1')
+    gauge.set_function(lambda: {('node2', ): 2}, key='node2')
+    rendered = registry.render()
+    assert 'queued{node="node1"} 1.0' in rendered
+    assert 'queued{node="node2"} 2.0' in rendered
+
+    gauge.remove_function(key='node1')
+    gauge.remove_function(key='node1')
+    rendered = registry.render()
+    assert 'node1' not in rendered
+    assert 'queued{node="node2"} 2.0' in rendered
+
+
+def test_histogram_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('latency', 'Latency.', ('method', ), buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value, ('eth_call', ))
+
+    lines = registry.render().splitlines()
+    assert lines[2:] == [
+        'latency_bucket{method="eth_call",le="0.1"} 2.0',
+        'latency_bucket{method="eth_call",le="1.0"} 3.0',
+        'latency_bucket{method="eth_call",le="+Inf"} 4.0',
+        'latency_sum{method="eth_call"} 5.65',
+        'latency_count{method="eth_call"} 4.0',
+    ]
+
+
+def test_disabled_registry():
+    registry = MetricsRegistry()
+    counter = registry.counter('retries_total', 'Retries.')
+    histogram = registry.histogram('latency', 'Latency.')
+
+    registry.enabled = False
+    counter.inc()
+    with histogram.time():
+        pass
+
+    assert registry.render().splitlines() == [
+        '# HELP retries_total Retries.',
+        '# TYPE retries_total counter',
+        '# HELP latency Latency.',
+        '# TYPE latency histogram',
+    ]
+
+
+def test_duplicated_metric():
+    registry = MetricsRegistry()
+    registry.counter('retries_total', 'Retries.')
+
+    with pytest.raises(ValueError):
+        registry.gauge('retries_total', 'Retries.')
+
+
+def test_event_poll_lag():
+    address = factories.make_address()
+    raiden = SimpleNamespace(
+        address=address,
+        alarm=SimpleNamespace(last_block_number=12),
+        blockchain_events=SimpleNamespace(poll_blockchain_events=lambda: []),
+        event_poll_lock=Semaphore(),
+    )
+
+    RaidenService.poll_blockchain_events(raiden, 10)
+    assert EVENT_POLL_LAG_BLOCKS.labels_to_values[(address_encoder(address), )] == 2
@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 import pytest
 
-from raiden.exceptions import InvalidAddress
-from raiden.network.discovery import Discovery
+from raiden.exceptions import InvalidAddress, UnknownAddress
+from raiden.network.discovery import ContractDiscovery, Discovery
+from raiden.storage.serialize import PickleSerializer
+from raiden.storage.sqlite import SQLiteStorage
 from raiden.tests.utils.factories import make_address
 
 
@@ -25,3 +27,52 @@ def test_mock_registry_api_compliance():
     contract_discovery_instance.register(address, '127.0.0.1', 88888)
     assert contract_discovery_instance.nodeid_by_host_port(('127.0.0.1', 88888)) == address
     assert contract_discovery_instance.get(address) == ('127.0.0.1', 88888)
+
+
+class MockDiscoveryProxy:
+    def __init__(self, registrations):
+        self.address = make_address()
+        self.registrations = registrations
+        self.queried_ranges = list()
+
+    def registered_endpoints(self, from_block, to_block):
+        self.queried_ranges.append((from_block, to_block))
+        return [
+            registration
+            for registration in self.registrations
+            if from_block <= registration[2] <= to_block
+        ]
+
+    def endpoint_by_address(self, node_address):  # pylint: disable=no-self-use
+        raise AssertionError('the preloaded discovery must not query the registry')
+
+
+def test_contract_discovery_preload():
+    node1, node2 = make_address(), make_address()
+    proxy = MockDiscoveryProxy([
+        (node1, '127.0.0.1:5001', 1),
+        (node2, '127.0.0.2:5001', 2),
+        (node1, '127.0.0.1:5002', 3),
+    ])
+    storage = SQLiteStorage(':memory:', PickleSerializer)
+
+    changes = list()
+    discovery = ContractDiscovery(make_address(), proxy)
+    discovery.add_listener(lambda address, host_port: changes.append((address, host_port)))
+    discovery.preload(storage, 3)
+
+    assert discovery.get(node1) == ('127.0.0.1', 5002)
+    assert discovery.get(node2) == ('127.0.0.2', 5001)
+    with pytest.raises(UnknownAddress):
+        discovery.get(make_address())
+
+    discovery.endpoint_registered(node2, '127.0.0.2:5002', 10)
+    assert discovery.get(node2) == ('127.0.0.2', 5002)
+    assert changes[-1] == (node2, ('127.0.0.2', 5002))
+
+    # a restart only fetches the blocks after the last synced block
+    restarted = ContractDiscovery(make_address(), proxy)
+    restarted.preload(storage, 12)
+    assert proxy.queried_ranges[-1] == (10, 12)
+    assert restarted.get(node1) == ('127.0.0.1', 5002)
+    assert restarted.get(node2) == ('127.0.0.2', 5002)
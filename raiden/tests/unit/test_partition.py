@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+import random
+from copy import deepcopy
+
+import networkx
+
+from raiden.tests.utils import factories
+from raiden.tests.utils.factories import (
+    UNIT_SECRETHASH,
+    UNIT_TOKEN_NETWORK_ADDRESS,
+    UNIT_TRANSFER_AMOUNT,
+    UNIT_TRANSFER_DESCRIPTION,
+    UNIT_TRANSFER_IDENTIFIER,
+    UNIT_TRANSFER_TARGET,
+)
+from raiden.transfer import node
+from raiden.transfer.architecture import StateManager
+from raiden.transfer.mediated_transfer.state_change import (
+    ActionInitInitiator,
+    ReceiveSecretRequest,
+)
+from raiden.transfer.partition import copy_partitions, get_partitions
+from raiden.transfer.state import (
+    NODE_NETWORK_REACHABLE,
+    NodeState,
+    TokenNetworkGraphState,
+    TokenNetworkState,
+    TransactionChannelNewBalance,
+)
+from raiden.transfer.state_change import (
+    ActionChangeNodeNetworkState,
+    ActionNewTokenNetwork,
+    Block,
+    ContractReceiveChannelClosed,
+    ContractReceiveChannelNewBalance,
+)
+
+
+def make_token_network(token_network_identifier, channels):
+    return TokenNetworkState(
+        token_network_identifier,
+        factories.make_address(),
+        TokenNetworkGraphState(networkx.Graph()),
+        channels,
+    )
+
+
+def state_summary(node_state):
+    """ The content of `node_state`, including the block timers. """
+    token_networks = list()
+    for payment_network in node_state.identifiers_to_paymentnetworks.values():
+        for token_network_state in payment_network.tokenidentifiers_to_tokennetworks.values():
+            token_networks.append((
+                token_network_state.address,
+                token_network_state.token_address,
+                token_network_state.channelidentifiers_to_channels,
+                sorted(token_network_state.network_graph.network.edges()),
+            ))
+
+    return (
+        node_state.block_number,
+        node_state.pseudo_random_generator.getstate(),
+        node_state.queueids_to_queues,
+        node_state.nodeaddresses_to_networkstates,
+        node_state.payment_mapping,
+        node_state.block_timers.keys_to_block,
+        token_networks,
+    )
+
+
+def make_state_changes():
+    payment_network_identifier = factories.make_address()
+    other_token_network_identifier = factories.make_address()
+
+    payment_channel = factories.make_channel(
+        our_balance=100,
+        partner_address=UNIT_TRANSFER_TARGET,
+        token_network_identifier=UNIT_TOKEN_NETWORK_ADDRESS,
+    )
+    other_channel = factories.make_channel(
+        our_balance=100,
+        token_network_identifier=other_token_network_identifier,
+    )
+
+    state_changes = [
+        ActionNewTokenNetwork(
+            payment_network_identifier,
+            make_token_network(UNIT_TOKEN_NETWORK_ADDRESS, [payment_channel]),
+        ),
+        ActionNewTokenNetwork(
+            payment_network_identifier,
+            make_token_network(other_token_network_identifier, [other_channel]),
+        ),
+        ActionInitInitiator(
+            UNIT_TRANSFER_DESCRIPTION,
+            [factories.route_from_channel(payment_channel)],
+        ),
+        ContractReceiveChannelNewBalance(
+            other_token_network_identifier,
+            other_channel.identifier,
+            TransactionChannelNewBalance(other_channel.our_state.address, 150, 2),
+        ),
+        ActionChangeNodeNetworkState(UNIT_TRANSFER_TARGET, NODE_NETWORK_REACHABLE),
+        ReceiveSecretRequest(
+            UNIT_TRANSFER_IDENTIFIER,
+            UNIT_TRANSFER_AMOUNT,
+            UNIT_SECRETHASH,
+            UNIT_TRANSFER_TARGET,
+        ),
+        ContractReceiveChannelClosed(
+            other_token_network_identifier,
+            other_channel.identifier,
+            other_channel.partner_state.address,
+            3,
+        ),
+    ]
+    state_changes.extend(Block(block_number) for block_number in range(2, 60))
+
+    return state_changes
+
+
+def test_partitions_of_state_changes():
+    node_state = NodeState(random.Random(), 1)
+    state_changes = make_state_changes()
+
+    for state_change in state_changes[:2]:
+        node.state_transition(node_state, state_change)
+
+    init_initiator = state_changes[2]
+    new_balance = state_changes[3]
+    network_state = state_changes[4]
+
+    assert get_partitions(node_state, state_changes[0]) is None
+    assert get_partitions(node_state, init_initiator) == (
+        {UNIT_TOKEN_NETWORK_ADDRESS},
+        {UNIT_SECRETHASH},
+    )
+    assert get_partitions(node_state, new_balance) == (
+        {new_balance.token_network_identifier},
+        set(),
+    )
+    assert get_partitions(node_state, network_state) == (set(), set())
+
+    # Nothing is due, a block doesn't modify any partition
+    assert get_partitions(node_state, Block(2)) == (set(), set())
+
+
+def test_copy_partitions_is_equivalent_to_a_full_copy():
+    state_changes = make_state_changes()
+    initial_state = NodeState(random.Random(42), 1)
+
+    full_copy = StateManager(node.state_transition, deepcopy(initial_state))
+    partitioned = StateManager(node.state_transition, deepcopy(initial_state), copy_partitions)
+
+    for state_change in state_changes:
+        previous_state = partitioned.current_state
+        previous_state_copy = deepcopy(previous_state)
+
+        full_copy_events = full_copy.dispatch(state_change)
+        partitioned_events = partitioned.dispatch(state_change)
+
+        assert partitioned_events == full_copy_events
+        assert state_summary(partitioned.current_state) == state_summary(full_copy.current_state)
+
+        # The state before the state change was not modified
+        assert state_summary(previous_state) == state_summary(previous_state_copy)
+
+    # The state changes did something
+    assert partitioned.current_state.payment_mapping.secrethashes_to_task
+    assert partitioned.current_state.queueids_to_queues
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+import json
+import random
+import types
+from collections import defaultdict
+from types import SimpleNamespace
+
+import networkx
+import pytest
+
+from raiden.api.python import RaidenAPI
+from raiden.api.rest import APIServer, RestAPI
+from raiden.exceptions import (
+    DuplicatedPaymentIdentifier,
+    InvalidAddress,
+    InvalidAmount,
+    UnknownTokenAddress,
+)
+from raiden.payments import PAYMENT_STATUS_PENDING, PaymentTracker
+from raiden.raiden_service import RaidenService
+from raiden.tests.utils import factories
+from raiden.transfer.mediated_transfer.state_change import ActionInitInitiator
+from raiden.transfer.state import (
+    NodeState,
+    PaymentNetworkState,
+    TokenNetworkGraphState,
+    TokenNetworkState,
+)
+from raiden.utils import address_encoder
+
+
+def make_raiden():
+    """ A RaidenService without the network and the blockchain, it records
+    the state changes instead of dispatching them.
+    """
+    registry_address = factories.make_address()
+    token_network_identifier = factories.make_address()
+    token_address = factories.make_address()
+
+    token_network = TokenNetworkState(
+        token_network_identifier,
+        token_address,
+        TokenNetworkGraphState(networkx.Graph()),
+        [],
+    )
+    node_state = NodeState(random.Random(), 1)
+    node_state.identifiers_to_paymentnetworks[registry_address] = PaymentNetworkState(
+        registry_address,
+        [token_network],
+    )
+
+    raiden = SimpleNamespace(
+        address=factories.make_address(),
+        default_registry=SimpleNamespace(address=registry_address),
+        wal=SimpleNamespace(state_manager=SimpleNamespace(current_state=node_state)),
+        protocol=SimpleNamespace(start_health_check=lambda address: None),
+        identifier_to_results=defaultdict(list),
+        payments=PaymentTracker(),
+        dispatched=list(),
+    )
+    raiden.handle_state_changes = raiden.dispatched.extend
+    raiden.start_mediated_transfers_batch = types.MethodType(
+        RaidenService.start_mediated_transfers_batch,
+        raiden,
+    )
+    return raiden, token_address
+
+
+def test_transfer_batch_validates_each_payment():
+    raiden, token_address = make_raiden()
+    api = RaidenAPI(raiden)
+    registry_address = raiden.default_registry.address
+    target = factories.make_address()
+
+    api.transfer_batch_async(registry_address, token_address, [(target, 1, 7)])
+    raiden.dispatched.clear()
+
+    results = api.transfer_batch_async(
+        registry_address,
+        token_address,
+        [
+            (target, 10, 1),
+            (target, 0, 2),
+            (b'invalid', 10, 3),
+            (target, 20, 1),
+            (target, 30, 7),
+            (target, 40, None),
+            (target, 50, 4),
+        ],
+    )
+
+    assert len(results) == 7
+    for position, error in ((1, InvalidAmount), (2, InvalidAddress)):
+        assert isinstance(results[position].exception, error)
+    for position in (3, 4):
+        assert isinstance(results[position].exception, DuplicatedPaymentIdentifier)
+
+    # Only the valid payments are started, and each position keeps its result
+    transfers = [state_change.transfer for state_change in raiden.dispatched]
+    assert all(isinstance(state_change, ActionInitInitiator) for state_change in raiden.dispatched)
+    assert [transfer.amount for transfer in transfers] == [10, 40, 50]
+    assert transfers[0].payment_identifier == 1
+    assert transfers[2].payment_identifier == 4
+    assert transfers[1].payment_identifier is not None
+
+    for position, transfer in zip((0, 5, 6), transfers):
+        assert not results[position].ready()
+        assert raiden.identifier_to_results[transfer.payment_identifier] == [results[position]]
+        assert raiden.payments.get(transfer.payment_identifier).amount == transfer.amount
+
+
+def test_transfer_batch_invalid_batch():
+    raiden, token_address = make_raiden()
+    api = RaidenAPI(raiden)
+    registry_address = raiden.default_registry.address
+    target = factories.make_address()
+
+    with pytest.raises(UnknownTokenAddress):
+        api.transfer_batch_async(registry_address, factories.make_address(), [(target, 1, 1)])
+
+    with pytest.raises(InvalidAddress):
+        api.transfer_batch_async(registry_address, b'invalid', [(target, 1, 1)])
+
+    # Nothing is started if all the payments are invalid
+    results = api.transfer_batch_async(registry_address, token_address, [(target, -1, 1)])
+    assert isinstance(results[0].exception, InvalidAmount)
+    assert raiden.dispatched == []
+    assert not raiden.identifier_to_results
+
+
+def test_rest_payment_batch():
+    raiden, token_address = make_raiden()
+    client = APIServer(RestAPI(RaidenAPI(raiden))).flask_app.test_client()
+    url = '/api/1/payments/{}'.format(address_encoder(token_address))
+    target = address_encoder(factories.make_address())
+
+    response = client.post(url, data=json.dumps({'payments': [
+        {'target_address': target, 'amount': 10, 'identifier': 1},
+        {'target_address': target, 'amount': 0, 'identifier': 2},
+        {'target_address': target, 'amount': 30, 'identifier': 1},
+        {'target_address': target, 'amount': 40, 'identifier': 3},
+    ]}), content_type='application/json')
+
+    assert response.status_code == 202
+    result = json.loads(response.get_data(as_text=True))
+    assert [payment['identifier'] for payment in result] == [1, 2, 1, 3]
+    assert [payment.get('amount') for payment in result] == [10, None, None, 40]
+    assert result[0]['status'] == result[3]['status'] == PAYMENT_STATUS_PENDING
+    assert result[0]['target_address'] == target
+    assert 'errors' in result[1] and 'errors' in result[2]
+    assert len(raiden.dispatched) == 2
+
+    # The payment identifiers are generated for the payments without one
+    response = client.post(url, data=json.dumps({'payments': [
+        {'target_address': target, 'amount': 10},
+    ]}), content_type='application/json')
+    result = json.loads(response.get_data(as_text=True))
+    assert response.status_code == 202
+    assert result[0]['identifier'] == raiden.dispatched[-1].transfer.payment_identifier
+
+    response = client.post(url, data=json.dumps({'payments': []}), content_type='application/json')
+    assert response.status_code == 400
+
+    unknown_token_url = '/api/1/payments/{}'.format(address_encoder(factories.make_address()))
+    response = client.post(unknown_token_url, data=json.dumps({'payments': [
+        {'target_address': target, 'amount': 10},
+    ]}), content_type='application/json')
+    assert response.status_code == 404
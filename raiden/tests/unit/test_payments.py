@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import gevent
+
+from raiden.payments import (
+    PAYMENT_STATUS_FAILED,
+    PAYMENT_STATUS_PENDING,
+    PAYMENT_STATUS_SUCCESS,
+    PaymentTracker,
+)
+from raiden.tests.utils.factories import make_address
+
+TOKEN_NETWORK = make_address()
+TARGET = make_address()
+
+
+def test_payment_status():
+    payments = PaymentTracker()
+
+    payments.payment_started(1, TOKEN_NETWORK, TARGET, 10)
+    assert payments.is_pending(1)
+    assert payments.get(1).status == PAYMENT_STATUS_PENDING
+
+    payments.payment_finished(1, False, 'no route')
+    assert not payments.is_pending(1)
+    assert payments.get(1).status == PAYMENT_STATUS_FAILED
+    assert payments.get(1).reason == 'no route'
+
+    # The identifier can be reused once the payment finished
+    payments.payment_started(1, TOKEN_NETWORK, TARGET, 10)
+    assert payments.get(1).status == PAYMENT_STATUS_PENDING
+
+    assert payments.payment_finished(2, True) is None
+    assert payments.get(2) is None
+
+
+def test_payment_results_history():
+    payments = PaymentTracker(history_size=2)
+
+    for identifier in range(1, 4):
+        payments.payment_started(identifier, TOKEN_NETWORK, TARGET, 10)
+        payments.payment_finished(identifier, True)
+
+    assert payments.get(1) is None
+    assert payments.get(3).status == PAYMENT_STATUS_SUCCESS
+    assert [payment.identifier for payment in payments.results_after(0)] == [2, 3]
+    assert [payment.identifier for payment in payments.results_after(2)] == [3]
+    assert payments.results_after(3) == []
+
+
+def test_wait_for_payment_results():
+    payments = PaymentTracker()
+    payments.payment_started(1, TOKEN_NETWORK, TARGET, 10)
+
+    assert payments.wait_for_results(0, timeout=0) == []
+
+    waiter = gevent.spawn(payments.wait_for_results, 0)
+    gevent.idle()
+    assert not waiter.ready()
+
+    payments.payment_finished(1, True)
+    results = waiter.get(timeout=1)
+    assert [payment.identifier for payment in results] == [1]
+    assert results[0].sequence == 1
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import random
+
+import networkx
+
+from raiden.storage.replay import replay
+from raiden.storage.serialize import PickleSerializer
+from raiden.storage.sqlite import SQLiteStorage
+from raiden.storage.wal import restore_from_latest_snapshot
+from raiden.tests.utils import factories
+from raiden.transfer import node
+from raiden.transfer.state import (
+    TokenNetworkGraphState,
+    TokenNetworkState,
+    TransactionChannelNewBalance,
+)
+from raiden.transfer.state_change import (
+    ActionInitNode,
+    ActionNewTokenNetwork,
+    Block,
+    ContractReceiveChannelNewBalance,
+)
+
+
+def make_recorded_storage():
+    storage = SQLiteStorage(':memory:', PickleSerializer())
+    wal, _ = restore_from_latest_snapshot(node.state_transition, storage)
+
+    channel_state = factories.make_channel(our_balance=100)
+    token_network_state = TokenNetworkState(
+        channel_state.token_network_identifier,
+        factories.make_address(),
+        TokenNetworkGraphState(networkx.Graph()),
+        [channel_state],
+    )
+
+    wal.log_and_dispatch(ActionInitNode(random.Random(), 1), 1)
+    wal.log_and_dispatch(
+        ActionNewTokenNetwork(factories.make_address(), token_network_state),
+        1,
+    )
+    wal.log_and_dispatch(
+        ContractReceiveChannelNewBalance(
+            channel_state.token_network_identifier,
+            channel_state.identifier,
+            TransactionChannelNewBalance(channel_state.our_state.address, 150, 2),
+        ),
+        2,
+    )
+    for block_number in range(2, 10):
+        wal.log_and_dispatch(Block(block_number), block_number)
+
+    wal.snapshot()
+
+    for block_number in range(10, 15):
+        wal.log_and_dispatch(Block(block_number), block_number)
+
+    return wal, storage
+
+
+def test_replay_matches_the_snapshot():
+    wal, storage = make_recorded_storage()
+
+    state, report = replay(storage)
+
+    assert state == wal.state_manager.current_state
+    assert report.number_of_state_changes == 16
+    assert report.last_identifier == 16
+    assert report.snapshot_identifier == 11
+    assert report.snapshot_differences == []
+    assert len(report.typenames_to_latencies['Block']) == 13
+    assert report.throughput > 0
+
+
+def test_replay_reports_snapshot_differences():
+    wal, storage = make_recorded_storage()
+
+    current_state = wal.state_manager.current_state
+    current_state.block_number += 1
+    storage.write_state_snapshot(wal.state_change_id, current_state)
+
+    _, report = replay(storage, to_identifier=11)
+    assert report.snapshot_differences is None
+    assert report.number_of_state_changes == 11
+
+    _, report = replay(storage)
+    assert report.snapshot_differences == ['block_number']
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import signal
+import sys
+
+from raiden.utils.profiling.stacksampler import OTHER_STACKS, StackSampler
+from raiden.utils.profiling.timer import TIMER
+
+
+def leaf(sampler):
+    sampler.sample(sys._getframe())
+
+
+def caller(sampler):
+    leaf(sampler)
+
+
+def other_caller(sampler):
+    leaf(sampler)
+
+
+def test_stack_sampler_aggregates_stacks():
+    sampler = StackSampler(max_depth=2)
+
+    caller(sampler)
+    caller(sampler)
+    other_caller(sampler)
+
+    leaf_label = 'leaf({}:{})'.format(__name__, leaf.__code__.co_firstlineno)
+    caller_label = 'caller({}:{})'.format(__name__, caller.__code__.co_firstlineno)
+    other_label = 'other_caller({}:{})'.format(__name__, other_caller.__code__.co_firstlineno)
+
+    assert sampler.number_of_samples == 3
+    assert sampler.collapsed().splitlines() == [
+        '{};{} 2'.format(caller_label, leaf_label),
+        '{};{} 1'.format(other_label, leaf_label),
+    ]
+    assert sampler.top(2) == [
+        (leaf_label, 3, 3),
+        (caller_label, 0, 2),
+    ]
+
+
+def test_stack_sampler_is_bounded():
+    sampler = StackSampler(max_stacks=1, max_depth=2)
+
+    caller(sampler)
+    other_caller(sampler)
+    other_caller(sampler)
+
+    assert len(sampler.stacks_to_counts) == 1
+    assert sampler.number_of_other_samples == 2
+    assert sampler.collapsed().splitlines()[-1] == '{} 2'.format(OTHER_STACKS)
+
+    sampler.reset()
+    assert sampler.collapsed() == ''
+
+
+def test_stack_sampler_stop_disarms_the_timer():
+    sampler = StackSampler(rate=10)
+
+    sampler.start()
+    assert sampler.running
+    assert signal.getitimer(TIMER)[1] > 0
+
+    sampler.stop()
+    assert not sampler.running
+    assert signal.getitimer(TIMER) == (0.0, 0.0)
@@ -1,5 +1,33 @@
 # -*- coding: utf-8 -*-
-from raiden.network.throttle import TokenBucket
+import errno
+from functools import partial
+from types import SimpleNamespace
+
+import gevent
+import pytest
+from gevent.event import Event
+
+from raiden.exceptions import InvalidAddress
+from raiden.network.throttle import PeerTokenBuckets, TokenBucket
+from raiden.network.transport.udp.healthcheck import HealthCheckScheduler
+from raiden.network.transport.udp.envelope import (
+    ENVELOPE_HEADER,
+    MessageCoalescer,
+    envelope_size,
+    is_envelope,
+    pack_envelope,
+    unpack_envelope,
+)
+from raiden.network.transport.udp.scheduler import (
+    PRIORITY_ACK,
+    PRIORITY_PING,
+    PRIORITY_PROTOCOL,
+    SendScheduler,
+)
+from raiden.network.transport.udp.udp_transport import UDPTransport
+from raiden.tests.utils import factories
+from raiden.utils import address_encoder
+from raiden.utils.metrics import TRANSPORT_QUEUED_MESSAGES, format_labels
 
 
 def test_token_bucket():
@@ -21,3 +49,350 @@ def test_token_bucket():
 
     for num in range(1, 9):
         assert num * token_refill == bucket.consume(1)
+
+
+def test_envelope_roundtrip():
+    messagedata_list = [b'\x05' * 10, b'\x0c' * 77, b'\x01']
+
+    data = pack_envelope(messagedata_list)
+
+    assert is_envelope(data)
+    assert len(data) == envelope_size(messagedata_list)
+    assert unpack_envelope(data) == messagedata_list
+
+
+@pytest.mark.parametrize('data', [
+    ENVELOPE_HEADER,
+    ENVELOPE_HEADER + b'\x00',
+    ENVELOPE_HEADER + b'\x00\x00',
+    ENVELOPE_HEADER + b'\x00\x05\x01\x02',
+    pack_envelope([pack_envelope([b'\x01'])]),
+])
+def test_envelope_invalid(data):
+    with pytest.raises(ValueError):
+        unpack_envelope(data)
+
+
+def test_coalescer_flushes_when_full():
+    sent = list()
+    coalescer = MessageCoalescer(
+        lambda host_port, data: sent.append((host_port, data)),
+        flush_delay=60,
+        max_size=100,
+    )
+    host_port = ('127.0.0.1', 1)
+
+    coalescer.add(host_port, b'\x05' * 40)
+    coalescer.add(host_port, b'\x05' * 40)
+    assert not sent
+
+    coalescer.add(host_port, b'\x05' * 40)
+    assert sent == [(host_port, pack_envelope([b'\x05' * 40, b'\x05' * 40]))]
+
+    coalescer.flush(host_port)
+    assert sent[-1] == (host_port, b'\x05' * 40)
+
+    coalescer.stop()
+
+
+def test_send_scheduler_per_peer_and_priority():
+    now = [0]
+    time = lambda: now[0]
+
+    sent = list()
+    scheduler = SendScheduler(
+        lambda host_port, data: sent.append((host_port, data)),
+        TokenBucket(10, 1, time),
+        PeerTokenBuckets(1, 1, time),
+        time,
+    )
+    peer1 = ('127.0.0.1', 1)
+    peer2 = ('127.0.0.1', 2)
+
+    scheduler.send(peer1, b'ping', PRIORITY_PING)
+    assert sent == [(peer1, b'ping')]
+
+    # peer1 exhausted its bucket, the messages are queued without blocking
+    scheduler.send(peer1, b'ping', PRIORITY_PING)
+    scheduler.send(peer1, b'ack', PRIORITY_ACK)
+    assert scheduler.queued == 2
+    assert scheduler._send_next() == 1  # pylint: disable=protected-access
+
+    # but peer2 is not affected by it, though it waits for its turn
+    scheduler.send(peer2, b'data', PRIORITY_PROTOCOL)
+    assert scheduler._send_next() is None  # pylint: disable=protected-access
+    assert sent[-1] == (peer2, b'data')
+
+    # the acknowledgment goes before the ping
+    now[0] = 1
+    assert scheduler._send_next() is None  # pylint: disable=protected-access
+    assert sent[-1] == (peer1, b'ack')
+
+    statistics = scheduler.statistics_by_class()
+    assert statistics['ack']['delayed'] == 1
+    assert statistics['ack']['max_delay'] == 1
+    assert statistics['ping']['sent'] == 1
+
+
+def test_send_scheduler_survives_send_errors():
+    sent = list()
+
+    def sendto(host_port, data):
+        if data == b'unreachable':
+            raise OSError(errno.ENETUNREACH, 'Network is unreachable')
+        sent.append((host_port, data))
+
+    scheduler = SendScheduler(sendto, TokenBucket(10, 1000), PeerTokenBuckets(1, 1000))
+    peer = ('127.0.0.1', 1)
+
+    scheduler.send(peer, b'ping', PRIORITY_PING)
+    scheduler.send(peer, b'unreachable', PRIORITY_PROTOCOL)
+    scheduler.send(peer, b'data', PRIORITY_PROTOCOL)
+    assert scheduler.queued == 2
+
+    event_stop = Event()
+    runner = scheduler.start(event_stop)
+    gevent.sleep(0.05)
+
+    assert sent == [(peer, b'ping'), (peer, b'data')]
+    assert scheduler.queued == 0
+    assert not runner.dead
+
+    event_stop.set()
+    scheduler.stop()
+    runner.join(1)
+
+
+def test_peer_token_buckets_evict_idle_peers():
+    now = [0]
+    time = lambda: now[0]
+
+    buckets = PeerTokenBuckets(2, 1, time)
+    buckets.eviction_size = 2
+
+    busy = buckets.get('busy')
+    busy.consume(2)
+    buckets.get('idle').consume(1)
+
+    # once the idle peer refilled its bucket it is dropped on the next
+    # insertion, the busy peer keeps its bucket and its state
+    now[0] = 1
+    buckets.get('new')
+    assert set(buckets.peers_to_buckets) == {'busy', 'new'}
+    assert buckets.get('busy') is busy
+    assert buckets.eviction_size == PeerTokenBuckets.MIN_EVICTION_SIZE
+
+
+class MockProtocol:
+    def __init__(self):
+        self.raiden = None
+        self.pings = list()
+        self.network_states = list()
+
+    def get_host_port(self, address):  # pylint: disable=unused-argument,no-self-use
+        return ('127.0.0.1', 1)
+
+    def get_ping(self, nonce):  # pylint: disable=no-self-use
+        return nonce
+
+    def maybe_sendraw_to(self, address, host_port, messagedata):  # pylint: disable=unused-argument
+        self.pings.append(messagedata)
+
+    def set_node_network_state(self, address, network_state):  # pylint: disable=unused-argument
+        self.network_states.append(network_state)
+
+
+def test_healthcheck_scheduler_transitions():
+    now = [0]
+    protocol = MockProtocol()
+    protocol.raiden = protocol
+    protocol.address = b'\x01' * 20
+    partner = b'\x02' * 20
+
+    healthcheck = HealthCheckScheduler(
+        protocol,
+        nat_keepalive_retries=2,
+        nat_keepalive_timeout=5,
+        nat_invitation_timeout=15,
+        time_function=lambda: now[0],
+    )
+    events = healthcheck.add(partner)
+    peer = healthcheck.addresses_to_peers[partner]
+
+    # pylint: disable=protected-access
+    healthcheck._check(peer, now[0])
+    assert events.event_healthy.is_set()
+    assert protocol.pings == [1]
+    assert healthcheck.pong_received(partner, 1)
+
+    # recent traffic, no ping is necessary
+    healthcheck.peer_seen(partner)
+    now[0] = 1
+    healthcheck._check(peer, now[0])
+    assert protocol.pings == [1]
+
+    now[0] = 10
+    healthcheck._check(peer, now[0])
+    healthcheck._check(peer, now[0])
+    assert protocol.pings == [1, 2, 3]
+    assert not events.event_unhealthy.is_set()
+
+    healthcheck._check(peer, now[0])
+    assert events.event_unhealthy.is_set()
+
+    assert not healthcheck.pong_received(partner, 10)
+    assert healthcheck.pong_received(partner, 3)
+    assert events.event_healthy.is_set()
+
+    # one state change per transition
+    assert protocol.network_states == ['reachable', 'unreachable', 'reachable']
+
+
+def test_healthcheck_scheduler_pings_busy_peers_until_pong():
+    now = [0]
+    protocol = MockProtocol()
+    protocol.raiden = protocol
+    protocol.address = b'\x01' * 20
+    partner = b'\x02' * 20
+
+    healthcheck = HealthCheckScheduler(
+        protocol,
+        nat_keepalive_retries=2,
+        nat_keepalive_timeout=5,
+        nat_invitation_timeout=15,
+        time_function=lambda: now[0],
+    )
+
+    # traffic arrived before the endpoint was known, the peer is still
+    # pinged on the first contact to negotiate the capabilities
+    healthcheck.add(partner)
+    healthcheck.peer_seen(partner)
+    peer = healthcheck.addresses_to_peers[partner]
+
+    # pylint: disable=protected-access
+    healthcheck._check(peer, now[0])
+    assert protocol.pings == [1]
+
+    # the ping was lost, the busy peer is pinged again until it answers
+    now[0] = 1
+    healthcheck.peer_seen(partner)
+    healthcheck._check(peer, now[0])
+    assert protocol.pings == [1, 2]
+
+    assert healthcheck.pong_received(partner, 2)
+    healthcheck._check(peer, now[0])
+    assert protocol.pings == [1, 2]
+
+
+class FailingEndpointProtocol(MockProtocol):
+    """ The endpoint of `failing` can't be read, e.g. the ethereum node is not
+    reachable.
+    """
+
+    def __init__(self, failing, error):
+        super().__init__()
+        self.failing = failing
+        self.error = error
+        self.failed_lookups = 0
+
+    def get_host_port(self, address):
+        if address == self.failing:
+            self.failed_lookups += 1
+            raise self.error
+
+        return super().get_host_port(address)
+
+
+def test_healthcheck_scheduler_survives_a_failing_peer():
+    now = [0]
+    failing = b'\x02' * 20
+    partner = b'\x03' * 20
+    protocol = FailingEndpointProtocol(failing, ConnectionError('connection refused'))
+    protocol.raiden = protocol
+    protocol.address = b'\x01' * 20
+
+    healthcheck = HealthCheckScheduler(
+        protocol,
+        nat_keepalive_retries=2,
+        nat_keepalive_timeout=5,
+        nat_invitation_timeout=15,
+        time_function=lambda: now[0],
+    )
+    event_stop = Event()
+    runner = gevent.spawn(healthcheck.run, event_stop)
+
+    healthcheck.add(failing)
+    healthcheck.add(partner)
+    gevent.sleep(0)
+    assert protocol.failed_lookups == 1
+    assert protocol.pings == [1]
+
+    # the failing peer is checked again later, the other peers still are
+    now[0] = 10
+    healthcheck.event_wakeup.set()
+    gevent.sleep(0)
+    assert protocol.failed_lookups == 2
+    assert protocol.pings == [1, 2]
+    assert not runner.dead
+
+    event_stop.set()
+    healthcheck.stop()
+    runner.join(1)
+    assert runner.successful()
+
+
+def test_healthcheck_scheduler_waits_for_invalid_endpoints():
+    failing = b'\x02' * 20
+    protocol = FailingEndpointProtocol(failing, InvalidAddress('unknown node'))
+    protocol.raiden = protocol
+    protocol.address = b'\x01' * 20
+
+    healthcheck = HealthCheckScheduler(
+        protocol,
+        nat_keepalive_retries=2,
+        nat_keepalive_timeout=5,
+        nat_invitation_timeout=15,
+        time_function=lambda: 0,
+    )
+    events = healthcheck.add(failing)
+    peer = healthcheck.addresses_to_peers[failing]
+
+    # pylint: disable=protected-access
+    healthcheck._check(peer, 0)
+    assert events.event_unhealthy.is_set()
+    assert peer.endpoint_backoff is not None
+    assert peer.next_check is not None
+
+
+def test_transport_queue_depths_are_reported_per_node():
+    recipient = factories.make_address()
+    first = SimpleNamespace(
+        raiden=SimpleNamespace(address=factories.make_address()),
+        queueids_to_queues={(recipient, b'global'): [1, 2]},
+    )
+    second = SimpleNamespace(
+        raiden=SimpleNamespace(address=factories.make_address()),
+        queueids_to_queues={(recipient, b'global'): [1]},
+    )
+
+    TRANSPORT_QUEUED_MESSAGES.set_function(partial(UDPTransport.queue_depths, first), 'first')
+    TRANSPORT_QUEUED_MESSAGES.set_function(partial(UDPTransport.queue_depths, second), 'second')
+    try:
+        samples = {
+            labels: value
+            for _, labels, value in TRANSPORT_QUEUED_MESSAGES.samples()
+        }
+        for transport, depth in ((first, 2), (second, 1)):
+            labels = format_labels(
+                TRANSPORT_QUEUED_MESSAGES.labelnames,
+                (address_encoder(transport.raiden.address), address_encoder(recipient), 'global'),
+            )
+            assert samples[labels] == depth
+
+        # A stopped transport is not reported nor referenced
+        TRANSPORT_QUEUED_MESSAGES.remove_function('first')
+        assert 'first' not in TRANSPORT_QUEUED_MESSAGES.keys_to_functions
+        assert len(list(TRANSPORT_QUEUED_MESSAGES.samples())) == 1
+    finally:
+        TRANSPORT_QUEUED_MESSAGES.remove_function('first')
+        TRANSPORT_QUEUED_MESSAGES.remove_function('second')
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+import random
+from types import SimpleNamespace
+
+import gevent
+import networkx
+
+from raiden import waiting
+from raiden.settings import DEFAULT_NUMBER_OF_CONFIRMATIONS_BLOCK
+from raiden.tests.utils import factories
+from raiden.tests.utils.factories import make_address
+from raiden.transfer import node
+from raiden.transfer.partition import get_due_channels
+from raiden.transfer.state import (
+    NODE_NETWORK_REACHABLE,
+    NODE_NETWORK_UNREACHABLE,
+    NodeState,
+    TokenNetworkGraphState,
+    TokenNetworkState,
+    TransactionChannelNewBalance,
+)
+from raiden.transfer.state_change import (
+    ActionChangeNodeNetworkState,
+    ActionNewTokenNetwork,
+    Block,
+    ContractReceiveChannelNewBalance,
+)
+
+
+def make_raiden(networkstates):
+    node_state = SimpleNamespace(nodeaddresses_to_networkstates=networkstates)
+    return SimpleNamespace(
+        state_observers=waiting.StateObservers(),
+        wal=SimpleNamespace(state_manager=SimpleNamespace(current_state=node_state)),
+    )
+
+
+def set_network_state(raiden, node_address, network_state):
+    networkstates = raiden.wal.state_manager.current_state.nodeaddresses_to_networkstates
+    networkstates[node_address] = network_state
+    raiden.state_observers.notify(ActionChangeNodeNetworkState(node_address, network_state))
+
+
+def test_wait_for_healthy_is_woken_by_relevant_state_changes():
+    node_address = make_address()
+    other_address = make_address()
+    raiden = make_raiden({node_address: NODE_NETWORK_UNREACHABLE})
+
+    conditions_evaluated = list()
+    original_wait_until = raiden.state_observers.wait_until
+
+    def wait_until(keys, condition):
+        def counting_condition():
+            conditions_evaluated.append(True)
+            return condition()
+        original_wait_until(keys, counting_condition)
+
+    raiden.state_observers.wait_until = wait_until
+
+    waiter = gevent.spawn(waiting.wait_for_healthy, raiden, node_address)
+    gevent.idle()
+    assert len(conditions_evaluated) == 1
+
+    # Unrelated state changes don't wake the waiter up
+    raiden.state_observers.notify(Block(10))
+    set_network_state(raiden, other_address, NODE_NETWORK_REACHABLE)
+    gevent.idle()
+    assert not waiter.ready()
+    assert len(conditions_evaluated) == 1
+
+    set_network_state(raiden, node_address, NODE_NETWORK_REACHABLE)
+    waiter.get(timeout=1)
+    assert len(conditions_evaluated) == 2
+    assert not raiden.state_observers.keys_to_events
+
+
+def test_wait_until_returns_if_the_condition_holds():
+    raiden = make_raiden({})
+    raiden.state_observers.wait_until([waiting.node_key(make_address())], lambda: True)
+    assert not raiden.state_observers.keys_to_events
+
+
+def test_waiters_are_removed_on_timeout():
+    raiden = make_raiden({})
+    node_address = make_address()
+
+    with gevent.Timeout(0.01, False):
+        waiting.wait_for_healthy(raiden, node_address)
+
+    assert not raiden.state_observers.keys_to_events
+
+
+def apply_state_change(raiden, state_change):
+    """ Applies `state_change` and notifies the observers, like
+    `RaidenService.handle_state_change`.
+    """
+    node_state = raiden.wal.state_manager.current_state
+
+    due_channels = ()
+    if isinstance(state_change, Block):
+        due_channels = get_due_channels(node_state, state_change.block_number)
+
+    node.state_transition(node_state, state_change)
+    raiden.state_observers.notify(state_change, due_channels)
+
+
+def test_wait_for_newbalance_is_woken_by_the_confirming_block():
+    payment_network_identifier = make_address()
+    token_address = make_address()
+    channel_state = factories.make_channel(our_balance=100)
+    our_address = channel_state.our_state.address
+    partner_address = channel_state.partner_state.address
+    token_network_state = TokenNetworkState(
+        channel_state.token_network_identifier,
+        token_address,
+        TokenNetworkGraphState(networkx.Graph()),
+        [channel_state],
+    )
+
+    node_state = NodeState(random.Random(), 1)
+    raiden = SimpleNamespace(
+        address=our_address,
+        state_observers=waiting.StateObservers(),
+        wal=SimpleNamespace(state_manager=SimpleNamespace(current_state=node_state)),
+    )
+    apply_state_change(
+        raiden,
+        ActionNewTokenNetwork(payment_network_identifier, token_network_state),
+    )
+
+    waiter = gevent.spawn(
+        waiting.wait_for_participant_newbalance,
+        raiden,
+        payment_network_identifier,
+        token_address,
+        partner_address,
+        our_address,
+        150,
+    )
+    gevent.idle()
+
+    # The deposit is seen before it is confirmed, the balance is only updated
+    # by the Block which confirms it
+    deposit_block_number = 2
+    apply_state_change(raiden, ContractReceiveChannelNewBalance(
+        channel_state.token_network_identifier,
+        channel_state.identifier,
+        TransactionChannelNewBalance(our_address, 150, deposit_block_number),
+    ))
+
+    confirmation_block_number = deposit_block_number + DEFAULT_NUMBER_OF_CONFIRMATIONS_BLOCK + 1
+    for block_number in range(deposit_block_number, confirmation_block_number):
+        apply_state_change(raiden, Block(block_number))
+        gevent.idle()
+        assert not waiter.ready()
+
+    apply_state_change(raiden, Block(confirmation_block_number))
+    waiter.get(timeout=1)
+    assert not raiden.state_observers.keys_to_events
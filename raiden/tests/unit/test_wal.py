@@ -125,3 +125,90 @@ def test_write_read_events():
     latest_event = new_events[-1]
     assert latest_event[0] == block_number
     assert isinstance(latest_event[1], EventTransferSentFailed)
+
+
+def test_log_and_dispatch_batch():
+    events_by_block = dict()
+
+    def state_transition_events(state, state_change):
+        event = EventTransferSentFailed(state_change.block_number, 'whatever')
+        events_by_block[state_change.block_number] = event
+        return TransitionResult(state, [event])
+
+    state_manager = StateManager(state_transition_events, None)
+    storage = SQLiteStorage(':memory:', PickleSerializer)
+    wal = WriteAheadLog(state_manager, storage)
+
+    assert wal.log_and_dispatch_batch([], 1) == []
+
+    state_changes = [Block(number) for number in range(3)]
+    events_lists = wal.log_and_dispatch_batch(state_changes, 10)
+    assert events_lists == [[events_by_block[number]] for number in range(3)]
+
+    stored_state_changes = storage.get_statechanges_by_identifier(
+        from_identifier=0,
+        to_identifier='latest',
+    )
+    assert [block.block_number for block in stored_state_changes] == [0, 1, 2]
+    assert wal.state_change_id == 3
+
+    stored_events = storage.get_events_by_identifier(
+        from_identifier=0,
+        to_identifier='latest',
+    )
+    assert [event.identifier for _, event in stored_events] == [0, 1, 2]
+    assert all(block_number == 10 for block_number, _ in stored_events)
+
+
+def test_iter_events_by_block():
+    wal = new_wal()
+
+    state_change_id = wal.storage.write_state_change('statechangedata')
+    for block_number in (3, 1, 2, 1):
+        wal.storage.write_events(
+            state_change_id,
+            block_number,
+            [EventTransferSentFailed(block_number, 'whatever')],
+        )
+
+    for batch_size in (1, 2, 10):
+        stored_events = list(wal.storage.iter_events_by_block(1, 2, batch_size=batch_size))
+        assert [block_number for block_number, _ in stored_events] == [1, 1, 2]
+
+    assert list(wal.storage.iter_events_by_block(4, 10)) == []
+
+
+def test_write_read_contract_events():
+    storage = SQLiteStorage(':memory:', PickleSerializer)
+    contract_address = factories.make_address()
+
+    assert storage.get_contract_events_range(contract_address) is None
+
+    events = [
+        (block_number, event_type, {'event': event_type, 'block_number': block_number})
+        for block_number, event_type in ((3, 'ChannelNew'), (5, 'ChannelClosed'))
+    ]
+    storage.write_contract_events(contract_address, events, 0, 10)
+
+    assert storage.get_contract_events_range(contract_address) == (0, 10)
+    assert storage.get_contract_events(contract_address, 0, 10) == [
+        event for _, _, event in events
+    ]
+    assert storage.get_contract_events(contract_address, 4, 10) == [events[1][2]]
+    assert storage.get_contract_events(contract_address, 0, 10, ['ChannelNew']) == [events[0][2]]
+    assert storage.get_contract_events(factories.make_address(), 0, 10) == []
+
+
+def test_matrix_peers_roundtrip():
+    storage = SQLiteStorage(':memory:', PickleSerializer)
+    address = factories.make_address()
+    other_address = factories.make_address()
+
+    storage.write_matrix_peer(address, '!first:server', {'@b:server', '@a:server'})
+    storage.write_matrix_peer(other_address, None, set())
+    storage.write_matrix_peer(address, '!second:server', {'@a:server'})
+
+    assert sorted(storage.get_matrix_peers()) == sorted([
+        (address, '!second:server', ['@a:server']),
+        (other_address, None, []),
+    ])
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import copy
+import inspect
+
+import pytest
+
+from raiden.storage.serialize import PickleSerializer
+from raiden.tests.utils import factories
+from raiden.transfer import events, state_change
+from raiden.transfer.architecture import Event, StateChange
+from raiden.transfer.mediated_transfer import events as mediated_events
+from raiden.transfer.mediated_transfer import state_change as mediated_state_change
+
+
+def classes_of(module):
+    return [
+        klass
+        for _, klass in inspect.getmembers(module, inspect.isclass)
+        if issubclass(klass, (Event, StateChange)) and klass.__module__ == module.__name__
+    ]
+
+
+@pytest.mark.parametrize('module', [
+    events,
+    state_change,
+    mediated_events,
+    mediated_state_change,
+])
+def test_events_and_state_changes_are_slotted(module):
+    for klass in classes_of(module):
+        for base in klass.__mro__[:-1]:
+            assert '__slots__' in vars(base), base
+
+
+class LegacyInstance:
+    """ Pickles like an instance of `klass` with a `__dict__`, as the state
+    changes and events were pickled before they were slotted.
+    """
+
+    def __init__(self, klass, attributes):
+        self.klass = klass
+        self.attributes = attributes
+
+    def __reduce_ex__(self, protocol):
+        return object.__new__, (self.klass,), self.attributes
+
+
+def test_legacy_pickles_are_restored():
+    recipient = factories.make_address()
+    legacy_data = PickleSerializer.serialize([
+        LegacyInstance(state_change.Block, {'block_number': 5}),
+        LegacyInstance(events.SendProcessed, {
+            'recipient': recipient,
+            'queue_name': 'global',
+            'message_identifier': 7,
+        }),
+    ])
+
+    block, send_processed = PickleSerializer.deserialize(legacy_data)
+    assert block == state_change.Block(5)
+    assert send_processed == events.SendProcessed(recipient, 'global', 7)
+    assert not hasattr(block, '__dict__')
+
+    # The slotted instances are restored too
+    assert PickleSerializer.deserialize(PickleSerializer.serialize(block)) == block
+    assert copy.deepcopy(send_processed) == send_processed
@@ -29,6 +29,25 @@ from typing import List
 # outputs are separated under different class hierarquies (StateChange and Event).
 
 
+def set_pickled_state(instance, state):
+    """ Restores the attributes of a pickled slotted instance.
+
+    The state changes and events were pickled with a `__dict__` before they
+    were slotted, the WAL and the snapshots may still contain these. Their
+    state is the dictionary of attributes, while a slotted instance is
+    pickled with the `(None, slots)` pair.
+    """
+    if isinstance(state, tuple):
+        dict_state, slots_state = state
+    else:
+        dict_state, slots_state = state, None
+
+    for attributes in (dict_state, slots_state):
+        if attributes:
+            for name, value in attributes.items():
+                setattr(instance, name, value)
+
+
 class State:
     """ An isolated state, modified by StateChange messages.
 
@@ -62,6 +81,9 @@ class StateChange:
     """
     __slots__ = ()
 
+    def __setstate__(self, state):
+        set_pickled_state(self, state)
+
 
 class Event:
     """ Events produced by the execution of a state change.
@@ -79,14 +101,28 @@ class Event:
     """
     __slots__ = ()
 
+    def __setstate__(self, state):
+        set_pickled_state(self, state)
+
 
 class SendMessageEvent(Event):
+    __slots__ = (
+        'recipient',
+        'queue_name',
+        'message_identifier',
+    )
+
     def __init__(self, recipient, queue_name, message_identifier):
         self.recipient = recipient
         self.queue_name = queue_name
         self.message_identifier = message_identifier
 
 
+def copy_state(state, state_change):  # pylint: disable=unused-argument
+    """ Copies the whole state, regardless of what `state_change` modifies. """
+    return deepcopy(state)
+
+
 class StateManager:
     """ The mutable storage for the application state, this storage can do
     state transitions by applying the StateChanges to the current State.
@@ -94,20 +130,28 @@ class StateManager:
     __slots__ = (
         'state_transition',
         'current_state',
+        'copy_state',
     )
 
-    def __init__(self, state_transition, current_state):
+    def __init__(self, state_transition, current_state, copy_state=copy_state):
         """ Initialize the state manager.
 
         Args:
             state_transition: function that can apply a StateChange message.
             current_state: current application state.
+            copy_state: function that returns the copy of the current state
+                given to `state_transition`, it must copy every object that
+                the state change may modify.
         """
         if not callable(state_transition):
             raise ValueError('state_transition must be a callable')
 
+        if not callable(copy_state):
+            raise ValueError('copy_state must be a callable')
+
         self.state_transition = state_transition
         self.current_state = current_state
+        self.copy_state = copy_state
 
     def dispatch(self, state_change: StateChange) -> List[Event]:
         """ Apply the `state_change` in the current machine and return the
@@ -126,7 +170,7 @@ class StateManager:
 
         # the state objects must be treated as immutable, so make a copy of the
         # current state and pass the copy to the state machine to be modified.
-        next_state = deepcopy(self.current_state)
+        next_state = self.copy_state(self.current_state, state_change)
 
         # update the current state by applying the change
         iteration = self.state_transition(
@@ -1315,6 +1315,28 @@ def handle_block(
     return TransitionResult(channel_state, events)
 
 
+def get_next_block_event(
+        channel_state: NettingChannelState,
+) -> typing.Optional[typing.BlockNumber]:
+    """ The first block number at which `handle_block` may change the channel,
+    None if no block will.
+    """
+    blocks = list()
+
+    if get_status(channel_state) == CHANNEL_STATE_CLOSED:
+        closed_block_number = channel_state.close_transaction.finished_block_number
+        blocks.append(closed_block_number + channel_state.settle_timeout + 1)
+
+    if channel_state.deposit_transaction_queue:
+        deposit_block_number = channel_state.deposit_transaction_queue[0].block_number
+        blocks.append(deposit_block_number + DEFAULT_NUMBER_OF_CONFIRMATIONS_BLOCK + 1)
+
+    if blocks:
+        return min(blocks)
+
+    return None
+
+
 def handle_channel_closed(
         channel_state: NettingChannelState,
         state_change: ContractReceiveChannelClosed,
@@ -14,6 +14,12 @@ class ContractSendChannelClose(Event):
     on-chain.
     """
 
+    __slots__ = (
+        'channel_identifier',
+        'token_address',
+        'balance_proof',
+    )
+
     def __init__(self, channel_identifier, token_address, balance_proof):
         self.channel_identifier = channel_identifier
         self.token_address = token_address
@@ -41,6 +47,10 @@ class ContractSendChannelClose(Event):
 class ContractSendChannelSettle(Event):
     """ Event emitted if the netting channel must be settled. """
 
+    __slots__ = (
+        'channel_identifier',
+    )
+
     def __init__(self, channel_identifier):
         self.channel_identifier = channel_identifier
 
@@ -62,6 +72,11 @@ class ContractSendChannelSettle(Event):
 class ContractSendChannelUpdateTransfer(Event):
     """ Event emitted if the netting channel balance proof must be updated. """
 
+    __slots__ = (
+        'channel_identifier',
+        'balance_proof',
+    )
+
     def __init__(self, channel_identifier, balance_proof):
         self.channel_identifier = channel_identifier
         self.balance_proof = balance_proof
@@ -86,6 +101,11 @@ class ContractSendChannelUpdateTransfer(Event):
 class ContractSendChannelWithdraw(Event):
     """ Event emitted when the lock must be withdrawn on-chain. """
 
+    __slots__ = (
+        'channel_identifier',
+        'unlock_proofs',
+    )
+
     def __init__(self, channel_identifier, unlock_proofs):
         self.channel_identifier = channel_identifier
         self.unlock_proofs = unlock_proofs
@@ -130,6 +150,12 @@ class EventTransferSentSuccess(Event):
         sucessful but there is no knowledge about the global transfer.
     """
 
+    __slots__ = (
+        'identifier',
+        'amount',
+        'target',
+    )
+
     def __init__(self, identifier, amount, target):
         self.identifier = identifier
         self.amount = amount
@@ -162,6 +188,11 @@ class EventTransferSentFailed(Event):
         has failed, they may infer about lock successes and failures.
     """
 
+    __slots__ = (
+        'identifier',
+        'reason',
+    )
+
     def __init__(self, identifier, reason):
         self.identifier = identifier
         self.reason = reason
@@ -193,6 +224,12 @@ class EventTransferReceivedSuccess(Event):
         there is no correspoding `EventTransferReceivedFailed`.
     """
 
+    __slots__ = (
+        'identifier',
+        'amount',
+        'initiator',
+    )
+
     def __init__(self, identifier, amount, initiator):
         if amount < 0:
             raise ValueError('transferred_amount cannot be negative')
@@ -226,6 +263,11 @@ class EventTransferReceivedSuccess(Event):
 class EventTransferReceivedInvalidDirectTransfer(Event):
     """ Event emitted when an invalid direct transfer is received. """
 
+    __slots__ = (
+        'identifier',
+        'reason',
+    )
+
     def __init__(self, identifier, reason):
         self.identifier = identifier
         self.reason = reason
@@ -250,6 +292,12 @@ class EventTransferReceivedInvalidDirectTransfer(Event):
 class SendDirectTransfer(SendMessageEvent):
     """ Event emitted when a direct transfer message must be sent. """
 
+    __slots__ = (
+        'payment_identifier',
+        'balance_proof',
+        'token',
+    )
+
     def __init__(
             self,
             recipient,
@@ -295,6 +343,8 @@ class SendDirectTransfer(SendMessageEvent):
 
 
 class SendProcessed(SendMessageEvent):
+    __slots__ = ()
+
     def __repr__(self):
         return (
             '<SendProcessed confirmed_msgid:{} recipient:{}>'
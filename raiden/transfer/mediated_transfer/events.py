@@ -26,6 +26,10 @@ def refund_from_sendmediated(send_lockedtransfer_event):
 class SendLockedTransfer(SendMessageEvent):
     """ A locked transfer that must be sent to `recipient`. """
 
+    __slots__ = (
+        'transfer',
+    )
+
     def __init__(self, recipient, queue_name, message_identifier, transfer):
         if not isinstance(transfer, LockedTransferUnsignedState):
             raise ValueError('transfer must be a LockedTransferUnsignedState instance')
@@ -81,6 +85,12 @@ class SendRevealSecret(SendMessageEvent):
         to the sender, so when the secret is learned it is not yet time to
         update the balance.
     """
+
+    __slots__ = (
+        'secret',
+        'secrethash',
+    )
+
     def __init__(
             self,
             recipient,
@@ -133,6 +143,14 @@ class SendBalanceProof(SendMessageEvent):
         two uni-directional channels), as a consequence the merkle root is only
         updated by the recipient once a balance proof message is received.
     """
+
+    __slots__ = (
+        'payment_identifier',
+        'token',
+        'secret',
+        'balance_proof',
+    )
+
     def __init__(
             self,
             recipient,
@@ -182,6 +200,13 @@ class SendSecretRequest(SendMessageEvent):
     """ Event used by a target node to request the secret from the initiator
     (`recipient`).
     """
+
+    __slots__ = (
+        'payment_identifier',
+        'amount',
+        'secrethash',
+    )
+
     def __init__(
             self,
             recipient,
@@ -231,6 +256,16 @@ class SendRefundTransfer(SendMessageEvent):
     the sender, allowing the sender to try a different route without the risk
     of losing token.
     """
+
+    __slots__ = (
+        'payment_identifier',
+        'token',
+        'balance_proof',
+        'lock',
+        'initiator',
+        'target',
+    )
+
     def __init__(
             self,
             recipient,
@@ -291,6 +326,12 @@ class SendRefundTransfer(SendMessageEvent):
 
 class EventUnlockSuccess(Event):
     """ Event emitted when a lock unlock succeded. """
+
+    __slots__ = (
+        'identifier',
+        'secrethash',
+    )
+
     def __init__(self, identifier, secrethash):
         self.identifier = identifier
         self.secrethash = secrethash
@@ -314,6 +355,13 @@ class EventUnlockSuccess(Event):
 
 class EventUnlockFailed(Event):
     """ Event emitted when a lock unlock failed. """
+
+    __slots__ = (
+        'identifier',
+        'secrethash',
+        'reason',
+    )
+
     def __init__(self, identifier, secrethash, reason):
         self.identifier = identifier
         self.secrethash = secrethash
@@ -339,6 +387,12 @@ class EventUnlockFailed(Event):
 
 class EventWithdrawSuccess(Event):
     """ Event emitted when a lock withdraw succeded. """
+
+    __slots__ = (
+        'identifier',
+        'secrethash',
+    )
+
     def __init__(self, identifier, secrethash):
         self.identifier = identifier
         self.secrethash = secrethash
@@ -362,6 +416,13 @@ class EventWithdrawSuccess(Event):
 
 class EventWithdrawFailed(Event):
     """ Event emitted when a lock withdraw failed. """
+
+    __slots__ = (
+        'identifier',
+        'secrethash',
+        'reason',
+    )
+
     def __init__(self, identifier, secrethash, reason):
         self.identifier = identifier
         self.secrethash = secrethash
@@ -957,6 +957,29 @@ def handle_block(channelidentifiers_to_channels, state, state_change, block_numb
     return iteration
 
 
+def get_next_block_event(channelidentifiers_to_channels, state):
+    """ The first block number at which `handle_block` may close a channel or
+    expire a lock of the pending transfer pairs, None if no block will.
+    """
+    blocks = list()
+
+    for pair in get_pending_transfer_pairs(state.transfers_pair):
+        payer_channel_identifier = pair.payer_transfer.balance_proof.channel_address
+        payer_channel = channelidentifiers_to_channels.get(payer_channel_identifier)
+
+        if payer_channel is None:
+            # Let handle_block deal with the missing channel right away
+            return 0
+
+        blocks.append(pair.payer_transfer.lock.expiration - payer_channel.reveal_timeout)
+        blocks.append(pair.payee_transfer.lock.expiration + 1)
+
+    if blocks:
+        return min(blocks)
+
+    return None
+
+
 def handle_refundtransfer(
         mediator_state,
         mediator_state_change: ReceiveTransferRefund,
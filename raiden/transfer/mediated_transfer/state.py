@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 # pylint: disable=too-few-public-methods,too-many-arguments,too-many-instance-attributes
 from raiden.transfer.architecture import State
-from raiden.utils import pex, sha3, typing, encode_hex
+from raiden.utils import encode_hex, intern_identifier, pex, sha3, typing
 from raiden.transfer.state import (
     EMPTY_MERKLE_ROOT,
     balanceproof_from_envelope,
@@ -24,11 +24,11 @@ def lockedtransfersigned_from_message(message):
     transfer_state = LockedTransferSignedState(
         message.message_identifier,
         message.payment_identifier,
-        message.token,
+        intern_identifier(message.token),
         balance_proof,
         lock,
-        message.initiator,
-        message.target,
+        intern_identifier(message.initiator),
+        intern_identifier(message.target),
     )
 
     return transfer_state
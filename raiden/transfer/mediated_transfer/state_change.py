@@ -23,6 +23,11 @@ class ActionInitInitiator(StateChange):
         secret: The secret that must be used with the transfer.
     """
 
+    __slots__ = (
+        'transfer',
+        'routes',
+    )
+
     def __init__(self, transfer_description, routes):
         if not isinstance(transfer_description, TransferDescriptionWithSecretState):
             raise ValueError('transfer must be an TransferDescriptionWithSecretState instance.')
@@ -55,6 +60,12 @@ class ActionInitMediator(StateChange):
         from_transfer: The payee transfer.
     """
 
+    __slots__ = (
+        'routes',
+        'from_route',
+        'from_transfer',
+    )
+
     def __init__(
             self,
             routes: typing.List[RouteState],
@@ -98,6 +109,11 @@ class ActionInitTarget(StateChange):
         transfer: The payee transfer.
     """
 
+    __slots__ = (
+        'route',
+        'transfer',
+    )
+
     def __init__(self, route, transfer):
         if not isinstance(route, RouteState):
             raise ValueError('route must be a RouteState instance')
@@ -132,6 +148,12 @@ class ActionCancelRoute(StateChange):
         timeouts.
     """
 
+    __slots__ = (
+        'registry_address',
+        'identifier',
+        'routes',
+    )
+
     def __init__(self, registry_address, identifier, routes):
         self.registry_address = registry_address
         self.identifier = identifier
@@ -157,6 +179,14 @@ class ActionCancelRoute(StateChange):
 class ReceiveSecretRequest(StateChange):
     """ A SecretRequest message received. """
 
+    __slots__ = (
+        'payment_identifier',
+        'amount',
+        'secrethash',
+        'sender',
+        'revealsecret',
+    )
+
     def __init__(self, payment_identifier, amount, secrethash, sender):
         self.payment_identifier = payment_identifier
         self.amount = amount
@@ -188,6 +218,13 @@ class ReceiveSecretRequest(StateChange):
 
 class ReceiveSecretReveal(StateChange):
     """ A SecretReveal message received. """
+
+    __slots__ = (
+        'secret',
+        'secrethash',
+        'sender',
+    )
+
     def __init__(self, secret, sender):
         secrethash = sha3(secret)
 
@@ -218,6 +255,14 @@ class ReceiveTransferRefundCancelRoute(StateChange):
     route.
     """
 
+    __slots__ = (
+        'sender',
+        'transfer',
+        'routes',
+        'secrethash',
+        'secret',
+    )
+
     def __init__(self, sender, routes, transfer, secret):
         if not isinstance(transfer, LockedTransferSignedState):
             raise ValueError('transfer must be an instance of LockedTransferSignedState')
@@ -252,6 +297,13 @@ class ReceiveTransferRefundCancelRoute(StateChange):
 
 class ReceiveTransferRefund(StateChange):
     """ A RefundTransfer message received. """
+
+    __slots__ = (
+        'message_identifier',
+        'sender',
+        'transfer',
+    )
+
     def __init__(self, message_identifier, sender, transfer: LockedTransferSignedState):
         if not isinstance(transfer, LockedTransferSignedState):
             raise ValueError('transfer must be an instance of LockedTransferSignedState')
@@ -292,6 +344,14 @@ class ContractReceiveWithdraw(StateChange):
         If the channel was used for a mediated transfer that was refunded, this
         event must be used twice, once for each receiver.
     """
+
+    __slots__ = (
+        'channel_address',
+        'secrethash',
+        'receiver',
+        'secret',
+    )
+
     def __init__(self, channel_address, secret, receiver):
         secrethash = sha3(secret)
 
@@ -321,6 +381,12 @@ class ContractReceiveWithdraw(StateChange):
 
 
 class ContractReceiveClosed(StateChange):
+    __slots__ = (
+        'channel_address',
+        'closing_address',
+        'block_number',
+    )
+
     def __init__(self, channel_address, closing_address, block_number):
         self.channel_address = channel_address
         self.closing_address = closing_address
@@ -346,6 +412,11 @@ class ContractReceiveClosed(StateChange):
 
 
 class ContractReceiveSettled(StateChange):
+    __slots__ = (
+        'channel_address',
+        'block_number',
+    )
+
     def __init__(self, channel_address, block_number):
         self.channel_address = channel_address
         self.block_number = block_number  # TODO: rename to settle_block_number
@@ -368,6 +439,14 @@ class ContractReceiveSettled(StateChange):
 
 
 class ContractReceiveBalance(StateChange):
+    __slots__ = (
+        'channel_address',
+        'token_address',
+        'participant_address',
+        'balance',
+        'block_number',
+    )
+
     def __init__(
             self,
             channel_address,
@@ -409,6 +488,14 @@ class ContractReceiveBalance(StateChange):
 
 
 class ContractReceiveNewChannel(StateChange):
+    __slots__ = (
+        'manager_address',
+        'channel_address',
+        'participant1',
+        'participant2',
+        'settle_timeout',
+    )
+
     def __init__(
             self,
             manager_address,
@@ -451,6 +538,12 @@ class ContractReceiveNewChannel(StateChange):
 
 
 class ContractReceiveTokenAdded(StateChange):
+    __slots__ = (
+        'registry_address',
+        'token_address',
+        'manager_address',
+    )
+
     def __init__(self, registry_address, token_address, manager_address):
         self.registry_address = registry_address
         self.token_address = token_address
@@ -209,6 +209,23 @@ def handle_block(target_state, channel_state, block_number):
     return iteration
 
 
+def get_next_block_event(target_state, channel_state):
+    """ The first block number at which `handle_block` may emit events for
+    the transfer, None if no block will.
+    """
+    transfer = target_state.transfer
+    secret_known = channel.is_secret_known(
+        channel_state.partner_state,
+        transfer.lock.secrethash,
+    )
+
+    if secret_known and target_state.state == 'waiting_close':
+        return None
+
+    # Nothing is done while it is safe to wait, the lock expires afterwards
+    return transfer.lock.expiration - channel_state.reveal_timeout
+
+
 def state_transition(
         target_state,
         state_change,
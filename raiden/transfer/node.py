@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import heapq
+
 from raiden.transfer import (
     channel,
     token_network,
@@ -14,6 +16,7 @@ from raiden.transfer.architecture import (
     TransitionResult,
 )
 from raiden.transfer.state import (
+    BlockTimersState,
     NodeState,
     PaymentMappingState,
     PaymentNetworkState,
@@ -35,6 +38,7 @@ from raiden.transfer.state_change import (
     ContractReceiveNewTokenNetwork,
     ContractReceiveRouteNew,
     ReceiveDelivered,
+    ReceiveDeliveredBatch,
     ReceiveProcessed,
     ReceiveTransferDirect,
     ReceiveUnlock,
@@ -74,27 +78,135 @@ def get_token_network_by_token_address(node_state, payment_network_identifier, t
     return token_network_state
 
 
-def subdispatch_to_all_channels(node_state, state_change, block_number):
+def schedule_block_timer(node_state, kind, key, block_number):
+    """ Registers the next block at which `key` has to handle a `Block` state
+    change, None unregisters it.
+    """
+    block_timers = node_state.block_timers
+    timer_key = (kind, key)
+
+    if block_number is None:
+        block_timers.keys_to_block.pop(timer_key, None)
+        return
+
+    # A timer which is already due is handled on the next block
+    block_number = max(block_number, node_state.block_number + 1)
+
+    if block_timers.keys_to_block.get(timer_key) != block_number:
+        block_timers.keys_to_block[timer_key] = block_number
+        heapq.heappush(block_timers.queue, (block_number, kind, key))
+
+
+def schedule_channel(node_state, token_network_identifier, channel_identifier):
+    channel_state = views.get_channelstate_by_token_network_identifier(
+        node_state,
+        token_network_identifier,
+        channel_identifier,
+    )
+
+    block_number = None
+    if channel_state:
+        block_number = channel.get_next_block_event(channel_state)
+
+    schedule_block_timer(
+        node_state,
+        BlockTimersState.CHANNEL,
+        (token_network_identifier, channel_identifier),
+        block_number,
+    )
+
+
+def schedule_token_network(node_state, token_network_state):
+    for channel_identifier in token_network_state.channelidentifiers_to_channels:
+        schedule_channel(node_state, token_network_state.address, channel_identifier)
+
+
+def schedule_paymenttask(node_state, secrethash):
+    sub_task = node_state.payment_mapping.secrethashes_to_task.get(secrethash)
+    block_number = None
+
+    # Initiator tasks don't handle blocks
+    if isinstance(sub_task, PaymentMappingState.MediatorTask):
+        token_network_state = views.get_token_network_by_identifier(
+            node_state,
+            sub_task.token_network_identifier,
+        )
+
+        if token_network_state:
+            block_number = mediator.get_next_block_event(
+                token_network_state.channelidentifiers_to_channels,
+                sub_task.mediator_state,
+            )
+
+    elif isinstance(sub_task, PaymentMappingState.TargetTask):
+        channel_state = views.get_channelstate_by_token_network_identifier(
+            node_state,
+            sub_task.token_network_identifier,
+            sub_task.channel_identifier,
+        )
+
+        if channel_state:
+            block_number = target.get_next_block_event(
+                sub_task.target_state,
+                channel_state,
+            )
+
+    schedule_block_timer(node_state, BlockTimersState.TASK, secrethash, block_number)
+
+
+def pop_due_timers(node_state, block_number):
+    """ Removes the timers which are due at `block_number` and returns the keys
+    of the channels and of the payment tasks.
+    """
+    block_timers = node_state.block_timers
+    channel_keys = list()
+    secrethashes = list()
+
+    while block_timers.queue and block_timers.queue[0][0] <= block_number:
+        timer_block_number, kind, key = heapq.heappop(block_timers.queue)
+
+        # The timer was rescheduled or removed after this entry was added
+        if block_timers.keys_to_block.get((kind, key)) != timer_block_number:
+            continue
+
+        del block_timers.keys_to_block[(kind, key)]
+
+        if kind == BlockTimersState.CHANNEL:
+            channel_keys.append(key)
+        else:
+            secrethashes.append(key)
+
+    return channel_keys, secrethashes
+
+
+def subdispatch_to_due_channels(node_state, state_change, channel_keys):
     events = list()
 
-    for payment_network in node_state.identifiers_to_paymentnetworks.values():
-        for token_network_state in payment_network.tokenaddresses_to_tokennetworks.values():
-            for channel_state in token_network_state.channelidentifiers_to_channels.values():
-                result = channel.state_transition(
-                    channel_state,
-                    state_change,
-                    node_state.pseudo_random_generator,
-                    block_number,
-                )
-                events.extend(result.events)
+    for token_network_identifier, channel_identifier in channel_keys:
+        channel_state = views.get_channelstate_by_token_network_identifier(
+            node_state,
+            token_network_identifier,
+            channel_identifier,
+        )
+
+        if channel_state:
+            result = channel.state_transition(
+                channel_state,
+                state_change,
+                node_state.pseudo_random_generator,
+                node_state.block_number,
+            )
+            events.extend(result.events)
+
+        schedule_channel(node_state, token_network_identifier, channel_identifier)
 
     return TransitionResult(node_state, events)
 
 
-def subdispatch_to_all_lockedtransfers(node_state, state_change):
+def subdispatch_to_due_paymenttasks(node_state, state_change, secrethashes):
     events = list()
 
-    for secrethash in node_state.payment_mapping.secrethashes_to_task.keys():
+    for secrethash in secrethashes:
         result = subdispatch_to_paymenttask(node_state, state_change, secrethash)
         events.extend(result.events)
 
@@ -171,6 +283,8 @@ def subdispatch_to_paymenttask(node_state, state_change, secrethash):
         if sub_iteration and sub_iteration.new_state is None:
             del node_state.payment_mapping.secrethashes_to_task[secrethash]
 
+        schedule_paymenttask(node_state, secrethash)
+
     return TransitionResult(node_state, events)
 
 
@@ -273,6 +387,8 @@ def subdispatch_mediatortask(
         elif secrethash in node_state.payment_mapping.secrethashes_to_task:
             del node_state.payment_mapping.secrethashes_to_task[secrethash]
 
+        schedule_paymenttask(node_state, secrethash)
+
     return TransitionResult(node_state, events)
 
 
@@ -332,6 +448,8 @@ def subdispatch_targettask(
         elif secrethash in node_state.payment_mapping.secrethashes_to_task:
             del node_state.payment_mapping.secrethashes_to_task[secrethash]
 
+        schedule_paymenttask(node_state, secrethash)
+
     return TransitionResult(node_state, events)
 
 
@@ -361,6 +479,8 @@ def maybe_add_tokennetwork(node_state, payment_network_identifier, token_network
         ids_to_tokens[token_network_identifier] = token_network_state
         addrs_to_tokens[token_address] = token_network_state
 
+        schedule_token_network(node_state, token_network_state)
+
 
 def sanity_check(iteration):
     assert isinstance(iteration.new_state, NodeState)
@@ -370,15 +490,19 @@ def handle_block(node_state, state_change):
     block_number = state_change.block_number
     node_state.block_number = block_number
 
-    # Subdispatch Block state change
-    channels_result = subdispatch_to_all_channels(
+    # Only the channels and tasks which have something to do at this block
+    # are visited
+    channel_keys, secrethashes = pop_due_timers(node_state, block_number)
+
+    channels_result = subdispatch_to_due_channels(
         node_state,
         state_change,
-        block_number,
+        channel_keys,
     )
-    transfers_result = subdispatch_to_all_lockedtransfers(
+    transfers_result = subdispatch_to_due_paymenttasks(
         node_state,
         state_change,
+        secrethashes,
     )
     events = channels_result.events + transfers_result.events
     return TransitionResult(node_state, events)
@@ -424,6 +548,18 @@ def handle_token_network_action(node_state, state_change):
 
         events = iteration.events
 
+        if isinstance(state_change, ContractReceiveChannelNew):
+            channel_identifier = state_change.channel_state.identifier
+        else:
+            channel_identifier = getattr(state_change, 'channel_identifier', None)
+
+        if channel_identifier is not None:
+            schedule_channel(
+                node_state,
+                state_change.token_network_identifier,
+                channel_identifier,
+            )
+
     return TransitionResult(node_state, events)
 
 
@@ -443,6 +579,21 @@ def handle_delivered(node_state, state_change):
     return TransitionResult(node_state, [])
 
 
+def handle_delivered_batch(node_state, state_change):
+    # A single pass over the queues for all the acknowledged messages
+    delivered = set(state_change.message_identifiers)
+
+    for queueid, queue in node_state.queueids_to_queues.items():
+        if queueid[1] == 'global':
+            queue[:] = [
+                message
+                for message in queue
+                if message.message_identifier not in delivered
+            ]
+
+    return TransitionResult(node_state, [])
+
+
 def handle_new_token_network(node_state, state_change):
     token_network_state = state_change.token_network
     payment_network_identifier = state_change.payment_network_identifier
@@ -489,6 +640,9 @@ def handle_new_payment_network(node_state, state_change):
     if payment_network_identifier not in node_state.identifiers_to_paymentnetworks:
         node_state.identifiers_to_paymentnetworks[payment_network_identifier] = payment_network
 
+        for token_network_state in payment_network.tokenidentifiers_to_tokennetworks.values():
+            schedule_token_network(node_state, token_network_state)
+
     return TransitionResult(node_state, events)
 
 
@@ -731,6 +885,11 @@ def state_transition(node_state, state_change):
             node_state,
             state_change,
         )
+    elif type(state_change) == ReceiveDeliveredBatch:
+        iteration = handle_delivered_batch(
+            node_state,
+            state_change,
+        )
     elif type(state_change) == ReceiveTransferDirect:
         iteration = handle_token_network_action(
             node_state,
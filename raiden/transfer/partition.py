@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Copy-on-write partitions of the node state.
+
+Every token network, together with the payment tasks that use its channels,
+is a partition of the `NodeState`. Most state changes modify a single
+partition, so instead of copying the whole node state for every state change
+`copy_partitions` copies only the partitions the state change may modify, the
+other partitions are shared with the previous state. Node-wide state changes
+are either fanned out to the partitions they touch, e.g. a `Block` only
+copies the partitions with a due timer, or copy the whole state.
+"""
+from copy import copy, deepcopy
+
+from raiden.transfer import views
+from raiden.transfer.mediated_transfer.state_change import (
+    ActionInitInitiator,
+    ActionInitMediator,
+    ActionInitTarget,
+    ReceiveSecretRequest,
+    ReceiveSecretReveal,
+    ReceiveTransferRefund,
+    ReceiveTransferRefundCancelRoute,
+)
+from raiden.transfer.state import (
+    BlockTimersState,
+    NodeState,
+)
+from raiden.transfer.state_change import (
+    ActionChangeNodeNetworkState,
+    ActionChannelClose,
+    ActionTransferDirect,
+    Block,
+    ContractReceiveChannelClosed,
+    ContractReceiveChannelNew,
+    ContractReceiveChannelNewBalance,
+    ContractReceiveChannelSettled,
+    ContractReceiveRouteNew,
+    ReceiveDelivered,
+    ReceiveDeliveredBatch,
+    ReceiveProcessed,
+    ReceiveTransferDirect,
+    ReceiveUnlock,
+)
+from raiden.utils import typing
+
+# State changes which only modify the node-wide queues and network states
+NODE_STATE_CHANGES = (
+    ActionChangeNodeNetworkState,
+    ReceiveDelivered,
+    ReceiveDeliveredBatch,
+    ReceiveProcessed,
+)
+
+# State changes which only modify the channels of their token network
+TOKEN_NETWORK_STATE_CHANGES = (
+    ActionChannelClose,
+    ActionTransferDirect,
+    ContractReceiveChannelClosed,
+    ContractReceiveChannelNew,
+    ContractReceiveChannelNewBalance,
+    ContractReceiveChannelSettled,
+    ContractReceiveRouteNew,
+    ReceiveTransferDirect,
+)
+
+# State changes which modify a payment task and the channels of its token
+# network
+PAYMENT_STATE_CHANGES = (
+    ActionInitInitiator,
+    ActionInitMediator,
+    ActionInitTarget,
+    ReceiveSecretRequest,
+    ReceiveSecretReveal,
+    ReceiveTransferRefund,
+    ReceiveTransferRefundCancelRoute,
+    ReceiveUnlock,
+)
+
+Partitions = typing.Tuple[typing.Set[typing.TokenNetworkID], typing.Set[typing.SecretHash]]
+
+
+def secrethash_for(state_change) -> typing.SecretHash:
+    """ The secrethash of the payment task a payment state change is
+    dispatched to.
+    """
+    if isinstance(state_change, ActionInitInitiator):
+        return state_change.transfer.secrethash
+
+    if isinstance(state_change, ActionInitMediator):
+        return state_change.from_transfer.lock.secrethash
+
+    transfer_state_changes = (
+        ActionInitTarget,
+        ReceiveTransferRefund,
+        ReceiveTransferRefundCancelRoute,
+    )
+    if isinstance(state_change, transfer_state_changes):
+        return state_change.transfer.lock.secrethash
+
+    return state_change.secrethash
+
+
+def get_due_timers(block_timers: BlockTimersState, block_number: typing.BlockNumber):
+    """ The entries of `block_timers` which are due at `block_number`, without
+    removing them.
+    """
+    queue = block_timers.queue
+    due = list()
+
+    # The children of an entry in the heap are never due before it
+    positions = [0]
+    while positions:
+        position = positions.pop()
+
+        if position < len(queue) and queue[position][0] <= block_number:
+            due.append(queue[position])
+            positions.append(2 * position + 1)
+            positions.append(2 * position + 2)
+
+    return due
+
+
+def get_due_channels(
+        node_state: NodeState,
+        block_number: typing.BlockNumber,
+) -> typing.List[typing.Tuple[typing.Address, typing.ChannelID]]:
+    """ The `(token_network_identifier, channel_identifier)` of the channels a
+    `Block` at `block_number` is dispatched to. The timers are removed when
+    the block is applied, so this must be called before.
+    """
+    block_timers = node_state.block_timers
+
+    return [
+        key
+        for timer_block_number, kind, key in get_due_timers(block_timers, block_number)
+        if (
+            kind == BlockTimersState.CHANNEL and
+            block_timers.keys_to_block.get((kind, key)) == timer_block_number
+        )
+    ]
+
+
+def get_partitions(node_state: NodeState, state_change) -> typing.Optional[Partitions]:
+    """ Returns the token networks and the payment tasks that `state_change`
+    may modify, None if it may modify anything else.
+    """
+    # pylint: disable=unidiomatic-typecheck
+    secrethashes_to_task = node_state.payment_mapping.secrethashes_to_task
+    state_change_type = type(state_change)
+
+    if state_change_type in NODE_STATE_CHANGES:
+        return set(), set()
+
+    if state_change_type in TOKEN_NETWORK_STATE_CHANGES:
+        return {state_change.token_network_identifier}, set()
+
+    if state_change_type in PAYMENT_STATE_CHANGES:
+        secrethash = secrethash_for(state_change)
+        token_network_identifier = views.token_network_for(state_change)
+        sub_task = secrethashes_to_task.get(secrethash)
+
+        if sub_task is not None:
+            task_token_network_identifier = sub_task.token_network_identifier
+
+            if token_network_identifier not in (None, task_token_network_identifier):
+                return None
+
+            token_network_identifier = task_token_network_identifier
+
+        elif token_network_identifier is None:
+            # There is no task to dispatch the state change to
+            return set(), set()
+
+        return {token_network_identifier}, {secrethash}
+
+    if state_change_type == Block:
+        token_network_identifiers = set()
+        secrethashes = set()
+
+        for _, kind, key in get_due_timers(node_state.block_timers, state_change.block_number):
+            if kind == BlockTimersState.CHANNEL:
+                token_network_identifier, _ = key
+                token_network_identifiers.add(token_network_identifier)
+            else:
+                sub_task = secrethashes_to_task.get(key)
+
+                if sub_task is not None:
+                    token_network_identifiers.add(sub_task.token_network_identifier)
+                    secrethashes.add(key)
+
+        return token_network_identifiers, secrethashes
+
+    return None
+
+
+def copy_partitions(node_state: NodeState, state_change) -> NodeState:
+    """ Copies `node_state` for the transition of `state_change`.
+
+    The partitions that `state_change` may modify and the node-wide containers
+    are copied, the other partitions are shared with `node_state`.
+    """
+    partitions = None
+    if node_state is not None:
+        partitions = get_partitions(node_state, state_change)
+
+    if partitions is None:
+        return deepcopy(node_state)
+
+    token_network_identifiers, secrethashes = partitions
+    secrethashes_to_task = node_state.payment_mapping.secrethashes_to_task
+
+    token_networks = list()
+    for token_network_identifier in token_network_identifiers:
+        token_network_state = views.get_token_network_by_identifier(
+            node_state,
+            token_network_identifier,
+        )
+
+        if token_network_state is not None:
+            token_networks.append(token_network_state)
+
+    tasks = {
+        secrethash: secrethashes_to_task[secrethash]
+        for secrethash in secrethashes
+        if secrethash in secrethashes_to_task
+    }
+
+    # A single copy keeps the objects shared by the tasks and the channels
+    # shared in the copy
+    pseudo_random_generator, token_networks, tasks = deepcopy((
+        node_state.pseudo_random_generator,
+        token_networks,
+        tasks,
+    ))
+
+    new_state = NodeState(pseudo_random_generator, node_state.block_number)
+    new_state.queueids_to_queues = {
+        queueid: list(queue)
+        for queueid, queue in node_state.queueids_to_queues.items()
+    }
+    new_state.nodeaddresses_to_networkstates = dict(node_state.nodeaddresses_to_networkstates)
+    new_state.payment_mapping.secrethashes_to_task = dict(secrethashes_to_task)
+    new_state.payment_mapping.secrethashes_to_task.update(tasks)
+    new_state.block_timers.queue = list(node_state.block_timers.queue)
+    new_state.block_timers.keys_to_block = dict(node_state.block_timers.keys_to_block)
+    new_state.identifiers_to_paymentnetworks = dict(node_state.identifiers_to_paymentnetworks)
+
+    copied_payment_networks = set()
+    for token_network_state in token_networks:
+        payment_network_state = views.search_payment_network_by_token_network_id(
+            new_state,
+            token_network_state.address,
+        )
+        payment_network_identifier = payment_network_state.address
+
+        if payment_network_identifier not in copied_payment_networks:
+            payment_network_state = copy(payment_network_state)
+            payment_network_state.tokenidentifiers_to_tokennetworks = dict(
+                payment_network_state.tokenidentifiers_to_tokennetworks,
+            )
+            payment_network_state.tokenaddresses_to_tokennetworks = dict(
+                payment_network_state.tokenaddresses_to_tokennetworks,
+            )
+
+            new_state.identifiers_to_paymentnetworks[payment_network_identifier] = (
+                payment_network_state
+            )
+            copied_payment_networks.add(payment_network_identifier)
+
+        ids_to_tokens = payment_network_state.tokenidentifiers_to_tokennetworks
+        addrs_to_tokens = payment_network_state.tokenaddresses_to_tokennetworks
+        ids_to_tokens[token_network_state.address] = token_network_state
+        addrs_to_tokens[token_network_state.token_address] = token_network_state
+
+    return new_state
@@ -9,7 +9,7 @@ from raiden.encoding.format import buffer_for
 from raiden.encoding import messages
 from raiden.transfer.architecture import State
 from raiden.transfer.merkle_tree import merkleroot
-from raiden.utils import lpex, pex, sha3, typing
+from raiden.utils import intern_identifier, lpex, pex, sha3, typing
 
 SecretHashToLock = typing.Dict[typing.SecretHash, 'HashTimeLockState']
 SecretHashToPartialUnlockProof = typing.Dict[typing.SecretHash, 'UnlockPartialProofState']
@@ -52,11 +52,11 @@ def balanceproof_from_envelope(envelope_message):
         envelope_message.transferred_amount,
         envelope_message.locked_amount,
         envelope_message.locksroot,
-        envelope_message.token_network_address,
-        envelope_message.channel,
+        intern_identifier(envelope_message.token_network_address),
+        intern_identifier(envelope_message.channel),
         envelope_message.message_hash,
         envelope_message.signature,
-        envelope_message.sender,
+        intern_identifier(envelope_message.sender),
     )
 
 
@@ -85,6 +85,7 @@ class NodeState(State):
         'identifiers_to_paymentnetworks',
         'nodeaddresses_to_networkstates',
         'payment_mapping',
+        'block_timers',
     )
 
     def __init__(self, pseudo_random_generator: random.Random, block_number: typing.BlockNumber):
@@ -97,6 +98,7 @@ class NodeState(State):
         self.identifiers_to_paymentnetworks = dict()
         self.nodeaddresses_to_networkstates = dict()
         self.payment_mapping = PaymentMappingState()
+        self.block_timers = BlockTimersState()
 
     def __repr__(self):
         return '<NodeState block:{} networks:{} qtd_transfers:{}>'.format(
@@ -108,7 +110,7 @@ class NodeState(State):
     def __eq__(self, other):
         return (
             isinstance(other, NodeState) and
-            self.pseudo_random_generator == other.pseudo_random_generator and
+            self.pseudo_random_generator.getstate() == other.pseudo_random_generator.getstate() and
             self.block_number == other.block_number and
             self.queueids_to_queues == other.queueids_to_queues and
             self.identifiers_to_paymentnetworks == other.identifiers_to_paymentnetworks and
@@ -239,10 +241,17 @@ class TokenNetworkGraphState(State):
     def __repr__(self):
         return '<TokenNetworkGraphState>'
 
+    def _comparable_network(self):
+        # networkx graphs are compared by identity
+        return (
+            set(self.network.nodes()),
+            {frozenset(edge) for edge in self.network.edges()},
+        )
+
     def __eq__(self, other):
         return (
             isinstance(other, TokenNetworkGraphState) and
-            self.network == other.network
+            self._comparable_network() == other._comparable_network()
         )
 
     def __ne__(self, other):
@@ -303,6 +312,37 @@ class PaymentMappingState(State):
         return not self.__eq__(other)
 
 
+class BlockTimersState(State):
+    """ Index of the channels and payment tasks by the next block at which a
+    `Block` state change has something to do for them, e.g. a lock expiration,
+    the end of the settlement period or a deposit confirmation.
+
+    The queue is a min-heap of `(block_number, kind, key)` entries, an entry
+    is only valid if `keys_to_block` still maps the key to the same block
+    number, outdated entries are discarded when popped.
+
+    This is an index over the rest of the node state, so it is not part of
+    the state's equality.
+    """
+
+    CHANNEL = 0
+    TASK = 1
+
+    __slots__ = (
+        'queue',
+        'keys_to_block',
+    )
+
+    def __init__(self):
+        self.queue = list()
+        self.keys_to_block = dict()
+
+    def __repr__(self):
+        return '<BlockTimersState qtd_timers:{}>'.format(
+            len(self.keys_to_block)
+        )
+
+
 class RouteState(State):
     """ A possible route provided by a routing service.
 
@@ -18,6 +18,10 @@ class Block(StateChange):
         block_number: The current block_number.
     """
 
+    __slots__ = (
+        'block_number',
+    )
+
     def __init__(self, block_number: typing.BlockNumber):
         if not isinstance(block_number, typing.T_BlockNumber):
             raise ValueError('block_number must be of type block_number')
@@ -43,6 +47,10 @@ class ActionCancelPayment(StateChange):
     state of the transfer.
     """
 
+    __slots__ = (
+        'payment_identifier',
+    )
+
     def __init__(self, payment_identifier: typing.PaymentID):
         self.payment_identifier = payment_identifier
 
@@ -64,6 +72,11 @@ class ActionCancelPayment(StateChange):
 class ActionChannelClose(StateChange):
     """ User is closing an existing channel. """
 
+    __slots__ = (
+        'token_network_identifier',
+        'channel_identifier',
+    )
+
     def __init__(
             self,
             token_network_identifier: typing.TokenNetworkID,
@@ -95,6 +108,10 @@ class ActionCancelTransfer(StateChange):
     state of the transfer.
     """
 
+    __slots__ = (
+        'transfer_identifier',
+    )
+
     def __init__(self, transfer_identifier: typing.TransferID) -> None:
         self.transfer_identifier = transfer_identifier
 
@@ -114,6 +131,13 @@ class ActionCancelTransfer(StateChange):
 
 
 class ActionTransferDirect(StateChange):
+    __slots__ = (
+        'token_network_identifier',
+        'amount',
+        'receiver_address',
+        'payment_identifier',
+    )
+
     def __init__(
             self,
             token_network_identifier: typing.TokenNetworkIdentifier,
@@ -155,6 +179,11 @@ class ActionTransferDirect(StateChange):
 class ContractReceiveChannelNew(StateChange):
     """ A new channel was created and this node IS a participant. """
 
+    __slots__ = (
+        'token_network_identifier',
+        'channel_state',
+    )
+
     def __init__(
             self,
             token_network_identifier: typing.TokenNetworkID,
@@ -183,6 +212,13 @@ class ContractReceiveChannelNew(StateChange):
 class ContractReceiveChannelClosed(StateChange):
     """ A channel to which this node IS a participant was closed. """
 
+    __slots__ = (
+        'token_network_identifier',
+        'channel_identifier',
+        'closing_address',
+        'closed_block_number',
+    )
+
     def __init__(
             self,
             token_network_identifier: typing.TokenNetworkID,
@@ -228,6 +264,11 @@ class ContractReceiveChannelClosed(StateChange):
 
 
 class ActionInitNode(StateChange):
+    __slots__ = (
+        'pseudo_random_generator',
+        'block_number',
+    )
+
     def __init__(
             self,
             pseudo_random_generator,
@@ -258,6 +299,11 @@ class ActionNewTokenNetwork(StateChange):
     A token network corresponds to a channel manager smart contract.
     """
 
+    __slots__ = (
+        'payment_network_identifier',
+        'token_network',
+    )
+
     def __init__(
             self,
             payment_network_identifier: typing.PaymentNetworkID,
@@ -289,6 +335,12 @@ class ActionNewTokenNetwork(StateChange):
 class ContractReceiveChannelNewBalance(StateChange):
     """ A channel to which this node IS a participant had a deposit. """
 
+    __slots__ = (
+        'token_network_identifier',
+        'channel_identifier',
+        'deposit_transaction',
+    )
+
     def __init__(
             self,
             token_network_identifier: typing.TokenNetworkID,
@@ -323,6 +375,12 @@ class ContractReceiveChannelNewBalance(StateChange):
 class ContractReceiveChannelSettled(StateChange):
     """ A channel to which this node IS a participant was settled. """
 
+    __slots__ = (
+        'token_network_identifier',
+        'channel_identifier',
+        'settle_block_number',
+    )
+
     def __init__(
             self,
             token_network_identifier: typing.TokenNetworkID,
@@ -361,6 +419,8 @@ class ContractReceiveChannelSettled(StateChange):
 class ActionLeaveAllNetworks(StateChange):
     """ User is quitting all payment networks. """
 
+    __slots__ = ()
+
     def __repr__(self):
         return '<ActionLeaveAllNetworks>'
 
@@ -374,6 +434,11 @@ class ActionLeaveAllNetworks(StateChange):
 class ActionChangeNodeNetworkState(StateChange):
     """ The network state of `node_address` changed. """
 
+    __slots__ = (
+        'node_address',
+        'network_state',
+    )
+
     def __init__(
             self,
             node_address: typing.Address,
@@ -407,6 +472,10 @@ class ContractReceiveNewPaymentNetwork(StateChange):
     A payment network corresponds to a registry smart contract.
     """
 
+    __slots__ = (
+        'payment_network',
+    )
+
     def __init__(self, payment_network: PaymentNetworkState):
         if not isinstance(payment_network, PaymentNetworkState):
             raise ValueError('payment_network must be a PaymentNetworkState instance')
@@ -431,6 +500,11 @@ class ContractReceiveNewPaymentNetwork(StateChange):
 class ContractReceiveNewTokenNetwork(StateChange):
     """ A new token was registered with the payment network. """
 
+    __slots__ = (
+        'payment_network_identifier',
+        'token_network',
+    )
+
     def __init__(
             self,
             payment_network_identifier: typing.PaymentNetworkID,
@@ -471,6 +545,15 @@ class ContractReceiveChannelWithdraw(StateChange):
         event must be used twice, once for each receiver.
     """
 
+    __slots__ = (
+        'payment_network_identifier',
+        'token_address',
+        'channel_identifier',
+        'secret',
+        'secrethash',
+        'receiver',
+    )
+
     def __init__(
             self,
             payment_network_identifier: typing.PaymentNetworkID,
@@ -517,6 +600,11 @@ class ContractReceiveChannelWithdraw(StateChange):
 class ContractReceiveNewRoute(StateChange):
     """ New channel was created and this node is NOT a participant. """
 
+    __slots__ = (
+        'participant1',
+        'participant2',
+    )
+
     def __init__(self, participant1: typing.Address, participant2: typing.Address):
         if not isinstance(participant1, typing.T_Address):
             raise ValueError('participant1 must be of type address')
@@ -547,6 +635,12 @@ class ContractReceiveNewRoute(StateChange):
 class ContractReceiveRouteNew(StateChange):
     """ New channel was created and this node is NOT a participant. """
 
+    __slots__ = (
+        'token_network_identifier',
+        'participant1',
+        'participant2',
+    )
+
     def __init__(
             self,
             token_network_identifier: typing.TokenNetworkID,
@@ -584,6 +678,13 @@ class ContractReceiveRouteNew(StateChange):
 
 
 class ReceiveTransferDirect(StateChange):
+    __slots__ = (
+        'token_network_identifier',
+        'message_identifier',
+        'payment_identifier',
+        'balance_proof',
+    )
+
     def __init__(
             self,
             token_network_identifier: typing.TokenNetworkID,
@@ -625,6 +726,13 @@ class ReceiveTransferDirect(StateChange):
 
 
 class ReceiveUnlock(StateChange):
+    __slots__ = (
+        'message_identifier',
+        'secret',
+        'secrethash',
+        'balance_proof',
+    )
+
     def __init__(
             self,
             message_identifier: typing.MessageID,
@@ -662,10 +770,43 @@ class ReceiveUnlock(StateChange):
 
 
 class ReceiveDelivered(StateChange):
+    __slots__ = (
+        'message_identifier',
+    )
+
     def __init__(self, message_identifier: typing.MessageID):
         self.message_identifier = message_identifier
 
 
+class ReceiveDeliveredBatch(StateChange):
+    """ Multiple messages were acknowledged at once by the partner node. """
+
+    __slots__ = (
+        'message_identifiers',
+    )
+
+    def __init__(self, message_identifiers: typing.List[typing.MessageID]):
+        self.message_identifiers = message_identifiers
+
+    def __repr__(self):
+        return '<ReceiveDeliveredBatch msgids:{}>'.format(
+            self.message_identifiers,
+        )
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, ReceiveDeliveredBatch) and
+            self.message_identifiers == other.message_identifiers
+        )
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
 class ReceiveProcessed(StateChange):
+    __slots__ = (
+        'message_identifier',
+    )
+
     def __init__(self, message_identifier: typing.MessageID):
         self.message_identifier = message_identifier
@@ -1,5 +1,10 @@
 # -*- coding: utf-8 -*-
 from raiden.transfer import channel
+from raiden.transfer.mediated_transfer.state_change import (
+    ActionInitInitiator,
+    ActionInitMediator,
+    ActionInitTarget,
+)
 from raiden.transfer.state import (
     CHANNEL_STATE_OPENED,
     CHANNEL_STATE_SETTLED,
@@ -199,6 +204,28 @@ def get_token_network_by_token_address(
     return None
 
 
+def token_network_for(state_change) -> typing.Optional[typing.Address]:
+    """ Returns the token network modified by `state_change`, or None if it
+    can not be determined from the state change alone.
+    """
+    token_network_identifier = getattr(state_change, 'token_network_identifier', None)
+    balance_proof = getattr(state_change, 'balance_proof', None)
+
+    if token_network_identifier is None:
+        if balance_proof is not None:
+            token_network_identifier = balance_proof.token_network_identifier
+        elif isinstance(state_change, ActionInitInitiator):
+            token_network_identifier = state_change.transfer.token_network_identifier
+        elif isinstance(state_change, ActionInitMediator):
+            balance_proof = state_change.from_transfer.balance_proof
+            token_network_identifier = balance_proof.token_network_identifier
+        elif isinstance(state_change, ActionInitTarget):
+            balance_proof = state_change.transfer.balance_proof
+            token_network_identifier = balance_proof.token_network_identifier
+
+    return token_network_identifier
+
+
 def get_token_network_by_identifier(
         node_state: NodeState,
         token_network_id: typing.TokenAddress,
@@ -475,7 +502,7 @@ def search_payment_network_by_token_network_id(
         )
 
         if token_network_state:
-            return payment_network_state
+            return payment_network
 
     return payment_network_state
 
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 import structlog
 
-from raiden.utils import random_secret
+from raiden.utils import intern_identifier, random_secret
 from raiden.routing import get_best_routes
 from raiden.transfer import views
 from raiden.transfer.state import balanceproof_from_envelope
@@ -36,7 +36,7 @@ def handle_message_secretrequest(raiden: 'RaidenService', message: SecretRequest
         message.payment_identifier,
         message.amount,
         message.secrethash,
-        message.sender,
+        intern_identifier(message.sender),
     )
     raiden.handle_state_change(secret_request)
 
@@ -44,7 +44,7 @@ def handle_message_secretrequest(raiden: 'RaidenService', message: SecretRequest
 def handle_message_revealsecret(raiden: 'RaidenService', message: RevealSecret):
     state_change = ReceiveSecretReveal(
         message.secret,
-        message.sender,
+        intern_identifier(message.sender),
     )
     raiden.handle_state_change(state_change)
 
@@ -62,6 +62,7 @@ def handle_message_secret(raiden: 'RaidenService', message: Secret):
 def handle_message_refundtransfer(raiden: 'RaidenService', message: RefundTransfer):
     token_network_address = message.token_network_address
     from_transfer = lockedtransfersigned_from_message(message)
+    sender = from_transfer.balance_proof.sender
     node_state = views.state_from_raiden(raiden)
 
     routes = get_best_routes(
@@ -70,7 +71,7 @@ def handle_message_refundtransfer(raiden: 'RaidenService', message: RefundTransf
         raiden.address,
         from_transfer.target,
         from_transfer.lock.amount,
-        message.sender,
+        sender,
     )
 
     role = views.get_transfer_role(
@@ -81,7 +82,7 @@ def handle_message_refundtransfer(raiden: 'RaidenService', message: RefundTransf
     if role == 'initiator':
         secret = random_secret()
         state_change = ReceiveTransferRefundCancelRoute(
-            message.sender,
+            sender,
             routes,
             from_transfer,
             secret,
@@ -89,7 +90,7 @@ def handle_message_refundtransfer(raiden: 'RaidenService', message: RefundTransf
     else:
         state_change = ReceiveTransferRefund(
             message.message_identifier,
-            message.sender,
+            sender,
             from_transfer,
         )
 
@@ -11,32 +11,27 @@ import shutil
 from copy import deepcopy
 from itertools import count
 
+# The modules of the transports, the API, the ethereum client and the smoketest
+# are imported by the commands which use them, so the commands which need none
+# of them, e.g. `raiden version`, start fast. `test_cli_import` checks it.
 import click
 import gevent
 import gevent.monkey
 gevent.monkey.patch_all()
-import requests
 from eth_utils import denoms
 import structlog
-from requests.exceptions import RequestException
 
-from raiden.accounts import AccountManager
-from raiden.api.rest import APIServer, RestAPI
 from raiden.constants import (
     ID_TO_NETWORKNAME,
     ROPSTEN_DISCOVERY_ADDRESS,
     ROPSTEN_REGISTRY_ADDRESS,
 )
 from raiden.exceptions import EthNodeCommunicationError, ContractVersionMismatch
-from raiden.network.discovery import ContractDiscovery
-from raiden.network.matrixtransport import MatrixTransport
-from raiden.network.transport.udp.udp_transport import UDPTransport
-from raiden.network.rpc.client import JSONRPCClient
-from raiden.network.sockfactory import SocketFactory
-from raiden.network.throttle import TokenBucket
-from raiden.network.utils import get_free_port
 from raiden.settings import (
+    DEFAULT_HUB_BLOCK_THRESHOLD,
     DEFAULT_NAT_KEEPALIVE_RETRIES,
+    DEFAULT_PROTOCOL_PEER_THROTTLE_CAPACITY,
+    DEFAULT_PROTOCOL_PEER_THROTTLE_FILL_RATE,
     ETHERSCAN_API,
     INITIAL_PORT,
     ORACLE_BLOCKNUMBER_DRIFT_TOLERANCE,
@@ -50,12 +45,6 @@ from raiden.utils import (
     quantity_decoder,
     split_endpoint,
 )
-from raiden.tests.utils.smoketest import (
-    load_smoketest_config,
-    start_ethereum,
-    run_smoketests,
-)
-
 from raiden.utils.cli import (
     ADDRESS_TYPE,
     command,
@@ -112,6 +101,8 @@ def toggle_trace_profiler(raiden):
 
 
 def check_json_rpc(client):
+    import requests
+
     try:
         client_version = client.web3.version.node
     except (requests.exceptions.ConnectionError, EthNodeCommunicationError):
@@ -132,6 +123,8 @@ def check_json_rpc(client):
 
 
 def check_synced(blockchain_service):
+    from requests.exceptions import RequestException
+
     net_id = blockchain_service.network_id
     try:
         network = ID_TO_NETWORKNAME[net_id]
@@ -180,6 +173,9 @@ def check_discovery_registration_gas(blockchain_service, account_address):
 
 
 def etherscan_query_with_retries(url, sleep, retries=3):
+    import requests
+    from requests.exceptions import RequestException
+
     for _ in range(retries - 1):
         try:
             etherscan_block = quantity_decoder(requests.get(url).json()['result'])
@@ -243,6 +239,8 @@ def wait_for_sync(blockchain_service, url, tolerance, sleep):
     # iteration
     print('Checking if the ethereum node is synchronized')
 
+    from requests.exceptions import RequestException
+
     try:
         wait_for_sync_etherscan(blockchain_service, url, tolerance, sleep)
     except (RequestException, ValueError, KeyError):
@@ -325,6 +323,37 @@ def options(func):
             default='udp',
             show_default=True
         ),
+        option(
+            '--partitioned-state',
+            help=(
+                'Copy only the token networks modified by a state change, instead '
+                'of the whole node state. Experimental.'
+            ),
+            is_flag=True,
+        ),
+        option(
+            '--sampling-profiler-rate',
+            help=(
+                'Sample the stacks this many times per second, the profile is '
+                'served by the /api/1/debug/profile endpoint. Zero disables '
+                'the profiler.'
+            ),
+            default=0,
+            type=click.IntRange(min=0),
+            show_default=True,
+        ),
+        option(
+            '--hub-block-threshold',
+            help=(
+                'Report the greenlets which block the gevent hub for longer than '
+                'this many seconds, e.g. 0.1, the incidents are served by the '
+                '/api/1/debug/blocks endpoint. The monitor traces every greenlet '
+                'switch, it is disabled by default.'
+            ),
+            default=DEFAULT_HUB_BLOCK_THRESHOLD,
+            type=float,
+            show_default=True,
+        ),
         option_group(
             'Ethereum Node Options',
             option(
@@ -357,6 +386,15 @@ def options(func):
                 help='Print all communication with the underlying eth client',
                 is_flag=True,
             ),
+            option(
+                '--eth-ipc-path',
+                help=(
+                    'Path to the IPC socket of a local ethereum node. If given, new '
+                    'blocks are received from a subscription instead of polling.'
+                ),
+                default=None,
+                type=str,
+            ),
         ),
         option_group(
             'UDP Transport Options',
@@ -405,6 +443,38 @@ def options(func):
                 show_default=True,
                 option_group='udp_transport'
             ),
+            option(
+                '--packet-coalescing/--no-packet-coalescing',
+                help=(
+                    'Pack multiple messages for the same node into a single UDP packet. '
+                    'Only used with nodes that support it too.'
+                ),
+                default=False,
+                show_default=True,
+            ),
+            option(
+                '--batch-delivered/--no-batch-delivered',
+                help=(
+                    'Acknowledge multiple received messages with a single packet. '
+                    'Only used with nodes that support it too.'
+                ),
+                default=False,
+                show_default=True,
+            ),
+            option(
+                '--protocol-peer-throttle-capacity',
+                help='Number of UDP packets which can be sent to a single node in a burst.',
+                default=DEFAULT_PROTOCOL_PEER_THROTTLE_CAPACITY,
+                type=float,
+                show_default=True,
+            ),
+            option(
+                '--protocol-peer-throttle-fill-rate',
+                help='Number of UDP packets per second which can be sent to a single node.',
+                default=DEFAULT_PROTOCOL_PEER_THROTTLE_FILL_RATE,
+                type=float,
+                show_default=True,
+            ),
         ),
         option_group(
             'Matrix Transport Options',
@@ -508,14 +578,23 @@ def app(
         web_ui,
         datadir,
         eth_client_communication,
+        eth_ipc_path,
         nat,
+        packet_coalescing,
+        batch_delivered,
+        protocol_peer_throttle_capacity,
+        protocol_peer_throttle_fill_rate,
         transport,
-        matrix_server
+        matrix_server,
+        partitioned_state,
+        sampling_profiler_rate,
+        hub_block_threshold,
 ):
     # pylint: disable=too-many-locals,too-many-branches,too-many-statements,unused-argument
 
     from raiden.app import App
     from raiden.network.blockchain_service import BlockChainService
+    from raiden.network.rpc.client import JSONRPCClient
 
     if transport == 'udp' and not mapped_socket:
         raise RuntimeError('Missing socket')
@@ -539,6 +618,10 @@ def app(
     config['web_ui'] = rpc and web_ui
     config['api_host'] = api_host
     config['api_port'] = api_port
+    config['eth_ipc_path'] = eth_ipc_path
+    config['partitioned_state'] = partitioned_state
+    config['sampling_profiler_rate'] = sampling_profiler_rate
+    config['hub_block_threshold'] = hub_block_threshold
     if mapped_socket:
         config['socket'] = mapped_socket.socket
         config['external_ip'] = mapped_socket.external_ip
@@ -548,6 +631,10 @@ def app(
     config['protocol']['nat_keepalive_retries'] = DEFAULT_NAT_KEEPALIVE_RETRIES
     timeout = max_unresponsive_time / DEFAULT_NAT_KEEPALIVE_RETRIES
     config['protocol']['nat_keepalive_timeout'] = timeout
+    config['protocol']['packet_coalescing'] = packet_coalescing
+    config['protocol']['batch_delivered'] = batch_delivered
+    config['protocol']['peer_throttle_capacity'] = protocol_peer_throttle_capacity
+    config['protocol']['peer_throttle_fill_rate'] = protocol_peer_throttle_fill_rate
 
     privatekey_hex = hexlify(privatekey_bin)
     config['privatekey_hex'] = privatekey_hex
@@ -610,6 +697,10 @@ def app(
 
     discovery = None
     if transport == 'udp':
+        from raiden.network.discovery import ContractDiscovery
+        from raiden.network.throttle import TokenBucket
+        from raiden.network.transport.udp.udp_transport import UDPTransport
+
         check_discovery_registration_gas(blockchain_service, address)
         try:
             discovery = ContractDiscovery(
@@ -632,6 +723,8 @@ def app(
             config['protocol'],
         )
     elif transport == 'matrix':
+        from raiden.network.matrixtransport import MatrixTransport
+
         transport = MatrixTransport(config['matrix'])
     else:
         raise RuntimeError(f'Unknown transport type "{transport}" given')
@@ -648,6 +741,8 @@ def app(
 
 
 def prompt_account(address_hex, keystore_path, password_file):
+    from raiden.accounts import AccountManager
+
     accmgr = AccountManager(keystore_path)
     if not accmgr.accounts:
         raise RuntimeError('No Ethereum accounts found in the user\'s system')
@@ -729,8 +824,6 @@ def run(ctx, **kwargs):
         return
 
     print('Welcome to Raiden, version {}!'.format(get_system_spec()['raiden']))
-    from raiden.ui.console import Console
-    from raiden.api.python import RaidenAPI
 
     configure_logging(
         kwargs['log_config'],
@@ -759,6 +852,9 @@ def run(ctx, **kwargs):
 
         api_server = None
         if ctx.params['rpc']:
+            from raiden.api.python import RaidenAPI
+            from raiden.api.rest import APIServer, RestAPI
+
             raiden_api = RaidenAPI(app_.raiden)
             rest_api = RestAPI(raiden_api)
             api_server = APIServer(
@@ -780,6 +876,8 @@ def run(ctx, **kwargs):
             )
 
         if ctx.params['console']:
+            from raiden.ui.console import Console
+
             console = Console(app_)
             console.start()
 
@@ -803,6 +901,8 @@ def run(ctx, **kwargs):
     # - Ask for confirmation to quit if there are any locked transfers that did
     # not timeout.
     if kwargs['transport'] == 'udp':
+        from raiden.network.sockfactory import SocketFactory
+
         (listen_host, listen_port) = split_endpoint(kwargs['listen_address'])
         try:
             with SocketFactory(listen_host, listen_port, strategy=kwargs['nat']) as mapped_socket:
@@ -855,7 +955,15 @@ def version(short, **kwargs):  # pylint: disable=unused-argument
 def smoketest(ctx, debug, **kwargs):  # pylint: disable=unused-argument
     """ Test, that the raiden installation is sane."""
     from raiden.api.python import RaidenAPI
+    from raiden.api.rest import APIServer, RestAPI
     from raiden.blockchain.abi import get_static_or_compile
+    from raiden.network.sockfactory import SocketFactory
+    from raiden.network.utils import get_free_port
+    from raiden.tests.utils.smoketest import (
+        load_smoketest_config,
+        start_ethereum,
+        run_smoketests,
+    )
     from raiden.utils import get_contract_path
 
     # Check the solidity compiler early in the smoketest.
@@ -1006,3 +1114,110 @@ def removedb(ctx):
     if not result:
         print('No raiden databases found for {}'.format(address_hex))
         print('Nothing to delete.')
+
+
+@run.command()
+@click.argument(
+    'database',
+    type=click.Path(exists=True, dir_okay=False),
+)
+@option(
+    '--to-identifier',
+    help='Stop after the state change with this identifier.',
+    type=int,
+)
+@option(
+    '--histogram',
+    is_flag=True,
+    help='Print the latency histogram of every state change type.',
+)
+@option(
+    '--trace-memory',
+    is_flag=True,
+    help='Measure the peak memory allocated by the replay, this slows it down.',
+)
+@click.pass_context
+def replay(ctx, database, to_identifier, histogram, trace_memory):
+    """ Replay the state changes of a node database without network or chain.
+
+    The state changes are dispatched through the state machine, the resulting
+    state is verified against the stored snapshot and the throughput and the
+    latency of every state change type are reported.
+    """
+    import resource
+    import tracemalloc
+
+    from raiden.storage import replay as wal_replay
+    from raiden.storage.serialize import PickleSerializer
+    from raiden.storage.sqlite import SQLiteStorage
+    from raiden.transfer.architecture import copy_state
+    from raiden.transfer.partition import copy_partitions
+
+    storage = SQLiteStorage(database, PickleSerializer())
+
+    state_copy = copy_state
+    if ctx.obj['partitioned_state']:
+        state_copy = copy_partitions
+
+    if trace_memory:
+        tracemalloc.start()
+
+    state, report = wal_replay.replay(storage, state_copy=state_copy, to_identifier=to_identifier)
+
+    if trace_memory:
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print('replayed {} state changes and {} events in {:.2f}s, {:.1f} state changes/s'.format(
+        report.number_of_state_changes,
+        report.number_of_events,
+        report.duration,
+        report.throughput,
+    ))
+
+    if report.snapshot_identifier is None:
+        print('no snapshot to verify')
+    elif report.snapshot_differences is None:
+        print('the snapshot at state change {} was not reached'.format(
+            report.snapshot_identifier,
+        ))
+    elif report.snapshot_differences:
+        print('the snapshot at state change {} differs in {}'.format(
+            report.snapshot_identifier,
+            ', '.join(report.snapshot_differences),
+        ))
+    else:
+        print('the snapshot at state change {} matches'.format(report.snapshot_identifier))
+
+    print('final state {} bytes pickled, peak RSS {} KiB'.format(
+        len(storage.serializer.serialize(state)),
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    ))
+    if trace_memory:
+        print('peak memory allocated {} bytes'.format(peak_memory))
+
+    print()
+    print('{:<36} {:>8} {:>10} {:>10} {:>10} {:>10} {:>10}'.format(
+        'state change', 'count', 'mean us', 'p50 us', 'p90 us', 'p99 us', 'max us',
+    ))
+    for typename, latencies in sorted(report.typenames_to_latencies.items()):
+        latencies = sorted(latencies)
+        print('{:<36} {:>8} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f}'.format(
+            typename,
+            len(latencies),
+            sum(latencies) / len(latencies) * 1e6,
+            wal_replay.percentile(latencies, 0.5) * 1e6,
+            wal_replay.percentile(latencies, 0.9) * 1e6,
+            wal_replay.percentile(latencies, 0.99) * 1e6,
+            latencies[-1] * 1e6,
+        ))
+
+    if histogram:
+        for typename, latencies in sorted(report.typenames_to_latencies.items()):
+            print()
+            print(typename)
+            for upper_bound, bucket_count in wal_replay.latency_histogram(latencies):
+                print('  <= {:>8} us {:>8}'.format(upper_bound, bucket_count))
+
+    if report.snapshot_differences:
+        sys.exit(1)
@@ -50,6 +50,8 @@ def print_usage():
         HEADER, OKBLUE))
     print("\tuse `{}lasterr(n){}` to see n lines of stderr. [default 1]".format(
         HEADER, OKBLUE))
+    print("\tuse `{}hotspots(n){}` to see the n hottest functions of the sampling profiler. "
+          "[default 20]".format(HEADER, OKBLUE))
     print("\tuse `{}help(<topic>){}` for help on a specific topic.".format(HEADER, OKBLUE))
     print("\ttype `{}usage(){}` to see this help again.".format(HEADER, OKBLUE))
     print("\n" + ENDC)
@@ -279,6 +281,21 @@ class Console(BaseService):
 
         self.console_locals['lasterr'] = lasterr
 
+        def hotspots(n=20):
+            """ Print the `n` functions with the most samples of the sampling
+            profiler, which runs with `--sampling-profiler-rate`.
+            """
+            profiler = self.app.raiden.sampling_profiler
+            if profiler is None:
+                print('The sampling profiler is not running')
+                return
+
+            print('{:>8} {:>8}  function'.format('self', 'total'))
+            for function, self_samples, total_samples in profiler.top(n):
+                print('{:>8} {:>8}  {}'.format(self_samples, total_samples, function))
+
+        self.console_locals['hotspots'] = hotspots
+
         IPython.start_ipython(argv=['--gui', 'gevent'], user_ns=self.console_locals)
         self.interrupt.clear()
 
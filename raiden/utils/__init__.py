@@ -18,6 +18,10 @@ from raiden.utils import typing
 
 LETTERS = string.printable
 
+# The interned identifiers are received from the network, the table is bounded
+MAX_INTERNED_IDENTIFIERS = 100000
+INTERNED_IDENTIFIERS = dict()
+
 
 def safe_address_decode(address):
     try:
@@ -29,6 +33,26 @@ def safe_address_decode(address):
     return address
 
 
+def intern_identifier(identifier: bytes) -> bytes:
+    """ Returns the shared object equal to `identifier`.
+
+    Addresses and channel identifiers are repeated in the messages, state
+    changes and events of every transfer, interning them keeps a single
+    object per identifier in the node state and in the pickled snapshots.
+    Secrets and hashes are unique to a payment and must not be interned.
+    """
+    interned = INTERNED_IDENTIFIERS.get(identifier)
+
+    if interned is None:
+        if len(INTERNED_IDENTIFIERS) >= MAX_INTERNED_IDENTIFIERS:
+            return identifier
+
+        INTERNED_IDENTIFIERS[identifier] = identifier
+        interned = identifier
+
+    return interned
+
+
 def random_secret():
     return os.urandom(32)
 
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Detection of the greenlets which block the gevent hub.
+
+Everything runs on a single hub, while a greenlet runs without switching no
+packet is received, no health check is done and the alarm task doesn't run.
+A greenlet tracer measures the time between the switches, a switch away from
+a greenlet other than the hub after more than `threshold` seconds ends a
+block. The stack of the blocking greenlet can only be taken while it blocks,
+so a native thread checks every half `threshold` if the hub is blocked and
+takes the stack of the greenlet.
+
+The code which processes a state change, an event or a message marks it as
+the activity of its greenlet with `processing`, the activity at the time of
+the block is recorded with the incident. The recent incidents are kept in a
+ring buffer and the blocks are measured by the `raiden_hub_block_seconds`
+histogram.
+
+Blocking callbacks run by the hub itself are not detected.
+"""
+import sys
+import time
+import traceback
+from collections import deque
+
+import greenlet
+from gevent import get_hub, monkey
+
+from raiden.utils.metrics import HUB_BLOCK_SECONDS
+
+# The monitor thread must be a native thread and must not yield to the hub
+start_new_thread = monkey.get_original('_thread', 'start_new_thread')
+get_ident = monkey.get_original('_thread', 'get_ident')
+sleep = monkey.get_original('time', 'sleep')
+
+DEFAULT_MAX_INCIDENTS = 100
+MAX_STACK_DEPTH = 50
+MAX_ACTIVITY_REPR = 200
+
+
+def activity_label(activity):
+    if activity is None:
+        return ''
+
+    if isinstance(activity, str):
+        return activity
+
+    return type(activity).__name__
+
+
+class BlockIncident:
+    """ A block of the hub longer than the threshold. """
+    __slots__ = (
+        'started',
+        'duration',
+        'greenlet',
+        'activity',
+        'activity_repr',
+        'stack',
+    )
+
+    def __init__(self, started, duration, greenlet_repr, activity, stack):
+        self.started = started
+        self.duration = duration
+        self.greenlet = greenlet_repr
+        self.activity = activity_label(activity)
+        self.activity_repr = repr(activity)[:MAX_ACTIVITY_REPR] if activity is not None else ''
+        self.stack = stack
+
+    def to_dict(self):
+        return {
+            'started': self.started,
+            'duration': self.duration,
+            'greenlet': self.greenlet,
+            'activity': self.activity,
+            'activity_repr': self.activity_repr,
+            'stack': self.stack,
+        }
+
+
+class Processing:
+    """ Context manager which sets the activity of the current greenlet. """
+    __slots__ = ('greenlets_to_activities', 'activity', 'previous')
+
+    def __init__(self, greenlets_to_activities, activity):
+        self.greenlets_to_activities = greenlets_to_activities
+        self.activity = activity
+        self.previous = None
+
+    def __enter__(self):
+        current = greenlet.getcurrent()
+        self.previous = self.greenlets_to_activities.get(current)
+        self.greenlets_to_activities[current] = self.activity
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        current = greenlet.getcurrent()
+        if self.previous is None:
+            self.greenlets_to_activities.pop(current, None)
+        else:
+            self.greenlets_to_activities[current] = self.previous
+
+
+class HubMonitor:
+    """ Records the blocks of the hub longer than `threshold` seconds. """
+
+    def __init__(self, max_incidents=DEFAULT_MAX_INCIDENTS):
+        self.threshold = None
+        self.incidents = deque(maxlen=max_incidents)
+        self.greenlets_to_activities = dict()
+
+        # Number of `start` calls not followed by a `stop`, the monitor is
+        # shared by the nodes of the process
+        self.users = 0
+        self.hub = None
+        self.thread_id = None
+        self.previous_trace = None
+
+        self.current = None
+        self.last_switch = None
+        self.number_of_switches = 0
+
+        # The incident of the ongoing block, with the number of switches when
+        # it was detected
+        self.ongoing = None
+
+    @property
+    def running(self):
+        return self.users > 0
+
+    def processing(self, activity):
+        """ Marks `activity` as processed by the current greenlet, for use in
+        a `with` statement.
+        """
+        return Processing(self.greenlets_to_activities, activity)
+
+    def start(self, threshold):
+        self.users += 1
+        if self.users > 1:
+            return
+
+        self.threshold = threshold
+        self.hub = get_hub()
+        self.thread_id = get_ident()
+        self.current = greenlet.getcurrent()
+        self.last_switch = time.perf_counter()
+        self.previous_trace = greenlet.settrace(self._trace)
+        start_new_thread(self._run, ())
+
+    def stop(self):
+        if self.users == 0:
+            return
+
+        self.users -= 1
+        if self.users == 0:
+            greenlet.settrace(self.previous_trace)
+            self.previous_trace = None
+
+    def _trace(self, event, args):
+        if event in ('switch', 'throw'):
+            now = time.perf_counter()
+            origin, target = args
+
+            duration = now - self.last_switch
+            if duration > self.threshold and origin is not self.hub:
+                self._end_block(origin, duration)
+
+            self.current = target
+            self.last_switch = now
+            self.number_of_switches += 1
+
+        if self.previous_trace is not None:
+            self.previous_trace(event, args)
+
+    def _end_block(self, blocking_greenlet, duration):
+        ongoing = self.ongoing
+        self.ongoing = None
+
+        if ongoing is not None and ongoing[0] == self.number_of_switches:
+            incident = ongoing[1]
+            incident.duration = duration
+        else:
+            # The block was too short to be seen by the monitor thread
+            activity = self.greenlets_to_activities.get(blocking_greenlet)
+            incident = BlockIncident(
+                time.time() - duration,
+                duration,
+                repr(blocking_greenlet),
+                activity,
+                [],
+            )
+
+        self.incidents.append(incident)
+        HUB_BLOCK_SECONDS.observe(duration, (incident.activity, ))
+
+    def _run(self):
+        while self.running:
+            sleep(self.threshold / 2)
+
+            current = self.current
+            number_of_switches = self.number_of_switches
+            blocked_for = time.perf_counter() - self.last_switch
+
+            already_seen = (
+                self.ongoing is not None and
+                self.ongoing[0] == number_of_switches
+            )
+            if current is self.hub or blocked_for <= self.threshold or already_seen:
+                continue
+
+            frame = sys._current_frames().get(self.thread_id)  # pylint: disable=protected-access
+            stack = traceback.format_stack(frame, limit=MAX_STACK_DEPTH) if frame else []
+            del frame
+
+            incident = BlockIncident(
+                time.time() - blocked_for,
+                blocked_for,
+                repr(current),
+                self.greenlets_to_activities.get(current),
+                stack,
+            )
+
+            # The block may have ended while the stack was taken
+            if self.number_of_switches == number_of_switches:
+                self.ongoing = (number_of_switches, incident)
+
+    def recent_incidents(self):
+        """ The recorded incidents, the most recent first. """
+        return list(reversed(self.incidents))
+
+
+HUB_MONITOR = HubMonitor()
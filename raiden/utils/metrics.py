@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+A small registry of counters, gauges and histograms for the hot paths of the
+node, rendered in the Prometheus text exposition format.
+
+Recording a value is a dictionary update, and the histograms have fixed
+buckets, so the instrumentation is cheap enough to be always enabled. The
+label values are positional, in the order of the `labelnames` of the metric.
+"""
+import bisect
+import math
+import time
+
+from raiden.utils import typing
+
+# Upper bounds in seconds, from 10us to 10s
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005,
+    0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0,
+    10.0,
+)
+
+
+def format_value(value) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+def format_labels(labelnames, labels, extra=()) -> str:
+    pairs = list(zip(labelnames, labels)) + list(extra)
+    if not pairs:
+        return ''
+
+    formatted = ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'),
+        )
+        for name, value in pairs
+    )
+    return '{' + formatted + '}'
+
+
+class Metric:
+    """ Base class of the metrics, a metric has one value per combination of
+    label values.
+    """
+    __slots__ = (
+        'registry',
+        'name',
+        'documentation',
+        'labelnames',
+    )
+
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self):
+        """ Yields the `(suffix, labels, value)` tuples of the metric. """
+        raise NotImplementedError()
+
+    def render(self) -> typing.List[str]:
+        lines = [
+            '# HELP {} {}'.format(self.name, self.documentation),
+            '# TYPE {} {}'.format(self.name, self.kind),
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append('{}{}{} {}'.format(
+                self.name,
+                suffix,
+                labels,
+                format_value(value),
+            ))
+        return lines
+
+
+class Counter(Metric):
+    """ A value which only increases, e.g. the number of retries. """
+    __slots__ = ('labels_to_values',)
+
+    kind = 'counter'
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        super().__init__(registry, name, documentation, labelnames)
+        self.labels_to_values = dict()
+
+    def inc(self, amount=1, labels=()):
+        if self.registry.enabled:
+            self.labels_to_values[labels] = self.labels_to_values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self.labels_to_values.items()):
+            yield '', format_labels(self.labelnames, labels), value
+
+
+class Gauge(Metric):
+    """ A value which goes up and down, e.g. the length of a queue.
+
+    A gauge may be backed by functions, which are called when the metrics are
+    rendered instead of updating the gauge on every change. A function
+    returns the `(labels, value)` pairs of the gauge, and is registered under
+    a key, e.g. the object it reports on, so that every instance reports its
+    own values and is released once its function is removed.
+    """
+    __slots__ = ('labels_to_values', 'keys_to_functions')
+
+    kind = 'gauge'
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        super().__init__(registry, name, documentation, labelnames)
+        self.labels_to_values = dict()
+        self.keys_to_functions = dict()
+
+    def set(self, value, labels=()):
+        if self.registry.enabled:
+            self.labels_to_values[labels] = value
+
+    def set_function(self, function, key=None):
+        self.keys_to_functions[key] = function
+
+    def remove_function(self, key=None):
+        self.keys_to_functions.pop(key, None)
+
+    def samples(self):
+        labels_to_values = dict(self.labels_to_values)
+        for function in list(self.keys_to_functions.values()):
+            labels_to_values.update(function())
+
+        for labels, value in sorted(labels_to_values.items()):
+            yield '', format_labels(self.labelnames, labels), value
+
+
+class Histogram(Metric):
+    """ The distribution of the observed values, e.g. latencies, in buckets
+    with fixed upper bounds.
+    """
+    __slots__ = ('buckets', 'labels_to_counts', 'labels_to_sums')
+
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.labels_to_counts = dict()
+        self.labels_to_sums = dict()
+
+    def observe(self, value, labels=()):
+        if not self.registry.enabled:
+            return
+
+        counts = self.labels_to_counts.get(labels)
+        if counts is None:
+            # The last position counts the values above the largest bucket
+            counts = [0] * (len(self.buckets) + 1)
+            self.labels_to_counts[labels] = counts
+            self.labels_to_sums[labels] = 0
+
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.labels_to_sums[labels] += value
+
+    def time(self, labels=()):
+        """ Context manager which observes the time spent in its block. """
+        return Timer(self, labels)
+
+    def samples(self):
+        upper_bounds = self.buckets + (math.inf, )
+
+        for labels, counts in sorted(self.labels_to_counts.items()):
+            cumulative = 0
+            for upper_bound, count in zip(upper_bounds, counts):
+                cumulative += count
+                yield (
+                    '_bucket',
+                    format_labels(self.labelnames, labels, [('le', format_value(upper_bound))]),
+                    cumulative,
+                )
+
+            formatted = format_labels(self.labelnames, labels)
+            yield '_sum', formatted, self.labels_to_sums[labels]
+            yield '_count', formatted, cumulative
+
+
+class Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(time.perf_counter() - self.start, self.labels)
+
+
+class MetricsRegistry:
+    """ The metrics of a process, in order of registration. """
+
+    def __init__(self):
+        self.enabled = True
+        self.names_to_metrics = dict()
+
+    def register(self, metric):
+        if metric.name in self.names_to_metrics:
+            raise ValueError('The metric {} is already registered'.format(metric.name))
+
+        self.names_to_metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self.register(Gauge(self, name, documentation, labelnames))
+
+    def histogram(
+            self,
+            name,
+            documentation,
+            labelnames=(),
+            buckets=DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """ The metrics in the Prometheus text exposition format. """
+        lines = list()
+        for metric in self.names_to_metrics.values():
+            lines.extend(metric.render())
+        lines.append('')
+        return '\n'.join(lines)
+
+
+REGISTRY = MetricsRegistry()
+
+WAL_WRITE_SECONDS = REGISTRY.histogram(
+    'raiden_wal_write_seconds',
+    'Time spent writing state changes and events to the write-ahead-log.',
+    ('operation', ),
+)
+STATE_CHANGE_DISPATCH_SECONDS = REGISTRY.histogram(
+    'raiden_state_change_dispatch_seconds',
+    'Time spent applying a state change to the node state.',
+    ('state_change', ),
+)
+TRANSPORT_QUEUED_MESSAGES = REGISTRY.gauge(
+    'raiden_transport_queued_messages',
+    'Number of messages waiting to be acknowledged, by node and queue.',
+    ('node', 'recipient', 'queue'),
+)
+TRANSPORT_RETRIES = REGISTRY.counter(
+    'raiden_transport_retries_total',
+    'Number of messages sent again because they were not acknowledged.',
+)
+RPC_REQUEST_SECONDS = REGISTRY.histogram(
+    'raiden_rpc_request_seconds',
+    'Time spent on the JSON-RPC requests to the ethereum node, by method.',
+    ('method', ),
+)
+EVENT_POLL_DURATION_SECONDS = REGISTRY.histogram(
+    'raiden_event_poll_duration_seconds',
+    'Time spent polling and applying the blockchain events.',
+)
+EVENT_POLL_LAG_BLOCKS = REGISTRY.gauge(
+    'raiden_event_poll_lag_blocks',
+    'Number of blocks mined after the block whose events were last applied, by node.',
+    ('node', ),
+)
+ALARM_SKIPPED_BLOCKS = REGISTRY.counter(
+    'raiden_alarm_skipped_blocks_total',
+    'Number of blocks skipped because the alarm callbacks were lagging behind.',
+)
+HUB_BLOCK_SECONDS = REGISTRY.histogram(
+    'raiden_hub_block_seconds',
+    'Duration of the blocks of the gevent hub, by the activity of the blocking greenlet.',
+    ('activity', ),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+ALARM_CALLBACKS_SECONDS = REGISTRY.histogram(
+    'raiden_alarm_callbacks_seconds',
+    'Time spent running the callbacks of a new block.',
+)
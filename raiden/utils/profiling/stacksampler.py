@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+A sampling profiler cheap enough to run continuously.
+
+The stacks are sampled by the handler of the profiling timer signal, which
+runs in the thread of the gevent hub in between two bytecodes of the running
+greenlet. The bottom frame of a greenlet's stack is the function it was
+spawned with, so the samples are grouped by greenlet in the flamegraph. The
+timer counts the CPU time of the process, the time the hub waits for IO is not
+sampled.
+
+Unlike `SampleProfiler` nothing is written to disk and no memory or object
+statistics are collected, and unlike the tracing profiler nothing runs on the
+function calls. The samples are aggregated in memory by stack, with a bounded
+number of stacks.
+
+A sampling thread is not used because it can only take a sample when the hub
+thread releases the GIL, which biases the samples towards the blocking calls.
+"""
+
+from raiden.utils.profiling.timer import Timer
+
+DEFAULT_SAMPLING_RATE = 100
+DEFAULT_MAX_STACKS = 10000
+DEFAULT_MAX_DEPTH = 100
+
+# The samples of new stacks once `max_stacks` is reached
+OTHER_STACKS = '[other stacks]'
+
+
+def code_format(code, module_name):
+    return '{}({}:{})'.format(code.co_name, module_name, code.co_firstlineno)
+
+
+class StackSampler:
+    """ Counts the stacks sampled `rate` times per second of CPU time. """
+
+    def __init__(
+            self,
+            rate=DEFAULT_SAMPLING_RATE,
+            max_stacks=DEFAULT_MAX_STACKS,
+            max_depth=DEFAULT_MAX_DEPTH,
+    ):
+        if rate <= 0:
+            raise ValueError('The sampling rate must be positive')
+
+        self.interval = 1.0 / rate
+        self.max_stacks = max_stacks
+        self.max_depth = max_depth
+
+        self.timer = None
+
+        # Stacks are tuples of the ids of the code objects from the bottom
+        # frame, hashing the code objects is slower. The code objects are
+        # kept alive by `ids_to_codes`, so their ids are not reused.
+        self.stacks_to_counts = dict()
+        self.ids_to_codes = dict()
+        self.ids_to_labels = dict()
+        self.number_of_samples = 0
+        self.number_of_other_samples = 0
+
+    @property
+    def running(self):
+        return self.timer is not None
+
+    def start(self):
+        """ Starts sampling, must be called from the main thread. """
+        if self.timer is None:
+            self.timer = Timer(self._sample, interval=self.interval)
+
+    def stop(self):
+        if self.timer is not None:
+            self.timer.stop()
+            self.timer = None
+
+    def reset(self):
+        self.stacks_to_counts = dict()
+        self.number_of_samples = 0
+        self.number_of_other_samples = 0
+
+    def _sample(self, signum, frame):  # pylint: disable=unused-argument
+        self.sample(frame)
+
+    def sample(self, frame):
+        code_ids = list()
+        ids_to_labels = self.ids_to_labels
+        max_depth = self.max_depth
+
+        while frame is not None and len(code_ids) < max_depth:
+            code = frame.f_code
+            code_id = id(code)
+
+            if code_id not in ids_to_labels:
+                self.ids_to_codes[code_id] = code
+                ids_to_labels[code_id] = code_format(code, frame.f_globals.get('__name__'))
+
+            code_ids.append(code_id)
+            frame = frame.f_back
+
+        code_ids.reverse()
+        stack = tuple(code_ids)
+
+        stacks_to_counts = self.stacks_to_counts
+        count = stacks_to_counts.get(stack)
+        if count is not None:
+            stacks_to_counts[stack] = count + 1
+        elif len(stacks_to_counts) < self.max_stacks:
+            stacks_to_counts[stack] = 1
+        else:
+            self.number_of_other_samples += 1
+
+        self.number_of_samples += 1
+
+    def labeled_stacks(self):
+        """ The `(labels, count)` pairs of the sampled stacks. """
+        # The copy is done by a single call into C, the signal handler can't
+        # add a stack while it's done
+        stacks_to_counts = dict(self.stacks_to_counts)
+        ids_to_labels = self.ids_to_labels
+
+        return [
+            (tuple(ids_to_labels[code_id] for code_id in stack), count)
+            for stack, count in stacks_to_counts.items()
+        ]
+
+    def collapsed(self):
+        """ The samples in the collapsed stack format of `flamegraph.pl`, one
+        `frame;frame;frame count` line per stack.
+        """
+        lines = sorted(
+            '{} {}'.format(';'.join(labels), count)
+            for labels, count in self.labeled_stacks()
+        )
+
+        if self.number_of_other_samples:
+            lines.append('{} {}'.format(OTHER_STACKS, self.number_of_other_samples))
+
+        return '\n'.join(lines)
+
+    def top(self, limit=20):
+        """ The `limit` functions with the most samples on top of the stack.
+
+        Returns:
+            A list of `(function, self_samples, total_samples)`, where the
+            total samples are the samples the function is anywhere on the
+            stack.
+        """
+        labels_to_self = dict()
+        labels_to_total = dict()
+
+        for labels, count in self.labeled_stacks():
+            if not labels:
+                continue
+
+            leaf = labels[-1]
+            labels_to_self[leaf] = labels_to_self.get(leaf, 0) + count
+
+            for label in set(labels):
+                labels_to_total[label] = labels_to_total.get(label, 0) + count
+
+        hottest = sorted(
+            labels_to_total,
+            key=lambda label: (labels_to_self.get(label, 0), labels_to_total[label]),
+            reverse=True,
+        )
+
+        return [
+            (label, labels_to_self.get(label, 0), labels_to_total[label])
+            for label in hottest[:limit]
+        ]
@@ -46,6 +46,7 @@ class Timer:
                 self.oldtimer[1],
             )
         else:
+            signal.setitimer(TIMER, 0)
             signal.signal(TIMER_SIGNAL, signal.SIG_IGN)
 
     def __del__(self):
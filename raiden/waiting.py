@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
-import gevent
+from collections import defaultdict
+
+from gevent.event import Event
 import structlog
 
 from raiden.transfer.state import NODE_NETWORK_REACHABLE
@@ -7,39 +9,170 @@ from raiden.transfer.state import (
     CHANNEL_STATE_SETTLED,
     CHANNEL_AFTER_CLOSE_STATES,
 )
+from raiden.transfer.state_change import (
+    ActionChangeNodeNetworkState,
+    ActionChannelClose,
+    ActionInitNode,
+    ActionNewTokenNetwork,
+    Block,
+    ContractReceiveChannelClosed,
+    ContractReceiveChannelNew,
+    ContractReceiveChannelNewBalance,
+    ContractReceiveChannelSettled,
+    ContractReceiveChannelWithdraw,
+    ContractReceiveNewPaymentNetwork,
+    ContractReceiveNewTokenNetwork,
+)
 from raiden.transfer import channel, views
 from raiden.utils import typing
 
 log = structlog.get_logger(__name__)  # pylint: disable=invalid-name
 
+# State changes that may affect any of the observed conditions, e.g. a new
+# token network can make a channel lookup succeed. These are rare, so every
+# observer is woken up.
+BROADCAST_STATE_CHANGES = (
+    ActionInitNode,
+    ActionNewTokenNetwork,
+    ContractReceiveNewPaymentNetwork,
+    ContractReceiveNewTokenNetwork,
+)
+
+CHANNEL_STATE_CHANGES = (
+    ActionChannelClose,
+    ContractReceiveChannelClosed,
+    ContractReceiveChannelNewBalance,
+    ContractReceiveChannelSettled,
+    ContractReceiveChannelWithdraw,
+)
+
+
+def channel_key(channel_identifier: typing.ChannelID) -> typing.Tuple:
+    return ('channel', channel_identifier)
+
+
+def partner_key(partner_address: typing.Address) -> typing.Tuple:
+    return ('partner', partner_address)
+
+
+def node_key(node_address: typing.Address) -> typing.Tuple:
+    return ('node', node_address)
+
+
+def state_change_keys(state_change, due_channels=()) -> typing.List[typing.Tuple]:
+    """ Returns the keys of the observers interested in `state_change`.
+
+    A `Block` changes the channels it is dispatched to, e.g. it confirms their
+    deposits, these are given by `due_channels`.
+    """
+    if isinstance(state_change, Block):
+        return [
+            channel_key(channel_identifier)
+            for _, channel_identifier in due_channels
+        ]
+
+    if isinstance(state_change, CHANNEL_STATE_CHANGES):
+        return [channel_key(state_change.channel_identifier)]
+
+    if isinstance(state_change, ContractReceiveChannelNew):
+        channel_state = state_change.channel_state
+        return [
+            channel_key(channel_state.identifier),
+            partner_key(channel_state.partner_state.address),
+        ]
+
+    if isinstance(state_change, ActionChangeNodeNetworkState):
+        return [node_key(state_change.node_address)]
+
+    return []
+
+
+class StateObservers:
+    """ Wakes up the tasks waiting for a condition on the node state.
+
+    A waiting task registers the keys of the state it depends on, e.g. the
+    channel identifier, and is only woken up when a state change for one of
+    these keys is applied. The high frequency state changes, like `Block` and
+    the protocol messages, only wake up the tasks of the channels they modify,
+    so a large number of waiting tasks don't have to re-evaluate their
+    conditions every block.
+    """
+
+    def __init__(self):
+        self.keys_to_events = defaultdict(set)
+
+    def notify(self, state_change, due_channels=()):
+        """ Must be called after `state_change` is applied to the node state,
+        `due_channels` are the channels a `Block` was dispatched to.
+        """
+        if isinstance(state_change, BROADCAST_STATE_CHANGES):
+            events = set()
+            for key_events in self.keys_to_events.values():
+                events.update(key_events)
+        else:
+            events = set()
+            for key in state_change_keys(state_change, due_channels):
+                events.update(self.keys_to_events.get(key, ()))
+
+        for event in events:
+            event.set()
+
+    def wait_until(
+            self,
+            keys: typing.List[typing.Tuple],
+            condition: typing.Callable[[], bool],
+    ) -> None:
+        """ Block until `condition` holds, it is evaluated every time a state
+        change for one of the `keys` is applied.
+
+        Note:
+            This does not time out, use gevent.Timeout.
+        """
+        event = Event()
+
+        for key in keys:
+            self.keys_to_events[key].add(event)
+
+        try:
+            # The condition does not switch contexts, so a notification can't
+            # be missed between clearing the event and evaluating it.
+            event.clear()
+            while not condition():
+                event.wait()
+                event.clear()
+        finally:
+            for key in keys:
+                key_events = self.keys_to_events[key]
+                key_events.discard(event)
+
+                if not key_events:
+                    del self.keys_to_events[key]
+
 
 def wait_for_newchannel(
         raiden: 'RaidenService',
         payment_network_id: typing.PaymentNetworkID,
         token_address: typing.TokenAddress,
         partner_address: typing.Address,
-        poll_timeout: typing.NetworkTimeout,
 ) -> None:
     """Wait until the channel with partner_address is registered.
 
     Note:
         This does not time out, use gevent.Timeout.
     """
-    channel_state = views.get_channelstate_for(
-        views.state_from_raiden(raiden),
-        payment_network_id,
-        token_address,
-        partner_address,
-    )
-
-    while channel_state is None:
-        gevent.sleep(poll_timeout)
+    def channel_is_registered():
         channel_state = views.get_channelstate_for(
             views.state_from_raiden(raiden),
             payment_network_id,
             token_address,
             partner_address,
         )
+        return channel_state is not None
+
+    raiden.state_observers.wait_until(
+        [partner_key(partner_address)],
+        channel_is_registered,
+    )
 
 
 def wait_for_participant_newbalance(
@@ -49,7 +182,6 @@ def wait_for_participant_newbalance(
         partner_address: typing.Address,
         target_address: typing.Address,
         target_balance: typing.TokenAmount,
-        poll_timeout: typing.NetworkTimeout,
 ) -> None:
     """Wait until a given channels balance exceeds the target balance.
 
@@ -63,55 +195,82 @@ def wait_for_participant_newbalance(
     else:
         raise ValueError('target_address must be one of the channel participants')
 
-    channel_state = views.get_channelstate_for(
-        views.state_from_raiden(raiden),
-        payment_network_id,
-        token_address,
-        partner_address,
-    )
-
-    while balance(channel_state) < target_balance:
-        gevent.sleep(poll_timeout)
-        channel_state = views.get_channelstate_for(
+    def get_channel_state():
+        return views.get_channelstate_for(
             views.state_from_raiden(raiden),
             payment_network_id,
             token_address,
             partner_address,
         )
 
+    channel_identifier = get_channel_state().identifier
 
-def wait_for_close(
+    raiden.state_observers.wait_until(
+        [channel_key(channel_identifier)],
+        lambda: balance(get_channel_state()) >= target_balance,
+    )
+
+
+def wait_for_channels_status(
         raiden: 'RaidenService',
         payment_network_id: typing.PaymentNetworkID,
-        token_address: typing.Address,
+        token_address: typing.TokenAddress,
         channel_ids: typing.List[typing.ChannelID],
-        poll_timeout: typing.NetworkTimeout,
+        target_states: typing.Tuple[str, ...],
 ) -> None:
-    """Wait until all channels are closed.
+    """Wait until all channels are in one of the `target_states`, a channel
+    which is not known is considered done.
 
     Note:
         This does not time out, use gevent.Timeout.
     """
-    channel_ids = list(channel_ids)
+    pending_ids = set(channel_ids)
 
-    while channel_ids:
-        first_id = channel_ids[0]
-        channel_state = views.get_channelstate_by_id(
-            views.state_from_raiden(raiden),
-            payment_network_id,
-            token_address,
-            first_id,
-        )
+    def channels_are_done():
+        node_state = views.state_from_raiden(raiden)
 
-        channel_is_settled = (
-            channel_state is None or
-            channel.get_status(channel_state) in CHANNEL_AFTER_CLOSE_STATES
-        )
+        for channel_id in list(pending_ids):
+            channel_state = views.get_channelstate_by_id(
+                node_state,
+                payment_network_id,
+                token_address,
+                channel_id,
+            )
 
-        if channel_is_settled:
-            channel_ids.pop()
-        else:
-            gevent.sleep(poll_timeout)
+            channel_is_done = (
+                channel_state is None or
+                channel.get_status(channel_state) in target_states
+            )
+
+            if channel_is_done:
+                pending_ids.remove(channel_id)
+
+        return not pending_ids
+
+    raiden.state_observers.wait_until(
+        [channel_key(channel_id) for channel_id in pending_ids],
+        channels_are_done,
+    )
+
+
+def wait_for_close(
+        raiden: 'RaidenService',
+        payment_network_id: typing.PaymentNetworkID,
+        token_address: typing.Address,
+        channel_ids: typing.List[typing.ChannelID],
+) -> None:
+    """Wait until all channels are closed.
+
+    Note:
+        This does not time out, use gevent.Timeout.
+    """
+    wait_for_channels_status(
+        raiden,
+        payment_network_id,
+        token_address,
+        channel_ids,
+        CHANNEL_AFTER_CLOSE_STATES,
+    )
 
 
 def wait_for_settle(
@@ -119,7 +278,6 @@ def wait_for_settle(
         payment_network_id: typing.PaymentNetworkID,
         token_address: typing.TokenAddress,
         channel_ids: typing.List[typing.ChannelID],
-        poll_timeout: typing.NetworkTimeout,
 ) -> None:
     """Wait until all channels are settled.
 
@@ -129,31 +287,17 @@ def wait_for_settle(
     if not isinstance(channel_ids, list):
         raise ValueError('channel_ids must be a list')
 
-    channel_ids = list(channel_ids)
-
-    while channel_ids:
-        first_id = channel_ids[0]
-        channel_state = views.get_channelstate_by_id(
-            views.state_from_raiden(raiden),
-            payment_network_id,
-            token_address,
-            first_id,
-        )
-
-        channel_is_settled = (
-            channel_state is None or
-            channel.get_status(channel_state) == CHANNEL_STATE_SETTLED
-        )
-
-        if channel_is_settled:
-            channel_ids.pop()
-        else:
-            gevent.sleep(poll_timeout)
+    wait_for_channels_status(
+        raiden,
+        payment_network_id,
+        token_address,
+        channel_ids,
+        (CHANNEL_STATE_SETTLED, ),
+    )
 
 
 def wait_for_settle_all_channels(
         raiden: 'RaidenService',
-        poll_timeout: typing.NetworkTimeout,
 ) -> None:
     """Wait until all channels are settled.
 
@@ -173,27 +317,26 @@ def wait_for_settle_all_channels(
                 raiden,
                 payment_network_id,
                 token_network_id,
-                channel_ids,
-                poll_timeout,
+                list(channel_ids),
             )
 
 
 def wait_for_healthy(
         raiden: 'RaidenService',
         node_address: typing.Address,
-        poll_timeout: typing.NetworkTimeout,
 ) -> None:
     """Wait until `node_address` becomes healthy.
 
     Note:
         This does not time out, use gevent.Timeout.
     """
-    network_statuses = views.get_networkstatuses(
-        views.state_from_raiden(raiden),
-    )
-
-    while network_statuses.get(node_address) != NODE_NETWORK_REACHABLE:
-        gevent.sleep(poll_timeout)
+    def node_is_healthy():
         network_statuses = views.get_networkstatuses(
             views.state_from_raiden(raiden),
         )
+        return network_statuses.get(node_address) == NODE_NETWORK_REACHABLE
+
+    raiden.state_observers.wait_until(
+        [node_key(node_address)],
+        node_is_healthy,
+    )